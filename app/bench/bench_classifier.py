@@ -0,0 +1,151 @@
+# app/bench/bench_classifier.py
+"""
+Классификатор типа документа (app.services.doc_classifier) против правил detect_*.
+
+Для каждого уровня OCR-шума (--noise) считает точность и docs/sec:
+  rules      — только цепочка из 12 детекторов (как было)
+  classifier — только модель, пачкой (одно умножение матриц на CHUNK документов)
+  combined   — detect_types_batch: цепочка правил → при «Неизвестно» уверенный ответ модели
+
+Корпус: --jsonl (text, filename, type_document) или синтетический (--synthetic N):
+шаблоны 12 типов, часть имён файлов «безликие» (scan_0001.pdf) — тогда рапорты
+КУИ/ЕРДР правила по имени уже не узнают. Модель: --model или обучение на
+отдельной синтетической выборке (--train N, с OCR-аугментацией).
+
+Запуск:
+    python -m app.bench.bench_classifier --synthetic 600 --train 1200 --noise 0,0.05,0.1 --out clf.json
+"""
+from __future__ import annotations
+import argparse
+import json
+import logging
+import random
+import time
+from typing import List, Optional, Tuple
+
+from app.services import doc_classifier as dc
+from app.services import parser_dispatch as pd
+
+_FILLER = (
+    "в период времени находясь по адресу улица дом квартира согласно сведениям установлено что "
+    "гражданин гражданка года рождения проживающий зарегистрированный в отношении имущества "
+    "на сумму тенге при обстоятельствах изложенных выше руководствуясь статьями УПК"
+).split()
+
+# (type_document, заголовок текста, ключевая фраза, осмысленное имя файла)
+_TEMPLATES = [
+    ("Рапорт КУИ", "РАПОРТ", "Докладываю, что сообщение зарегистрировано в КУИ за № {num}",
+     "1. Рапорт_КУИ_{num}.pdf"),
+    ("Рапорт ЕРДР", "РАПОРТ", "Докладываю, что сведения внесены в ЕРДР за № {num}",
+     "2. Рапорт_ЕРДР_{num}.pdf"),
+    ("Уведомление о начале ДР", "УВЕДОМЛЕНИЕ", "о начале досудебного расследования № {num}",
+     "3. Уведомление о начале досудебного расследования_ЕРДР__{num}.pdf"),
+    ("Постановление о принятии материалов", "ПОСТАНОВЛЕНИЕ",
+     "о принятии материалов уголовного дела в собственное производство",
+     "4. Постановление о принятии материалов уголовного дела в собственное производство.pdf"),
+    ("Постановление о ведении УП по ДР (электронно)", "ПОСТАНОВЛЕНИЕ",
+     "о ведении уголовного судопроизводства по досудебному расследованию в электронном формате",
+     "6. Постановление_о_ведении_уголовного_производства_по_досудебному_расследованию_в_электронном_формате.pdf"),
+    ("Постановление о поручении производства ДР следователю", "ПОСТАНОВЛЕНИЕ",
+     "о поручении производства досудебного расследования следователю",
+     "7. Постановление_о_поручении_производства_досудебного_расследования_следователю.pdf"),
+    ("Постановление о признании лица потерпевшим", "ПОСТАНОВЛЕНИЕ",
+     "о признании лица потерпевшим", "5. Постановление_о_признании_лица_потерпевшим.pdf"),
+    ("Заявление потерпевшего о языке судопроизводства", "ЗАЯВЛЕНИЕ",
+     "потерпевшего о языке судопроизводства", "8. Заявление_потерпевшего_о_языке_судопроизводства.pdf"),
+    ("Исковое заявление", "ИСКОВОЕ ЗАЯВЛЕНИЕ", "о возмещении материального ущерба", "Исковое_заявление.pdf"),
+    ("Постановление о признании лица гражданским истцом", "ПОСТАНОВЛЕНИЕ",
+     "о признании лица гражданским истцом", "Постановление_о_признании_гражданским_истцом.pdf"),
+    ("Заявление об отказе от ознакомления", "ЗАЯВЛЕНИЕ",
+     "отказываюсь от ознакомления с постановлением о назначении экспертизы", "Заявление_об_отказе.pdf"),
+    ("протокол допроса потерпевшего", "ПРОТОКОЛ", "допроса потерпевшего", "Протокол_допроса_потерпевшего.pdf"),
+]
+
+
+def _filler(rnd: random.Random, n: int) -> str:
+    return " ".join(rnd.choice(_FILLER) for _ in range(n)) + "."
+
+
+def synthetic(n: int, seed: int, generic_names: float) -> List[Tuple[Optional[str], str, str, str]]:
+    rnd = random.Random(seed)
+    out = []
+    for i in range(n):
+        td, title, phrase, name = _TEMPLATES[i % len(_TEMPLATES)]
+        num = "".join(rnd.choice("0123456789") for _ in range(15))
+        text = (f"{title}\n{phrase.format(num=num)}\nг. Павлодар {rnd.randint(1, 28):02d}.04.2025 г.\n"
+                f"{_filler(rnd, rnd.randint(30, 150))}\n{_filler(rnd, 20)}\nСледователь Иванов И.И.\n")
+        fn = f"scan_{i:04d}.pdf" if rnd.random() < generic_names else name.format(num=num)
+        out.append((fn, text, td, pd.view_of(td)))
+    return out
+
+
+def _accuracy(pred: List[str], truth: List[str]) -> float:
+    return round(sum(p.lower() == t.lower() for p, t in zip(pred, truth)) / max(len(truth), 1), 4)
+
+
+def evaluate(samples, noise: float, seed: int) -> dict:
+    rnd = random.Random(seed)
+    items = [(dc.ocr_noise(fn or "", noise, rnd) if fn else fn, dc.ocr_noise(text, noise, rnd))
+             for fn, text, _, _ in samples]
+    truth = [td for _, _, td, _ in samples]
+    model = dc.get_model()
+    res = {"noise": noise, "docs": len(items)}
+
+    dc.set_model(None)
+    t = time.perf_counter()
+    rules = [pd.detect_type_and_view(fn, text)["type_document"] for fn, text in items]
+    dt = time.perf_counter() - t
+    res["rules"] = {"accuracy": _accuracy(rules, truth), "docs_per_s": round(len(items) / dt, 1),
+                    "unknown": sum(r == "Неизвестно" for r in rules)}
+
+    t = time.perf_counter()
+    clf = [p.type_document for p in model.predict(items)]
+    dt = time.perf_counter() - t
+    res["classifier"] = {"accuracy": _accuracy(clf, truth), "docs_per_s": round(len(items) / dt, 1)}
+
+    dc.set_model(model)
+    t = time.perf_counter()
+    comb = [m["type_document"] for m in pd.detect_types_batch(items)]
+    dt = time.perf_counter() - t
+    res["combined"] = {"accuracy": _accuracy(comb, truth), "docs_per_s": round(len(items) / dt, 1),
+                       "unknown": sum(r == "Неизвестно" for r in comb)}
+    return res
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--jsonl")
+    ap.add_argument("--synthetic", type=int, default=600)
+    ap.add_argument("--generic-names", type=float, default=0.3, help="доля безликих имён файлов")
+    ap.add_argument("--model", help="готовая модель .npz (иначе обучение на синтетике)")
+    ap.add_argument("--train", type=int, default=1200)
+    ap.add_argument("--train-noise", type=float, default=0.08)
+    ap.add_argument("--epochs", type=int, default=30)
+    ap.add_argument("--noise", default="0,0.05,0.1")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--out")
+    args = ap.parse_args()
+    logging.getLogger("app.services.parser_dispatch").setLevel(logging.WARNING)
+
+    samples = dc.samples_from_jsonl(args.jsonl) if args.jsonl else \
+        synthetic(args.synthetic, args.seed, args.generic_names)
+    t = time.perf_counter()
+    if args.model:
+        model = dc.Model.load(args.model)
+    else:
+        fit = dc.augment(synthetic(args.train, args.seed + 1000, args.generic_names),
+                         args.train_noise, 1, 0.5, args.seed)
+        model = dc.train(fit, epochs=args.epochs)
+    train_s = time.perf_counter() - t
+    dc.set_model(model)
+
+    res = {"model": args.model or "synthetic", "train_s": round(train_s, 2), "classes": len(model.labels),
+           "runs": [evaluate(samples, float(x), args.seed) for x in args.noise.split(",")]}
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(res, f, ensure_ascii=False, indent=2)
+    print(json.dumps(res, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+# app/bench/bench_embed_limiter.py
+"""
+Лимитер параллельности эмбеддингов (app.core.limiter): AIMD против «залпа» и
+последовательных вызовов на сервере ограниченной ёмкости.
+
+Поднимает в процессе Ollama-заглушку (app.bench.standin_ollama) с ёмкостью --parallel
+и латентностью --latency-ms, затем в каждом режиме --seconds секунд гоняет смешанную
+нагрузку:
+  ingest — --ingest-threads потоков, каждый в цикле embed_passages(пачка --batch текстов);
+  query  — один поток, embed_query каждые --query-every-ms.
+Режимы:
+  serial — EMBED_LIMITER=false: пачка — запрос за запросом, как до лимитера;
+  blast  — фиксированный лимит --blast (min = max): пачка целиком в полёте;
+  aimd   — адаптивный лимит по умолчанию (EMBED_CONCURRENCY_*).
+Печатает тексты/с ingest, латентность query (p50/p95/max), ошибки/таймауты
+(OLLAMA_TIMEOUT = --timeout-s) и итоговый лимит.
+
+Запуск:
+    python -m app.bench.bench_embed_limiter --parallel 4 --latency-ms 20 --seconds 10 --out limiter.json
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import threading
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from app.bench import standin_ollama
+from app.core import embeddings, limiter
+
+
+def _reset() -> None:
+    # свежие синглтоны под новые ENV (те же сбросы, что и после fork)
+    if embeddings._POOL is not None:
+        embeddings._POOL.shutdown(wait=True)
+    embeddings._reset_after_fork()
+    limiter._reset_after_fork()
+
+
+def run_mode(mode: str, args) -> Dict:
+    env = {"EMBED_LIMITER": "false" if mode == "serial" else "true", "OLLAMA_TIMEOUT": str(args.timeout_s)}
+    if mode == "blast":
+        env.update(EMBED_CONCURRENCY_INITIAL=str(args.blast), EMBED_CONCURRENCY_MIN=str(args.blast),
+                   EMBED_CONCURRENCY_MAX=str(args.blast))
+    saved = {k: os.environ.get(k) for k in ("EMBED_LIMITER", "OLLAMA_TIMEOUT", "EMBED_CONCURRENCY_INITIAL",
+                                            "EMBED_CONCURRENCY_MIN", "EMBED_CONCURRENCY_MAX")}
+    os.environ.update(env)
+    for k in ("EMBED_CONCURRENCY_INITIAL", "EMBED_CONCURRENCY_MIN", "EMBED_CONCURRENCY_MAX"):
+        if k not in env:
+            os.environ.pop(k, None)
+    _reset()
+    emb = embeddings.get_embedder()
+    stop = threading.Event()
+    texts, errors, q_lat, q_err = [0], [0], [], [0]
+    lock = threading.Lock()
+
+    def ingest_loop(i: int):
+        n = 0
+        while not stop.is_set():
+            batch = [f"документ {i}-{n}-{j} текст показаний" for j in range(args.batch)]
+            n += 1
+            try:
+                emb.embed_passages(batch)
+                with lock:
+                    texts[0] += len(batch)
+            except Exception:
+                with lock:
+                    errors[0] += 1
+
+    def query_loop():
+        k = 0
+        while not stop.is_set():
+            t = time.perf_counter()
+            try:
+                emb.embed_query(f"запрос {k}")
+                q_lat.append((time.perf_counter() - t) * 1000)
+            except Exception:
+                q_err[0] += 1
+            k += 1
+            stop.wait(args.query_every_ms / 1000)
+
+    threads = [threading.Thread(target=ingest_loop, args=(i,)) for i in range(args.ingest_threads)]
+    threads.append(threading.Thread(target=query_loop))
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    limits: List[float] = []
+    while time.perf_counter() - t0 < args.seconds:
+        time.sleep(0.25)
+        if mode != "serial":
+            limits.append(limiter.get_embed_limiter().limit)
+    stop.set()
+    for t in threads:
+        t.join()
+    el = time.perf_counter() - t0
+
+    q = np.asarray(q_lat) if q_lat else np.zeros(1)
+    res = {
+        "mode": mode, "ingest_texts_per_s": round(texts[0] / el, 1), "ingest_batch_errors": errors[0],
+        "query_n": len(q_lat), "query_errors": q_err[0],
+        "query_p50_ms": round(float(np.percentile(q, 50)), 1), "query_p95_ms": round(float(np.percentile(q, 95)), 1),
+        "query_max_ms": round(float(q.max()), 1),
+    }
+    if mode != "serial":
+        snap = limiter.get_embed_limiter().snapshot()
+        res.update(limit_final=snap["limit"], limit_mean=round(float(np.mean(limits)), 2) if limits else None,
+                   requests=snap["requests"])
+    for k, v in saved.items():
+        if v is None:
+            os.environ.pop(k, None)
+        else:
+            os.environ[k] = v
+    _reset()
+    return res
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--modes", default="serial,blast,aimd")
+    ap.add_argument("--parallel", type=int, default=4, help="ёмкость заглушки (OLLAMA_NUM_PARALLEL)")
+    ap.add_argument("--latency-ms", type=float, default=20)
+    ap.add_argument("--jitter-ms", type=float, default=5)
+    ap.add_argument("--seconds", type=float, default=10)
+    ap.add_argument("--ingest-threads", type=int, default=1)
+    ap.add_argument("--batch", type=int, default=32)
+    ap.add_argument("--query-every-ms", type=float, default=100)
+    ap.add_argument("--blast", type=int, default=64, help="фиксированный лимит режима blast")
+    ap.add_argument("--timeout-s", type=float, default=2.0, help="OLLAMA_TIMEOUT на время прогона")
+    ap.add_argument("--port", type=int, default=0)
+    ap.add_argument("--out")
+    args = ap.parse_args()
+
+    srv = standin_ollama.serve("127.0.0.1", args.port, 64, args.latency_ms, args.jitter_ms, 0.0, 0.0,
+                               args.parallel)
+    srv.daemon_threads = True
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    prev_url = os.environ.get("OLLAMA_URL")
+    os.environ["OLLAMA_URL"] = f"http://127.0.0.1:{srv.server_address[1]}/api/embeddings"
+    try:
+        runs = [run_mode(m, args) for m in args.modes.split(",")]
+    finally:
+        srv.shutdown()
+        if prev_url is None:
+            os.environ.pop("OLLAMA_URL", None)
+        else:
+            os.environ["OLLAMA_URL"] = prev_url
+
+    res = {"server_parallel": args.parallel, "latency_ms": args.latency_ms, "seconds": args.seconds,
+           "ingest_threads": args.ingest_threads, "batch": args.batch, "runs": runs}
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(res, f, ensure_ascii=False, indent=2)
+    print(json.dumps(res, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+# app/bench/bench_embed_projection.py
+"""
+Снижение размерности эмбеддингов (app.core.projection): recall@k против размерности
+и экономия памяти для Matryoshka-усечения и PCA.
+
+Эталон — точный top-k по косинусу на полных векторах; для каждой размерности из --dims
+база и запросы проецируются (truncate: первые d координат; pca: обучение на --fit-sample
+векторах базы) и ищутся тем же точным перебором. recall@k = доля эталонного top-k
+в top-k после проекции — потери самой проекции, без погрешности ANN-индекса.
+Память — float32 векторы: n × d × 4 байт (плюс mean/W у PCA), время — перебор на запрос.
+
+Векторы:
+  по умолчанию — синтетические: смесь гауссиан со спадающим спектром дисперсий
+  (d^-alpha, как у реальных эмбеддингов); без --rotate дисперсия сосредоточена в первых
+  координатах (Matryoshka-подобная модель), с --rotate — размазана случайным поворотом
+  (обычная модель: усечение теряет, PCA нет);
+  --vectors file.npy — свои векторы модели; --from-store — выборка из app.core.local_store.
+Запросы — последние --queries векторов (не входят в базу и выборку PCA).
+
+Запуск:
+    python -m app.bench.bench_embed_projection --n 20000 --dim 768 --dims 512,384,256,128,64 --out proj.json
+    python -m app.bench.bench_embed_projection --vectors emb.npy --dims 256,128
+"""
+from __future__ import annotations
+import argparse
+import json
+import time
+from typing import Dict
+
+import numpy as np
+
+from app.bench.bench_vector_index import exact_topk
+from app.core.projection import Projection, fit_pca
+
+
+def synth_embeddings(n: int, dim: int, clusters: int = 64, alpha: float = 0.5,
+                     rotate: bool = False, seed: int = 42) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    scale = (1.0 + np.arange(dim)) ** -alpha
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=n)
+    x = (centers[labels] + 0.5 * rng.standard_normal((n, dim)).astype(np.float32)) * scale.astype(np.float32)
+    if rotate:
+        q, _ = np.linalg.qr(rng.standard_normal((dim, dim)))
+        x = x @ q.astype(np.float32)
+    return x / (np.linalg.norm(x, axis=1, keepdims=True) + 1e-12)
+
+
+def run(proj: Projection, base: np.ndarray, queries: np.ndarray, truth: np.ndarray, k: int,
+        full_bytes: int) -> Dict:
+    t = time.perf_counter()
+    pb = proj.apply(base)
+    project_s = time.perf_counter() - t
+    pq = proj.apply(queries)
+    t = time.perf_counter()
+    got = exact_topk(pb, pq, k)
+    search_ms = (time.perf_counter() - t) * 1000 / len(queries)
+    recall = np.mean([len(set(g) & set(e)) / k for g, e in zip(got.tolist(), truth.tolist())])
+    mem = pb.nbytes + (0 if proj.kind != "pca" else proj.mean.nbytes + proj.components.nbytes)
+    res = {"method": proj.kind, "dim": int(pb.shape[1]), f"recall@{k}": round(float(recall), 4),
+           "vectors_mb": round(mem / 2 ** 20, 2), "memory_saved": round(1 - mem / full_bytes, 3),
+           "search_ms_per_query": round(search_ms, 3), "project_s": round(project_s, 3)}
+    if proj.kind == "pca":
+        res["explained_variance"] = proj.meta["explained_variance"]
+    return res
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    src = ap.add_mutually_exclusive_group()
+    src.add_argument("--vectors", help=".npy [n × dim] векторов модели")
+    src.add_argument("--from-store", action="store_true", help="выборка из app.core.local_store")
+    ap.add_argument("--n", type=int, default=20000, help="размер базы (синтетика / выборка)")
+    ap.add_argument("--dim", type=int, default=768, help="размерность синтетики")
+    ap.add_argument("--alpha", type=float, default=0.5, help="спад спектра синтетики")
+    ap.add_argument("--rotate", action="store_true", help="синтетика без Matryoshka-порядка координат")
+    ap.add_argument("--clusters", type=int, default=64)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--dims", default="512,384,256,128,64")
+    ap.add_argument("--methods", default="truncate,pca")
+    ap.add_argument("--fit-sample", type=int, default=10000)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--out")
+    args = ap.parse_args()
+
+    if args.vectors:
+        x = np.load(args.vectors).astype(np.float32)
+    elif args.from_store:
+        from app.core.projection import sample_from_store
+        x = sample_from_store(args.n + args.queries, args.seed)
+    else:
+        x = synth_embeddings(args.n + args.queries, args.dim, args.clusters, args.alpha, args.rotate, args.seed)
+    x = x / (np.linalg.norm(x, axis=1, keepdims=True) + 1e-12)
+    base, queries = x[: -args.queries], x[-args.queries:]
+    dim_in = base.shape[1]
+
+    t = time.perf_counter()
+    truth = exact_topk(base, queries, args.k)
+    full_ms = (time.perf_counter() - t) * 1000 / len(queries)
+    rng = np.random.default_rng(args.seed)
+    fit_rows = np.sort(rng.choice(len(base), size=min(args.fit_sample, len(base)), replace=False))
+
+    runs = []
+    for d in sorted({int(v) for v in args.dims.split(",")}, reverse=True):
+        if d >= dim_in:
+            continue
+        for m in args.methods.split(","):
+            if m == "truncate":
+                proj = Projection("truncate", dim=d)
+            elif m == "pca":
+                t = time.perf_counter()
+                proj = fit_pca(base[fit_rows], d)
+                proj.meta["fit_s"] = round(time.perf_counter() - t, 2)
+            else:
+                ap.error(f"unknown method {m!r}")
+            runs.append(run(proj, base, queries, truth, args.k, base.nbytes))
+            print(json.dumps(runs[-1], ensure_ascii=False))
+
+    res = {"n": len(base), "queries": len(queries), "k": args.k, "dim_in": dim_in,
+           "source": args.vectors or ("local_store" if args.from_store else
+                                      f"synthetic(alpha={args.alpha}, rotate={args.rotate})"),
+           "full": {"vectors_mb": round(base.nbytes / 2 ** 20, 2), "search_ms_per_query": round(full_ms, 3)},
+           "runs": runs}
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(res, f, ensure_ascii=False, indent=2)
+    print(json.dumps(res, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# app/bench/bench_local_store.py
+"""
+Бенчмарк встроенного NumPy-хранилища (app.core.local_store) на 10k / 100k / 1M векторов:
+время загрузки, латентность точного блочного поиска и IVF (nprobe), recall IVF
+относительно точного перебора, объём memmap-матрицы.
+
+Запуск:
+    python -m app.bench.bench_local_store --sizes 10000,100000,1000000 --dim 768 \
+        --queries 100 --k 10 --nlist 1024 --nprobe 8,32
+
+Векторы синтетические (смесь гауссиан); хранилище создаётся во временном каталоге
+(или --dir). На 1M×768 это ~3 ГБ на диске.
+"""
+from __future__ import annotations
+import argparse
+import json
+import math
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from app.bench.bench_vector_index import synth_vectors
+from app.core.local_store import LocalVectorIndex
+
+
+def _percentiles(lat: list[float]) -> dict:
+    a = np.asarray(lat)
+    return {p: round(float(np.percentile(a, int(p[1:]))), 3) for p in ("p50", "p95", "p99")}
+
+
+def bench_size(n: int, args, root: Path) -> dict:
+    path = root / f"n{n}"
+    store = LocalVectorIndex(path)
+
+    t0 = time.perf_counter()
+    for start in range(0, n, args.batch):
+        m = min(args.batch, n - start)
+        vecs = synth_vectors(m, args.dim, seed=start)
+        props = [{"city_fix": ("Павлодар", "Экибастуз", "Аксу")[(start + i) % 3]} for i in range(m)]
+        store.add(vecs, props)
+    load_s = time.perf_counter() - t0
+
+    queries = synth_vectors(args.queries, args.dim, seed=10**9)
+    k = args.k
+
+    lat_exact, truth = [], []
+    for q in queries:
+        t = time.perf_counter()
+        truth.append({r for r, _ in store.search(q, k)[0]})
+        lat_exact.append((time.perf_counter() - t) * 1000)
+
+    t = time.perf_counter()
+    store.search(queries, k)  # вся пачка одним блочным matmul
+    batch_ms = (time.perf_counter() - t) * 1000
+
+    t = time.perf_counter()
+    store.search(queries[0], k, filters={"city_fix": "Павлодар"})
+    filtered_ms = (time.perf_counter() - t) * 1000
+
+    res = {
+        "n": n,
+        "dim": args.dim,
+        "load_vec_per_s": round(n / load_s, 1),
+        "matrix_mb": round(n * args.dim * 4 / 2**20, 1),
+        "exact_ms": _percentiles(lat_exact),
+        "exact_batch_ms_per_query": round(batch_ms / len(queries), 3),
+        "exact_filtered_ms": round(filtered_ms, 3),
+        "ivf": [],
+    }
+
+    nlist = args.nlist or max(16, int(math.sqrt(n)))
+    if n >= nlist * 4:
+        t = time.perf_counter()
+        store.train_ivf(nlist, sample=min(n, args.ivf_sample))
+        res["ivf_nlist"] = nlist
+        res["ivf_train_s"] = round(time.perf_counter() - t, 2)
+        for nprobe in [int(x) for x in args.nprobe.split(",") if x]:
+            lat, hits = [], 0
+            for qi, q in enumerate(queries):
+                t = time.perf_counter()
+                got = {r for r, _ in store.search(q, k, nprobe=nprobe)[0]}
+                lat.append((time.perf_counter() - t) * 1000)
+                hits += len(got & truth[qi])
+            res["ivf"].append({
+                "nprobe": nprobe,
+                f"recall@{k}": round(hits / (len(queries) * k), 4),
+                "ms": _percentiles(lat),
+            })
+    return res
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", default="10000,100000,1000000")
+    ap.add_argument("--dim", type=int, default=768)
+    ap.add_argument("--queries", type=int, default=100)
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--batch", type=int, default=20000)
+    ap.add_argument("--nlist", type=int, default=0, help="0 = sqrt(n)")
+    ap.add_argument("--nprobe", default="8,32")
+    ap.add_argument("--ivf-sample", type=int, default=100_000)
+    ap.add_argument("--dir", help="каталог для хранилищ (по умолчанию временный)")
+    ap.add_argument("--out", help="куда записать JSON с результатами")
+    args = ap.parse_args()
+
+    root = Path(args.dir) if args.dir else Path(tempfile.mkdtemp(prefix="local_store_bench_"))
+    results = []
+    try:
+        for n in [int(x) for x in args.sizes.split(",") if x]:
+            print(f"== n={n} ==")
+            r = bench_size(n, args, root)
+            print("   " + json.dumps(r, ensure_ascii=False))
+            results.append(r)
+    finally:
+        if not args.dir:
+            shutil.rmtree(root, ignore_errors=True)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
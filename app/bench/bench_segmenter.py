@@ -0,0 +1,145 @@
+# app/bench/bench_segmenter.py
+"""
+Разметка на разделы (app.services.segmenter) на длинных документах: SEGMENTS=true против false.
+
+Для каждого размера из --sizes строит синтетический документ с настоящей структурой:
+  protokol      — протокол допроса: шапка, вводный абзац, анкета, показания на N символов
+                  (с упоминаниями «Следователь», «г. …», ФИО и дат внутри), подпись;
+  postanovlenie — постановление: шапка, УСТАНОВИЛ на N символов, ПОСТАНОВИЛ, подпись;
+и разбирает его соответствующим парсером --repeat раз в каждом режиме.
+Печатает мс/док (CPU), ускорение, время самой разметки и поля, которые различаются
+между режимами (ожидаемо: только post_new постановлений — берётся из подписи, а не шапки).
+
+Запуск:
+    python -m app.bench.bench_segmenter --sizes 50000,200000,500000 --repeat 5 --out seg.json
+"""
+from __future__ import annotations
+import argparse
+import json
+import logging
+import os
+import random
+import time
+from typing import Callable, Dict, List
+
+from app.services import parser_dispatch as pd
+from app.services import segmenter
+
+_WORDS = (
+    "потерпевший пояснил что в период времени находясь по адресу улица дом квартира "
+    "передал денежные средства в сумме тенге гражданину который обещал вернуть долг "
+    "однако обязательства не исполнил на звонки не отвечает сообщения игнорирует"
+).split()
+_NOISE = [
+    "Следователь мне не звонил.", "г. Павлодар", "17 апреля 2025 года", "Петров П.П.",
+    "по Павлодарской области", "в помещении банка", "№ 255500121000018",
+]
+
+
+def _body(rnd: random.Random, size: int) -> str:
+    out, n = [], 0
+    while n < size:
+        s = " ".join(rnd.choice(_WORDS) for _ in range(rnd.randint(8, 25)))
+        if rnd.random() < 0.3:
+            s += " " + rnd.choice(_NOISE)
+        s = s.capitalize() + ".\n"
+        out.append(s)
+        n += len(s)
+    return "".join(out)
+
+
+def protokol(rnd: random.Random, size: int) -> str:
+    return (
+        "ПРОТОКОЛ\nдопроса потерпевшего\nг. Павлодар 17 апреля 2025 года\n"
+        "Следователь по ОВД Следственного управления Департамента экономических расследований "
+        "по Павлодарской области Закиев Е.Б. в помещении служебного кабинета № 5 "
+        "допросил по уголовному делу № 255500121000018 от 17 апреля 2025 года в качестве потерпевшего(ей):\n"
+        "Фамилия, имя, отчество: Петров Петр Петрович\nДата рождения: 01.01.1980\n"
+        "Место жительства: г. Павлодар, ул. Ленина 1\n"
+        "Применение технических средств аудио/видео фиксации: Не применялось\n"
+        "По существу дела потерпевший(ая) дал(а) следующие показания:\n"
+        + _body(rnd, size) +
+        "Протокол прочитан лично, замечаний нет.\n"
+        "Следователь по ОВД Следственного управления Департамента экономических расследований "
+        "по Павлодарской области Закиев Е.Б.\n"
+    )
+
+
+def postanovlenie(rnd: random.Random, size: int) -> str:
+    return (
+        "ПОСТАНОВЛЕНИЕ\nо признании лица потерпевшим\nг. Павлодар 17 апреля 2025 года\n"
+        "Следователь Департамента экономических расследований по Павлодарской области Иванов И.И., "
+        "рассмотрев материалы уголовного дела № 255500121000018,\nУСТАНОВИЛ:\n"
+        + _body(rnd, size) +
+        "ПОСТАНОВИЛ:\n1. Признать Петрова Петра Петровича потерпевшим.\n"
+        "Следователь по особо важным делам\nДепартамента экономических расследований по Павлодарской области\n"
+        "Сидоров С.С.\n"
+    )
+
+
+_CASES = {
+    "protokol": (protokol, "parse_prot_doprosa"),
+    "postanovlenie": (postanovlenie, "parse_priznanie_poter"),
+}
+
+
+def _time(fn: Callable, text: str, repeat: int) -> tuple:
+    res, t = None, time.process_time()
+    for _ in range(repeat):
+        res = fn(text, filename="bench.txt")
+    return (time.process_time() - t) * 1000 / repeat, res
+
+
+def run_case(kind: str, size: int, repeat: int, seed: int) -> Dict:
+    build, parser = _CASES[kind]
+    text = build(random.Random(seed), size)
+    fn = pd._parser(parser)
+
+    os.environ["SEGMENTS"] = "false"
+    off_ms, off = _time(fn, text, repeat)
+    os.environ["SEGMENTS"] = "true"
+    on_ms, on = _time(fn, text, repeat)
+
+    t = time.process_time()
+    for _ in range(repeat):
+        seg = segmenter.segment(text, kind)
+    seg_ms = (time.process_time() - t) * 1000 / repeat
+    return {
+        "kind": kind, "chars": len(text), "off_ms": round(off_ms, 2), "on_ms": round(on_ms, 2),
+        "speedup": round(off_ms / max(on_ms, 1e-6), 2), "segment_ms": round(seg_ms, 3),
+        "sections": {k: e - s for k, (s, e) in seg.spans.items()},
+        "changed_fields": sorted(k for k in on if on[k] != off[k]),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", default="50000,200000,500000")
+    ap.add_argument("--kinds", default=",".join(_CASES))
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out")
+    args = ap.parse_args()
+    logging.getLogger("app.services.parser_dispatch").setLevel(logging.WARNING)
+
+    prev = os.environ.get("SEGMENTS")
+    runs: List[Dict] = []
+    try:
+        for kind in args.kinds.split(","):
+            for size in (int(s) for s in args.sizes.split(",")):
+                runs.append(run_case(kind, size, args.repeat, args.seed))
+    finally:
+        if prev is None:
+            os.environ.pop("SEGMENTS", None)
+        else:
+            os.environ["SEGMENTS"] = prev
+
+    res = {"repeat": args.repeat, "runs": runs}
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(res, f, ensure_ascii=False, indent=2)
+    print(json.dumps(res, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
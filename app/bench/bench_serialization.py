@@ -0,0 +1,110 @@
+# app/bench/bench_serialization.py
+"""
+Бенчмарк сериализации ответов: размер тела и время на limit=1000.
+
+Сравнивает для /search/bm25 (hits) и /reports/chunks (items + векторы):
+  pydantic   — старый путь: Hit(**h) → HitsResponse → model_dump_json
+  json       — json.dumps готовых dict'ов
+  fast       — app.core.serialization.dumps (orjson)
+  base64/f32, base64/f16 — векторы строкой base64
+  binary/f32, binary/f16 — application/octet-stream (pack_binary)
+
+Запуск:
+    python -m app.bench.bench_serialization --limit 1000 --dim 768 --out ser.json
+"""
+from __future__ import annotations
+import argparse
+import json
+import random
+import time
+import uuid
+
+import numpy as np
+
+from app.core import serialization as ser
+from app.core.weaviate_client import REPORT_FIELDS
+from app.schemas.schemas import Hit, HitsResponse
+
+
+def synthetic_items(n: int, dim: int, seed: int = 3) -> list[dict]:
+    rnd = random.Random(seed)
+    rng = np.random.default_rng(seed)
+    words = "потерпевший мошенничество денежные средства ущерб заявление следователь постановление".split()
+    items = []
+    for _ in range(n):
+        props = {f: " ".join(rnd.choice(words) for _ in range(rnd.randint(3, 60))) for f in REPORT_FIELDS}
+        v = rng.standard_normal(dim).astype(np.float32)
+        items.append({
+            "uuid": str(uuid.uuid4()),
+            "score": rnd.random(),
+            "properties": props,
+            "vector": (v / np.linalg.norm(v)).tolist(),
+        })
+    return items
+
+
+def _time(fn, repeat: int) -> tuple[float, int]:
+    best, size = float("inf"), 0
+    for _ in range(repeat):
+        t = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t)
+        size = len(out)
+    return round(best * 1000, 3), size
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--limit", type=int, default=1000)
+    ap.add_argument("--dim", type=int, default=768)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--out")
+    args = ap.parse_args()
+
+    items = synthetic_items(args.limit, args.dim)
+    hits = [{"id": it["uuid"], "score": it["score"], "properties": it["properties"]} for it in items]
+    chunks = {"count": len(items), "limit": args.limit, "offset": 0, "filters_applied": {}, "items": items}
+
+    def pydantic_hits():
+        return HitsResponse(hits=[Hit(**h) for h in hits]).model_dump_json().encode("utf-8")
+
+    def fresh():
+        # encode_items меняет item["vector"] на месте — поверхностной копии достаточно
+        return {**chunks, "items": [dict(it) for it in items]}
+
+    def encoded(fmt, dtype):
+        return lambda: ser.encode_items(fresh(), fmt, dtype).body
+
+    res = {"limit": args.limit, "dim": args.dim, "orjson": ser.orjson is not None, "hits": {}, "chunks": {}}
+    for name, fn in [
+        ("pydantic", pydantic_hits),
+        ("json", lambda: json.dumps({"hits": hits}, ensure_ascii=False).encode("utf-8")),
+        ("fast", lambda: ser.dumps({"hits": hits})),
+    ]:
+        ms, size = _time(fn, args.repeat)
+        res["hits"][name] = {"ms": ms, "bytes": size}
+
+    for name, fn in [
+        ("json", lambda: json.dumps(chunks, ensure_ascii=False).encode("utf-8")),
+        ("fast_json_vectors", lambda: ser.dumps(chunks)),
+        ("base64_f32", encoded("base64", "float32")),
+        ("base64_f16", encoded("base64", "float16")),
+        ("binary_f32", encoded("binary", "float32")),
+        ("binary_f16", encoded("binary", "float16")),
+    ]:
+        ms, size = _time(fn, args.repeat)
+        res["chunks"][name] = {"ms": ms, "bytes": size}
+
+    # проверка обратимости бинарного кадра
+    head, mat = ser.unpack_binary(ser.encode_items(fresh(), "binary", "float32").body)
+    assert mat.shape == (len(items), args.dim) and head["count"] == len(items)
+    assert np.allclose(mat[0], items[0]["vector"])
+
+    print(json.dumps(res, ensure_ascii=False, indent=2))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(res, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# app/bench/bench_startup.py
+"""
+Бенчмарк холодного старта.
+
+1) import — время `import app.main` в чистом интерпретаторе (медиана --repeat прогонов)
+   и топ модулей по собственному времени импорта (python -X importtime).
+2) ttfr  — time-to-first-response: запуск uvicorn → первый успешный ответ на --path,
+   плюс латентность второго такого же запроса (уже «тёплого»).
+
+Запуск (без внешних серверов):
+    python -m app.bench.bench_startup --env BM25_BACKEND=sqlite --env FTS_DB_PATH=:memory: \\
+        --path /search/bm25 --body '{"query": "мошенничество"}' --out startup.json
+    python -m app.bench.bench_startup --env WARMUP=false ...   # сравнить без прогрева
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import requests
+
+
+def _env(pairs: list[str]) -> dict:
+    env = dict(os.environ)
+    for p in pairs or []:
+        k, _, v = p.partition("=")
+        env[k] = v
+    return env
+
+
+def import_time(env: dict, repeat: int) -> dict:
+    walls = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "import app.main"], env=env, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        walls.append(time.perf_counter() - t)
+    base = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], env=env, check=True)
+        base.append(time.perf_counter() - t)
+
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app.main"], env=env,
+                         capture_output=True, text=True, check=True).stderr
+    rows = []
+    for line in out.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cum_us, name = line[len("import time:"):].split("|")
+        rows.append((int(self_us), int(cum_us), name.strip()))
+    app_cum = next((c for _, c, n in rows if n == "app.main"), None)
+    return {
+        "wall_ms_median": round(statistics.median(walls) * 1000, 1),
+        "interpreter_ms_median": round(statistics.median(base) * 1000, 1),
+        "app_main_cumulative_ms": round(app_cum / 1000, 1) if app_cum else None,
+        "top_self_ms": [(n, round(s / 1000, 1)) for s, _, n in sorted(rows, reverse=True)[:15]],
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def ttfr(env: dict, method: str, path: str, body: str | None, timeout: float) -> dict:
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}{path}"
+    kw = {"data": body.encode("utf-8"), "headers": {"Content-Type": "application/json"}} if body else {}
+    t0 = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+                             "--log-level", "warning"], env=env)
+    first = None
+    try:
+        while time.perf_counter() - t0 < timeout:
+            try:
+                r = requests.request(method, url, timeout=timeout, **kw)
+                if r.status_code < 500:
+                    first = time.perf_counter() - t0
+                    status = r.status_code
+                    break
+            except requests.ConnectionError:
+                time.sleep(0.02)
+        if first is None:
+            return {"error": f"no response within {timeout}s"}
+        t = time.perf_counter()
+        requests.request(method, url, timeout=timeout, **kw)
+        second = time.perf_counter() - t
+        ready = requests.get(f"http://127.0.0.1:{port}/ready", timeout=timeout).json()
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+    return {
+        "first_response_ms": round(first * 1000, 1),
+        "first_status": status,
+        "second_request_ms": round(second * 1000, 1),
+        "warmup": {k: ready.get(k) for k in ("seconds", "steps", "errors")},
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--env", action="append", default=[], help="KEY=VALUE для процессов бенчмарка")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--method", default="POST")
+    ap.add_argument("--path", default="/search/bm25")
+    ap.add_argument("--body", default='{"query": "мошенничество", "limit": 10}')
+    ap.add_argument("--timeout", type=float, default=60)
+    ap.add_argument("--skip-ttfr", action="store_true")
+    ap.add_argument("--out")
+    args = ap.parse_args()
+
+    env = _env(args.env)
+    res = {"env": args.env, "import": import_time(env, args.repeat)}
+    if not args.skip_ttfr:
+        res["ttfr"] = ttfr(env, args.method.upper(), args.path,
+                           args.body if args.method.upper() != "GET" else None, args.timeout)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(res, f, ensure_ascii=False, indent=2)
+    print(json.dumps(res, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
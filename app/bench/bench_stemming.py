@@ -0,0 +1,114 @@
+# app/bench/bench_stemming.py
+"""
+Бенчмарк стоимости стемминга при индексации (теневые поля *_stem).
+
+Меряет на наборе документов:
+  - токенов/сек stem_text при холодном и тёплом кэше stem_word;
+  - время with_derived_fields на документ и доля в нём stem_props;
+  - прирост объёма свойств (байт теневых полей к байтам исходных).
+
+Запуск:
+    python -m app.bench.bench_stemming --dir ./samples     # .txt/.pdf → parse_document
+    python -m app.bench.bench_stemming --synthetic 2000    # синтетические документы
+"""
+from __future__ import annotations
+import argparse
+import json
+import random
+import time
+from pathlib import Path
+
+from app.core import stemming
+from app.core.weaviate_client import with_derived_fields
+
+_WORDS = (
+    "потерпевший потерпевшему потерпевшего следователь следователю постановление постановления "
+    "уголовного дела досудебного расследования мошенничество мошенничества денежные средства "
+    "путём обмана злоупотребления доверием причинён ущерб крупном размере показания допроса "
+    "заявление языке судопроизводства гражданским истцом признании лица Павлодарской области "
+    "департамента экономических расследований қылмыстық істі тергеу жәбірленуші өтініш"
+).split()
+
+
+def synthetic_docs(n: int, seed: int = 7) -> list[dict]:
+    rnd = random.Random(seed)
+
+    def para(k):
+        return " ".join(rnd.choice(_WORDS) for _ in range(k)) + "."
+
+    return [{
+        "type_document": "Протокол допроса потерпевшего",
+        "view_document": "Протокол",
+        "post_main": para(10),
+        "report_begin": para(rnd.randint(80, 400)),
+        "report_next": para(30),
+        "report_end": para(rnd.randint(50, 200)),
+        "post_new": para(12),
+        "date_doc": "17 апреля 2025 года",
+    } for _ in range(n)]
+
+
+def docs_from_dir(root: str) -> list[dict]:
+    from app.services.parser_dispatch import parse_document
+    from app.services.type_files._1_6_intro._1_rep_kui import read_any
+    out = []
+    for p in sorted(Path(root).rglob("*")):
+        if p.suffix.lower() in (".pdf", ".txt"):
+            text, _ = read_any(p)
+            out.append(parse_document(text, filename=p.name))
+    return out
+
+
+def _size(props: dict, fields) -> int:
+    return sum(len(str(props.get(f) or "").encode("utf-8")) for f in fields)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--dir")
+    ap.add_argument("--synthetic", type=int, default=2000)
+    args = ap.parse_args()
+
+    docs = docs_from_dir(args.dir) if args.dir else synthetic_docs(args.synthetic)
+    texts = [str(d.get(f) or "") for d in docs for f in stemming.STEM_FIELDS]
+    n_tokens = sum(len(stemming._RE_WORD.findall(t)) for t in texts)
+
+    stemming.stem_word.cache_clear()
+    t = time.perf_counter()
+    for s in texts:
+        stemming.stem_text(s)
+    cold = time.perf_counter() - t
+
+    t = time.perf_counter()
+    for s in texts:
+        stemming.stem_text(s)
+    warm = time.perf_counter() - t
+
+    stemming.stem_word.cache_clear()
+    t = time.perf_counter()
+    derived = [with_derived_fields(d) for d in docs]
+    with_stem = time.perf_counter() - t
+
+    stemming.stem_word.cache_clear()
+    t = time.perf_counter()
+    for d in docs:
+        stemming.stem_props(d)
+    stem_only = time.perf_counter() - t
+
+    shadow = [stemming.stem_field(f) for f in stemming.STEM_FIELDS]
+    res = {
+        "docs": len(docs),
+        "tokens": n_tokens,
+        "stem_tokens_per_s_cold": round(n_tokens / cold, 1),
+        "stem_tokens_per_s_warm": round(n_tokens / warm, 1),
+        "derived_ms_per_doc": round(with_stem * 1000 / len(docs), 4),
+        "stem_props_ms_per_doc": round(stem_only * 1000 / len(docs), 4),
+        "shadow_bytes_ratio": round(sum(_size(d, shadow) for d in derived)
+                                    / max(1, sum(_size(d, stemming.STEM_FIELDS) for d in derived)), 3),
+        "stem_cache_size": stemming.stem_word.cache_info().currsize,
+    }
+    print(json.dumps(res, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
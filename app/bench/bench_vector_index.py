@@ -0,0 +1,199 @@
+# app/bench/bench_vector_index.py
+"""
+Бенчмарк настроек векторного индекса: recall@k, латентность и память
+для HNSW без сжатия и с PQ / BQ / SQ на локальном Weaviate.
+
+Эталон — точный перебор в NumPy (cosine на L2-нормированных векторах)
+по тем же векторам.
+
+Запуск:
+    python -m app.bench.bench_vector_index --n 20000 --queries 200 --k 10 \
+        --quantizers none,pq,bq --ef 64 --ef-construction 128 --max-connections 32
+
+Векторы: синтетические (смесь гауссиан, seed) или свои из .npy (--vectors).
+Память: дельта go_memstats_heap_inuse_bytes из Prometheus-метрик Weaviate
+(PROMETHEUS_MONITORING_ENABLED=true, порт 2112) + расчётный объём векторов.
+"""
+from __future__ import annotations
+import argparse
+import gc
+import json
+import os
+import time
+from typing import Optional
+
+import numpy as np
+import requests
+from weaviate.classes.config import Configure
+from weaviate.classes.data import DataObject
+
+from app.core.weaviate_client import ensure_connected, vector_index_config
+
+METRICS_URL = os.getenv("WEAVIATE_METRICS_URL", "http://localhost:2112/metrics")
+BENCH_PREFIX = "BenchVecIdx"
+
+
+# -------------------------
+# Данные и эталон
+# -------------------------
+def synth_vectors(n: int, dim: int, clusters: int = 64, seed: int = 42) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=n)
+    x = centers[labels] + 0.35 * rng.standard_normal((n, dim)).astype(np.float32)
+    return x / (np.linalg.norm(x, axis=1, keepdims=True) + 1e-12)
+
+
+def exact_topk(base: np.ndarray, queries: np.ndarray, k: int, block: int = 4096) -> np.ndarray:
+    """Точный top-k по косинусу (векторы уже нормированы) блоками по base."""
+    best_s = np.full((len(queries), k), -np.inf, dtype=np.float32)
+    best_i = np.zeros((len(queries), k), dtype=np.int64)
+    for start in range(0, len(base), block):
+        s = queries @ base[start:start + block].T
+        idx = np.arange(start, start + s.shape[1])
+        cat_s = np.concatenate([best_s, s], axis=1)
+        cat_i = np.concatenate([best_i, np.broadcast_to(idx, s.shape)], axis=1)
+        part = np.argpartition(-cat_s, k - 1, axis=1)[:, :k]
+        best_s = np.take_along_axis(cat_s, part, axis=1)
+        best_i = np.take_along_axis(cat_i, part, axis=1)
+    return best_i
+
+
+# -------------------------
+# Память
+# -------------------------
+def heap_inuse() -> Optional[float]:
+    try:
+        txt = requests.get(METRICS_URL, timeout=5).text
+    except Exception:
+        return None
+    for line in txt.splitlines():
+        if line.startswith("go_memstats_heap_inuse_bytes "):
+            return float(line.split()[1])
+    return None
+
+
+def estimated_vector_bytes(q: str, n: int, dim: int, segments: Optional[int]) -> int:
+    if q == "pq":
+        return n * (segments or dim // 4)   # 1 байт на сегмент (256 центроидов)
+    if q == "bq":
+        return n * dim // 8
+    if q == "sq":
+        return n * dim
+    return n * dim * 4
+
+
+# -------------------------
+# Прогон одной настройки
+# -------------------------
+def run_setting(q: str, base: np.ndarray, queries: np.ndarray, truth: np.ndarray, args) -> dict:
+    client = ensure_connected()
+    name = f"{BENCH_PREFIX}{q.upper()}"
+    if client.collections.exists(name):
+        client.collections.delete(name)
+
+    mem0 = heap_inuse()
+    col = client.collections.create(
+        name=name,
+        vectorizer_config=Configure.Vectorizer.none(),
+        vector_index_config=vector_index_config(
+            quantizer=q, ef=args.ef, ef_construction=args.ef_construction,
+            max_connections=args.max_connections,
+        ),
+    )
+
+    t0 = time.perf_counter()
+    for start in range(0, len(base), args.batch):
+        chunk = base[start:start + args.batch]
+        res = col.data.insert_many([
+            DataObject(properties={"idx": start + i}, vector=v.tolist())
+            for i, v in enumerate(chunk)
+        ])
+        if res.has_errors:
+            raise RuntimeError(f"{name}: insert errors: {list(res.errors.values())[:3]}")
+    ingest_s = time.perf_counter() - t0
+
+    # квантование обучается после вставки — даём Weaviate сжать индекс
+    time.sleep(args.settle)
+    gc.collect()
+    mem1 = heap_inuse()
+
+    lat = []
+    hits = 0
+    for qi, qv in enumerate(queries):
+        t = time.perf_counter()
+        res = col.query.near_vector(near_vector=qv.tolist(), limit=args.k, return_properties=["idx"])
+        lat.append((time.perf_counter() - t) * 1000.0)
+        got = {int(o.properties["idx"]) for o in res.objects}
+        hits += len(got & set(truth[qi].tolist()))
+
+    if not args.keep:
+        client.collections.delete(name)
+
+    lat_a = np.asarray(lat)
+    return {
+        "quantizer": q,
+        "n": len(base),
+        "dim": base.shape[1],
+        "k": args.k,
+        f"recall@{args.k}": round(hits / (len(queries) * args.k), 4),
+        "ingest_obj_per_s": round(len(base) / ingest_s, 1),
+        "latency_ms_p50": round(float(np.percentile(lat_a, 50)), 3),
+        "latency_ms_p95": round(float(np.percentile(lat_a, 95)), 3),
+        "latency_ms_p99": round(float(np.percentile(lat_a, 99)), 3),
+        "heap_delta_mb": round((mem1 - mem0) / 2**20, 1) if mem0 is not None and mem1 is not None else None,
+        "vectors_est_mb": round(estimated_vector_bytes(q, len(base), base.shape[1],
+                                                       int(os.getenv("PQ_SEGMENTS") or 0) or None) / 2**20, 1),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--n", type=int, default=20000)
+    ap.add_argument("--dim", type=int, default=768)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--vectors", help=".npy с векторами (n×dim); иначе синтетика")
+    ap.add_argument("--quantizers", default="none,pq,bq,sq")
+    ap.add_argument("--ef", type=int)
+    ap.add_argument("--ef-construction", type=int)
+    ap.add_argument("--max-connections", type=int)
+    ap.add_argument("--batch", type=int, default=500)
+    ap.add_argument("--settle", type=float, default=5.0, help="пауза после вставки, сек")
+    ap.add_argument("--keep", action="store_true", help="не удалять бенч-коллекции")
+    ap.add_argument("--out", help="куда записать JSON с результатами")
+    args = ap.parse_args()
+
+    if args.vectors:
+        data = np.load(args.vectors).astype(np.float32)
+        data /= np.linalg.norm(data, axis=1, keepdims=True) + 1e-12
+    else:
+        data = synth_vectors(args.n + args.queries, args.dim)
+    base, queries = data[:-args.queries], data[-args.queries:]
+
+    # PQ/SQ обучаются на первых training_limit векторах — не больше, чем есть
+    os.environ.setdefault("QUANTIZER_TRAINING_LIMIT", str(min(len(base), 100_000)))
+
+    print(f"== ground truth: exact NumPy top-{args.k} over {len(base)}×{base.shape[1]} ==")
+    t = time.perf_counter()
+    truth = exact_topk(base, queries, args.k)
+    print(f"   {len(queries)} queries in {time.perf_counter() - t:.2f}s")
+
+    results = []
+    for q in [x.strip() for x in args.quantizers.split(",") if x.strip()]:
+        print(f"== {q} ==")
+        try:
+            r = run_setting(q, base, queries, truth, args)
+        except Exception as e:
+            print(f"   skipped: {e}")
+            continue
+        print("   " + json.dumps(r, ensure_ascii=False))
+        results.append(r)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# app/bench/bench_workers.py
+"""
+Масштабирование пропускной способности по числу воркеров (app.serve).
+
+Для каждого N из --workers поднимает `python -m app.serve --workers N`, ждёт /ready,
+гоняет closed-loop нагрузку (--clients одновременных клиентов, --duration секунд)
+на выбранный эндпоинт и гасит сервер SIGTERM (время остановки = время дренажа).
+По умолчанию — локальный стенд: BM25_BACKEND=sqlite, общий файл FTS во временном каталоге.
+
+Запуск:
+    python -m app.bench.bench_workers --workers 1,2,4 --endpoint upload --clients 16 --out scale.json
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import requests
+
+from app.bench.loadtest import Endpoints
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(base: str, n_workers: int, timeout: float) -> None:
+    # /ready отвечает тот воркер, кому достался accept — собираем разные pid
+    seen, deadline = set(), time.time() + timeout
+    while time.time() < deadline:
+        try:
+            r = requests.get(f"{base}/ready", timeout=2)
+            if r.status_code == 200:
+                seen.add(r.json().get("pid"))
+                if len(seen) >= n_workers:
+                    return
+        except requests.ConnectionError:
+            pass
+        time.sleep(0.05)
+    if not seen:
+        raise RuntimeError(f"server at {base} not ready in {timeout}s")
+
+
+def closed_loop(base: str, endpoint: str, clients: int, duration: float) -> dict:
+    ep = Endpoints(base, index_batch=5, timeout=60)
+    lat, errors, lock = [], [0], threading.Lock()
+    stop = time.perf_counter() + duration
+
+    def client(seed: int):
+        rnd = random.Random(seed)
+        while time.perf_counter() < stop:
+            t = time.perf_counter()
+            try:
+                ok = ep.call(endpoint, rnd).status_code < 400
+            except requests.RequestException:
+                ok = False
+            dt = (time.perf_counter() - t) * 1000
+            with lock:
+                lat.append(dt)
+                errors[0] += 0 if ok else 1
+
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    wall = time.perf_counter() - t0
+    a = np.asarray(lat or [0.0])
+    return {
+        "requests": len(lat),
+        "errors": errors[0],
+        "throughput_rps": round(len(lat) / wall, 2),
+        "p50_ms": round(float(np.percentile(a, 50)), 2),
+        "p95_ms": round(float(np.percentile(a, 95)), 2),
+        "p99_ms": round(float(np.percentile(a, 99)), 2),
+    }
+
+
+def run_one(n: int, args, env: dict) -> dict:
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    proc = subprocess.Popen([sys.executable, "-m", "app.serve", "--workers", str(n), "--host", "127.0.0.1",
+                             "--port", str(port), "--log-level", "warning"]
+                            + (["--preload"] if args.preload else []), env=env)
+    try:
+        t = time.perf_counter()
+        _wait_ready(base, n, args.timeout)
+        ready_s = time.perf_counter() - t
+        res = closed_loop(base, args.endpoint, args.clients, args.duration)
+    finally:
+        t = time.perf_counter()
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=args.timeout)
+        stop_s = time.perf_counter() - t
+    return {"workers": n, "ready_s": round(ready_s, 2), "shutdown_s": round(stop_s, 2), **res}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--workers", default="1,2,4")
+    ap.add_argument("--endpoint", default="upload", choices=("upload", "index", "bm25", "chunks"))
+    ap.add_argument("--clients", type=int, default=16)
+    ap.add_argument("--duration", type=float, default=15)
+    ap.add_argument("--timeout", type=float, default=60)
+    ap.add_argument("--preload", action="store_true")
+    ap.add_argument("--env", action="append", default=[], help="KEY=VALUE (по умолчанию локальный sqlite-стенд)")
+    ap.add_argument("--out")
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_workers_")
+    env = dict(os.environ, BM25_BACKEND="sqlite", FTS_DB_PATH=os.path.join(tmp, "fts.sqlite3"),
+               RAW_ARCHIVE_PATH=os.path.join(tmp, "raw.sqlite3"))
+    for p in args.env:
+        k, _, v = p.partition("=")
+        env[k] = v
+
+    runs = [run_one(int(n), args, env) for n in args.workers.split(",")]
+    base_rps = runs[0]["throughput_rps"] or 1
+    for r in runs:
+        r["speedup"] = round(r["throughput_rps"] / base_rps, 2)
+    res = {"endpoint": args.endpoint, "clients": args.clients, "cpu_count": os.cpu_count(), "runs": runs}
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(res, f, ensure_ascii=False, indent=2)
+    print(json.dumps(res, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
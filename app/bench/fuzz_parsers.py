@@ -0,0 +1,183 @@
+# app/bench/fuzz_parsers.py
+"""
+Фазз-корпус против 12 парсеров: доказывает, что худшее время разбора ограничено.
+
+Корпус (детерминированный, --seed) строится из «якорей» регулярок парсеров —
+фраз, с которых начинаются ленивые [\\s\\S]*? пролёты — без закрывающих фраз:
+  anchors    — сотни якорей вперемешку с мусором (каждый запускает долгий поиск)
+  flood      — тысячи переводов строк/пробелов ((?:^|\\n)\\s* квадратичен на них)
+  garbled    — настоящий по структуре текст, испорченный OCR-шумом
+  no_breaks  — те же якоря без переводов строк
+размерами --sizes символов. Плюс файлы из --extra (например ./data/quarantine).
+
+Каждый вход прогоняется через каждый парсер:
+  raw     — без бюджета (только страховочный потолок --cap-ms, чтобы прогон не завис)
+  guarded — regex_guard.run с бюджетом --budget-ms
+Итог: худшее/p99 время по парсерам и статусы; код выхода 1, если guarded-время
+хоть раз превысило 2 × бюджет + --slack-ms (две ступени: полный текст и окно).
+Бюджет жёсткий только в главном потоке (SIGPROF) — прогон идёт в нём.
+
+Запуск:
+    python -m app.bench.fuzz_parsers --sizes 20000,100000 --budget-ms 500 --out fuzz.json
+    python -m app.bench.fuzz_parsers --write-corpus ./data/fuzz_corpus   # сохранить входы
+"""
+from __future__ import annotations
+import argparse
+import json
+import logging
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from app.services import parser_dispatch as pd
+from app.services import regex_guard
+from app.services.doc_classifier import ocr_noise
+
+_ANCHORS = [
+    "Следователь", "Павлодарской области", "в помещении", "в качестве потерпевшего(ей):",
+    "Фамилия, имя, отчество:", "Применение технических средств аудио/видео фиксации:",
+    "дал(а) следующие показания:", "Следователь по ОВД", "Учитывая наличие", "ЕРДР",
+    "Едином реестре", "под №", "Руководитель Департамента", "экономических", "расследований по",
+    "УСТАНОВИЛ:", "ПОСТАНОВИЛ:", "Единый", "Я, старший следователь", "о выявлении сведений",
+    "К рапорту прилагаются", "Старший следователь", "Республики",
+    "В период дежурства поступило сообщение следующего содержания:", "Для принятия решения",
+    "КУИ №", "Зарегистрированное сообщение передано на рассмотрение сотруднику",
+    "Старший оперуполномоченный", "Агентства", "Мне разъяснена сущность статьи 30 УПК РК",
+    "Иванов И.И.", "И.И. Иванов", "г. Павлодар", "17 апреля 2025 года", "от", "Заявление", "Постановление",
+]
+_JUNK = "абвгдежзийклмнопрстуфхцчшщыэюя .,:;-()№0123456789"
+
+
+def _anchors(rnd: random.Random, size: int, sep: str) -> str:
+    out, n = [], 0
+    while n < size:
+        s = rnd.choice(_ANCHORS) if rnd.random() < 0.6 else "".join(rnd.choice(_JUNK) for _ in range(rnd.randint(1, 40)))
+        out.append(s)
+        n += len(s) + 1
+    return sep.join(out)[:size]
+
+
+def _flood(rnd: random.Random, size: int) -> str:
+    unit = rnd.choice(["\n", " \n", "\n\t ", " "])
+    body = unit * (size // len(unit) // 2)
+    return rnd.choice(_ANCHORS) + body + rnd.choice(_ANCHORS) + body
+
+
+def _garbled(rnd: random.Random, size: int) -> str:
+    block = ("ПРОТОКОЛ\nдопроса потерпевшего\nг. Павлодар 17 апреля 2025 года\n"
+             "Следователь по ОВД Следственного управления ДЭР по Павлодарской области Иванов И.И. в помещении\n"
+             "Фамилия, имя, отчество: Петров Петр Петрович\nУчитывая наличие сведений в Едином реестре\n"
+             "УСТАНОВИЛ:\nВ период дежурства поступило сообщение следующего содержания:\n")
+    text = (block * (size // len(block) + 1))[:size]
+    return ocr_noise(text, 0.1, rnd)
+
+
+def build_corpus(sizes: List[int], seed: int) -> List[Tuple[str, str]]:
+    rnd = random.Random(seed)
+    corpus = []
+    for size in sizes:
+        corpus.append((f"anchors_{size}", _anchors(rnd, size, "\n")))
+        corpus.append((f"flood_{size}", _flood(rnd, size)))
+        corpus.append((f"garbled_{size}", _garbled(rnd, size)))
+        corpus.append((f"no_breaks_{size}", _anchors(rnd, size, " ")))
+    return corpus
+
+
+def _stub() -> Dict[str, None]:
+    return {}
+
+
+def _time_raw(fn, text: str, cap_ms: float) -> Tuple[float, bool]:
+    t = time.process_time()
+    try:
+        with regex_guard.cpu_budget(cap_ms):
+            fn(text, filename="fuzz.txt")
+        capped = False
+    except regex_guard.ParseBudgetExceeded:
+        capped = True
+    except Exception:   # падение парсера — не предмет этого теста
+        capped = False
+    return (time.process_time() - t) * 1000, capped
+
+
+def _time_guarded(fn, name: str, text: str, budget: float) -> Tuple[float, str]:
+    t = time.process_time()
+    try:
+        _, status = regex_guard.run(fn, text, "fuzz.txt", _stub, name=name, ms=budget)
+    except Exception:
+        status = "error"
+    return (time.process_time() - t) * 1000, status
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", default="20000,100000")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--extra", action="append", default=[], help="каталог с .txt (карантин, реальные файлы)")
+    ap.add_argument("--parsers", help="через запятую (по умолчанию все 12)")
+    ap.add_argument("--budget-ms", type=float, default=500)
+    ap.add_argument("--cap-ms", type=float, default=10000, help="потолок для raw-прогона")
+    ap.add_argument("--slack-ms", type=float, default=200)
+    ap.add_argument("--skip-raw", action="store_true")
+    ap.add_argument("--write-corpus", help="сохранить сгенерированный корпус в каталог")
+    ap.add_argument("--out")
+    args = ap.parse_args()
+
+    logging.getLogger("app.services.parser_dispatch").setLevel(logging.WARNING)
+    logging.getLogger("app.services.regex_guard").setLevel(logging.ERROR)
+    # фазз не должен засорять рабочий карантин
+    import os
+    os.environ["PARSE_QUARANTINE"] = "false"
+
+    corpus = build_corpus([int(s) for s in args.sizes.split(",")], args.seed)
+    for d in args.extra:
+        corpus += [(p.name, p.read_text(encoding="utf-8", errors="ignore")) for p in sorted(Path(d).glob("*.txt"))]
+    if args.write_corpus:
+        Path(args.write_corpus).mkdir(parents=True, exist_ok=True)
+        for name, text in corpus:
+            (Path(args.write_corpus) / f"{name}.txt").write_text(text, encoding="utf-8")
+
+    names = args.parsers.split(",") if args.parsers else list(pd._PARSERS)
+    limit = 2 * args.budget_ms + args.slack_ms
+    report, worst_guarded = {}, 0.0
+    for name in names:
+        fn = pd._parser(name)
+        raw, guarded, statuses, worst_input = [], [], {}, None
+        for cname, text in corpus:
+            if not args.skip_raw:
+                ms, capped = _time_raw(fn, text, args.cap_ms)
+                raw.append(ms)
+                if ms == max(raw):
+                    worst_input = cname + (" (capped)" if capped else "")
+            ms, status = _time_guarded(fn, name, text, args.budget_ms)
+            guarded.append(ms)
+            statuses[status] = statuses.get(status, 0) + 1
+        g = np.asarray(guarded)
+        report[name] = {
+            "guarded_max_ms": round(float(g.max()), 1),
+            "guarded_p99_ms": round(float(np.percentile(g, 99)), 1),
+            "statuses": statuses,
+        }
+        if raw:
+            report[name].update(raw_max_ms=round(max(raw), 1), raw_worst_input=worst_input)
+        worst_guarded = max(worst_guarded, float(g.max()))
+        print(f"{name:34s} {json.dumps(report[name], ensure_ascii=False)}", file=sys.stderr)
+
+    res = {
+        "inputs": len(corpus), "budget_ms": args.budget_ms, "limit_ms": limit,
+        "hard_limit": regex_guard.hard_limit_available(),
+        "worst_guarded_ms": round(worst_guarded, 1), "bounded": worst_guarded <= limit, "parsers": report,
+    }
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(res, f, ensure_ascii=False, indent=2)
+    print(json.dumps({k: v for k, v in res.items() if k != "parsers"}, ensure_ascii=False, indent=2))
+    sys.exit(0 if res["bounded"] else 1)
+
+
+if __name__ == "__main__":
+    main()
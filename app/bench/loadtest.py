@@ -0,0 +1,233 @@
+# app/bench/loadtest.py
+"""
+Сквозной нагрузочный тест API (open-loop: запросы стартуют по расписанию целевого
+RPS независимо от латентности ответов, поэтому очередь на сервере видна в p99).
+
+Смесь эндпоинтов (--mix, веса):
+  upload  — POST /upload/reports   (синтетический .txt рапорт КУИ)
+  index   — POST /reports/index    (--index-batch документов в теле)
+  bm25    — POST /search/bm25      (запросы из словаря)
+  chunks  — GET  /reports/chunks   (случайный offset)
+
+Результат — JSON: по каждому эндпоинту и в целом count / errors / error_rate /
+throughput_rps / p50 / p95 / p99 / max (мс). --compare baseline.json сравнивает
+p95 и error_rate с базой и завершает процесс с кодом 1 при регрессии больше --tolerance.
+
+Локальный стенд без внешних серверов:
+    python -m app.bench.standin_ollama --latency-ms 10 &
+    BM25_BACKEND=sqlite FTS_DB_PATH=:memory: uvicorn app.main:app --port 8000 &
+    python -m app.bench.loadtest --rps 50 --duration 30 --out run.json
+    python -m app.bench.loadtest --rps 50 --duration 30 --compare run.json
+"""
+from __future__ import annotations
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+_WORDS = (
+    "потерпевший мошенничество денежные средства путём обмана ущерб крупном размере "
+    "заявление допрос свидетель следователь постановление уголовного дела расследования"
+).split()
+_CITIES = ["Павлодар", "Экибастуз", "Аксу", "Астана", "Алматы"]
+_QUERIES = [
+    "мошенничество", "потерпевшему ущерб", "денежные средства", "постановление",
+    "заявление о преступлении", "допрос свидетеля", "Павлодар", "крупном размере",
+]
+
+
+def _para(rnd: random.Random, n: int) -> str:
+    return " ".join(rnd.choice(_WORDS) for _ in range(n)) + "."
+
+
+def synthetic_report(rnd: random.Random) -> str:
+    """Текст в формате рапорта КУИ (разбирается parse_document)."""
+    num = "".join(rnd.choice("0123456789") for _ in range(15))
+    return (
+        "РАПОРТ\n"
+        f"г. {rnd.choice(_CITIES)} {rnd.randint(1, 28):02d}.{rnd.randint(1, 12):02d}.2025 г.\n"
+        f"Начальнику Управления полиции\n{_para(rnd, 8)}\n"
+        f"Докладываю, что {_para(rnd, rnd.randint(40, 200))}\n"
+        f"КУИ № {num}. {_para(rnd, 20)}\n"
+        f"На основании изложенного {_para(rnd, 30)}\n"
+        f"Следователь СУ {_para(rnd, 6)}\nИванов И.И.\n"
+    )
+
+
+def synthetic_item(rnd: random.Random) -> dict:
+    return {
+        "type_document": "Рапорт",
+        "view_document": "Рапорт КУИ",
+        "post_main": _para(rnd, 8),
+        "city_fix": rnd.choice(_CITIES),
+        "date_doc": f"2025-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}",
+        "report_begin": _para(rnd, rnd.randint(40, 200)),
+        "report_next": _para(rnd, 20),
+        "report_end": _para(rnd, 30),
+    }
+
+
+# -------------------------
+# Запросы
+# -------------------------
+class Endpoints:
+    def __init__(self, base: str, index_batch: int, timeout: float):
+        self.base = base.rstrip("/")
+        self.index_batch = index_batch
+        self.timeout = timeout
+        self.local = threading.local()
+
+    def _session(self) -> requests.Session:
+        s = getattr(self.local, "s", None)
+        if s is None:
+            s = self.local.s = requests.Session()
+        return s
+
+    def call(self, name: str, rnd: random.Random) -> requests.Response:
+        s, t = self._session(), self.timeout
+        if name == "upload":
+            body = synthetic_report(rnd).encode("utf-8")
+            return s.post(f"{self.base}/upload/reports", timeout=t,
+                          files=[("files", (f"raport_{rnd.randrange(10**9)}.txt", body, "text/plain"))])
+        if name == "index":
+            items = [synthetic_item(rnd) for _ in range(self.index_batch)]
+            return s.post(f"{self.base}/reports/index", json={"items": items}, timeout=t)
+        if name == "bm25":
+            return s.post(f"{self.base}/search/bm25", timeout=t,
+                          json={"query": rnd.choice(_QUERIES), "limit": 10})
+        if name == "chunks":
+            return s.get(f"{self.base}/reports/chunks", timeout=t,
+                         params={"limit": 50, "offset": rnd.randrange(0, 500)})
+        raise ValueError(f"unknown endpoint {name!r}")
+
+
+def parse_mix(spec: str) -> dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        k, _, v = part.partition("=")
+        mix[k.strip()] = float(v or 1)
+    return {k: v for k, v in mix.items() if v > 0}
+
+
+# -------------------------
+# Прогон
+# -------------------------
+def run(base: str, rps: float, duration: float, mix: dict[str, float], workers: int,
+        index_batch: int = 5, timeout: float = 30.0, seed: int = 1) -> dict:
+    ep = Endpoints(base, index_batch, timeout)
+    rnd = random.Random(seed)
+    names, weights = list(mix), list(mix.values())
+    lat: dict[str, list[float]] = {n: [] for n in names}
+    errs: dict[str, int] = {n: 0 for n in names}
+    err_samples: list[str] = []
+    lock = threading.Lock()
+    late = 0
+
+    def one(name: str, r: random.Random):
+        t0 = time.perf_counter()
+        ok, msg = False, ""
+        try:
+            resp = ep.call(name, r)
+            ok = resp.status_code < 400
+            if not ok:
+                msg = f"{name}: HTTP {resp.status_code} {resp.text[:200]}"
+        except requests.RequestException as e:
+            msg = f"{name}: {type(e).__name__}: {e}"
+        dt = (time.perf_counter() - t0) * 1000
+        with lock:
+            lat[name].append(dt)
+            if not ok:
+                errs[name] += 1
+                if len(err_samples) < 10:
+                    err_samples.append(msg)
+
+    total = int(rps * duration)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for i in range(total):
+            due = start + i / rps
+            now = time.perf_counter()
+            if due > now:
+                time.sleep(due - now)
+            elif now - due > 1.0:
+                late += 1  # генератор не успевает — мало --workers
+            name = rnd.choices(names, weights)[0]
+            pool.submit(one, name, random.Random(rnd.random()))
+    wall = time.perf_counter() - start
+
+    def summary(samples: list[float], n_err: int) -> dict:
+        a = np.asarray(samples or [0.0])
+        return {
+            "count": len(samples),
+            "errors": n_err,
+            "error_rate": round(n_err / max(1, len(samples)), 4),
+            "throughput_rps": round(len(samples) / wall, 2),
+            "p50_ms": round(float(np.percentile(a, 50)), 2),
+            "p95_ms": round(float(np.percentile(a, 95)), 2),
+            "p99_ms": round(float(np.percentile(a, 99)), 2),
+            "max_ms": round(float(a.max()), 2),
+        }
+
+    all_lat = [x for v in lat.values() for x in v]
+    return {
+        "config": {"base": base, "rps": rps, "duration_s": duration, "mix": mix,
+                   "workers": workers, "index_batch": index_batch, "seed": seed},
+        "wall_s": round(wall, 2),
+        "late_starts": late,
+        "overall": summary(all_lat, sum(errs.values())),
+        "endpoints": {n: summary(lat[n], errs[n]) for n in names},
+        "error_samples": err_samples,
+    }
+
+
+def compare(cur: dict, base: dict, tolerance: float) -> list[str]:
+    """Регрессии: p95 выросла больше чем на tolerance (доля) или error_rate выросла больше чем на 1 п.п."""
+    out = []
+    pairs = [("overall", cur["overall"], base.get("overall", {}))]
+    pairs += [(n, s, base.get("endpoints", {}).get(n, {})) for n, s in cur["endpoints"].items()]
+    for name, c, b in pairs:
+        if not b:
+            continue
+        if b.get("p95_ms") and c["p95_ms"] > b["p95_ms"] * (1 + tolerance):
+            out.append(f"{name}: p95 {b['p95_ms']} -> {c['p95_ms']} ms")
+        if c["error_rate"] > b.get("error_rate", 0) + 0.01:
+            out.append(f"{name}: error_rate {b.get('error_rate')} -> {c['error_rate']}")
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--base", default="http://127.0.0.1:8000")
+    ap.add_argument("--rps", type=float, default=20)
+    ap.add_argument("--duration", type=float, default=30, help="секунд")
+    ap.add_argument("--mix", default="upload=1,index=1,bm25=6,chunks=2")
+    ap.add_argument("--workers", type=int, default=64)
+    ap.add_argument("--index-batch", type=int, default=5)
+    ap.add_argument("--timeout", type=float, default=30)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--out", help="сохранить JSON-результат")
+    ap.add_argument("--compare", help="JSON прошлого прогона для сравнения")
+    ap.add_argument("--tolerance", type=float, default=0.2, help="допустимый рост p95 (доля)")
+    args = ap.parse_args()
+
+    res = run(args.base, args.rps, args.duration, parse_mix(args.mix), args.workers,
+              args.index_batch, args.timeout, args.seed)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            res["regressions"] = compare(res, json.load(f), args.tolerance)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(res, f, ensure_ascii=False, indent=2)
+    print(json.dumps(res, ensure_ascii=False, indent=2))
+    if res.get("regressions"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# app/bench/standin_ollama.py
+"""
+Лёгкая замена Ollama для бенчмарков и нагрузочных тестов (только stdlib + NumPy).
+
+Эндпоинты:
+  POST /api/embeddings  {"model", "prompt"}        → {"embedding": [...]}
+  POST /api/embed       {"model", "input": str|[]} → {"embeddings": [[...], ...]}
+
+Векторы детерминированные: seed = sha256(текста), L2-нормированы, размерность
+STANDIN_EMBED_DIM (768). Латентность: STANDIN_LATENCY_MS + равномерный джиттер
+STANDIN_JITTER_MS на запрос и STANDIN_PER_TEXT_MS на каждый текст пачки.
+Ёмкость: --parallel N (STANDIN_PARALLEL, как OLLAMA_NUM_PARALLEL) — одновременно
+обрабатываются N запросов, остальные ждут очереди (0 — без ограничения).
+
+Запуск:
+    python -m app.bench.standin_ollama --port 11434 --latency-ms 15 --jitter-ms 5
+    OLLAMA_URL=http://localhost:11434/api/embeddings uvicorn app.main:app
+"""
+from __future__ import annotations
+import argparse
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+
+def fake_vector(text: str, dim: int) -> list[float]:
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    v = np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+    v /= np.linalg.norm(v) + 1e-12
+    return v.tolist()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "OllamaStandin/1.0"
+    cfg: dict = {}
+    stats = {"requests": 0, "texts": 0}
+    lock = threading.Lock()
+    capacity: threading.Semaphore | None = None
+
+    def log_message(self, fmt, *args):  # без access-лога на каждый запрос
+        pass
+
+    def _send(self, code: int, obj) -> None:
+        body = json.dumps(obj).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _sleep(self, n_texts: int) -> None:
+        c = self.cfg
+        ms = c["latency_ms"] + random.uniform(0, c["jitter_ms"]) + c["per_text_ms"] * n_texts
+        if ms <= 0:
+            return
+        if self.capacity is None:
+            time.sleep(ms / 1000.0)
+            return
+        with self.capacity:   # сверх ёмкости — ожидание, как во внутренней очереди Ollama
+            time.sleep(ms / 1000.0)
+
+    def do_GET(self):
+        if self.path in ("/", "/api/version"):
+            return self._send(200, {"version": "standin", **self.stats})
+        self._send(404, {"error": "not found"})
+
+    def do_POST(self):
+        try:
+            n = int(self.headers.get("Content-Length") or 0)
+            req = json.loads(self.rfile.read(n) or b"{}")
+        except ValueError:
+            return self._send(400, {"error": "bad json"})
+        dim = self.cfg["dim"]
+
+        if self.path == "/api/embeddings":
+            text = req.get("prompt")
+            if not isinstance(text, str):
+                return self._send(400, {"error": "prompt is required"})
+            texts = [text]
+        elif self.path == "/api/embed":
+            inp = req.get("input")
+            texts = [inp] if isinstance(inp, str) else inp
+            if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+                return self._send(400, {"error": "input must be string or list of strings"})
+        else:
+            return self._send(404, {"error": "not found"})
+
+        with self.lock:
+            self.stats["requests"] += 1
+            self.stats["texts"] += len(texts)
+        if self.cfg["error_rate"] and random.random() < self.cfg["error_rate"]:
+            return self._send(500, {"error": "injected failure"})
+        self._sleep(len(texts))
+
+        vecs = [fake_vector(t, dim) for t in texts]
+        if self.path == "/api/embeddings":
+            return self._send(200, {"embedding": vecs[0]})
+        self._send(200, {"model": req.get("model"), "embeddings": vecs})
+
+
+def serve(host: str, port: int, dim: int, latency_ms: float, jitter_ms: float,
+          per_text_ms: float, error_rate: float, parallel: int = 0) -> ThreadingHTTPServer:
+    _Handler.cfg = {"dim": dim, "latency_ms": latency_ms, "jitter_ms": jitter_ms,
+                    "per_text_ms": per_text_ms, "error_rate": error_rate}
+    _Handler.capacity = threading.Semaphore(parallel) if parallel > 0 else None
+    return ThreadingHTTPServer((host, port), _Handler)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=11434)
+    ap.add_argument("--dim", type=int, default=int(os.getenv("STANDIN_EMBED_DIM", "768")))
+    ap.add_argument("--latency-ms", type=float, default=float(os.getenv("STANDIN_LATENCY_MS", "0")))
+    ap.add_argument("--jitter-ms", type=float, default=float(os.getenv("STANDIN_JITTER_MS", "0")))
+    ap.add_argument("--per-text-ms", type=float, default=float(os.getenv("STANDIN_PER_TEXT_MS", "0")))
+    ap.add_argument("--error-rate", type=float, default=0.0, help="доля ответов 500 (0..1)")
+    ap.add_argument("--parallel", type=int, default=int(os.getenv("STANDIN_PARALLEL", "0")),
+                    help="одновременно обрабатываемых запросов (0 — без ограничения)")
+    args = ap.parse_args()
+
+    srv = serve(args.host, args.port, args.dim, args.latency_ms, args.jitter_ms,
+                args.per_text_ms, args.error_rate, args.parallel)
+    print(f"Ollama stand-in on http://{args.host}:{args.port} (dim={args.dim}, "
+          f"latency={args.latency_ms}±{args.jitter_ms}ms)", flush=True)
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        srv.server_close()
+
+
+if __name__ == "__main__":
+    main()
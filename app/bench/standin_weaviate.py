@@ -0,0 +1,78 @@
+# app/bench/standin_weaviate.py
+"""
+Локальный Weaviate для бенчмарков без отдельного сервера.
+
+Два варианта:
+
+1) embedded — закреплённая версия бинарника Weaviate, которую скачивает и
+   запускает сам weaviate-client (connect_to_embedded). Полная совместимость
+   с HTTP+gRPC API, данные во временном каталоге:
+
+       python -m app.bench.standin_weaviate --version 1.25.8 --port 8079 --grpc-port 50060
+       WEAVIATE_HTTP_PORT=8079 WEAVIATE_GRPC_PORT=50060 uvicorn app.main:app
+
+2) in-memory — без Weaviate вообще: BM25 и вставка идут в SQLite FTS5 в памяти
+   (app.core.fts_store), /reports/chunks — туда же. Скрипт только печатает ENV:
+
+       python -m app.bench.standin_weaviate --mode memory
+"""
+from __future__ import annotations
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+MEMORY_ENV = {
+    "BM25_BACKEND": "sqlite",
+    "FTS_DB_PATH": ":memory:",
+}
+
+
+def run_embedded(version: str, port: int, grpc_port: int, data_dir: str | None) -> None:
+    import weaviate
+
+    tmp = None
+    if data_dir is None:
+        tmp = data_dir = tempfile.mkdtemp(prefix="weaviate_standin_")
+    client = weaviate.connect_to_embedded(
+        version=version,
+        port=port,
+        grpc_port=grpc_port,
+        persistence_data_path=data_dir,
+        environment_variables={
+            "PROMETHEUS_MONITORING_ENABLED": "true",
+            "DISABLE_TELEMETRY": "true",
+            "LOG_LEVEL": os.getenv("STANDIN_WEAVIATE_LOG_LEVEL", "warning"),
+        },
+    )
+    print(f"Weaviate {version} embedded: http://127.0.0.1:{port} grpc:{grpc_port} data={data_dir}")
+    print(f"export WEAVIATE_HTTP_PORT={port} WEAVIATE_GRPC_PORT={grpc_port}", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        client.close()
+        if tmp:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--mode", choices=("embedded", "memory"), default="embedded")
+    ap.add_argument("--version", default=os.getenv("STANDIN_WEAVIATE_VERSION", "1.25.8"))
+    ap.add_argument("--port", type=int, default=8079)
+    ap.add_argument("--grpc-port", type=int, default=50060)
+    ap.add_argument("--data-dir")
+    args = ap.parse_args()
+
+    if args.mode == "memory":
+        print(" ".join(f"{k}={v}" for k, v in MEMORY_ENV.items()))
+        return
+    run_embedded(args.version, args.port, args.grpc_port, args.data_dir)
+
+
+if __name__ == "__main__":
+    main()
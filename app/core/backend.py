@@ -0,0 +1,179 @@
+# app/core/backend.py
+"""
+Выбор бэкенда BM25 по ENV: BM25_BACKEND=weaviate (по умолчанию) | sqlite | local.
+sqlite — локальный FTS5 (app.core.fts_store), local — встроенное NumPy-хранилище
+(app.core.local_store); оба — без сервера Weaviate.
+"""
+from __future__ import annotations
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional
+
+from app.core import facets
+from app.core.resilience import BackendUnavailable
+
+logger = logging.getLogger(__name__)
+
+_POOL: Optional[ThreadPoolExecutor] = None
+_POOL_LOCK = threading.Lock()
+
+
+def bm25_backend() -> str:
+    b = os.getenv("BM25_BACKEND", "weaviate").strip().lower()
+    if b in ("sqlite", "fts", "fts5"):
+        return "sqlite"
+    if b in ("local", "local_store", "numpy"):
+        return "local"
+    return "weaviate"
+
+
+def _impl():
+    b = bm25_backend()
+    if b == "sqlite":
+        from app.core import fts_store
+        return fts_store
+    if b == "local":
+        from app.core import local_store
+        return local_store
+    from app.core import weaviate_client
+    return weaviate_client
+
+
+def insert_reports(objs: list[Dict[str, Any]], tenants: list[Optional[str]] | None = None,
+                   ids: list[Optional[str]] | None = None) -> list[str | None]:
+    """ids — заданные UUID (upsert: объект с тем же UUID перезаписывается), иначе новые."""
+    try:
+        return _impl().insert_reports(objs, tenants=tenants, ids=ids)
+    finally:
+        facets.invalidate()
+
+
+def update_reports(updates: list[tuple[str, Dict[str, Any], Optional[str]]]) -> int:
+    """(uuid, props, tenant) → перезапись свойств существующих объектов."""
+    try:
+        return _impl().update_reports(updates)
+    finally:
+        facets.invalidate()
+
+
+def iter_reports(batch: int = 200) -> Iterator[list[tuple[str, Dict[str, Any], Optional[str]]]]:
+    """Все документы пачками [(uuid, props, tenant), ...] — для миграций (app.services.backfill)."""
+    return _impl().iter_reports(batch=batch)
+
+
+def fetch_case(number: str, limit: int = 1000, fields: Optional[list[str]] = None,
+               tenant: Optional[str] = None) -> list[Dict[str, Any]]:
+    """Документы дела (case_number — уже нормализованный номер) по возрастанию даты."""
+    return _impl().fetch_case(number, limit=limit, fields=fields, tenant=tenant)
+
+
+def facet_counts(fields: list[str], filters: Dict[str, Any] | None = None, tenant: Optional[str] = None,
+                 limit: int = 20) -> tuple[Dict[str, Any], bool]:
+    """Счётчики значений (/reports/facets) через кэш app.core.facets: (результат, из кэша ли)."""
+    key = facets.cache_key(bm25_backend(), fields, filters, tenant, limit)
+    return facets.get_cache().get_or_compute(
+        key, lambda: _impl().facet_counts(fields, filters=filters, tenant=tenant, limit=limit))
+
+
+def bm25_search(query: str, query_props: list[str], limit: int = 10,
+                filters: Dict[str, Any] | None = None, tenant: Optional[str] = None,
+                fields: Optional[list[str]] = None, snippet_chars: int = 0):
+    """fields — проекция свойств; snippet_chars > 0 — длинные поля заменяются сниппетами."""
+    hits = _impl().bm25_search(query, query_props, limit=limit, filters=filters, tenant=tenant, fields=fields)
+    if snippet_chars:
+        from app.core.snippets import apply_snippets
+        hits = apply_snippets(hits, query, chars=snippet_chars)
+    return hits
+
+
+# -------------------------
+# Пакетный BM25 (/search/bm25/batch)
+# -------------------------
+def batch_concurrency() -> int:
+    return max(1, int(os.getenv("SEARCH_BATCH_CONCURRENCY", "8")))
+
+
+def _pool() -> ThreadPoolExecutor:
+    """Общий пул на процесс: параллельность всех батчей вместе ограничена SEARCH_BATCH_CONCURRENCY."""
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = ThreadPoolExecutor(max_workers=batch_concurrency(), thread_name_prefix="bm25-batch")
+        return _POOL
+
+
+def _reset_after_fork() -> None:
+    # потоки пула не переживают fork
+    global _POOL, _POOL_LOCK
+    _POOL = None
+    _POOL_LOCK = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _batch_key(q: Dict[str, Any]) -> str:
+    return json.dumps(q, sort_keys=True, ensure_ascii=False, default=str)
+
+
+def bm25_search_batch(queries: List[Dict[str, Any]], concurrency: Optional[int] = None,
+                      tenant: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    queries — dict с ключами query / query_props / limit / filters (как BM25Query).
+    Одинаковые запросы выполняются один раз; результаты — в исходном порядке:
+    {"hits", "took_ms", "error", "duplicate_of"}. Ошибка одного запроса (FilterError,
+    таймаут или сбой бэкенда) попадает в его error и не роняет весь батч. concurrency ограничивает число одновременно идущих запросов
+    этого батча (не больше размера общего пула).
+    """
+    first: Dict[str, int] = {}
+    unique: List[int] = []
+    for i, q in enumerate(queries):
+        k = _batch_key(q)
+        if k not in first:
+            first[k] = i
+            unique.append(i)
+
+    sem = threading.Semaphore(max(1, concurrency or batch_concurrency()))
+
+    def run(i: int) -> Dict[str, Any]:
+        q = queries[i]
+        t0 = time.perf_counter()
+        try:
+            hits, err = bm25_search(q["query"], q["query_props"], limit=q.get("limit", 10),
+                                    filters=q.get("filters") or None, tenant=tenant,
+                                    fields=q.get("fields"), snippet_chars=q.get("snippet_chars") or 0), None
+        except (ValueError, BackendUnavailable) as e:  # FilterError, неизвестный тенант/поле, выключатель
+            hits, err = [], str(e)
+        except Exception as e:  # сбой бэкенда на одном запросе — в его error, остальные отвечают
+            logger.warning("bm25 batch query %d failed: %s: %s", i, type(e).__name__, e)
+            hits, err = [], f"{type(e).__name__}: {e}"
+        return {"hits": hits, "took_ms": round((time.perf_counter() - t0) * 1000, 3), "error": err}
+
+    # семафор берётся до submit, чтобы ожидающие запросы не занимали потоки общего пула
+    futures = {}
+    for i in unique:
+        sem.acquire()
+        futures[i] = _pool().submit(run, i)
+        futures[i].add_done_callback(lambda _f: sem.release())
+    out: List[Dict[str, Any]] = []
+    for i, q in enumerate(queries):
+        j = first[_batch_key(q)]
+        r = futures[j].result()
+        out.append({**r, "duplicate_of": None if i == j else j})
+    return out
+
+
+def fetch_reports(limit: int = 100, offset: int = 0, filters: Dict[str, Any] | None = None,
+                  fields: Optional[list[str]] = None):
+    """Только для sqlite/local: Weaviate-ветка /reports/chunks работает с коллекцией напрямую."""
+    return _impl().fetch_reports(limit=limit, offset=offset, filters=filters, fields=fields)
+
+
+__all__ = [
+    "bm25_backend", "insert_reports", "update_reports", "iter_reports", "bm25_search", "bm25_search_batch", "fetch_reports",
+    "fetch_case", "facet_counts",
+]
@@ -0,0 +1,93 @@
+# app/core/case_number.py
+"""
+Номер дела (регистрационный номер КУИ / ЕРДР) — естественный ключ дела: по нему
+собираются все документы одного дела одним фильтром (/cases/{number}/documents).
+
+Извлекается в parse_document_ex после парсера полей — одинаково для всех типов:
+  1) report_next — строка регистрации («… КУИ № 255500120000201 дата регистрации …»);
+  2) начало текста — номер после «КУИ №», «ЕРДР №», «уголовному делу №»;
+  3) имя файла («1. Рапорт_КУИ__255500120000201.pdf», как _detect_kui_from_name).
+Нормализация — только цифры: пробелы/дефисы/«№» отбрасываются, длина 9–20
+(тот же диапазон, что у case-тенантов app.core.tenancy). Документы без номера от
+парсера (вставка через /reports/index) получают его из report_next при вставке
+(weaviate_client.with_derived_fields).
+
+Без ключевого слова (имя файла, report_next без «КУИ №») длинных чисел много — ИИН
+(12 цифр), телефоны (11), отметки времени сканера (14: Scan20241019101530.pdf);
+там принимается только номер в формате регистрации КУИ/ЕРДР (is_registration),
+иначе номер не определён (None), а не случайное число.
+"""
+from __future__ import annotations
+import re
+import time
+from typing import Any, Dict, Optional
+
+_MIN_DIGITS, _MAX_DIGITS = 9, 20
+_REG_DIGITS = 15
+
+_RE_NUMBER = re.compile(r"(?<!\d)(\d{%d,%d})(?!\d)" % (_MIN_DIGITS, _MAX_DIGITS))
+# после ключевого слова номер бывает разорван пробелами/дефисами (OCR, перенос строки)
+_RE_ANCHORED = re.compile(
+    r"(?:куи|ердр|уголовному\s+делу|уголовного\s+дела|досудебному\s+расследованию)\s*"
+    r"(?:за\s+)?№\s*(\d[\d \t\-]{%d,40}\d)" % (_MIN_DIGITS - 2),
+    re.I,
+)
+
+
+def normalize(value: Any) -> Optional[str]:
+    """Номер дела в каноническом виде (только цифры) или None, если это не номер."""
+    if value is None:
+        return None
+    digits = re.sub(r"\D", "", str(value))
+    return digits if _MIN_DIGITS <= len(digits) <= _MAX_DIGITS else None
+
+
+def is_registration(digits: str) -> bool:
+    """
+    Регистрационный номер КУИ/ЕРДР: 15 цифр — ГГ (год регистрации, не позже текущего),
+    код органа (3–4-я цифры — регион, не 00), …, 9-я цифра — 0 (КУИ) или 1 (ЕРДР), порядковый номер.
+    Напр. 255500120000201 (КУИ), 255500121000018 (ЕРДР).
+    """
+    return (len(digits) == _REG_DIGITS and digits.isdigit()
+            and int(digits[:2]) <= time.localtime().tm_year % 100
+            and digits[2:4] != "00" and digits[8] in "01")
+
+
+def _unanchored(s: str) -> Optional[str]:
+    for m in _RE_NUMBER.finditer(s):
+        if is_registration(m.group(1)):
+            return m.group(1)
+    return None
+
+
+def _anchored(s: str) -> Optional[str]:
+    for m in _RE_ANCHORED.finditer(s):
+        raw = m.group(1)
+        first = re.match(r"\d+", raw).group()
+        # слитный номер — как есть (за ним может идти дата: «№ 2555… 17.04.2025»), иначе склеиваем куски
+        num = normalize(first) if len(first) >= _MIN_DIGITS else normalize(raw)
+        if num:
+            return num
+    return None
+
+
+def from_text(s: Optional[str]) -> Optional[str]:
+    """Номер из фрагмента текста: после ключевого слова, иначе первый номер в формате КУИ/ЕРДР."""
+    if not s:
+        return None
+    return _anchored(s) or _unanchored(s)
+
+
+def extract(fields: Dict[str, Any], filename: Optional[str] = None, head: Optional[str] = None) -> Optional[str]:
+    """Номер дела документа по разобранным полям, началу текста и имени файла."""
+    num = normalize(fields.get("case_number")) or from_text(fields.get("report_next"))
+    if num:
+        return num
+    if head:
+        num = _anchored(head)
+        if num:
+            return num
+    return _unanchored(filename or "")
+
+
+__all__ = ["normalize", "is_registration", "from_text", "extract"]
@@ -0,0 +1,58 @@
+# app/core/dates.py
+from __future__ import annotations
+import re
+from datetime import datetime, date, timezone
+from typing import Optional
+
+# Родительный падеж — так месяцы пишутся в шапках документов ("17 апреля 2025 года")
+_MONTHS = {
+    "января": 1, "февраля": 2, "марта": 3, "апреля": 4, "мая": 5, "июня": 6,
+    "июля": 7, "августа": 8, "сентября": 9, "октября": 10, "ноября": 11, "декабря": 12,
+}
+
+_RE_ISO = re.compile(r"^\s*(\d{4})-(\d{2})-(\d{2})")
+_RE_DOTS = re.compile(r"\b(\d{1,2})\.(\d{1,2})\.(\d{4})\b")
+_RE_WORDS = re.compile(r"\b(\d{1,2})\s+([А-Яа-яЁё]+)\s+(\d{4})\b")
+
+
+def parse_date_doc(value: object) -> Optional[datetime]:
+    """
+    Разбирает date_doc в datetime (UTC, полночь).
+    Понимает: "2025-04-17", "17.04.2025", "17 апреля 2025 года".
+    None — если дату распознать не удалось.
+    """
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day, tzinfo=timezone.utc)
+
+    s = str(value).strip()
+    if not s:
+        return None
+
+    y = m = d = None
+    mt = _RE_ISO.search(s)
+    if mt:
+        y, m, d = int(mt.group(1)), int(mt.group(2)), int(mt.group(3))
+    else:
+        mt = _RE_DOTS.search(s)
+        if mt:
+            d, m, y = int(mt.group(1)), int(mt.group(2)), int(mt.group(3))
+        else:
+            mt = _RE_WORDS.search(s)
+            if mt:
+                month = _MONTHS.get(mt.group(2).lower().replace("ё", "е"))
+                if month:
+                    d, m, y = int(mt.group(1)), month, int(mt.group(3))
+
+    if y is None:
+        return None
+    try:
+        return datetime(y, m, d, tzinfo=timezone.utc)
+    except ValueError:
+        return None
+
+
+__all__ = ["parse_date_doc"]
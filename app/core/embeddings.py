@@ -1,11 +1,27 @@
 # app/core/embeddings.py
 from __future__ import annotations
 import os
-from typing import Iterable, List
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Optional
 
 import numpy as np
 import requests
 
+from app.core import limiter, projection, resilience
+
+# ошибки, означающие перегрузку сервера (снижают лимит параллельности)
+_OVERLOAD = (requests.Timeout, requests.ConnectionError, limiter.LimiterTimeout)
+_OVERLOAD_STATUS = (429, 500, 502, 503, 504)
+
+
+class EmbedOverloaded(RuntimeError):
+    """Ollama ответила 429/5xx — сервер перегружен."""
+
+
+# не повторяются и не открывают выключатель: ошибка запроса (4xx) или своя очередь лимитера
+_FATAL = resilience.CLIENT_ERRORS + (requests.HTTPError, limiter.LimiterTimeout)
+
 
 def _l2norm_1d(v: np.ndarray) -> np.ndarray:
     return v / (np.linalg.norm(v) + 1e-12)
@@ -16,6 +32,7 @@ class OllamaEmbedder:
     Встраивание через локальный Ollama embeddings API.
     Совместимо с nomic-embed-text и др. эмбеддинг-моделями.
     Поддерживает E5-стиль префиксов (query:/passage:) по флагу EMBED_PREFIX_MODE.
+    Векторы запросов и документов проходят одну и ту же проекцию (app.core.projection).
     """
     def __init__(self):
         # URL вида http://host:11434/api/embeddings
@@ -25,10 +42,24 @@ class OllamaEmbedder:
         mode = os.getenv("EMBED_PREFIX_MODE", "e5").strip().lower()
         self.use_e5_prefix = mode in ("e5", "true", "1", "yes")
 
-    def _embed_one(self, text: str) -> List[float]:
-        """Вызов Ollama для одной строки. Возвращает L2-нормированный вектор."""
+    def _embed_one(self, text: str, priority: int = limiter.INGEST) -> List[float]:
+        """Вызов Ollama для одной строки: повторы/выключатель (app.core.resilience), каждая
+        попытка — под лимитером параллельности (app.core.limiter); дубль — только для запросов
+        поиска. Возвращает L2-нормированный вектор."""
+        return resilience.policy("ollama", _FATAL).call(self._limited, text, priority,
+                                                         hedge=priority == limiter.QUERY)
+
+    def _limited(self, text: str, priority: int) -> List[float]:
+        if not limiter.enabled():
+            return self._request(text)
+        with limiter.get_embed_limiter().slot(priority, overload=_OVERLOAD + (EmbedOverloaded,)):
+            return self._request(text)
+
+    def _request(self, text: str) -> List[float]:
         payload = {"model": self.model, "prompt": text}
         resp = requests.post(self.url, json=payload, timeout=self.timeout)
+        if resp.status_code in _OVERLOAD_STATUS:
+            raise EmbedOverloaded(f"Ollama embeddings HTTP {resp.status_code}")
         resp.raise_for_status()
         data = resp.json()
 
@@ -53,25 +84,62 @@ class OllamaEmbedder:
             raise ValueError("Empty query text")
         if self.use_e5_prefix:
             t = f"query: {t}"
-        return self._embed_one(t)
+        return self._project([self._embed_one(t, limiter.QUERY)])[0]
 
-    def embed_passages(self, texts: Iterable[str]) -> List[List[float]]:
-        out: List[List[float]] = []
+    def embed_passages(self, texts: Iterable[str], priority: int = limiter.INGEST,
+                       project: bool = True) -> List[List[float]]:
+        """Эмбеддинги документов; при включённом лимитере — параллельно, в пределах его лимита.
+        project=False — векторы модели без проекции (выборка для обучения PCA)."""
+        prepared: List[str] = []
         for t in texts:
             s = (t or "").strip()
             if not s:
                 raise ValueError("Empty passage text")
             if self.use_e5_prefix:
                 s = f"passage: {s}"
-            out.append(self._embed_one(s))
-        return out
+            prepared.append(s)
+        if len(prepared) < 2 or not limiter.enabled():
+            vecs = [self._embed_one(s, priority) for s in prepared]
+        else:
+            # потоков — до потолка лимитера; сколько из них реально шлют запросы, решает лимитер
+            vecs = list(_pool().map(lambda s: self._embed_one(s, priority), prepared))
+        return self._project(vecs) if project and vecs else vecs
+
+    @staticmethod
+    def _project(vecs: List[List[float]]) -> List[List[float]]:
+        proj = projection.get_projection()
+        if proj.kind == "none":
+            return vecs
+        return proj.apply(np.asarray(vecs, dtype=np.float32)).tolist()
 
 
 # Singleton
 _EMBEDDER: OllamaEmbedder | None = None
+_POOL: Optional[ThreadPoolExecutor] = None
+_POOL_LOCK = threading.Lock()
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = ThreadPoolExecutor(max_workers=max(1, int(limiter.get_embed_limiter().max_limit)),
+                                       thread_name_prefix="embed")
+        return _POOL
 
 def get_embedder() -> OllamaEmbedder:
     global _EMBEDDER
     if _EMBEDDER is None:
         _EMBEDDER = OllamaEmbedder()
     return _EMBEDDER
+
+
+def _reset_after_fork() -> None:
+    # потоки пула не переживают fork
+    global _EMBEDDER, _POOL, _POOL_LOCK
+    _EMBEDDER = None
+    _POOL = None
+    _POOL_LOCK = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
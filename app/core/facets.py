@@ -0,0 +1,123 @@
+# app/core/facets.py
+"""
+Кэш счётчиков /reports/facets.
+
+Дашборды запрашивают одни и те же агрегаты (тип/вид документа, город, месяц) с
+одними и теми же фильтрами; каждый запрос — group_by по всей коллекции. Ответ
+держится FACETS_CACHE_TTL_S секунд; вставка/обновление документов через
+app.core.backend сбрасывает кэш сразу. Кэш — на процесс: вставки из других
+процессов (воркеры app.serve, ingest/watch) становятся видны не позже чем через TTL.
+
+Одновременные промахи по одному ключу считаются один раз (остальные ждут результат);
+результат, посчитанный до сброса кэша, не сохраняется — иначе старые счётчики
+пережили бы вставку.
+
+ENV: FACETS_CACHE_TTL_S=10 (0 — без кэша), FACETS_CACHE_SIZE=256
+"""
+from __future__ import annotations
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class TTLCache:
+    def __init__(self, ttl: float = 10.0, size: int = 256):
+        self.ttl = ttl
+        self.size = max(1, size)
+        self._lock = threading.Lock()
+        self._items: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[str, threading.Event] = {}
+        self._generation = 0
+        self.counters = {"hit": 0, "miss": 0, "invalidate": 0}
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._generation += 1
+            self.counters["invalidate"] += 1
+
+    def get_or_compute(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """(значение, из кэша ли)."""
+        if self.ttl <= 0:
+            return fn(), False
+        while True:
+            with self._lock:
+                hit = self._items.get(key)
+                if hit is not None and hit[0] > time.monotonic():
+                    self._items.move_to_end(key)
+                    self.counters["hit"] += 1
+                    return hit[1], True
+                wait = self._inflight.get(key)
+                if wait is None:
+                    self._inflight[key] = done = threading.Event()
+                    generation = self._generation
+                    self.counters["miss"] += 1
+                    break
+            wait.wait()   # тот же ключ уже считается — ждём и перечитываем
+        try:
+            value = fn()
+            with self._lock:
+                if generation == self._generation:
+                    self._items[key] = (time.monotonic() + self.ttl, value)
+                    self._items.move_to_end(key)
+                    while len(self._items) > self.size:
+                        self._items.popitem(last=False)
+            return value, False
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            done.set()
+
+    def prometheus(self, prefix: str = "facets_cache") -> str:
+        with self._lock:
+            lines = [f"# TYPE {prefix}_entries gauge", f"{prefix}_entries {len(self._items)}",
+                     f"# TYPE {prefix}_requests_total counter"]
+            lines += [f'{prefix}_requests_total{{outcome="{k}"}} {v}' for k, v in self.counters.items()]
+        return "\n".join(lines) + "\n"
+
+
+# -------------------------
+# Кэш процесса
+# -------------------------
+_CACHE: Optional[TTLCache] = None
+_LOCK = threading.Lock()
+
+
+def get_cache() -> TTLCache:
+    global _CACHE
+    with _LOCK:
+        if _CACHE is None:
+            _CACHE = TTLCache(ttl=float(os.getenv("FACETS_CACHE_TTL_S", "10")),
+                              size=int(os.getenv("FACETS_CACHE_SIZE", "256")))
+        return _CACHE
+
+
+def _reset_after_fork() -> None:
+    # замок и ожидающие события родителя в дочернем процессе недействительны
+    global _CACHE, _LOCK
+    _CACHE = None
+    _LOCK = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def invalidate() -> None:
+    if _CACHE is not None:
+        _CACHE.invalidate()
+
+
+def cache_key(backend: str, facets: list[str], filters: Dict[str, Any] | None,
+              tenant: Optional[str], limit: int) -> str:
+    return json.dumps([backend, tenant, facets, filters or None, limit], sort_keys=True,
+                      ensure_ascii=False, default=str)
+
+
+def prometheus() -> str:
+    return get_cache().prometheus()
+
+
+__all__ = ["TTLCache", "get_cache", "invalidate", "cache_key", "prometheus"]
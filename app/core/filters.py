@@ -0,0 +1,228 @@
+# app/core/filters.py
+"""
+Мини-DSL фильтров для ReportKUI.
+
+Спецификация — обычный dict (как раньше в BM25Request.filters):
+
+    {
+      "city_fix": "Павлодар",                             # equal
+      "type_document": ["Рапорт КУИ", "Рапорт ЕРДР"],     # in (сокращённая форма)
+      "view_document": {"not_in": ["Заявление"]},
+      "date_doc": {"gte": "2025-01-01", "lt": "01.05.2025"},
+      "post_main": {"like": "Руководитель"},              # префикс (без * → добавим *)
+      "or":  [{"city_fix": "Павлодар"}, {"city_fix": "Экибастуз"}],
+      "not": {"type_document": "Исковое заявление"},
+    }
+
+Ключи верхнего уровня объединяются через AND. Отрицание проталкивается до
+листьев (де Морган, gt ↔ lte, gte ↔ lt), поэтому "not" с диапазоном даты
+исключает и документы без даты: {"not": {"date_doc": {"gt": X}}} — это
+date_doc ≤ X, а не «всё, кроме date_doc > X». ne/not_in, наоборот, пустые
+поля включают. Спецификация сначала
+валидируется и приводится к дереву (parse_filters), затем один раз
+компилируется в дерево weaviate Filter (compile_filters) — один запрос
+вместо N запросов по каждому значению.
+"""
+from __future__ import annotations
+import functools
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.core.dates import parse_date_doc
+
+# Поля с датой: диапазоны по тексту бессмысленны, поэтому сравнения
+# gt/gte/lt/lte идут в теневое DATE-свойство, заполняемое при вставке.
+DATE_FIELDS: Dict[str, str] = {"date_doc": "date_doc_iso"}
+
+GROUP_KEYS = ("and", "or", "not")
+OPS = ("eq", "ne", "in", "not_in", "like", "gt", "gte", "lt", "lte")
+RANGE_OPS = ("gt", "gte", "lt", "lte")
+MAX_IN_VALUES = 100
+MAX_DEPTH = 8
+
+# отрицание листа (законы де Моргана для групп — в _negate); диапазон без даты
+# не выполняется ни в прямой, ни в отрицательной форме — см. докстринг модуля
+_NEGATE_OP = {
+    "eq": "ne", "ne": "eq",
+    "in": "not_in", "not_in": "in",
+    "gt": "lte", "lte": "gt",
+    "gte": "lt", "lt": "gte",
+}
+
+_RE_FIELD = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+# Узел дерева: ("and", [узлы]) | ("or", [узлы]) | ("cmp", поле, оп, значение)
+Node = Tuple[Any, ...]
+
+
+class FilterError(ValueError):
+    """Некорректная спецификация фильтра (отдаём клиенту как 400/422)."""
+
+
+# -------------------------
+# Валидация → дерево
+# -------------------------
+def _scalar(field: str, v: Any) -> Any:
+    if isinstance(v, (str, int, float, bool)):
+        return v
+    raise FilterError(f"{field}: expected scalar value, got {type(v).__name__}")
+
+
+def _leaf(field: str, op: str, v: Any) -> Node:
+    if op not in OPS:
+        raise FilterError(f"{field}: unknown operator {op!r} (allowed: {', '.join(OPS)})")
+
+    if op in ("in", "not_in"):
+        if not isinstance(v, (list, tuple)) or not v:
+            raise FilterError(f"{field}.{op}: expected non-empty list")
+        if len(v) > MAX_IN_VALUES:
+            raise FilterError(f"{field}.{op}: too many values (max {MAX_IN_VALUES})")
+        return ("cmp", field, op, tuple(_scalar(field, x) for x in v))
+
+    if op in RANGE_OPS:
+        if field not in DATE_FIELDS:
+            raise FilterError(f"{field}.{op}: range operators are supported only for {', '.join(DATE_FIELDS)}")
+        dt = parse_date_doc(v)
+        if dt is None:
+            raise FilterError(f"{field}.{op}: cannot parse date {v!r}")
+        return ("cmp", field, op, dt)
+
+    if op == "like":
+        if not isinstance(v, str) or not v.strip():
+            raise FilterError(f"{field}.like: expected non-empty string")
+        s = v.strip()
+        if "*" not in s and "?" not in s:
+            s += "*"
+        return ("cmp", field, op, s)
+
+    return ("cmp", field, op, _scalar(field, v))
+
+
+def _field_nodes(field: str, v: Any, fields: Optional[set]) -> List[Node]:
+    if not _RE_FIELD.match(field):
+        raise FilterError(f"invalid field name {field!r}")
+    if fields is not None and field not in fields:
+        raise FilterError(f"unknown filter field {field!r}")
+    if v is None:
+        return []  # как и раньше: None-фильтр просто пропускаем
+    if isinstance(v, (list, tuple)):
+        return [_leaf(field, "in", v)]
+    if isinstance(v, dict):
+        if not v:
+            raise FilterError(f"{field}: empty operator object")
+        return [_leaf(field, op, x) for op, x in v.items()]
+    return [_leaf(field, "eq", v)]
+
+
+def _parse(spec: Any, fields: Optional[set], depth: int) -> Optional[Node]:
+    if depth > MAX_DEPTH:
+        raise FilterError(f"filter nesting is too deep (max {MAX_DEPTH})")
+    if not isinstance(spec, dict):
+        raise FilterError(f"expected object, got {type(spec).__name__}")
+
+    nodes: List[Node] = []
+    for key, v in spec.items():
+        if key in ("and", "or"):
+            if not isinstance(v, list) or not v:
+                raise FilterError(f"{key}: expected non-empty list of objects")
+            subs = [n for n in (_parse(s, fields, depth + 1) for s in v) if n is not None]
+            if subs:
+                nodes.append(subs[0] if len(subs) == 1 else (key, subs))
+        elif key == "not":
+            sub = _parse(v, fields, depth + 1)
+            if sub is not None:
+                nodes.append(_negate(sub))
+        else:
+            nodes.extend(_field_nodes(key, v, fields))
+
+    if not nodes:
+        return None
+    return nodes[0] if len(nodes) == 1 else ("and", nodes)
+
+
+def _negate(node: Node) -> Node:
+    kind = node[0]
+    if kind == "and":
+        return ("or", [_negate(n) for n in node[1]])
+    if kind == "or":
+        return ("and", [_negate(n) for n in node[1]])
+    _, field, op, v = node
+    if op == "like":
+        raise FilterError(f"{field}: 'like' cannot be negated")
+    return ("cmp", field, _NEGATE_OP[op], v)
+
+
+def parse_filters(spec: Dict[str, Any] | None, fields: Iterable[str] | None = None) -> Optional[Node]:
+    """
+    Проверяет спецификацию и возвращает нормализованное дерево
+    (отрицания уже протолкнуты до листьев). None — фильтра нет.
+    fields — допустимые имена полей (None = не проверять).
+    """
+    if not spec:
+        return None
+    return _parse(spec, set(fields) if fields is not None else None, 0)
+
+
+# -------------------------
+# Семантика сравнения (для локальных бэкендов)
+# -------------------------
+# Текстовые свойства Weaviate с tokenization=word: значение разбивается на слова в нижнем
+# регистре; equal — все слова значения есть в поле, like — шаблон сопоставляется со словом.
+# Свойства с tokenization=field (ключи, date_doc_month) сравниваются значением целиком.
+_RE_WORD = re.compile(r"\w+", re.U)
+
+
+def words(value: Any) -> List[str]:
+    """Слова значения, как их видит word-токенизация (нижний регистр)."""
+    return _RE_WORD.findall(str(value).lower()) if value is not None else []
+
+
+@functools.lru_cache(maxsize=256)
+def like_regex(pattern: str, ignore_case: bool = True) -> "re.Pattern[str]":
+    """Шаблон like (* — любая подстрока, ? — один символ) → regex на значение целиком."""
+    body = "".join(".*" if ch == "*" else "." if ch == "?" else re.escape(ch) for ch in pattern)
+    return re.compile(body + r"\Z", re.S | (re.I if ignore_case else 0))
+
+
+# -------------------------
+# Дерево → weaviate Filter
+# -------------------------
+def _compile(node: Node):
+    from weaviate.classes.query import Filter
+
+    kind = node[0]
+    if kind in ("and", "or"):
+        parts = [_compile(n) for n in node[1]]
+        return Filter.all_of(parts) if kind == "and" else Filter.any_of(parts)
+
+    _, field, op, v = node
+    if op in RANGE_OPS:
+        p = Filter.by_property(DATE_FIELDS[field])
+        return {"gt": p.greater_than, "gte": p.greater_or_equal,
+                "lt": p.less_than, "lte": p.less_or_equal}[op](v)
+
+    p = Filter.by_property(field)
+    if op == "eq":
+        return p.equal(v)
+    if op == "ne":
+        return p.not_equal(v)
+    if op == "like":
+        return p.like(v)
+    if op == "in":
+        parts = [Filter.by_property(field).equal(x) for x in v]
+        return parts[0] if len(parts) == 1 else Filter.any_of(parts)
+    # not_in
+    parts = [Filter.by_property(field).not_equal(x) for x in v]
+    return parts[0] if len(parts) == 1 else Filter.all_of(parts)
+
+
+def compile_filters(spec: Dict[str, Any] | None, fields: Iterable[str] | None = None):
+    """Спецификация DSL → weaviate Filter (или None)."""
+    node = parse_filters(spec, fields)
+    return _compile(node) if node is not None else None
+
+
+__all__ = [
+    "FilterError", "parse_filters", "compile_filters", "words", "like_regex",
+    "DATE_FIELDS", "OPS",
+]
@@ -0,0 +1,440 @@
+# app/core/fts_store.py
+"""
+Локальный BM25-бэкенд на SQLite FTS5 (офлайн, CI, сравнение латентности).
+Включается BM25_BACKEND=sqlite (см. app.core.backend).
+
+Таблица reports_fts: uuid (UNINDEXED) + 11 полей REPORT_FIELDS + теневые *_stem
+(app.core.stemming) + case_number + date_doc_iso (UNINDEXED). case_number — в индексе
+FTS5 (номер — один токен): фильтр по номеру дела идёт через MATCH, без перебора таблицы.
+Таблица прежней схемы (без новых колонок) при подключении переписывается в новую (_migrate).
+Ранжирование — bm25() FTS5 с весами колонок (FTS_BM25_WEIGHTS="report_begin=2,post_main=0.5").
+Фильтры — тот же DSL, что и build_filters (app.core.filters), компилируется в SQL WHERE
+с семантикой Weaviate: eq/in по текстовым полям (tokenization=word) — совпадение по словам
+через MATCH, like — по каждому слову; по ключам (tokenization=field) — значение целиком.
+Таблица несовместимой схемы — ошибка при подключении, а не предупреждение.
+
+База: FTS_DB_PATH (по умолчанию ./data/reports_fts.sqlite3). Если база пустая и задан
+FTS_BOOTSTRAP_NDJSON — при первом обращении загружается экспорт Weaviate (NDJSON,
+по объекту на строку: {"id": ..., "properties": {...}}).
+
+CLI:
+    python -m app.core.fts_store load export.ndjson
+"""
+from __future__ import annotations
+import json
+import logging
+import os
+import re
+import sqlite3
+import sys
+import threading
+import uuid as uuidlib
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+from app.core.filters import parse_filters, words, like_regex, DATE_FIELDS
+from app.core.stemming import STEM_FIELDS, stem_field, stem_query, expand_query_props, stemming_enabled
+from app.core.weaviate_client import (
+    REPORT_FIELDS, FILTER_FIELDS, FACET_FIELDS, project_fields, with_derived_fields, facet_values,
+)
+
+logger = logging.getLogger(__name__)
+
+TABLE = "reports_fts"
+STEM_COLUMNS = [stem_field(f) for f in STEM_FIELDS]
+TEXT_COLUMNS = REPORT_FIELDS + STEM_COLUMNS
+COLUMNS = ["uuid"] + TEXT_COLUMNS + ["case_number", "date_doc_iso"]
+_UNINDEXED = ("uuid", "date_doc_iso")
+_KEY_COLUMNS = ("case_number",)   # не участвуют в BM25 (вес 0), eq/in — через MATCH
+_INSERT_SQL = f"INSERT INTO {TABLE} ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+_RE_TERM = re.compile(r"\w+", re.U)
+# производные поля без своей колонки — выражения над date_doc_iso ("YYYY-MM-DD")
+_EXPR = {"date_doc_month": "substr(date_doc_iso, 1, 7)"}
+
+_CONN: Optional[sqlite3.Connection] = None
+_LOCK = threading.RLock()
+
+
+# -------------------------
+# Подключение / схема
+# -------------------------
+def _db_path() -> str:
+    return os.getenv("FTS_DB_PATH", "./data/reports_fts.sqlite3")
+
+
+def get_conn() -> sqlite3.Connection:
+    global _CONN
+    with _LOCK:
+        if _CONN is None:
+            path = _db_path()
+            if path != ":memory:":
+                Path(path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.create_function("token_like", 2, _token_like, deterministic=True)
+            try:
+                _create_table(conn)
+            except Exception:
+                conn.close()
+                raise
+            _CONN = conn
+            boot = os.getenv("FTS_BOOTSTRAP_NDJSON", "").strip()
+            if boot and count() == 0:
+                logger.info("bootstrap %s from %s", TABLE, boot)
+                load_ndjson(boot)
+        return _CONN
+
+
+def _create_table(conn: sqlite3.Connection, name: str = TABLE) -> None:
+    cols = ", ".join(
+        f"{c} UNINDEXED" if c in _UNINDEXED else c for c in COLUMNS
+    )
+    conn.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {name} USING fts5("
+        f"{cols}, tokenize='unicode61 remove_diacritics 2')"
+    )
+    if name != TABLE:
+        return
+    have = [r[1] for r in conn.execute(f"PRAGMA table_info({TABLE})")]
+    if have != COLUMNS and have[0] == "uuid" and set(have) < set(COLUMNS):
+        _migrate(conn, have)
+    elif have != COLUMNS:
+        # с чужой схемой запросы молча возвращали бы не те колонки
+        raise RuntimeError(f"{_db_path()}: {TABLE} columns {have} are incompatible with {COLUMNS}; "
+                           f"remove the database and reload it (python -m app.core.fts_store load ...)")
+
+
+def _migrate(conn: sqlite3.Connection, have: list[str]) -> None:
+    """Таблица без новых колонок → новая схема: строки переносятся через _row (производные пересчитываются)."""
+    logger.info("migrate %s: add columns %s", TABLE, [c for c in COLUMNS if c not in have])
+    tmp = f"{TABLE}_new"
+    conn.execute(f"DROP TABLE IF EXISTS {tmp}")
+    _create_table(conn, tmp)
+    cur = conn.execute(f"SELECT {', '.join(have)} FROM {TABLE}")
+    while True:
+        rows = cur.fetchmany(5000)
+        if not rows:
+            break
+        conn.executemany(_INSERT_SQL.replace(f"INTO {TABLE} ", f"INTO {tmp} ", 1),
+                         [_row(dict(zip(have[1:], r[1:])), r[0]) for r in rows])
+    conn.execute(f"DROP TABLE {TABLE}")
+    conn.execute(f"ALTER TABLE {tmp} RENAME TO {TABLE}")
+    conn.commit()
+
+
+def ensure_schema() -> None:
+    get_conn()  # таблица создаётся при подключении
+
+
+def drop_collection(name: str | None = None) -> None:
+    with _LOCK:
+        conn = get_conn()
+        conn.execute(f"DROP TABLE IF EXISTS {TABLE}")
+        _create_table(conn)
+        conn.commit()
+
+
+def _reset_after_fork() -> None:
+    """Соединение с базой FTS5 (reports_fts) воркер откроет своё (при первом get_conn, с проверкой
+    схемы); RLock запросов, который мог держать поток родителя в момент fork, — новый."""
+    global _CONN, _LOCK
+    _CONN = None
+    _LOCK = threading.RLock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def close() -> None:
+    global _CONN
+    with _LOCK:
+        if _CONN is not None:
+            _CONN.close()
+            _CONN = None
+
+
+def count() -> int:
+    return get_conn().execute(f"SELECT count(*) FROM {TABLE}").fetchone()[0]
+
+
+# -------------------------
+# Загрузка
+# -------------------------
+def _row(props: Dict[str, Any], oid: Optional[str] = None) -> tuple:
+    p = with_derived_fields(props)
+    iso = p.get("date_doc_iso")
+    return (
+        oid or str(uuidlib.uuid4()),
+        *[(None if p.get(f) is None else str(p.get(f))) for f in TEXT_COLUMNS],
+        p.get("case_number"),
+        iso.strftime("%Y-%m-%d") if iso else None,
+    )
+
+
+def bulk_insert(rows: Iterable[Tuple[Optional[str], Dict[str, Any]]], batch: int = 5000) -> int:
+    """(uuid|None, props) пачками: одна транзакция на пачку, подготовленный INSERT через executemany."""
+    conn = get_conn()
+    n = 0
+    buf: list[tuple] = []
+    with _LOCK:
+        for oid, props in rows:
+            buf.append(_row(props, oid))
+            if len(buf) >= batch:
+                with conn:
+                    conn.executemany(_INSERT_SQL, buf)
+                n += len(buf)
+                buf.clear()
+        if buf:
+            with conn:
+                conn.executemany(_INSERT_SQL, buf)
+            n += len(buf)
+    return n
+
+
+def insert_reports(objs: list[Dict[str, Any]], tenants: list[Optional[str]] | None = None,
+                   ids: list[Optional[str]] | None = None) -> list[str | None]:
+    """Как weaviate_client.insert_reports (заданные ids — upsert); тенанты для SQLite не используются."""
+    if ids:
+        ids = [uid or str(uuidlib.uuid4()) for uid in ids]
+        update_reports([(uid, props, None) for uid, props in zip(ids, objs)])
+        return ids
+    ids = [str(uuidlib.uuid4()) for _ in objs]
+    bulk_insert(zip(ids, objs))
+    return ids
+
+
+def update_reports(updates: list[Tuple[str, Dict[str, Any], Optional[str]]], batch: int = 5000) -> int:
+    """(uuid, props, tenant) — перезапись строк по uuid (DELETE + INSERT в одной транзакции)."""
+    conn = get_conn()
+    n = 0
+    with _LOCK:
+        for i in range(0, len(updates), batch):
+            chunk = updates[i:i + batch]
+            with conn:
+                conn.executemany(f"DELETE FROM {TABLE} WHERE uuid = ?", [(uid,) for uid, _, _ in chunk])
+                conn.executemany(_INSERT_SQL, [_row(props, uid) for uid, props, _ in chunk])
+            n += len(chunk)
+    return n
+
+
+def iter_reports(batch: int = 5000) -> Iterator[list[Tuple[str, Dict[str, Any], Optional[str]]]]:
+    """Как weaviate_client.iter_reports. Строки, перезаписанные во время обхода (update_reports
+    вставляет их заново, с новым rowid), повторно не выдаются: обход — до rowid на момент начала."""
+    cols = TEXT_COLUMNS + ["case_number", "date_doc_iso"] + list(_EXPR)
+    with _LOCK:
+        last = get_conn().execute(f"SELECT max(rowid) FROM {TABLE}").fetchone()[0] or 0
+    after = 0
+    while after < last:
+        with _LOCK:
+            rows = get_conn().execute(
+                f"SELECT rowid, uuid, {', '.join(_EXPR.get(c, c) for c in cols)} FROM {TABLE}"
+                f" WHERE rowid > ? AND rowid <= ?"
+                f" ORDER BY rowid LIMIT ?", (after, last, batch)).fetchall()
+        if not rows:
+            break
+        after = rows[-1][0]
+        yield [(r[1], {c: v for c, v in zip(cols, r[2:]) if v is not None}, None) for r in rows]
+
+
+def _iter_ndjson(path: str) -> Iterator[Tuple[Optional[str], Dict[str, Any]]]:
+    with open(path, encoding="utf-8") as f:
+        for ln, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                obj = json.loads(line)
+            except ValueError as e:
+                logger.warning("%s:%d: bad json: %s", path, ln, e)
+                continue
+            props = obj.get("properties") if isinstance(obj.get("properties"), dict) else obj
+            yield obj.get("id") or obj.get("uuid"), props
+
+
+def load_ndjson(path: str) -> int:
+    n = bulk_insert(_iter_ndjson(path))
+    logger.info("loaded %d objects into %s", n, TABLE)
+    return n
+
+
+# -------------------------
+# Фильтры: дерево DSL → SQL
+# -------------------------
+def _sql(node) -> Tuple[str, list]:
+    kind = node[0]
+    if kind in ("and", "or"):
+        parts = [_sql(n) for n in node[1]]
+        sep = " AND " if kind == "and" else " OR "
+        return "(" + sep.join(p for p, _ in parts) + ")", [a for _, args in parts for a in args]
+
+    _, field, op, v = node
+    if op in ("gt", "gte", "lt", "lte"):
+        col = DATE_FIELDS[field]
+        sym = {"gt": ">", "gte": ">=", "lt": "<", "lte": "<="}[op]
+        return f"{col} {sym} ?", [v.strftime("%Y-%m-%d")]
+    if field in _KEY_COLUMNS and op in ("eq", "in"):
+        # точное значение-токен через индекс FTS5 (подзапрос — и внутри bm25 MATCH)
+        terms = " OR ".join(_quote(x) for x in (v if op == "in" else (v,)))
+        return f"rowid IN (SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH ?)", [f"{field} : ({terms})"]
+    if field in TEXT_COLUMNS and op != "like":
+        return _token_sql(field, op, v)
+    if field in TEXT_COLUMNS:
+        return f"token_like({field}, ?)", [v]
+    field = _EXPR.get(field, field)
+    if field not in COLUMNS and field not in _EXPR.values():
+        # поле есть в схеме Weaviate, но не в FTS-таблице — совпадений нет
+        return ("1=1" if op in ("ne", "not_in") else "0=1"), []
+    if op == "eq":
+        return f"{field} = ?", [str(v)]
+    if op == "ne":
+        return f"({field} IS NULL OR {field} != ?)", [str(v)]
+    if op == "in":
+        return f"{field} IN ({', '.join('?' * len(v))})", [str(x) for x in v]
+    if op == "not_in":
+        return f"({field} IS NULL OR {field} NOT IN ({', '.join('?' * len(v))}))", [str(x) for x in v]
+    # like по значению целиком (tokenization=field): Weaviate-шаблон (*, ?) → GLOB, [ — литерал
+    return f"{field} GLOB ?", [v.replace("[", "[[]")]
+
+
+def _quote(term: Any) -> str:
+    return '"' + str(term).replace('"', '""') + '"'
+
+
+def _token_sql(field: str, op: str, v) -> Tuple[str, list]:
+    """
+    eq/ne/in/not_in по текстовой колонке — как equal Weaviate на TEXT с tokenization=word:
+    значение разбивается на слова, совпадение — все слова есть в поле (в любом порядке,
+    без учёта регистра), через MATCH по колонке. ne/not_in — дополнение (включая пустые поля).
+    """
+    groups = []
+    for x in (v if op in ("in", "not_in") else (v,)):
+        terms = words(x)
+        if terms:
+            groups.append("(" + " AND ".join(_quote(t) for t in terms) + ")")
+    negate = op in ("ne", "not_in")
+    if not groups:   # значение без слов ничему не равно
+        return ("1=1" if negate else "0=1"), []
+    sub = f"SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH ?"
+    return f"rowid {'NOT IN' if negate else 'IN'} ({sub})", [f"{field} : ({' OR '.join(groups)})"]
+
+
+def _token_like(value: Optional[str], pattern: str) -> bool:
+    """like Weaviate на TEXT с tokenization=word: шаблон (*, ?) сравнивается с каждым словом поля."""
+    rx = like_regex(pattern)
+    return any(rx.match(t) for t in words(value))
+
+
+def build_where(filters: Dict[str, Any] | None) -> Tuple[str, list]:
+    node = parse_filters(filters, fields=FILTER_FIELDS)
+    return _sql(node) if node is not None else ("", [])
+
+
+# -------------------------
+# BM25
+# -------------------------
+def _weights() -> Dict[str, float]:
+    w: Dict[str, float] = {}
+    for part in os.getenv("FTS_BM25_WEIGHTS", "").split(","):
+        if "=" in part:
+            k, v = part.split("=", 1)
+            w[k.strip()] = float(v)
+    return w
+
+
+def _match_expr(query: str, query_props: list[str]) -> Optional[str]:
+    terms = _RE_TERM.findall(query or "")
+    if not terms:
+        return None
+    cols = [c for c in query_props if c in TEXT_COLUMNS] or REPORT_FIELDS
+    ors = " OR ".join('"' + t.replace('"', '""') + '"' for t in terms)
+    return "{" + " ".join(cols) + "} : (" + ors + ")"
+
+
+def bm25_search(query: str, query_props: list[str], limit: int = 10,
+                filters: Dict[str, Any] | None = None, tenant: Optional[str] = None,
+                fields: Optional[list[str]] = None):
+    """Тот же контракт, что у weaviate_client.bm25_search (score — больше = лучше)."""
+    fields = project_fields(fields)
+    if stemming_enabled():
+        query, query_props = stem_query(query), expand_query_props(query_props or REPORT_FIELDS)
+    match = _match_expr(query, query_props)
+    if match is None:
+        return []
+    where, args = build_where(filters)
+    w = _weights()
+    weights = ", ".join(str(w.get(c, 0.0 if c in _UNINDEXED + _KEY_COLUMNS else 1.0)) for c in COLUMNS)
+    sql = (
+        f"SELECT uuid, {', '.join(fields)}, bm25({TABLE}, {weights}) AS rank "
+        f"FROM {TABLE} WHERE {TABLE} MATCH ?"
+        + (f" AND {where}" if where else "")
+        + " ORDER BY rank LIMIT ?"
+    )
+    with _LOCK:
+        rows = get_conn().execute(sql, [match, *args, limit]).fetchall()
+    return [{
+        "id": r[0],
+        "score": float(-r[-1]),
+        "properties": dict(zip(fields, r[1:-1])),
+    } for r in rows]
+
+
+def fetch_reports(limit: int = 100, offset: int = 0, filters: Dict[str, Any] | None = None,
+                  fields: Optional[list[str]] = None):
+    fields = project_fields(fields)
+    where, args = build_where(filters)
+    sql = (f"SELECT uuid, {', '.join(fields)} FROM {TABLE}"
+           + (f" WHERE {where}" if where else "") + " LIMIT ? OFFSET ?")
+    with _LOCK:
+        rows = get_conn().execute(sql, [*args, limit, offset]).fetchall()
+    return [{"uuid": r[0], "score": None, "properties": dict(zip(fields, r[1:]))} for r in rows]
+
+
+def fetch_case(number: str, limit: int = 1000, fields: Optional[list[str]] = None,
+               tenant: Optional[str] = None) -> list[Dict[str, Any]]:
+    """Как weaviate_client.fetch_case: документы дела по MATCH case_number, по дате (без даты — в конце)."""
+    fields = project_fields(fields)
+    where, args = build_where({"case_number": number})
+    sql = (f"SELECT uuid, {', '.join(fields)} FROM {TABLE} WHERE {where}"
+           " ORDER BY date_doc_iso IS NULL, date_doc_iso LIMIT ?")
+    with _LOCK:
+        rows = get_conn().execute(sql, [*args, limit]).fetchall()
+    return [{"uuid": r[0], "score": None, "properties": dict(zip(fields, r[1:]))} for r in rows]
+
+
+# -------------------------
+# Агрегаты (/reports/facets)
+# -------------------------
+def facet_counts(facets: list[str], filters: Dict[str, Any] | None = None,
+                 tenant: Optional[str] = None, limit: int = 20) -> Dict[str, Any]:
+    """Тот же контракт, что у weaviate_client.facet_counts: GROUP BY по полю на каждый фасет."""
+    unknown = [f for f in facets if f not in FACET_FIELDS]
+    if unknown:
+        raise ValueError(f"unknown facets: {', '.join(unknown)}")
+    where, args = build_where(filters)
+    cond = f" WHERE {where}" if where else ""
+    out: Dict[str, Any] = {}
+    with _LOCK:
+        conn = get_conn()
+        total = conn.execute(f"SELECT count(*) FROM {TABLE}{cond}", args).fetchone()[0]
+        for f in facets:
+            col = _EXPR.get(f, f)
+            rows = conn.execute(f"SELECT {col}, count(*) FROM {TABLE}{cond} GROUP BY 1", args).fetchall()
+            out[f] = facet_values({v: c for v, c in rows if v is not None}, total, limit)
+    return {"total": total, "facets": out}
+
+
+__all__ = [
+    "get_conn", "ensure_schema", "drop_collection", "close", "count",
+    "bulk_insert", "insert_reports", "update_reports", "iter_reports", "load_ndjson",
+    "build_where", "bm25_search", "fetch_reports", "fetch_case", "facet_counts",
+]
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    if len(sys.argv) == 3 and sys.argv[1] == "load":
+        print(load_ndjson(sys.argv[2]))
+    else:
+        print("usage: python -m app.core.fts_store load <export.ndjson>")
+        sys.exit(2)
@@ -0,0 +1,238 @@
+# app/core/limiter.py
+"""
+Адаптивное ограничение параллельности (AIMD) для вызовов эмбеддинг-сервера.
+
+Ollama обрабатывает ограниченное число запросов одновременно (OLLAMA_NUM_PARALLEL),
+остальные ждут в её внутренней очереди — при залпе запросов растёт латентность,
+и запросы падают по OLLAMA_TIMEOUT; последовательные вызовы оставляют сервер
+простаивать. Лимитер держит число запросов «в полёте» около ёмкости сервера:
+
+  limit += 1/limit  — успешный ответ не медленнее цели при загруженном лимите
+                      (+1 за «окно» из limit запросов — аддитивный рост);
+  limit *= BACKOFF  — ошибка перегрузки (таймаут, соединение, 429/5xx) или ответ
+                      медленнее цели; не чаще раза за время одного запроса.
+
+Цель латентности — EMBED_LATENCY_TARGET_MS или, при 0, базовая латентность
+(минимум за последние 1–2 окна EMBED_BASELINE_WINDOW_S) × EMBED_LATENCY_TOLERANCE.
+
+Запросы сверх лимита ждут в очереди по приоритету: QUERY (поиск — пользователь
+ждёт ответа) всегда раньше INGEST (эмбеддинг документов при загрузке), внутри
+приоритета — FIFO. Ожидание дольше timeout → LimiterTimeout.
+
+Лимитер — на процесс: в многопроцессном режиме (app.serve) каждый воркер
+подстраивается сам по общей для всех латентности сервера.
+
+ENV: EMBED_LIMITER=true, EMBED_CONCURRENCY_INITIAL=4, EMBED_CONCURRENCY_MIN=1,
+     EMBED_CONCURRENCY_MAX=16, EMBED_LATENCY_TARGET_MS=0, EMBED_LATENCY_TOLERANCE=2.0,
+     EMBED_AIMD_BACKOFF=0.7, EMBED_BASELINE_WINDOW_S=60,
+     EMBED_QUEUE_TIMEOUT_S (по умолчанию OLLAMA_TIMEOUT)
+"""
+from __future__ import annotations
+import heapq
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Type
+
+QUERY = 0
+INGEST = 1
+PRIORITY_NAMES = {QUERY: "query", INGEST: "ingest"}
+
+
+class LimiterTimeout(TimeoutError):
+    """Слот не освободился за отведённое время ожидания."""
+
+
+def _f(name: str, default: str) -> float:
+    return float(os.getenv(name, default))
+
+
+def enabled() -> bool:
+    return os.getenv("EMBED_LIMITER", "true").strip().lower() in ("1", "true", "yes", "y")
+
+
+class AdaptiveLimiter:
+    def __init__(self, initial: float = 4, min_limit: float = 1, max_limit: float = 16,
+                 target_ms: float = 0.0, tolerance: float = 2.0, backoff: float = 0.7,
+                 queue_timeout: Optional[float] = 30.0, baseline_window: float = 60.0):
+        self.min_limit = max(1.0, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = min(self.max_limit, max(self.min_limit, initial))
+        self.target_ms = target_ms
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.queue_timeout = queue_timeout
+        self.baseline_window = baseline_window
+
+        self._cond = threading.Condition()
+        self._inflight = 0
+        self._waiters: List[Tuple[int, int]] = []        # куча (приоритет, номер)
+        self._seq = itertools.count()
+        self._last_decrease = 0.0
+        self.baseline_ms: Optional[float] = None
+        self._win_min: Optional[float] = None           # минимум текущего окна
+        self._prev_min: Optional[float] = None          # минимум прошлого окна
+        self._win_start = time.monotonic()
+        self.latency_ewma_ms: Optional[float] = None
+        self.wait_ewma_ms = 0.0
+        self.counters: Dict[str, int] = {"ok": 0, "slow": 0, "overload": 0, "error": 0, "rejected": 0}
+
+    # -------------------------
+    # Слоты
+    # -------------------------
+    def _capacity(self) -> int:
+        return int(self.limit)
+
+    def _queued(self, priority: int) -> int:
+        return sum(1 for p, _ in self._waiters if p == priority)
+
+    def acquire(self, priority: int = INGEST, timeout: Optional[float] = None) -> float:
+        """Ждёт слот; возвращает время ожидания, мс."""
+        timeout = self.queue_timeout if timeout is None else timeout
+        t0 = time.monotonic()
+        me = (priority, next(self._seq))
+        with self._cond:
+            heapq.heappush(self._waiters, me)
+            while not (self._waiters[0] == me and self._inflight < self._capacity()):
+                left = None if timeout is None else timeout - (time.monotonic() - t0)
+                if left is not None and left <= 0:
+                    self._waiters.remove(me)
+                    heapq.heapify(self._waiters)
+                    self.counters["rejected"] += 1
+                    self._cond.notify_all()
+                    raise LimiterTimeout(f"embedding limiter: no slot in {timeout:.1f}s "
+                                         f"(limit={self._capacity()}, queued={len(self._waiters)})")
+                self._cond.wait(left)
+            heapq.heappop(self._waiters)
+            self._inflight += 1
+            waited = (time.monotonic() - t0) * 1000
+            self.wait_ewma_ms += 0.1 * (waited - self.wait_ewma_ms)
+            self._cond.notify_all()   # следующий в очереди может пройти, если слотов несколько
+        return waited
+
+    def release(self, latency_ms: float, outcome: str, inflight_at_start: int) -> None:
+        """outcome: ok | overload | error (error — не про нагрузку: 4xx, битый ответ)."""
+        with self._cond:
+            self._inflight -= 1
+            if outcome == "ok":
+                self._observe(latency_ms)
+                if latency_ms > self.target():
+                    outcome = "slow"
+                    self._decrease(latency_ms)
+                elif inflight_at_start >= self._capacity() / 2:
+                    # рост только под нагрузкой: иначе лимит «разгоняется» на простое
+                    self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            elif outcome == "overload":
+                self._decrease(latency_ms)
+            self.counters[outcome] += 1
+            self._cond.notify_all()
+
+    def _observe(self, ms: float) -> None:
+        self.latency_ewma_ms = ms if self.latency_ewma_ms is None else self.latency_ewma_ms + 0.1 * (ms - self.latency_ewma_ms)
+        # минимум по двум окнам: база следует за сменой модели/железа не позже чем через 2 окна,
+        # а снижения лимита регулярно дают «чистые» замеры без очереди на сервере
+        now = time.monotonic()
+        if now - self._win_start >= self.baseline_window:
+            self._prev_min, self._win_min, self._win_start = self._win_min, None, now
+        self._win_min = ms if self._win_min is None else min(ms, self._win_min)
+        self.baseline_ms = self._win_min if self._prev_min is None else min(self._win_min, self._prev_min)
+
+    def _decrease(self, latency_ms: float) -> None:
+        now = time.monotonic()
+        # не чаще раза за время запроса: один залп ошибок — одно снижение
+        if now - self._last_decrease >= max(latency_ms, self.baseline_ms or 0.0) / 1000:
+            self.limit = max(self.min_limit, self.limit * self.backoff)
+            self._last_decrease = now
+
+    def target(self) -> float:
+        if self.target_ms > 0:
+            return self.target_ms
+        return float("inf") if self.baseline_ms is None else self.baseline_ms * self.tolerance
+
+    @contextmanager
+    def slot(self, priority: int = INGEST, overload: Tuple[Type[BaseException], ...] = (),
+             timeout: Optional[float] = None) -> Iterator[None]:
+        """Слот на один запрос; исключения из overload снижают лимит, прочие — нет."""
+        self.acquire(priority, timeout)
+        with self._cond:
+            inflight = self._inflight
+        t0 = time.perf_counter()
+        outcome = "error"
+        try:
+            yield
+            outcome = "ok"
+        except overload:
+            outcome = "overload"
+            raise
+        finally:
+            self.release((time.perf_counter() - t0) * 1000, outcome, inflight)
+
+    # -------------------------
+    # Метрики
+    # -------------------------
+    def snapshot(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "limit": round(self.limit, 2), "inflight": self._inflight,
+                "queued": {name: self._queued(p) for p, name in PRIORITY_NAMES.items()},
+                "latency_ewma_ms": None if self.latency_ewma_ms is None else round(self.latency_ewma_ms, 2),
+                "latency_baseline_ms": None if self.baseline_ms is None else round(self.baseline_ms, 2),
+                "latency_target_ms": None if self.target() == float("inf") else round(self.target(), 2),
+                "queue_wait_ewma_ms": round(self.wait_ewma_ms, 2),
+                "requests": dict(self.counters),
+            }
+
+    def prometheus(self, prefix: str = "embed") -> str:
+        s = self.snapshot()
+        lines = [
+            f"# TYPE {prefix}_concurrency_limit gauge", f"{prefix}_concurrency_limit {s['limit']}",
+            f"# TYPE {prefix}_inflight gauge", f"{prefix}_inflight {s['inflight']}",
+            f"# TYPE {prefix}_queue_depth gauge",
+            *(f'{prefix}_queue_depth{{priority="{k}"}} {v}' for k, v in s["queued"].items()),
+            f"# TYPE {prefix}_queue_wait_ewma_ms gauge", f"{prefix}_queue_wait_ewma_ms {s['queue_wait_ewma_ms']}",
+        ]
+        for k in ("latency_ewma_ms", "latency_baseline_ms", "latency_target_ms"):
+            if s[k] is not None:
+                lines += [f"# TYPE {prefix}_{k} gauge", f"{prefix}_{k} {s[k]}"]
+        lines.append(f"# TYPE {prefix}_requests_total counter")
+        lines += [f'{prefix}_requests_total{{outcome="{k}"}} {v}' for k, v in s["requests"].items()]
+        return "\n".join(lines) + "\n"
+
+
+# -------------------------
+# Синглтон для эмбеддингов
+# -------------------------
+_LIMITER: Optional[AdaptiveLimiter] = None
+_LOCK = threading.Lock()
+
+
+def get_embed_limiter() -> AdaptiveLimiter:
+    global _LIMITER
+    with _LOCK:
+        if _LIMITER is None:
+            _LIMITER = AdaptiveLimiter(
+                initial=_f("EMBED_CONCURRENCY_INITIAL", "4"),
+                min_limit=_f("EMBED_CONCURRENCY_MIN", "1"),
+                max_limit=_f("EMBED_CONCURRENCY_MAX", "16"),
+                target_ms=_f("EMBED_LATENCY_TARGET_MS", "0"),
+                tolerance=_f("EMBED_LATENCY_TOLERANCE", "2.0"),
+                backoff=_f("EMBED_AIMD_BACKOFF", "0.7"),
+                queue_timeout=_f("EMBED_QUEUE_TIMEOUT_S", os.getenv("OLLAMA_TIMEOUT", "30")),
+                baseline_window=_f("EMBED_BASELINE_WINDOW_S", "60"),
+            )
+        return _LIMITER
+
+
+def _reset_after_fork() -> None:
+    # замок/условие и счётчик «в полёте» родителя в дочернем процессе недействительны
+    global _LIMITER, _LOCK
+    _LIMITER = None
+    _LOCK = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+__all__ = ["QUERY", "INGEST", "AdaptiveLimiter", "LimiterTimeout", "enabled", "get_embed_limiter"]
@@ -0,0 +1,701 @@
+# app/core/local_store.py
+"""
+Встроенное (in-process) векторное хранилище на NumPy — для офлайн-развёртываний
+и тестов без сервера Weaviate. Включается BM25_BACKEND=local (см. app.core.backend);
+интерфейс повторяет функции app.core.weaviate_client: ensure_schema / insert_reports
+(ids — upsert) / update_reports / bm25_search / fetch_case / facet_counts / iter_reports
+/ drop_collection + vector_search / fetch_reports. Тенантов нет (как у app.core.fts_store).
+
+Хранение (каталог LOCAL_STORE_DIR, по умолчанию ./data/local_store):
+  vectors.f32   — memmap float32 [capacity × dim], строки L2-нормированы
+  state.json    — dim, count, capacity и embedding — версия пространства векторов
+                  (модель + проекция, app.core.projection.projection_id())
+  meta.jsonl    — по строке на объект: {"id": uuid, "properties": {...}}
+  deleted.json  — удалённые строки (tombstones)
+  ivf.npz       — центроиды и списки IVF (если обучен)
+  store.lock    — flock писателей
+
+Несколько процессов на одном каталоге (воркеры app.serve, API рядом с ingest/watch):
+запись (add/delete) идёт под эксклюзивным flock и начинается с досчитывания чужих
+строк (_refresh), поэтому процессы не пишут в одни и те же строки; читатели подхватывают
+чужие строки при каждом get_store() — по count из state.json (он пишется последним).
+IVF, обученный в другом процессе, подхватывается только при переоткрытии.
+
+Поиск — блочный matmul top-k по всем строкам; при обученном IVF — только по
+nprobe ближайшим кластерам. BM25 — по инвертированному индексу «поле → слово →
+строки» в памяти (k1=1.2, b=0.75, как у Weaviate; сумма по полям; удалённые строки
+остаются в статистике до переиндексации, как tombstones Weaviate до компактации).
+Свойства хранятся с производными полями (with_derived_fields, date_doc_iso — "YYYY-MM-DD").
+
+Фильтры — тот же DSL (app.core.filters) с семантикой Weaviate: eq/in по текстовым
+полям (tokenization=word) — все слова значения есть в поле, like — шаблон по каждому
+слову (через словарь поля); ключи (case_number, date_doc_month) — значение целиком
+(индекс «поле → значение → строки»).
+"""
+from __future__ import annotations
+import fcntl
+import json
+import math
+import os
+import threading
+import uuid as uuidlib
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from app.core.dates import parse_date_doc
+from app.core.filters import parse_filters, words, like_regex
+from app.core.stemming import STEM_FIELDS, stem_field, stem_query, expand_query_props, stemming_enabled
+from app.core.weaviate_client import (
+    REPORT_FIELDS, FILTER_FIELDS, FACET_FIELDS, project_fields, with_derived_fields, facet_values,
+)
+
+_BLOCK = 65536
+# свойства с word-токенизацией: BM25 и пословные eq/like
+TEXT_FIELDS = REPORT_FIELDS + [stem_field(f) for f in STEM_FIELDS]
+_K1, _B = 1.2, 0.75
+
+
+def _l2norm_rows(x: np.ndarray) -> np.ndarray:
+    return x / (np.linalg.norm(x, axis=1, keepdims=True) + 1e-12)
+
+
+def report_text(props: Dict[str, Any]) -> str:
+    """Текст документа для эмбеддинга: непустые поля REPORT_FIELDS через перевод строки."""
+    return "\n".join(str(props[f]) for f in REPORT_FIELDS if props.get(f))
+
+
+class LocalVectorIndex:
+    def __init__(self, path: str | Path, dim: Optional[int] = None):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._lock_file = open(self.path / "store.lock", "a+b")
+        self._flock_depth = 0
+        self._meta_end = 0            # байт meta.jsonl после строки count-1
+        self._del_sig: Optional[tuple] = None
+
+        self.dim: Optional[int] = dim
+        self.embedding: Optional[str] = None
+        self.count = 0
+        self.capacity = 0
+        self._mat: Optional[np.memmap] = None
+        self.ids: List[str] = []
+        self.props: List[Dict[str, Any]] = []
+        self.id_to_row: Dict[str, int] = {}
+        self.deleted: set[int] = set()
+        # равенства по значению целиком: поле → значение → список строк (не TEXT_FIELDS)
+        self._eq: Dict[str, Dict[Any, List[int]]] = {}
+        # текстовые поля: поле → слово → {строка: частота}; поле → {строка: число слов}
+        self._terms: Dict[str, Dict[str, Dict[int, int]]] = {}
+        self._lens: Dict[str, Dict[int, int]] = {}
+        # IVF
+        self.centroids: Optional[np.ndarray] = None
+        self.lists: List[List[int]] = []
+
+        with self._writer():
+            self._load()
+
+    # ---------- файлы ----------
+    @contextmanager
+    def _writer(self):
+        """Эксклюзивный доступ к каталогу: замок потоков + flock между процессами (реентерабельно)."""
+        with self._lock:
+            if not self._flock_depth:
+                fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX)
+            self._flock_depth += 1
+            try:
+                yield
+            finally:
+                self._flock_depth -= 1
+                if not self._flock_depth:
+                    fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _file_sig(self, name: str) -> Optional[tuple]:
+        try:
+            st = (self.path / name).stat()
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def _read_meta(self, upto: int) -> None:
+        """Строки meta.jsonl с _meta_end, пока строк не станет upto."""
+        meta_p = self.path / "meta.jsonl"
+        if not meta_p.exists():
+            return
+        with meta_p.open("rb") as f:
+            f.seek(self._meta_end)
+            for line in f:
+                if len(self.ids) >= upto or not line.endswith(b"\n"):
+                    break
+                rec = json.loads(line)
+                self._register(rec["id"], rec["properties"])
+                self._meta_end += len(line)
+
+    def _read_deleted(self) -> None:
+        sig = self._file_sig("deleted.json")
+        if sig is not None and sig != self._del_sig:
+            self.deleted = {r for r in json.loads((self.path / "deleted.json").read_text(encoding="utf-8"))
+                            if r < self.count}
+        self._del_sig = sig
+
+    def _refresh(self) -> None:
+        """Досчитать строки и tombstones, записанные другим процессом (count в state.json — последним)."""
+        state_p = self.path / "state.json"
+        if not state_p.exists():
+            return
+        st = json.loads(state_p.read_text(encoding="utf-8"))
+        self.embedding = st.get("embedding") or self.embedding
+        if st["count"] > self.count:
+            self.dim = st["dim"]
+            if self._mat is None or st["capacity"] != self.capacity:
+                self._mat = np.memmap(self._vec_path, dtype=np.float32, mode="r+",
+                                      shape=(st["capacity"], self.dim))
+                self.capacity = st["capacity"]
+            start = self.count
+            self._read_meta(st["count"])
+            self.count = len(self.ids)
+            if self.centroids is not None:
+                for row in range(start, self.count):
+                    self._ivf_assign(row)
+        self._read_deleted()
+
+    def refresh(self) -> None:
+        with self._lock:
+            self._refresh()
+    @property
+    def _vec_path(self) -> Path:
+        return self.path / "vectors.f32"
+
+    def _load(self) -> None:
+        state_p = self.path / "state.json"
+        if state_p.exists():
+            st = json.loads(state_p.read_text(encoding="utf-8"))
+            self.dim, self.count, self.capacity = st["dim"], st["count"], st["capacity"]
+            self.embedding = st.get("embedding")
+        if self.dim and self.capacity:
+            self._mat = np.memmap(self._vec_path, dtype=np.float32, mode="r+",
+                                  shape=(self.capacity, self.dim))
+        # строки сверх зафиксированного count — хвост записи, оборванной до _save_state
+        self._read_meta(self.count)
+        meta_p = self.path / "meta.jsonl"
+        if meta_p.exists() and meta_p.stat().st_size > self._meta_end:
+            # иначе следующий add допишет после хвоста, и строки разойдутся с векторами
+            with meta_p.open("r+b") as f:
+                f.truncate(self._meta_end)
+        if len(self.ids) < self.count:   # векторы записаны, метаданные — нет: строки не существуют
+            self.count = len(self.ids)
+            self._save_state()
+        self._read_deleted()
+        ivf_p = self.path / "ivf.npz"
+        if ivf_p.exists():
+            z = np.load(ivf_p)
+            self.centroids = z["centroids"]
+            assign = z["assign"]
+            self.lists = [[] for _ in range(len(self.centroids))]
+            for row, c in enumerate(assign[: self.count]):
+                self.lists[int(c)].append(row)
+            for row in range(len(assign), self.count):  # добавлены после обучения
+                self._ivf_assign(row)
+
+    def _write_json(self, name: str, obj: Any) -> None:
+        """Атомарная запись: tmp + replace — оборванная запись не оставляет полфайла."""
+        tmp = self.path / (name + ".tmp")
+        tmp.write_text(json.dumps(obj), encoding="utf-8")
+        tmp.replace(self.path / name)
+
+    def _save_state(self) -> None:
+        self._write_json("state.json", {"dim": self.dim, "count": self.count, "capacity": self.capacity,
+                                        "embedding": self.embedding})
+
+    def _grow(self, need: int) -> None:
+        if need <= self.capacity:
+            return
+        cap = max(need, self.capacity * 2, 1024)
+        if self._mat is not None:
+            self._mat.flush()
+            del self._mat
+        with open(self._vec_path, "ab") as f:
+            f.truncate(cap * self.dim * 4)
+        self._mat = np.memmap(self._vec_path, dtype=np.float32, mode="r+", shape=(cap, self.dim))
+        self.capacity = cap
+
+    def _register(self, oid: str, props: Dict[str, Any]) -> None:
+        row = len(self.ids)
+        self.ids.append(oid)
+        self.props.append(props)
+        self.id_to_row[oid] = row
+        for k, v in props.items():
+            if k in TEXT_FIELDS:
+                ws = words(v)
+                if ws:
+                    postings = self._terms.setdefault(k, {})
+                    for w in ws:
+                        tf = postings.setdefault(w, {})
+                        tf[row] = tf.get(row, 0) + 1
+                    self._lens.setdefault(k, {})[row] = len(ws)
+            elif isinstance(v, (str, int, float, bool)):
+                self._eq.setdefault(k, {}).setdefault(v, []).append(row)
+
+    # ---------- запись ----------
+    def add(self, vectors: np.ndarray, props: List[Dict[str, Any]],
+            ids: Optional[List[str]] = None) -> List[str]:
+        vecs = _l2norm_rows(np.asarray(vectors, dtype=np.float32))
+        if vecs.ndim != 2 or len(vecs) != len(props):
+            raise ValueError("vectors must be [n × dim] and match props")
+        with self._writer():
+            self._refresh()
+            if self.dim is None:
+                self.dim = vecs.shape[1]
+            if vecs.shape[1] != self.dim:
+                raise ValueError(f"dim mismatch: store={self.dim}, got={vecs.shape[1]}")
+            ids = ids or [str(uuidlib.uuid4()) for _ in props]
+            start = self.count
+            self._grow(start + len(vecs))
+            self._mat[start:start + len(vecs)] = vecs
+            self._mat.flush()
+            with (self.path / "meta.jsonl").open("ab") as f:
+                for oid, p in zip(ids, props):
+                    f.write((json.dumps({"id": oid, "properties": p}, ensure_ascii=False, default=str)
+                             + "\n").encode("utf-8"))
+                self._meta_end = f.tell()
+            for oid, p in zip(ids, props):
+                self._register(oid, p)
+            self.count = start + len(vecs)
+            if self.centroids is not None:
+                for row in range(start, self.count):
+                    self._ivf_assign(row)
+            self._save_state()
+            return ids
+
+    def upsert(self, vectors: np.ndarray, props: List[Dict[str, Any]], ids: List[str]) -> List[str]:
+        """Как add, но объекты с уже существующими ids заменяются (старые строки — в tombstones)."""
+        with self._writer():
+            self._refresh()
+            self.delete(ids)
+            return self.add(vectors, props, ids)
+
+    def live_row(self, oid: str) -> Optional[int]:
+        row = self.id_to_row.get(oid)
+        return None if row is None or row in self.deleted else row
+
+    def check_embedding(self, embedding: str, legacy: Optional[str] = None) -> None:
+        """
+        Новые векторы/запрос должны быть из того же пространства, что и хранилище.
+        Пустое хранилище принимает embedding; заполненное до версионирования — legacy.
+        """
+        with self._writer():
+            self._refresh()
+            if self.embedding is None:
+                self.embedding = legacy if self.count and legacy else embedding
+                if self.count:
+                    self._save_state()
+            if self.embedding != embedding:
+                raise ValueError(f"embedding mismatch: store={self.embedding}, current={embedding}; "
+                                 f"re-index into an empty store (drop_collection) or restore EMBED_PROJECTION")
+
+    def delete(self, ids: Iterable[str]) -> int:
+        with self._writer():
+            self._refresh()
+            rows = {self.id_to_row[i] for i in ids if i in self.id_to_row} - self.deleted
+            if rows:
+                self.deleted |= rows
+                self._write_json("deleted.json", sorted(self.deleted))
+                self._del_sig = self._file_sig("deleted.json")
+            return len(rows)
+
+    # ---------- фильтры ----------
+    def _eval(self, node) -> np.ndarray:
+        kind = node[0]
+        if kind == "and":
+            m = np.ones(self.count, dtype=bool)
+            for n in node[1]:
+                m &= self._eval(n)
+            return m
+        if kind == "or":
+            m = np.zeros(self.count, dtype=bool)
+            for n in node[1]:
+                m |= self._eval(n)
+            return m
+
+        _, field, op, v = node
+        if op in ("eq", "ne", "in", "not_in"):
+            m = np.zeros(self.count, dtype=bool)
+            for val in (v if op in ("in", "not_in") else (v,)):
+                rows = self._eq_rows(field, val)
+                if rows:
+                    m[rows] = True
+            return ~m if op in ("ne", "not_in") else m
+
+        if op == "like":
+            m = np.zeros(self.count, dtype=bool)
+            if field in TEXT_FIELDS:
+                rx = like_regex(v)
+                for w, tf in self._terms.get(field, {}).items():
+                    if rx.match(w):
+                        m[list(tf)] = True
+            else:
+                rx = like_regex(v, ignore_case=False)
+                for val, rows in self._eq.get(field, {}).items():
+                    if rx.match(str(val)):
+                        m[rows] = True
+            return m
+
+        # диапазоны дат (gt/gte/lt/lte) по date_doc
+        def ok(p):
+            d = parse_date_doc(p.get(field))
+            if d is None:
+                return False
+            return {"gt": d > v, "gte": d >= v, "lt": d < v, "lte": d <= v}[op]
+        return np.fromiter((ok(p) for p in self.props[: self.count]), dtype=bool, count=self.count)
+
+    def _eq_rows(self, field: str, val: Any) -> List[int]:
+        if field not in TEXT_FIELDS:
+            return self._eq.get(field, {}).get(val) or []
+        ws = words(val)
+        postings = self._terms.get(field, {})
+        if not ws or any(w not in postings for w in ws):
+            return []
+        rows = set(postings[ws[0]])
+        for w in ws[1:]:
+            rows &= postings[w].keys()
+        return sorted(rows)
+
+    def mask(self, filters: Dict[str, Any] | None) -> Optional[np.ndarray]:
+        node = parse_filters(filters, fields=FILTER_FIELDS)
+        if node is None and not self.deleted:
+            return None
+        m = self._eval(node) if node is not None else np.ones(self.count, dtype=bool)
+        if self.deleted:
+            m[list(self.deleted)] = False
+        return m
+
+    # ---------- BM25 ----------
+    def bm25(self, terms: List[str], fields: List[str], k: int = 10,
+             filters: Dict[str, Any] | None = None) -> List[tuple[int, float]]:
+        """Top-k (строка, score) по BM25: сумма по полям fields, по убыванию score."""
+        with self._lock:
+            if not self.count or not terms:
+                return []
+            m = self.mask(filters)
+            n_docs = self.count - len(self.deleted)
+            scores = np.zeros(self.count, dtype=np.float64)
+            for f in fields:
+                postings, lens = self._terms.get(f), self._lens.get(f)
+                if not postings:
+                    continue
+                avg = sum(lens.values()) / len(lens)
+                for t in terms:
+                    tf = postings.get(t)
+                    if not tf:
+                        continue
+                    idf = math.log(1 + (n_docs - len(tf) + 0.5) / (len(tf) + 0.5))
+                    for row, c in tf.items():
+                        scores[row] += idf * c * (_K1 + 1) / (c + _K1 * (1 - _B + _B * lens[row] / avg))
+            if m is not None:
+                scores[~m] = 0.0
+            hit = np.flatnonzero(scores > 0)
+            if len(hit) > k:
+                hit = hit[np.argpartition(-scores[hit], k - 1)[:k]]
+            hit = hit[np.argsort(-scores[hit], kind="stable")]
+            return [(int(r), float(scores[r])) for r in hit]
+
+    # ---------- IVF ----------
+    def _ivf_assign(self, row: int) -> None:
+        c = int(np.argmax(self.centroids @ self._mat[row]))
+        self.lists[c].append(row)
+
+    def train_ivf(self, nlist: int, sample: int = 100_000, iters: int = 10, seed: int = 0) -> None:
+        """Сферический k-means на выборке → грубый квантователь (списки строк по кластерам)."""
+        with self._lock:
+            n = self.count
+            if n < nlist:
+                raise ValueError(f"need at least nlist={nlist} vectors, have {n}")
+            rng = np.random.default_rng(seed)
+            pick = rng.choice(n, size=min(sample, n), replace=False)
+            x = np.asarray(self._mat[np.sort(pick)])
+            cent = x[rng.choice(len(x), size=nlist, replace=False)].copy()
+            for _ in range(iters):
+                a = np.argmax(x @ cent.T, axis=1)
+                for c in range(nlist):
+                    members = x[a == c]
+                    if len(members):
+                        cent[c] = members.sum(axis=0)
+                cent = _l2norm_rows(cent)
+            assign = np.empty(n, dtype=np.int32)
+            for start in range(0, n, _BLOCK):
+                assign[start:start + _BLOCK] = np.argmax(self._mat[start:min(n, start + _BLOCK)] @ cent.T, axis=1)
+            self.centroids = cent.astype(np.float32)
+            self.lists = [np.flatnonzero(assign == c).tolist() for c in range(nlist)]
+            np.savez(self.path / "ivf.npz", centroids=self.centroids, assign=assign)
+
+    # ---------- поиск ----------
+    def search(self, queries: np.ndarray, k: int = 10, filters: Dict[str, Any] | None = None,
+               nprobe: Optional[int] = None) -> List[List[tuple[int, float]]]:
+        """
+        Top-k для пачки запросов [q × dim] (или одного [dim]).
+        Возвращает по каждому запросу список (строка, cosine) по убыванию.
+        nprobe — сколько кластеров IVF просматривать (None/0 — точный перебор).
+        """
+        q = np.asarray(queries, dtype=np.float32)
+        if q.ndim == 1:
+            q = q[None, :]
+        q = _l2norm_rows(q)
+        with self._lock:
+            n = self.count
+            if n == 0:
+                return [[] for _ in range(len(q))]
+            m = self.mask(filters)
+            if nprobe and self.centroids is not None:
+                return [self._search_ivf(qv, k, m, nprobe) for qv in q]
+
+            best_s = np.full((len(q), k), -np.inf, dtype=np.float32)
+            best_i = np.full((len(q), k), -1, dtype=np.int64)
+            for start in range(0, n, _BLOCK):
+                stop = min(n, start + _BLOCK)
+                if m is not None and not m[start:stop].any():
+                    continue
+                s = q @ self._mat[start:stop].T
+                if m is not None:
+                    s[:, ~m[start:stop]] = -np.inf
+                best_s, best_i = _merge_topk(best_s, best_i, s, start, k)
+            return _to_hits(best_s, best_i)
+
+    def _search_ivf(self, qv: np.ndarray, k: int, m: Optional[np.ndarray], nprobe: int):
+        probe = np.argsort(-(self.centroids @ qv))[:nprobe]
+        rows = np.sort(np.fromiter((r for c in probe for r in self.lists[c]), dtype=np.int64))
+        if m is not None:
+            rows = rows[m[rows]]
+        if not len(rows):
+            return []
+        s = self._mat[rows] @ qv
+        top = np.argsort(-s)[:k]
+        return [(int(rows[i]), float(s[i])) for i in top]
+
+
+def _merge_topk(best_s, best_i, s, offset, k):
+    idx = np.broadcast_to(np.arange(offset, offset + s.shape[1]), s.shape)
+    cat_s = np.concatenate([best_s, s], axis=1)
+    cat_i = np.concatenate([best_i, idx], axis=1)
+    kk = min(k, cat_s.shape[1])
+    part = np.argpartition(-cat_s, kk - 1, axis=1)[:, :kk]
+    return np.take_along_axis(cat_s, part, axis=1), np.take_along_axis(cat_i, part, axis=1)
+
+
+def _to_hits(best_s, best_i):
+    out = []
+    for srow, irow in zip(best_s, best_i):
+        order = np.argsort(-srow)
+        out.append([(int(irow[j]), float(srow[j])) for j in order if np.isfinite(srow[j]) and irow[j] >= 0])
+    return out
+
+
+# -------------------------
+# Функции в стиле weaviate_client
+# -------------------------
+_STORE: Optional[LocalVectorIndex] = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_store() -> LocalVectorIndex:
+    global _STORE
+    with _STORE_LOCK:
+        if _STORE is None:
+            _STORE = LocalVectorIndex(os.getenv("LOCAL_STORE_DIR", "./data/local_store"))
+        else:
+            _STORE.refresh()   # строки, дописанные другими процессами
+        return _STORE
+
+
+def _reset_after_fork() -> None:
+    # memmap можно было бы разделять, но индекс мутабельный — открываем заново в каждом процессе
+    global _STORE, _STORE_LOCK
+    _STORE = None
+    _STORE_LOCK = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def ensure_schema() -> None:
+    get_store()
+
+
+def drop_collection(name: str | None = None) -> None:
+    global _STORE
+    with _STORE_LOCK:
+        path = Path(os.getenv("LOCAL_STORE_DIR", "./data/local_store"))
+        _STORE = None
+        for f in ("vectors.f32", "meta.jsonl", "state.json", "deleted.json", "ivf.npz"):
+            (path / f).unlink(missing_ok=True)
+
+
+def _check_embedding() -> None:
+    from app.core import projection
+    model = os.getenv("OLLAMA_EMB_MODEL", "nomic-embed-text")
+    # хранилища до версионирования наполнялись полными векторами модели
+    get_store().check_embedding(projection.projection_id(), legacy=projection.Projection().id(model))
+
+
+def _stored(props: Dict[str, Any]) -> Dict[str, Any]:
+    """Свойства для хранения: с производными полями, дата — строкой (meta.jsonl — JSON)."""
+    p = with_derived_fields(props)
+    if p.get("date_doc_iso") is not None:
+        p["date_doc_iso"] = p["date_doc_iso"].strftime("%Y-%m-%d")
+    return p
+
+
+def insert_reports(objs: list[Dict[str, Any]], tenants: list[Optional[str]] | None = None,
+                   ids: list[Optional[str]] | None = None,
+                   vectors: Optional[List[List[float]]] = None) -> list[str | None]:
+    """
+    Вставка; без vectors документы эмбеддятся через OllamaEmbedder (passage:).
+    ids — заданные UUID: объект с тем же id заменяется (upsert, как weaviate_client);
+    тенанты не используются.
+    """
+    if not objs:
+        return []
+    if vectors is None:
+        from app.core.embeddings import get_embedder
+        _check_embedding()
+        vectors = get_embedder().embed_passages([report_text(p) or "-" for p in objs])
+    vecs = np.asarray(vectors, dtype=np.float32)
+    props = [_stored(p) for p in objs]
+    if ids:
+        return list(get_store().upsert(vecs, props, [uid or str(uuidlib.uuid4()) for uid in ids]))
+    return list(get_store().add(vecs, props))
+
+
+def update_reports(updates: list[tuple[str, Dict[str, Any], Optional[str]]]) -> int:
+    """
+    (uuid, props, tenant) — перезапись свойств; удалённые не воскрешаются. Вектор — эмбеддинг
+    report_text: у объектов, чей текст изменился (reparse, backfill), он пересчитывается,
+    у остальных остаётся прежним. Эмбеддинг — вне замка записи, чтобы не держать flock на время Ollama.
+    """
+    store = get_store()
+    fresh = {uid: p for uid, p in ((uid, _stored(props)) for uid, props, _ in updates)
+             if store.live_row(uid) is not None}
+    changed = [uid for uid, p in fresh.items() if report_text(p) != report_text(store.props[store.live_row(uid)])]
+    vectors: Dict[str, np.ndarray] = {}
+    if changed:
+        from app.core.embeddings import get_embedder
+        _check_embedding()
+        embedded = get_embedder().embed_passages([report_text(fresh[uid]) or "-" for uid in changed])
+        vectors = dict(zip(changed, np.asarray(embedded, dtype=np.float32)))
+    with store._writer():
+        store._refresh()
+        keep = [(uid, p, store.live_row(uid)) for uid, p in fresh.items()]
+        keep = [(uid, p, row) for uid, p, row in keep if row is not None]
+        if not keep:
+            return 0
+        vecs = np.stack([vectors[uid] if uid in vectors else np.asarray(store._mat[row]) for uid, _, row in keep])
+        store.upsert(vecs, [p for _, p, _ in keep], [uid for uid, _, _ in keep])
+    return len(keep)
+
+
+def iter_reports(batch: int = 1000) -> Iterable[list[tuple[str, Dict[str, Any], Optional[str]]]]:
+    """Как weaviate_client.iter_reports; строки, перезаписанные во время обхода, повторно не выдаются."""
+    store = get_store()
+    last = store.count
+    for start in range(0, last, batch):
+        with store._lock:
+            chunk = [(store.ids[r], dict(store.props[r]), None)
+                     for r in range(start, min(last, start + batch)) if r not in store.deleted]
+        if chunk:
+            yield chunk
+
+
+def bm25_search(query: str, query_props: list[str], limit: int = 10,
+                filters: Dict[str, Any] | None = None, tenant: Optional[str] = None,
+                fields: Optional[list[str]] = None):
+    """Тот же контракт, что у weaviate_client.bm25_search (score — больше = лучше)."""
+    fields = project_fields(fields)
+    if stemming_enabled():
+        query, query_props = stem_query(query), expand_query_props(query_props or REPORT_FIELDS)
+    terms = list(dict.fromkeys(words(query)))
+    props = [p for p in (query_props or []) if p in TEXT_FIELDS] or REPORT_FIELDS
+    store = get_store()
+    return [{
+        "id": store.ids[row],
+        "score": score,
+        "properties": {f: store.props[row].get(f) for f in fields},
+    } for row, score in store.bm25(terms, props, k=limit, filters=filters)]
+
+
+def fetch_case(number: str, limit: int = 1000, fields: Optional[list[str]] = None,
+               tenant: Optional[str] = None) -> list[Dict[str, Any]]:
+    """Как weaviate_client.fetch_case: документы дела по case_number, по дате (без даты — в конце)."""
+    fields = project_fields(fields)
+    store = get_store()
+    with store._lock:
+        rows = [r for r in store._eq.get("case_number", {}).get(number, []) if r not in store.deleted]
+        rows.sort(key=lambda r: (store.props[r].get("date_doc_iso") is None, store.props[r].get("date_doc_iso") or ""))
+        return [{"uuid": store.ids[r], "score": None, "properties": {f: store.props[r].get(f) for f in fields}}
+                for r in rows[:limit]]
+
+
+def facet_counts(facets: list[str], filters: Dict[str, Any] | None = None,
+                 tenant: Optional[str] = None, limit: int = 20) -> Dict[str, Any]:
+    """Тот же контракт, что у weaviate_client.facet_counts: счётчики значений по отфильтрованным строкам."""
+    unknown = [f for f in facets if f not in FACET_FIELDS]
+    if unknown:
+        raise ValueError(f"unknown facets: {', '.join(unknown)}")
+    store = get_store()
+    with store._lock:
+        m = store.mask(filters)
+        rows = np.flatnonzero(m) if m is not None else np.arange(store.count)
+        counts: Dict[str, Dict[Any, int]] = {f: {} for f in facets}
+        for r in rows:
+            p = store.props[r]
+            for f in facets:
+                v = p.get(f)
+                if v not in (None, ""):
+                    counts[f][v] = counts[f].get(v, 0) + 1
+    return {"total": int(len(rows)), "facets": {f: facet_values(counts[f], int(len(rows)), limit) for f in facets}}
+
+
+def vector_search(query: str | List[float], limit: int = 10,
+                  filters: Dict[str, Any] | None = None, nprobe: Optional[int] = None):
+    """Поиск ближайших; ответ в формате bm25_search (score = cosine)."""
+    store = get_store()
+    if isinstance(query, str):
+        from app.core.embeddings import get_embedder
+        if store.count:
+            _check_embedding()
+        query = get_embedder().embed_query(query)
+    if nprobe is None:
+        nprobe = int(os.getenv("LOCAL_STORE_NPROBE", "0") or 0)
+    res = store.search(np.asarray(query, dtype=np.float32), k=limit, filters=filters, nprobe=nprobe)[0]
+    return [{
+        "id": store.ids[row],
+        "score": score,
+        "properties": {f: store.props[row].get(f) for f in REPORT_FIELDS},
+    } for row, score in res]
+
+
+def fetch_reports(limit: int = 100, offset: int = 0, filters: Dict[str, Any] | None = None,
+                  fields: Optional[list[str]] = None, include_vector: bool = False) -> list[Dict[str, Any]]:
+    fields = project_fields(fields)
+    store = get_store()
+    m = store.mask(filters)
+    rows = np.flatnonzero(m) if m is not None else np.arange(store.count)
+    out = []
+    for row in rows[offset:offset + limit]:
+        item = {
+            "uuid": store.ids[row],
+            "score": None,
+            "properties": {f: store.props[row].get(f) for f in fields},
+        }
+        if include_vector:
+            item["vector"] = store._mat[row].tolist()
+        out.append(item)
+    return out
+
+
+__all__ = [
+    "LocalVectorIndex", "get_store", "ensure_schema", "drop_collection", "TEXT_FIELDS",
+    "insert_reports", "update_reports", "iter_reports", "bm25_search", "fetch_case", "facet_counts",
+    "vector_search", "fetch_reports", "report_text",
+]
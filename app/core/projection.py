@@ -0,0 +1,248 @@
+# app/core/projection.py
+"""
+Снижение размерности эмбеддингов — необязательная ступень после OllamaEmbedder.
+
+Режимы (EMBED_PROJECTION):
+  none     — векторы модели как есть (по умолчанию);
+  truncate — первые EMBED_DIM координат + повторная L2-нормировка (Matryoshka:
+             имеет смысл только для моделей, обученных так, чтобы «голова» вектора
+             несла основную информацию, напр. nomic-embed-text v1.5);
+  pca      — (v − mean) @ Wᵀ + L2-нормировка; mean и W (EMBED_DIM главных
+             компонент) обучаются офлайн на выборке векторов и лежат в
+             EMBED_PROJECTION_PATH (.npz).
+
+Проекция применяется одинаково к документам и запросам (embed_passages / embed_query),
+поэтому векторы в индексе и запрос всегда в одном пространстве. Идентификатор
+проекции (projection_id(): модель + режим + размерность + хэш PCA) записывается
+в хранилище при первой вставке (app.core.local_store, state.json); при смене модели
+или проекции хранилище отказывается смешивать векторы — нужна переиндексация.
+
+Обучение PCA (выборка — из локального хранилища, .npy или архива сырого текста):
+    python -m app.core.projection --dim 256 --from-store --sample 20000
+    python -m app.core.projection --dim 256 --vectors sample.npy
+    python -m app.core.projection --dim 256 --from-archive --sample 5000
+
+ENV: EMBED_PROJECTION=none|truncate|pca, EMBED_DIM=256,
+     EMBED_PROJECTION_PATH=./data/embed_pca.npz
+"""
+from __future__ import annotations
+import argparse
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MODES = ("none", "truncate", "pca")
+
+
+def mode() -> str:
+    m = os.getenv("EMBED_PROJECTION", "none").strip().lower()
+    if m not in MODES:
+        raise ValueError(f"EMBED_PROJECTION={m!r}: expected one of {', '.join(MODES)}")
+    return m
+
+
+def target_dim() -> int:
+    return int(os.getenv("EMBED_DIM", "256"))
+
+
+def model_path() -> str:
+    return os.getenv("EMBED_PROJECTION_PATH", "./data/embed_pca.npz")
+
+
+def _l2norm(x: np.ndarray) -> np.ndarray:
+    return x / (np.linalg.norm(x, axis=-1, keepdims=True) + 1e-12)
+
+
+# -------------------------
+# Проекция
+# -------------------------
+class Projection:
+    def __init__(self, kind: str = "none", dim: Optional[int] = None,
+                 mean: Optional[np.ndarray] = None, components: Optional[np.ndarray] = None,
+                 meta: Optional[Dict[str, Any]] = None):
+        self.kind = kind
+        self.dim = dim
+        self.mean = None if mean is None else mean.astype(np.float32, copy=False)
+        self.components = None if components is None else components.astype(np.float32, copy=False)
+        self.meta = meta or {}
+        if kind == "pca":
+            if self.components is None or self.mean is None:
+                raise ValueError("pca projection needs mean and components")
+            self.dim = self.components.shape[0]
+
+    @property
+    def fingerprint(self) -> str:
+        """Короткий хэш параметров PCA: две обученные матрицы одной размерности — разные пространства."""
+        if self.kind != "pca":
+            return ""
+        h = hashlib.sha1(self.mean.tobytes())
+        h.update(self.components.tobytes())
+        return h.hexdigest()[:8]
+
+    def id(self, model: str) -> str:
+        if self.kind == "truncate":
+            return f"{model}:trunc{self.dim}"
+        if self.kind == "pca":
+            return f"{model}:pca{self.dim}-{self.fingerprint}"
+        return f"{model}:full"
+
+    def apply(self, x: np.ndarray) -> np.ndarray:
+        """[dim_in] или [n × dim_in] → L2-нормированные float32 [.. × dim]."""
+        x = np.asarray(x, dtype=np.float32)
+        if self.kind == "none":
+            return x
+        if self.kind == "truncate":
+            if self.dim >= x.shape[-1]:
+                return x
+            return _l2norm(x[..., : self.dim])
+        if x.shape[-1] != self.components.shape[1]:
+            raise ValueError(f"pca projection expects dim {self.components.shape[1]}, got {x.shape[-1]}")
+        return _l2norm((x - self.mean) @ self.components.T)
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        np.savez_compressed(path, mean=self.mean, components=self.components,
+                            meta=np.array(json.dumps(self.meta, ensure_ascii=False)))
+
+    @classmethod
+    def load(cls, path: str) -> "Projection":
+        with np.load(path, allow_pickle=False) as z:
+            return cls("pca", mean=z["mean"], components=z["components"], meta=json.loads(str(z["meta"])))
+
+
+def fit_pca(sample: np.ndarray, dim: int, meta: Optional[Dict[str, Any]] = None) -> Projection:
+    """PCA по выборке L2-нормированных векторов: SVD центрированной матрицы, первые dim компонент."""
+    x = np.asarray(sample, dtype=np.float64)
+    if x.ndim != 2 or len(x) < dim:
+        raise ValueError(f"need at least dim={dim} sample vectors, have {len(x)}")
+    mean = x.mean(axis=0)
+    _, s, vt = np.linalg.svd(x - mean, full_matrices=False)
+    var = s ** 2
+    explained = float(var[:dim].sum() / var.sum())
+    info = {"dim_in": int(x.shape[1]), "dim": dim, "samples": int(len(x)),
+            "explained_variance": round(explained, 4), "fitted": time.time(), **(meta or {})}
+    return Projection("pca", mean=mean.astype(np.float32), components=vt[:dim].astype(np.float32), meta=info)
+
+
+# -------------------------
+# Проекция процесса
+# -------------------------
+_PROJ: Optional[Projection] = None
+_LOCK = threading.Lock()
+
+
+def get_projection() -> Projection:
+    """Проекция из ENV (файл PCA загружается один раз); без файла при EMBED_PROJECTION=pca — ошибка:
+    молча отдать полные векторы значило бы смешать пространства в индексе."""
+    global _PROJ
+    if _PROJ is None:
+        with _LOCK:
+            if _PROJ is None:
+                m = mode()
+                if m == "pca":
+                    path = model_path()
+                    if not os.path.exists(path):
+                        raise RuntimeError(f"EMBED_PROJECTION=pca, but {path} not found "
+                                           f"(fit it: python -m app.core.projection --dim N ...)")
+                    proj = Projection.load(path)
+                    model = os.getenv("OLLAMA_EMB_MODEL", "nomic-embed-text")
+                    if proj.meta.get("model") and proj.meta["model"] != model:
+                        logger.warning("PCA %s fitted on %s, embedder model is %s", path, proj.meta["model"], model)
+                    logger.info("embedding projection: pca %d→%d (%s, explained %.3f)", proj.components.shape[1],
+                                proj.dim, path, proj.meta.get("explained_variance", float("nan")))
+                    _PROJ = proj
+                elif m == "truncate":
+                    _PROJ = Projection("truncate", dim=target_dim())
+                else:
+                    _PROJ = Projection()
+    return _PROJ
+
+
+def set_projection(proj: Optional[Projection]) -> None:
+    """Подменить проекцию процесса (бенчмарк); None — перечитать из ENV при следующем обращении."""
+    global _PROJ
+    with _LOCK:
+        _PROJ = proj
+
+
+def projection_id() -> str:
+    """Версия пространства векторов: модель эмбеддингов + проекция."""
+    return get_projection().id(os.getenv("OLLAMA_EMB_MODEL", "nomic-embed-text"))
+
+
+# -------------------------
+# Обучение
+# -------------------------
+def sample_from_store(n: int, seed: int = 0) -> np.ndarray:
+    """Выборка векторов локального хранилища — только если оно наполнено без проекции."""
+    from app.core.local_store import get_store
+    store = get_store()
+    if not store.count:
+        raise SystemExit("local store is empty")
+    if store.embedding and not store.embedding.endswith(":full"):
+        raise SystemExit(f"local store holds projected vectors ({store.embedding}); PCA needs full ones")
+    rng = np.random.default_rng(seed)
+    rows = np.sort(rng.choice(store.count, size=min(n, store.count), replace=False))
+    return np.asarray(store._mat[rows])
+
+
+def sample_from_archive(n: int, seed: int = 0) -> np.ndarray:
+    """Эмбеддинги (без проекции) текстов из архива сырого текста."""
+    import random
+    from app.core import raw_archive
+    from app.core.embeddings import get_embedder
+    shas = [r["sha256"] for recs in raw_archive.iter_records() for r in recs]
+    random.Random(seed).shuffle(shas)
+    texts = [t[:8000] for t in (raw_archive.get_text(s) for s in dict.fromkeys(shas[: n * 2])) if t and t.strip()]
+    if not texts:
+        raise SystemExit("raw archive is empty")
+    return np.asarray(get_embedder().embed_passages(texts[:n], project=False), dtype=np.float32)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--from-store", action="store_true", help="выборка из app.core.local_store")
+    src.add_argument("--from-archive", action="store_true", help="эмбеддинги текстов из app.core.raw_archive")
+    src.add_argument("--vectors", help=".npy [n × dim] векторов модели")
+    ap.add_argument("--dim", type=int, default=target_dim())
+    ap.add_argument("--sample", type=int, default=20000)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", default=model_path())
+    args = ap.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="[%(asctime)s] %(levelname)s %(name)s: %(message)s")
+    if args.from_store:
+        x = sample_from_store(args.sample, args.seed)
+    elif args.from_archive:
+        x = sample_from_archive(args.sample, args.seed)
+    else:
+        x = np.load(args.vectors).astype(np.float32)
+        if len(x) > args.sample:
+            x = x[np.random.default_rng(args.seed).choice(len(x), size=args.sample, replace=False)]
+    x = _l2norm(x)
+
+    t = time.perf_counter()
+    proj = fit_pca(x, args.dim, {"model": os.getenv("OLLAMA_EMB_MODEL", "nomic-embed-text")})
+    proj.save(args.out)
+    res = {**proj.meta, "fit_s": round(time.perf_counter() - t, 2), "fingerprint": proj.fingerprint,
+           "projection_id": proj.id(proj.meta["model"]), "out": args.out}
+    print(json.dumps(res, ensure_ascii=False, indent=2))
+
+
+__all__ = [
+    "MODES", "Projection", "fit_pca", "get_projection", "set_projection", "projection_id",
+    "mode", "target_dim", "model_path",
+]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+# app/core/raw_archive.py
+"""
+Архив сырого текста документов для повторного разбора без PDF.
+
+При загрузке (/upload/reports) извлечённый read_any текст сохраняется сжатым (zlib)
+по ключу sha256 содержимого — одинаковые документы хранятся один раз. Для каждого
+объекта в индексе пишется запись: uuid → sha256, имя файла, тенант, тип документа,
+версия детектора и парсера (app.services.parser_dispatch), хэш извлечённых полей.
+
+app.services.reparse по этим записям находит устаревшие (версия ниже текущей),
+заново разбирает сохранённый текст и обновляет изменившиеся объекты.
+
+База: RAW_ARCHIVE_PATH (по умолчанию ./data/raw_archive.sqlite3).
+Отключение: RAW_ARCHIVE=false.
+"""
+from __future__ import annotations
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+_CONN: Optional[sqlite3.Connection] = None
+_LOCK = threading.RLock()
+_LEVEL = 6
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS raw_texts (
+    sha256      TEXT PRIMARY KEY,
+    text_z      BLOB NOT NULL,
+    size        INTEGER NOT NULL,
+    created     REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS records (
+    uuid              TEXT PRIMARY KEY,
+    sha256            TEXT NOT NULL REFERENCES raw_texts(sha256),
+    filename          TEXT,
+    tenant            TEXT,
+    type_document     TEXT,
+    detector_version  INTEGER NOT NULL,
+    parser_version    INTEGER NOT NULL,
+    fields_hash       TEXT,
+    updated           REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS records_sha ON records(sha256);
+CREATE INDEX IF NOT EXISTS records_type ON records(type_document, parser_version);
+"""
+
+
+def is_enabled() -> bool:
+    return os.getenv("RAW_ARCHIVE", "true").strip().lower() in ("1", "true", "yes", "y")
+
+
+def _db_path() -> str:
+    return os.getenv("RAW_ARCHIVE_PATH", "./data/raw_archive.sqlite3")
+
+
+def get_conn() -> sqlite3.Connection:
+    global _CONN
+    with _LOCK:
+        if _CONN is None:
+            path = _db_path()
+            if path != ":memory:":
+                Path(path).parent.mkdir(parents=True, exist_ok=True)
+            _CONN = sqlite3.connect(path, check_same_thread=False)
+            _CONN.execute("PRAGMA journal_mode=WAL")
+            _CONN.execute("PRAGMA synchronous=NORMAL")
+            _CONN.executescript(_SCHEMA)
+        return _CONN
+
+
+def _reset_after_fork() -> None:
+    """Соединение с базой архива сырого текста (RAW_ARCHIVE_PATH) в дочернем процессе открывается
+    заново; замок записей архива — новый: его мог держать поток родителя во время fork."""
+    global _CONN, _LOCK
+    _CONN = None
+    _LOCK = threading.RLock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def close() -> None:
+    global _CONN
+    with _LOCK:
+        if _CONN is not None:
+            _CONN.close()
+            _CONN = None
+
+
+# -------------------------
+# Хэши
+# -------------------------
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def fields_hash(fields: Dict[str, Any]) -> str:
+    blob = json.dumps(fields, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()
+
+
+# -------------------------
+# Текст
+# -------------------------
+def put_text(text: str) -> str:
+    """Сохраняет текст (если такого ещё нет), возвращает sha256."""
+    sha = text_hash(text)
+    with _LOCK:
+        conn = get_conn()
+        with conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO raw_texts (sha256, text_z, size, created) VALUES (?, ?, ?, ?)",
+                (sha, zlib.compress(text.encode("utf-8"), _LEVEL), len(text), time.time()),
+            )
+    return sha
+
+
+def get_text(sha: str) -> Optional[str]:
+    with _LOCK:
+        row = get_conn().execute("SELECT text_z FROM raw_texts WHERE sha256 = ?", (sha,)).fetchone()
+    return zlib.decompress(row[0]).decode("utf-8") if row else None
+
+
+# -------------------------
+# Записи
+# -------------------------
+def record(uid: str, sha: str, filename: Optional[str], tenant: Optional[str],
+           fields: Dict[str, Any], detector_version: int, parser_version: int,
+           type_document: Optional[str]) -> None:
+    record_many([(uid, sha, filename, tenant, fields, detector_version, parser_version, type_document)])
+
+
+def record_many(rows: Sequence[tuple]) -> None:
+    """
+    rows: (uuid, sha256, filename, tenant, fields, detector_version, parser_version, type_document).
+    type_document — тип по детектору (meta из parse_document_ex), а не поле парсера:
+    по нему reparse сверяет версии с PARSER_VERSIONS.
+    """
+    now = time.time()
+    data = [
+        (uid, sha, fn, tenant, td, dv, pv, fields_hash(fields or {}), now)
+        for uid, sha, fn, tenant, fields, dv, pv, td in rows if uid
+    ]
+    if not data:
+        return
+    with _LOCK:
+        conn = get_conn()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO records (uuid, sha256, filename, tenant, type_document, "
+                "detector_version, parser_version, fields_hash, updated) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                data,
+            )
+
+
+def iter_records(batch: int = 1000) -> Iterator[List[Dict[str, Any]]]:
+    """Все записи пачками (по uuid)."""
+    last = ""
+    cols = ("uuid", "sha256", "filename", "tenant", "type_document",
+            "detector_version", "parser_version", "fields_hash")
+    while True:
+        with _LOCK:
+            rows = get_conn().execute(
+                f"SELECT {', '.join(cols)} FROM records WHERE uuid > ? ORDER BY uuid LIMIT ?", (last, batch)
+            ).fetchall()
+        if not rows:
+            return
+        last = rows[-1][0]
+        yield [dict(zip(cols, r)) for r in rows]
+
+
+def stats() -> Dict[str, Any]:
+    with _LOCK:
+        conn = get_conn()
+        n_texts, raw, packed = conn.execute(
+            "SELECT count(*), coalesce(sum(size), 0), coalesce(sum(length(text_z)), 0) FROM raw_texts"
+        ).fetchone()
+        n_records = conn.execute("SELECT count(*) FROM records").fetchone()[0]
+    return {"texts": n_texts, "records": n_records, "chars": raw, "compressed_bytes": packed}
+
+
+__all__ = [
+    "is_enabled", "get_conn", "close", "text_hash", "fields_hash",
+    "put_text", "get_text", "record", "record_many", "iter_records", "stats",
+]
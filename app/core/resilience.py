@@ -0,0 +1,399 @@
+# app/core/resilience.py
+"""
+Устойчивость вызовов внешних бэкендов (Weaviate, Ollama): повторы с бюджетом,
+автоматический выключатель и «подстраховочные» (hedged) дубли чтений.
+
+Policy(name).call(fn, ...) — один логический вызов:
+
+  выключатель  — после BREAKER_FAILURES подряд неудач бэкенд считается лежащим:
+                 вызовы сразу получают BackendUnavailable (503 в API) вместо ожидания
+                 таймаута клиента; через BREAKER_OPEN_S пропускается один пробный
+                 вызов (half-open): успех закрывает выключатель, неудача открывает
+                 снова с удвоенной паузой (до BREAKER_OPEN_MAX_S);
+  повторы      — только для чтений и только для «серверных» ошибок (соединение,
+                 таймаут, 5xx — не FilterError/ValueError): до RETRY_MAX_ATTEMPTS
+                 попыток, пауза — full jitter: uniform(0, min(RETRY_MAX_MS, RETRY_BASE_MS·2^n));
+  бюджет       — повтор тратит жетон из общего на процесс ведра: каждый вызов кладёт
+                 RETRY_BUDGET_RATIO жетона, плюс RETRY_BUDGET_MIN_PER_S в секунду;
+                 пустое ведро — повтора нет (при массовом сбое повторы не умножают нагрузку);
+  hedging      — (HEDGE=true, только для вызовов с hedge=True) если ответа нет дольше
+                 p95 латентности этого бэкенда (не меньше HEDGE_MIN_MS), тот же запрос
+                 отправляется второй раз, берётся первый успешный ответ; дубли ограничены
+                 своим ведром (HEDGE_BUDGET_RATIO от числа вызовов). Проигравший запрос
+                 не отменяется — дорабатывает в фоне. Попытки идут в пул из HEDGE_POOL_SIZE
+                 потоков без очереди: нет свободного потока для первой попытки — она
+                 выполняется в вызывающем потоке без дубля, для дубля — дубля нет
+                 (hedge_pool_busy); занятый пул не задерживает чтения.
+
+Счётчики по бэкендам — snapshot() / prometheus() (GET /metrics).
+
+ENV: RESILIENCE=true, RETRY_MAX_ATTEMPTS=3, RETRY_BASE_MS=50, RETRY_MAX_MS=1000,
+     RETRY_BUDGET_RATIO=0.1, RETRY_BUDGET_MIN_PER_S=1,
+     BREAKER_FAILURES=5, BREAKER_OPEN_S=10, BREAKER_OPEN_MAX_S=120,
+     HEDGE=false, HEDGE_MIN_MS=20, HEDGE_BUDGET_RATIO=0.05, HEDGE_POOL_SIZE=16
+"""
+from __future__ import annotations
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Optional, Tuple, Type
+
+# ошибки клиента: повтор не поможет, и бэкенд из-за них не «лежит»
+CLIENT_ERRORS: Tuple[Type[BaseException], ...] = (ValueError, TypeError, KeyError)
+
+
+class BackendUnavailable(RuntimeError):
+    """Выключатель открыт: бэкенд недавно падал, вызов отклонён без обращения к нему."""
+
+    def __init__(self, backend: str, retry_after: float):
+        super().__init__(f"{backend} is unavailable (circuit open, retry in {retry_after:.1f}s)")
+        self.backend = backend
+        self.retry_after = retry_after
+
+
+def _flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).strip().lower() in ("1", "true", "yes", "y")
+
+
+def _f(name: str, default: str) -> float:
+    return float(os.getenv(name, default))
+
+
+def enabled() -> bool:
+    return _flag("RESILIENCE", "true")
+
+
+# -------------------------
+# Ведро жетонов (бюджет повторов и дублей)
+# -------------------------
+class TokenBudget:
+    """Каждый вызов кладёт ratio жетона, время — per_s в секунду; расход — 1 на повтор."""
+
+    def __init__(self, ratio: float, per_s: float, cap: float = 10.0):
+        self.ratio = ratio
+        self.per_s = per_s
+        self.cap = max(1.0, cap)
+        self.tokens = self.cap
+        self._t = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.cap, self.tokens + (now - self._t) * self.per_s)
+        self._t = now
+
+    def deposit(self) -> None:
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.cap, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            self._refill()
+            if self.tokens >= 1.0:
+                self.tokens -= 1.0
+                return True
+            return False
+
+
+# -------------------------
+# Выключатель
+# -------------------------
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failures: int, open_s: float, open_max_s: float):
+        self.name = name
+        self.threshold = max(1, failures)
+        self.open_s = open_s
+        self.open_max_s = max(open_s, open_max_s)
+        self.state = CLOSED
+        self._fails = 0
+        self._pause = open_s
+        self._until = 0.0
+        self._probe = False
+        self._lock = threading.Lock()
+        self.transitions: Dict[str, int] = {OPEN: 0, HALF_OPEN: 0, CLOSED: 0}
+
+    def _to(self, state: str) -> None:
+        if state != self.state:
+            self.state = state
+            self.transitions[state] += 1
+
+    def before(self) -> bool:
+        """Пропустить вызов? True — это пробный вызов half-open. Закрыт — BackendUnavailable."""
+        with self._lock:
+            if self.state == CLOSED:
+                return False
+            now = time.monotonic()
+            if self.state == OPEN and now >= self._until:
+                self._to(HALF_OPEN)
+            if self.state == HALF_OPEN and not self._probe:
+                self._probe = True
+                return True
+            raise BackendUnavailable(self.name, max(0.0, self._until - now))
+
+    def success(self) -> None:
+        with self._lock:
+            self._fails = 0
+            self._probe = False
+            self._pause = self.open_s
+            self._to(CLOSED)
+
+    def failure(self, probe: bool = False) -> None:
+        with self._lock:
+            self._fails += 1
+            if probe or self.state == HALF_OPEN:
+                # пробный вызов не прошёл — пауза удваивается
+                self._probe = False
+                self._pause = min(self.open_max_s, self._pause * 2)
+                self._open()
+            elif self._fails >= self.threshold:
+                self._open()
+
+    def _open(self) -> None:
+        self._until = time.monotonic() + self._pause
+        self._to(OPEN)
+
+    def retry_after(self) -> float:
+        with self._lock:
+            return max(0.0, self._until - time.monotonic()) if self.state == OPEN else 0.0
+
+
+# -------------------------
+# Политика бэкенда
+# -------------------------
+_HEDGE_POOL: Optional[ThreadPoolExecutor] = None
+_HEDGE_SLOTS: Optional[threading.BoundedSemaphore] = None
+_HEDGE_LOCK = threading.Lock()
+
+
+def _hedge_pool() -> Tuple[ThreadPoolExecutor, threading.BoundedSemaphore]:
+    global _HEDGE_POOL, _HEDGE_SLOTS
+    with _HEDGE_LOCK:
+        if _HEDGE_POOL is None:
+            size = max(1, int(_f("HEDGE_POOL_SIZE", "16")))
+            _HEDGE_POOL = ThreadPoolExecutor(max_workers=size, thread_name_prefix="hedge")
+            _HEDGE_SLOTS = threading.BoundedSemaphore(size)
+        return _HEDGE_POOL, _HEDGE_SLOTS
+
+
+def _try_submit(fn: Callable[..., Any], *args) -> Optional[Future]:
+    """Задача в пул дублей, только если есть свободный поток (очереди нет); иначе None."""
+    pool, slots = _hedge_pool()
+    if not slots.acquire(blocking=False):
+        return None
+
+    def run():
+        try:
+            return fn(*args)
+        finally:
+            slots.release()
+    return pool.submit(run)
+
+
+class Policy:
+    def __init__(self, name: str, fatal: Tuple[Type[BaseException], ...] = CLIENT_ERRORS,
+                 budget: Optional[TokenBudget] = None,
+                 is_fatal: Optional[Callable[[BaseException], bool]] = None):
+        self.name = name
+        self.fatal = fatal
+        self.is_fatal = is_fatal   # ошибки клиента, не выразимые типом (напр. HTTP 4xx)
+        self.max_attempts = max(1, int(_f("RETRY_MAX_ATTEMPTS", "3")))
+        self.base_ms = _f("RETRY_BASE_MS", "50")
+        self.max_ms = _f("RETRY_MAX_MS", "1000")
+        self.budget = budget or _retry_budget()
+        self.breaker = CircuitBreaker(name, int(_f("BREAKER_FAILURES", "5")), _f("BREAKER_OPEN_S", "10"),
+                                      _f("BREAKER_OPEN_MAX_S", "120"))
+        self.hedge_enabled = _flag("HEDGE", "false")
+        self.hedge_min_ms = _f("HEDGE_MIN_MS", "20")
+        self.hedge_budget = TokenBudget(_f("HEDGE_BUDGET_RATIO", "0.05"), 0.0, cap=5.0)
+        self._lat: deque = deque(maxlen=256)
+        self._p95: Optional[float] = None
+        self._lock = threading.Lock()
+        self.counters: Dict[str, int] = {
+            "calls": 0, "ok": 0, "failures": 0, "client_errors": 0, "retries": 0,
+            "retry_budget_exhausted": 0, "rejected_open": 0, "hedges": 0, "hedge_wins": 0,
+            "hedge_budget_exhausted": 0, "hedge_pool_busy": 0,
+        }
+
+    def _inc(self, key: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[key] += n
+
+    def _observe(self, ms: float) -> None:
+        with self._lock:
+            self._lat.append(ms)
+            if len(self._lat) >= 20 and len(self._lat) % 10 == 0:
+                xs = sorted(self._lat)
+                self._p95 = xs[min(len(xs) - 1, int(len(xs) * 0.95))]
+
+    def hedge_delay_ms(self) -> Optional[float]:
+        """Задержка дубля: p95 латентности (до 20 замеров — дублей нет)."""
+        return None if self._p95 is None else max(self.hedge_min_ms, self._p95)
+
+    def _timed(self, fn: Callable[..., Any], args: tuple, kw: dict) -> Any:
+        t = time.perf_counter()
+        res = fn(*args, **kw)
+        self._observe((time.perf_counter() - t) * 1000)
+        return res
+
+    def _hedged(self, fn: Callable[..., Any], args: tuple, kw: dict) -> Any:
+        delay = self.hedge_delay_ms()
+        if delay is None:
+            return self._timed(fn, args, kw)
+        first = _try_submit(self._timed, fn, args, kw)
+        if first is None:   # пул занят — без дубля, но и без ожидания потока
+            self._inc("hedge_pool_busy")
+            return self._timed(fn, args, kw)
+        done, _ = wait([first], timeout=delay / 1000)
+        if done:
+            return first.result()
+        if not self.hedge_budget.withdraw():
+            self._inc("hedge_budget_exhausted")
+            return first.result()
+        second = _try_submit(self._timed, fn, args, kw)
+        if second is None:
+            self._inc("hedge_pool_busy")
+            return first.result()
+        self._inc("hedges")
+        pending = {first, second}
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for f in done:
+                if f.exception() is None:
+                    if f is second:
+                        self._inc("hedge_wins")
+                    return f.result()
+                error = f.exception()
+        raise error   # обе попытки упали
+
+    def call(self, fn: Callable[..., Any], *args, retry: bool = True, hedge: bool = False, **kw) -> Any:
+        """
+        fn(*args, **kw) под политикой. retry=False — запись (без повторов, только выключатель);
+        hedge=True — разрешить дубль (только идемпотентные чтения).
+        """
+        if not enabled():
+            return fn(*args, **kw)
+        self._inc("calls")
+        try:
+            probe = self.breaker.before()
+        except BackendUnavailable:
+            self._inc("rejected_open")
+            raise
+        self.budget.deposit()
+        self.hedge_budget.deposit()
+        attempt = 0
+        while True:
+            try:
+                if hedge and self.hedge_enabled and not probe:
+                    res = self._hedged(fn, args, kw)
+                else:
+                    res = self._timed(fn, args, kw)
+            except Exception as e:
+                if isinstance(e, self.fatal) or (self.is_fatal is not None and self.is_fatal(e)):
+                    # ошибка запроса, а не бэкенда: пробный вызов тоже считается успешным
+                    self._inc("client_errors")
+                    self.breaker.success()
+                    raise
+                self._inc("failures")
+                self.breaker.failure(probe)
+                attempt += 1
+                if not retry or probe or attempt >= self.max_attempts or self.breaker.state != CLOSED:
+                    raise
+                if not self.budget.withdraw():
+                    self._inc("retry_budget_exhausted")
+                    raise
+                self._inc("retries")
+                cap = min(self.max_ms, self.base_ms * (2 ** (attempt - 1)))
+                time.sleep(random.uniform(0, cap) / 1000)
+                continue
+            self._inc("ok")
+            self.breaker.success()
+            return res
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            c = dict(self.counters)
+        return {**c, "breaker": self.breaker.state, "breaker_opened": self.breaker.transitions[OPEN],
+                "retry_after_s": round(self.breaker.retry_after(), 1),
+                "hedge_delay_ms": None if self.hedge_delay_ms() is None else round(self.hedge_delay_ms(), 1)}
+
+
+# -------------------------
+# Реестр политик
+# -------------------------
+_POLICIES: Dict[str, Policy] = {}
+_BUDGET: Optional[TokenBudget] = None
+_LOCK = threading.Lock()
+
+
+def _retry_budget() -> TokenBudget:
+    # одно ведро на процесс для всех бэкендов
+    global _BUDGET
+    if _BUDGET is None:
+        _BUDGET = TokenBudget(_f("RETRY_BUDGET_RATIO", "0.1"), _f("RETRY_BUDGET_MIN_PER_S", "1"))
+    return _BUDGET
+
+
+def policy(name: str, fatal: Tuple[Type[BaseException], ...] = CLIENT_ERRORS,
+           is_fatal: Optional[Callable[[BaseException], bool]] = None) -> Policy:
+    """
+    Политика бэкенда (создаётся при первом обращении). Неповторяемые ошибки клиента —
+    типы fatal или те, для которых is_fatal(e) истинно.
+    """
+    p = _POLICIES.get(name)
+    if p is None:
+        with _LOCK:
+            p = _POLICIES.get(name)
+            if p is None:
+                p = _POLICIES[name] = Policy(name, fatal, is_fatal=is_fatal)
+    return p
+
+
+def snapshot() -> Dict[str, Any]:
+    out: Dict[str, Any] = {name: p.snapshot() for name, p in sorted(_POLICIES.items())}
+    if _BUDGET is not None:
+        out["retry_budget_tokens"] = round(_BUDGET.tokens, 2)
+    return out
+
+
+def prometheus() -> str:
+    snaps = {name: p.snapshot() for name, p in sorted(_POLICIES.items())}
+    lines = []
+    for key in next(iter(_POLICIES.values())).counters if _POLICIES else ():
+        lines.append(f"# TYPE backend_{key}_total counter")
+        lines += [f'backend_{key}_total{{backend="{n}"}} {s[key]}' for n, s in snaps.items()]
+    if snaps:
+        lines.append("# TYPE backend_breaker_open gauge")
+        lines += [f'backend_breaker_open{{backend="{n}"}} {int(s["breaker"] != CLOSED)}' for n, s in snaps.items()]
+        lines.append("# TYPE backend_breaker_opened_total counter")
+        lines += [f'backend_breaker_opened_total{{backend="{n}"}} {s["breaker_opened"]}' for n, s in snaps.items()]
+    if _BUDGET is not None:
+        lines += ["# TYPE backend_retry_budget_tokens gauge", f"backend_retry_budget_tokens {round(_BUDGET.tokens, 2)}"]
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+def _reset_after_fork() -> None:
+    # замки, состояние выключателей и потоки пула дублей — свои у каждого процесса
+    global _POLICIES, _BUDGET, _LOCK, _HEDGE_POOL, _HEDGE_SLOTS, _HEDGE_LOCK
+    _POLICIES = {}
+    _BUDGET = None
+    _LOCK = threading.Lock()
+    _HEDGE_POOL = None
+    _HEDGE_SLOTS = None
+    _HEDGE_LOCK = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+__all__ = [
+    "BackendUnavailable", "CircuitBreaker", "TokenBudget", "Policy", "CLIENT_ERRORS",
+    "enabled", "policy", "snapshot", "prometheus",
+]
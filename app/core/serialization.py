@@ -0,0 +1,113 @@
+# app/core/serialization.py
+"""
+Быстрая сериализация ответов API.
+
+- fast_json(obj) — уже готовые dict'ы (из bm25_search / fetch) пишутся сразу orjson'ом,
+  минуя повторную сборку Pydantic-моделей и валидацию response_model в FastAPI.
+  Без orjson — стандартный json (тот же результат, медленнее).
+- векторы: format=json (список float) | base64 (float32/float16 little-endian в строке) |
+  binary (application/octet-stream, см. pack_binary).
+
+Бинарный кадр (pack_binary):
+    uint32 LE  длина JSON-заголовка N
+    N байт     JSON (ответ без векторов + "vector": {"dtype", "dim", "count"})
+    count*dim  векторы подряд, в порядке items (строки без вектора — нули)
+"""
+from __future__ import annotations
+import base64
+import json
+import struct
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson есть в requirements, но не обязателен
+    orjson = None
+
+VECTOR_FORMATS = ("json", "base64", "binary")
+VECTOR_DTYPES = {"float32": np.dtype("<f4"), "float16": np.dtype("<f2")}
+OCTET = "application/octet-stream"
+
+
+def dumps(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+def _default(o):
+    if isinstance(o, np.ndarray):
+        return o.tolist()
+    if isinstance(o, np.generic):
+        return o.item()
+    raise TypeError(f"{type(o).__name__} is not JSON serializable")
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def fast_json(content: Any, status_code: int = 200) -> FastJSONResponse:
+    return FastJSONResponse(content, status_code=status_code)
+
+
+# -------------------------
+# Векторы
+# -------------------------
+def plain_vector(vec: Any) -> Optional[List[float]]:
+    """Weaviate v4 отдаёт вектор списком или dict именованных векторов ({"default": [...]})."""
+    if isinstance(vec, dict):
+        vec = vec.get("default", next(iter(vec.values()), None))
+    return vec
+
+
+def encode_b64(vec: Sequence[float], dtype: str = "float32") -> str:
+    return base64.b64encode(np.asarray(vec, dtype=VECTOR_DTYPES[dtype]).tobytes()).decode("ascii")
+
+
+def decode_b64(s: str, dtype: str = "float32") -> np.ndarray:
+    return np.frombuffer(base64.b64decode(s), dtype=VECTOR_DTYPES[dtype])
+
+
+def pack_binary(payload: Dict[str, Any], vectors: List[Optional[Sequence[float]]], dtype: str = "float32") -> bytes:
+    dim = max((len(v) for v in vectors if v is not None), default=0)
+    mat = np.zeros((len(vectors), dim), dtype=VECTOR_DTYPES[dtype])
+    for i, v in enumerate(vectors):
+        if v is not None:
+            mat[i, : len(v)] = v
+    head = dumps({**payload, "vector": {"dtype": dtype, "dim": dim, "count": len(vectors)}})
+    return struct.pack("<I", len(head)) + head + mat.tobytes()
+
+
+def unpack_binary(buf: bytes) -> tuple[Dict[str, Any], np.ndarray]:
+    (n,) = struct.unpack_from("<I", buf)
+    head = json.loads(buf[4: 4 + n])
+    meta = head["vector"]
+    mat = np.frombuffer(buf, dtype=VECTOR_DTYPES[meta["dtype"]], offset=4 + n)
+    return head, mat.reshape(meta["count"], meta["dim"])
+
+
+def encode_items(payload: Dict[str, Any], vector_format: str = "json", dtype: str = "float32") -> Response:
+    """payload["items"][i]["vector"] → выбранный формат; возвращает готовый Response."""
+    items = payload.get("items") or []
+    if vector_format == "binary":
+        vectors = [it.pop("vector", None) for it in items]
+        return Response(pack_binary(payload, vectors, dtype), media_type=OCTET)
+    if vector_format == "base64":
+        for it in items:
+            if it.get("vector") is not None:
+                it["vector"] = encode_b64(it["vector"], dtype)
+        payload["vector_encoding"] = {"format": "base64", "dtype": dtype}
+    return fast_json(payload)
+
+
+__all__ = [
+    "VECTOR_FORMATS", "VECTOR_DTYPES", "FastJSONResponse", "dumps", "fast_json",
+    "plain_vector", "encode_b64", "decode_b64", "pack_binary", "unpack_binary", "encode_items",
+]
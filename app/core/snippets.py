@@ -0,0 +1,96 @@
+# app/core/snippets.py
+"""
+Серверные сниппеты для выдачи поиска: вместо многокилобайтных report_begin/report_end
+возвращается окно ~snippet_chars символов вокруг самого плотного скопления слов запроса,
+совпадения обёрнуты в <b>…</b>. Совпадение — то же слово или тот же стемм
+(app.core.stemming), поэтому «потерпевшему» подсвечивает «потерпевшего».
+
+Текст в сниппете HTML-экранирован (UI вставляет его как разметку).
+"""
+from __future__ import annotations
+import html
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.core.stemming import stem_word
+
+# длинные поля, которые в режиме snippets заменяются окном; короткие отдаются как есть
+SNIPPET_FIELDS = ["post_main", "report_begin", "report_next", "report_end", "post_new"]
+
+_RE_WORD = re.compile(r"\w+", re.U)
+HL_OPEN, HL_CLOSE = "<b>", "</b>"
+ELLIPSIS = "…"
+
+
+def query_terms(query: str) -> Tuple[set, set]:
+    words = {w.lower() for w in _RE_WORD.findall(query or "")}
+    return words, {stem_word(w) for w in words}
+
+
+def _matches(text: str, words: set, stems: set) -> List[Tuple[int, int]]:
+    out = []
+    for m in _RE_WORD.finditer(text):
+        w = m.group(0).lower()
+        if w in words or stem_word(w) in stems:
+            out.append(m.span())
+    return out
+
+
+def _cut(text: str, start: int, end: int) -> Tuple[int, int]:
+    """Расширяет границы окна до границ слов."""
+    while start > 0 and not text[start - 1].isspace():
+        start -= 1
+    while end < len(text) and not text[end].isspace():
+        end += 1
+    return start, end
+
+
+def snippet(text: Optional[str], words: set, stems: set, chars: int = 200) -> Optional[str]:
+    if not text:
+        return text
+    spans = _matches(text, words, stems)
+    if not spans:
+        if len(text) <= chars:
+            return html.escape(text)
+        _, end = _cut(text, 0, chars)
+        return html.escape(text[:end].rstrip()) + ELLIPSIS
+
+    # окно с наибольшим числом совпадений (два указателя по началам совпадений)
+    best, best_i, j = 0, 0, 0
+    for i, (s, _) in enumerate(spans):
+        j = max(j, i)
+        while j + 1 < len(spans) and spans[j + 1][1] - s <= chars:
+            j += 1
+        if j - i + 1 > best:
+            best, best_i = j - i + 1, i
+    first = spans[best_i][0]
+    last = spans[best_i + best - 1][1]
+    pad = max(0, chars - (last - first)) // 2
+    start, end = _cut(text, max(0, first - pad), min(len(text), last + pad))
+
+    parts, pos = [], start
+    for s, e in spans[best_i: best_i + best]:
+        parts.append(html.escape(text[pos:s]))
+        parts.append(HL_OPEN + html.escape(text[s:e]) + HL_CLOSE)
+        pos = e
+    parts.append(html.escape(text[pos:end]))
+    body = "".join(parts).strip()
+    return (ELLIPSIS if start > 0 else "") + body + (ELLIPSIS if end < len(text) else "")
+
+
+def apply_snippets(hits: Iterable[Dict[str, Any]], query: str, chars: int = 200,
+                   fields: Iterable[str] = SNIPPET_FIELDS) -> List[Dict[str, Any]]:
+    """Заменяет длинные поля в hit["properties"] сниппетами (на месте)."""
+    words, stems = query_terms(query)
+    fields = list(fields)
+    out = []
+    for h in hits:
+        props = h.get("properties") or {}
+        for f in fields:
+            if f in props:
+                props[f] = snippet(props[f], words, stems, chars)
+        out.append(h)
+    return out
+
+
+__all__ = ["SNIPPET_FIELDS", "query_terms", "snippet", "apply_snippets"]
@@ -0,0 +1,251 @@
+# app/core/stemming.py
+"""
+Стемминг русского и казахского текста для BM25 без внешних зависимостей.
+
+- русский — алгоритм Snowball (Porter) для русского языка;
+- казахский — итеративное отсечение падежных/лично-притяжательных/множественных
+  аффиксов (слово считается казахским, если в нём есть ә/і/ң/ғ/ү/ұ/қ/ө/һ).
+
+При вставке для полей STEM_FIELDS пишутся теневые свойства "<поле>_stem"
+(стеммы через пробел); bm25_search приводит запрос к тем же стеммам,
+поэтому «потерпевшему» находит «потерпевший», «потерпевшего» и т.д.
+"""
+from __future__ import annotations
+import os
+import re
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional
+
+STEM_SUFFIX = "_stem"
+
+# стеммим содержательные поля; ФИО, город и дату — нет
+STEM_FIELDS = [
+    "type_document",
+    "view_document",
+    "post_main",
+    "report_begin",
+    "report_next",
+    "report_end",
+    "post_new",
+]
+
+_RE_WORD = re.compile(r"[0-9A-Za-zА-Яа-яЁёӘәІіҢңҒғҮүҰұҚқӨөҺһ]+")
+_KZ_LETTERS = set("әіңғүұқөһ")
+
+
+def stem_field(field: str) -> str:
+    return field + STEM_SUFFIX
+
+
+def stemming_enabled() -> bool:
+    return os.getenv("BM25_STEMMING", "true").strip().lower() in ("1", "true", "yes", "y")
+
+
+# ============================================================
+#                   Р У С С К И Й  (Snowball)
+# ============================================================
+_VOWELS = set("аеиоуыэюя")
+
+_PERFECTIVE_GERUND_1 = ("вшись", "вши", "в")
+_PERFECTIVE_GERUND_2 = ("ившись", "ывшись", "ивши", "ывши", "ив", "ыв")
+_ADJECTIVE = ("ими", "ыми", "его", "ого", "ему", "ому", "ее", "ие", "ые", "ое", "ей", "ий", "ый",
+              "ой", "ем", "им", "ым", "ом", "их", "ых", "ую", "юю", "ая", "яя", "ою", "ею")
+_PARTICIPLE_1 = ("ем", "нн", "вш", "ющ", "щ")
+_PARTICIPLE_2 = ("ивш", "ывш", "ующ")
+_REFLEXIVE = ("ся", "сь")
+_VERB_1 = ("ете", "йте", "ешь", "нно", "ла", "на", "ли", "ем", "ло", "но", "ет", "ют", "ны", "ть", "й", "л", "н")
+_VERB_2 = ("ейте", "уйте", "ила", "ыла", "ена", "ите", "или", "ыли", "ило", "ыло", "ено", "ует", "уют",
+           "ены", "ить", "ыть", "ишь", "ей", "уй", "ил", "ыл", "им", "ым", "ен", "ят", "ит", "ыт", "ую", "ю")
+_NOUN = ("иями", "ями", "ами", "ией", "иям", "ием", "иях", "ев", "ов", "ие", "ье", "еи", "ии", "ей", "ой",
+         "ий", "ям", "ем", "ам", "ом", "ах", "ях", "ию", "ью", "ия", "ья", "а", "е", "и", "й", "о", "у",
+         "ы", "ь", "ю", "я")
+_SUPERLATIVE = ("ейше", "ейш")
+_DERIVATIONAL = ("ость", "ост")
+
+
+def _by_len(t):
+    return tuple(sorted(t, key=len, reverse=True))
+
+
+_PERFECTIVE_GERUND_1, _PERFECTIVE_GERUND_2 = _by_len(_PERFECTIVE_GERUND_1), _by_len(_PERFECTIVE_GERUND_2)
+_ADJECTIVE, _PARTICIPLE_1, _PARTICIPLE_2 = _by_len(_ADJECTIVE), _by_len(_PARTICIPLE_1), _by_len(_PARTICIPLE_2)
+_VERB_1, _VERB_2, _NOUN = _by_len(_VERB_1), _by_len(_VERB_2), _by_len(_NOUN)
+
+
+def _regions(w: str) -> tuple[int, int]:
+    """(RV, R2) — индексы начала регионов Snowball."""
+    rv = len(w)
+    for i, ch in enumerate(w):
+        if ch in _VOWELS:
+            rv = i + 1
+            break
+
+    def next_r(start: int) -> int:
+        for i in range(start + 1, len(w)):
+            if w[i] not in _VOWELS and w[i - 1] in _VOWELS:
+                return i + 1
+        return len(w)
+
+    r1 = next_r(0)
+    r2 = next_r(r1)
+    return rv, r2
+
+
+def _strip(w: str, rv: int, group2: tuple, group1: tuple = ()) -> Optional[str]:
+    """Снимает самое длинное окончание в RV; окончания group1 — только после а/я."""
+    best = None
+    for s in group2:
+        if w.endswith(s) and len(w) - len(s) >= rv:
+            best = s
+            break
+    for s in group1:
+        if best is not None and len(s) <= len(best):
+            break
+        pos = len(w) - len(s)
+        if w.endswith(s) and pos - 1 >= rv and w[pos - 1] in "ая":
+            best = s
+            break
+    return w[: len(w) - len(best)] if best is not None else None
+
+
+def stem_ru(word: str) -> str:
+    w = word.lower().replace("ё", "е")
+    rv, r2 = _regions(w)
+    if rv >= len(w):
+        return w
+
+    # Шаг 1
+    r = _strip(w, rv, _PERFECTIVE_GERUND_2, _PERFECTIVE_GERUND_1)
+    if r is not None:
+        w = r
+    else:
+        r = _strip(w, rv, _REFLEXIVE)
+        if r is not None:
+            w = r
+        r = _strip(w, rv, _ADJECTIVE)
+        if r is not None:
+            w = r
+            r = _strip(w, rv, _PARTICIPLE_2, _PARTICIPLE_1)
+            if r is not None:
+                w = r
+        else:
+            r = _strip(w, rv, _VERB_2, _VERB_1)
+            if r is None:
+                r = _strip(w, rv, _NOUN)
+            if r is not None:
+                w = r
+
+    # Шаг 2
+    if w.endswith("и") and len(w) - 1 >= rv:
+        w = w[:-1]
+
+    # Шаг 3
+    for s in _DERIVATIONAL:
+        if w.endswith(s) and len(w) - len(s) >= r2:
+            w = w[: -len(s)]
+            break
+
+    # Шаг 4
+    if w.endswith("нн") and len(w) - 2 >= rv:
+        w = w[:-1]
+    else:
+        r = _strip(w, rv, _SUPERLATIVE)
+        if r is not None:
+            w = r
+            if w.endswith("нн") and len(w) - 2 >= rv:
+                w = w[:-1]
+        elif w.endswith("ь") and len(w) - 1 >= rv:
+            w = w[:-1]
+    return w
+
+
+# ============================================================
+#                         К А З А Х С К И Й
+# ============================================================
+_KZ_SUFFIXES = _by_len((
+    # множественное число
+    "лар", "лер", "дар", "дер", "тар", "тер",
+    # родительный
+    "ның", "нің", "дың", "дің", "тың", "тің",
+    # дательно-направительный
+    "ға", "ге", "қа", "ке", "на", "не",
+    # винительный
+    "ны", "ні", "ды", "ді", "ты", "ті",
+    # местный
+    "нда", "нде", "да", "де", "та", "те",
+    # исходный
+    "нан", "нен", "дан", "ден", "тан", "тен",
+    # творительный
+    "мен", "бен", "пен", "менен", "бенен", "пенен",
+    # притяжательные
+    "ымыз", "іміз", "мыз", "міз", "ыңыз", "іңіз", "ңыз", "ңіз",
+    "ым", "ім", "ың", "ің", "сы", "сі", "ы", "і",
+))
+_KZ_MIN_STEM = 3
+
+
+def stem_kz(word: str) -> str:
+    w = word.lower()
+    for _ in range(4):
+        for s in _KZ_SUFFIXES:
+            if w.endswith(s) and len(w) - len(s) >= _KZ_MIN_STEM:
+                w = w[: -len(s)]
+                break
+        else:
+            break
+    return w
+
+
+# ============================================================
+#                           Т Е К С Т
+# ============================================================
+@lru_cache(maxsize=200_000)
+def stem_word(word: str) -> str:
+    w = word.lower()
+    if w.isdigit() or len(w) < 3:
+        return w
+    if _KZ_LETTERS & set(w):
+        return stem_kz(w)
+    if re.search(r"[а-яё]", w):
+        return stem_ru(w)
+    return w
+
+
+def stem_tokens(text: Optional[str]) -> List[str]:
+    return [stem_word(t) for t in _RE_WORD.findall(text or "")]
+
+
+def stem_text(text: Optional[str]) -> str:
+    return " ".join(stem_tokens(text))
+
+
+def stem_query(query: str) -> str:
+    """Запрос для BM25: исходные слова + их стеммы (без повторов)."""
+    seen: Dict[str, None] = {}
+    for t in _RE_WORD.findall(query or ""):
+        seen.setdefault(t.lower(), None)
+        seen.setdefault(stem_word(t), None)
+    return " ".join(seen)
+
+
+def stem_props(props: Dict[str, Any]) -> Dict[str, str]:
+    """Теневые свойства <поле>_stem для STEM_FIELDS."""
+    out: Dict[str, str] = {}
+    for f in STEM_FIELDS:
+        v = props.get(f)
+        if v:
+            out[stem_field(f)] = stem_text(str(v))
+    return out
+
+
+def expand_query_props(query_props: Iterable[str]) -> List[str]:
+    """query_props + теневые *_stem для тех, у кого они есть."""
+    props = list(query_props)
+    return props + [stem_field(p) for p in props if p in STEM_FIELDS]
+
+
+__all__ = [
+    "STEM_SUFFIX", "STEM_FIELDS", "stem_field", "stemming_enabled",
+    "stem_ru", "stem_kz", "stem_word", "stem_tokens", "stem_text",
+    "stem_query", "stem_props", "expand_query_props",
+]
@@ -0,0 +1,199 @@
+# app/core/tenancy.py
+"""
+Мультиарендность ReportKUI (opt-in).
+
+REPORT_TENANCY=case   — тенант = номер дела (КУИ/ЕРДР), напр. "case_255500121000018"
+REPORT_TENANCY=region — тенант = город/регион (city_fix), напр. "region_pavlodar"
+(пусто/none)          — одна общая коллекция, как раньше.
+
+Здесь только вычисление ключа тенанта и учёт активности (общий для процессов
+хоста файл TENANT_ACTIVITY_PATH); работа с Weaviate — в app.core.weaviate_client.
+"""
+from __future__ import annotations
+import logging
+import os
+import re
+import sqlite3
+import time
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+from app.core import case_number
+
+logger = logging.getLogger(__name__)
+
+MODES = ("case", "region")
+DEFAULT_TENANT = "unassigned"
+
+_RE_TENANT = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+_TRANSLIT = str.maketrans({
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "е": "e", "ё": "e", "ж": "zh",
+    "з": "z", "и": "i", "й": "y", "к": "k", "л": "l", "м": "m", "н": "n", "о": "o",
+    "п": "p", "р": "r", "с": "s", "т": "t", "у": "u", "ф": "f", "х": "h", "ц": "ts",
+    "ч": "ch", "ш": "sh", "щ": "sch", "ъ": "", "ы": "y", "ь": "", "э": "e", "ю": "yu",
+    "я": "ya",
+    # казахские
+    "ә": "a", "і": "i", "ң": "n", "ғ": "g", "ү": "u", "ұ": "u", "қ": "k", "ө": "o", "һ": "h",
+})
+
+
+def tenancy_mode() -> Optional[str]:
+    mode = os.getenv("REPORT_TENANCY", "").strip().lower()
+    return mode if mode in MODES else None
+
+
+def is_enabled() -> bool:
+    return tenancy_mode() is not None
+
+
+def _slug(s: str) -> str:
+    s = s.lower().translate(_TRANSLIT)
+    s = re.sub(r"[^a-z0-9]+", "_", s).strip("_")
+    return s
+
+
+def normalize_tenant(name: str) -> str:
+    """Проверка имени тенанта, пришедшего извне (путь /tenants/{tenant}/...)."""
+    name = (name or "").strip()
+    if not _RE_TENANT.match(name):
+        raise ValueError(f"invalid tenant name {name!r}")
+    return name
+
+
+def tenant_key(props: Dict[str, Any], filename: Optional[str] = None) -> str:
+    """
+    Ключ тенанта для документа по текущему режиму.
+    case   — номер дела case_number, иначе номер из report_next, затем из имени файла
+             (app.core.case_number.from_text — без ключевого слова только формат КУИ/ЕРДР);
+    region — city_fix.
+    Если ключ не извлекается — DEFAULT_TENANT.
+    """
+    mode = tenancy_mode()
+    if mode == "case":
+        num = (case_number.normalize(props.get("case_number"))
+               or case_number.from_text(props.get("report_next")) or case_number.from_text(filename))
+        if num:
+            return f"case_{num}"
+    elif mode == "region":
+        slug = _slug(str(props.get("city_fix") or ""))
+        if slug:
+            return f"region_{slug}"[:64]
+    return DEFAULT_TENANT
+
+
+# -------------------------
+# Учёт активности тенантов (для выгрузки неактивных)
+# -------------------------
+# Активность общая для всех процессов хоста (воркеры app.serve, ingest, watch):
+# SQLite-файл TENANT_ACTIVITY_PATH, tenant → время последнего обращения. Учёт только
+# в памяти процесса давал бы /tenants/deactivate, обслуженному одним воркером,
+# «простой» тенантов, с которыми работают другие, и отсчёт простоя от старта процесса.
+# Запись — не чаще раза в TOUCH_WRITE_S на тенант в процессе.
+TOUCH_WRITE_S = 10.0
+# Кэш «тенант уже HOT» в weaviate_client живёт HOT_CACHE_S; выгрузка тенантов, простаивающих
+# меньше MIN_IDLE_S, могла бы выгрузить тенант, который другой процесс ещё считает активным.
+HOT_CACHE_S = 30.0
+MIN_IDLE_S = 60.0
+
+_LOCK = threading.Lock()
+_CONN: Optional[sqlite3.Connection] = None
+_LAST_USED: Dict[str, float] = {}     # последнее обращение в этом процессе
+_WRITTEN: Dict[str, float] = {}       # когда оно последний раз записано в общий файл
+
+
+def _db_path() -> str:
+    return os.getenv("TENANT_ACTIVITY_PATH", "./data/tenant_activity.sqlite3")
+
+
+def _conn() -> sqlite3.Connection:
+    global _CONN
+    if _CONN is None:
+        path = _db_path()
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        _CONN = sqlite3.connect(path, check_same_thread=False, timeout=5.0)
+        _CONN.execute("PRAGMA journal_mode=WAL")
+        _CONN.execute("PRAGMA synchronous=NORMAL")
+        _CONN.execute("CREATE TABLE IF NOT EXISTS tenant_activity (tenant TEXT PRIMARY KEY, last_used REAL NOT NULL)")
+    return _CONN
+
+
+def _reset_after_fork() -> None:
+    # соединение SQLite родителя в дочернем процессе не используем; отметки «записано» — тоже
+    global _LOCK, _CONN
+    _LOCK = threading.Lock()
+    _CONN = None
+    _WRITTEN.clear()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def touch(tenant: str) -> None:
+    now = time.time()
+    with _LOCK:
+        _LAST_USED[tenant] = now
+        if now - _WRITTEN.get(tenant, 0.0) < TOUCH_WRITE_S:
+            return
+        _WRITTEN[tenant] = now
+        try:
+            conn = _conn()
+            with conn:
+                conn.execute(
+                    "INSERT INTO tenant_activity (tenant, last_used) VALUES (?, ?) "
+                    "ON CONFLICT(tenant) DO UPDATE SET last_used = max(last_used, excluded.last_used)",
+                    (tenant, now),
+                )
+        except sqlite3.Error as e:   # учёт активности не должен ронять запрос
+            logger.warning("tenant activity write failed: %s", e)
+
+
+def idle_seconds_many(tenants: Iterable[str]) -> Dict[str, float]:
+    """
+    Сколько секунд тенанты не использовались ни одним процессом хоста. Тенант без
+    отметки (создан до учёта или другим хостом) получает отметку «сейчас»: простой
+    отсчитывается с первого наблюдения, а не со старта процесса.
+    """
+    names = list(tenants)
+    now = time.time()
+    with _LOCK:
+        conn = _conn()
+        last: Dict[str, float] = {}
+        for i in range(0, len(names), 500):
+            chunk = names[i:i + 500]
+            rows = conn.execute(
+                f"SELECT tenant, last_used FROM tenant_activity WHERE tenant IN ({','.join('?' * len(chunk))})",
+                chunk,
+            ).fetchall()
+            last.update(rows)
+        unseen = [n for n in names if n not in last]
+        if unseen:
+            with conn:
+                conn.executemany("INSERT OR IGNORE INTO tenant_activity (tenant, last_used) VALUES (?, ?)",
+                                 [(n, now) for n in unseen])
+        for n in names:
+            last[n] = max(last.get(n, now), _LAST_USED.get(n, 0.0))
+    return {n: max(0.0, now - last[n]) for n in names}
+
+
+def idle_seconds(tenant: str) -> float:
+    return idle_seconds_many([tenant])[tenant]
+
+
+def forget(tenant: str) -> None:
+    """Тенант выгружен: отметка активности снимается (следующая — при новом обращении)."""
+    with _LOCK:
+        _LAST_USED.pop(tenant, None)
+        _WRITTEN.pop(tenant, None)
+        conn = _conn()
+        with conn:
+            conn.execute("DELETE FROM tenant_activity WHERE tenant = ?", (tenant,))
+
+
+__all__ = [
+    "MODES", "DEFAULT_TENANT", "tenancy_mode", "is_enabled",
+    "normalize_tenant", "tenant_key", "touch", "idle_seconds", "idle_seconds_many", "forget",
+    "HOT_CACHE_S", "MIN_IDLE_S",
+]
@@ -0,0 +1,99 @@
+# app/core/warmup.py
+"""
+Прогрев процесса при старте (lifespan в app.main) — чтобы первый запрос
+после рестарта/масштабирования не платил за подключение, схему и компиляцию регулярок.
+
+Шаги (каждый с замером времени, ошибка шага не мешает старту):
+  backend   — подключение к Weaviate + ensure_schema (или открытие SQLite FTS5)
+  filters   — импорт weaviate Filter через compile_filters
+  parsers   — импорт 12 парсеров и прогон на образце (кэш re)
+  embedder  — один вызов Ollama (WARMUP_EMBEDDER=true)
+
+ENV: WARMUP=true|false, WARMUP_SCHEMA=true, WARMUP_EMBEDDER=false,
+     WARMUP_BLOCKING=true (false — в фоне; до готовности /ready отвечает 503).
+"""
+from __future__ import annotations
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+STATE: Dict[str, Any] = {"ready": False, "started": None, "seconds": None, "steps": {}, "errors": {}}
+
+
+def _flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).strip().lower() in ("1", "true", "yes", "y")
+
+
+def _step(name: str, fn: Callable[[], Any]) -> None:
+    t = time.perf_counter()
+    try:
+        fn()
+    except Exception as e:
+        STATE["errors"][name] = f"{type(e).__name__}: {e}"
+        logger.warning("warm-up %s failed: %s", name, e)
+    STATE["steps"][name] = round((time.perf_counter() - t) * 1000, 1)
+
+
+def _backend(schema: bool) -> None:
+    from app.core.backend import bm25_backend
+    if bm25_backend() == "sqlite":
+        from app.core import fts_store
+        fts_store.get_conn()
+        return
+    if bm25_backend() == "local":
+        from app.core import local_store
+        local_store.get_store()
+        return
+    from app.core import weaviate_client
+    weaviate_client.ensure_connected()
+    if schema:
+        weaviate_client.ensure_schema()
+
+
+def _filters() -> None:
+    from app.core.backend import bm25_backend
+    if bm25_backend() == "weaviate":
+        from app.core.weaviate_client import build_filters
+        build_filters({"city_fix": "warmup", "date_doc": {"gte": "2025-01-01"}})
+
+
+def _parsers() -> None:
+    from app.services.parser_dispatch import warm_up_parsers
+    warm_up_parsers()
+
+
+def _embedder() -> None:
+    from app.core.embeddings import get_embedder
+    get_embedder().embed_query("warmup")
+
+
+def run_warmup() -> Dict[str, Any]:
+    STATE.update(ready=False, started=time.time(), steps={}, errors={})
+    t = time.perf_counter()
+    _step("backend", lambda: _backend(_flag("WARMUP_SCHEMA", "true")))
+    _step("filters", _filters)
+    _step("parsers", _parsers)
+    if _flag("WARMUP_EMBEDDER", "false"):
+        _step("embedder", _embedder)
+    STATE["seconds"] = round(time.perf_counter() - t, 3)
+    STATE["ready"] = True
+    logger.info("warm-up done in %.3fs: %s", STATE["seconds"], STATE["steps"])
+    return STATE
+
+
+def start_warmup() -> None:
+    """Вызывается из lifespan: синхронно или в фоне (WARMUP_BLOCKING=false)."""
+    if not _flag("WARMUP", "true"):
+        STATE["ready"] = True
+        return
+    if _flag("WARMUP_BLOCKING", "true"):
+        run_warmup()
+    else:
+        threading.Thread(target=run_warmup, name="warmup", daemon=True).start()
+
+
+__all__ = ["STATE", "run_warmup", "start_warmup"]
@@ -1,14 +1,19 @@
 # app/core/weaviate_client.py
 from __future__ import annotations
-import os, atexit, logging
-from typing import Optional, Dict, Any, List
+import os, atexit, logging, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List, Callable, Iterator, TYPE_CHECKING
 
-from weaviate import WeaviateClient
-from weaviate.connect import ConnectionParams
-from weaviate.classes.init import AdditionalConfig, Timeout
-from weaviate.classes.config import Configure, Property, DataType, VectorDistances
-from weaviate.classes.query import Filter
-from weaviate.exceptions import WeaviateClosedClientError
+# SDK Weaviate (с gRPC/httpx) импортируется лениво — внутри функций, при первом
+# обращении к серверу: импорт модуля ради REPORT_FIELDS и т.п. остаётся быстрым.
+if TYPE_CHECKING:
+    from weaviate import WeaviateClient
+    from weaviate.classes.config import Property
+
+from app.core.dates import parse_date_doc
+from app.core.filters import compile_filters, DATE_FIELDS
+from app.core import case_number, tenancy, resilience
+from app.core.stemming import STEM_FIELDS, stem_field, stem_props, stem_query, expand_query_props, stemming_enabled
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +31,32 @@ REPORT_FIELDS = [
     "post_new_fn",
 ]
 
+# Ключевые свойства (keyword: только точные фильтры, без BM25): номер дела КУИ/ЕРДР
+# от парсера (app.core.case_number), при отсутствии — из report_next
+KEY_FIELDS = ["case_number"]
+
+# Служебные (производные) свойства: заполняются при вставке, в ответах не отдаются
+DERIVED_FIELDS = [
+    "date_doc_iso",   # date_doc → DATE, для диапазонов в фильтрах
+    "date_doc_month",  # date_doc → "YYYY-MM", для группировки по месяцам (/reports/facets)
+] + [stem_field(f) for f in STEM_FIELDS]   # <поле>_stem — стеммы для BM25 (app.core.stemming)
+
+# Поля, по которым разрешено фильтровать через DSL (app.core.filters)
+FILTER_FIELDS = REPORT_FIELDS + KEY_FIELDS + DERIVED_FIELDS
+
+# Поля со счётчиками значений (/reports/facets); date_doc группируется по месяцам
+FACET_FIELDS = ["type_document", "view_document", "city_fix", "date_doc_month"]
+
+
+def project_fields(fields: Optional[list[str]] = None) -> list[str]:
+    """Проекция ответа (?fields=): подмножество REPORT_FIELDS в порядке схемы; None/[] — все."""
+    if not fields:
+        return REPORT_FIELDS
+    unknown = [f for f in fields if f not in REPORT_FIELDS]
+    if unknown:
+        raise ValueError(f"unknown fields: {', '.join(unknown)}")
+    return [f for f in REPORT_FIELDS if f in fields]
+
 # -------------------------
 # Единственная коллекция
 # -------------------------
@@ -42,6 +73,9 @@ def _str_to_bool(v: str) -> bool:
 def get_client() -> WeaviateClient:
     global _CLIENT
     if _CLIENT is None:
+        from weaviate import WeaviateClient
+        from weaviate.connect import ConnectionParams
+        from weaviate.classes.init import AdditionalConfig, Timeout
         _CLIENT = WeaviateClient(
             connection_params=ConnectionParams.from_params(
                 http_host=os.getenv("WEAVIATE_HTTP_HOST", "localhost"),
@@ -56,7 +90,33 @@ def get_client() -> WeaviateClient:
         )
     return _CLIENT
 
+# gRPC-запрос (WeaviateQueryError) несёт только текст ошибки: сбой соединения/таймаут
+# узнаются по нему, остальное — ошибка самого запроса (фильтр, свойство, тенант)
+_TRANSIENT_MARKERS = ("unavailable", "deadline", "timeout", "timed out", "connect", "socket",
+                      "reset", "eof", "broken pipe", "internal")
+
+def _client_error(e: BaseException) -> bool:
+    """Ошибка запроса, а не Weaviate: HTTP 4xx (кроме 408/429) и неуспешный по вине запроса query."""
+    from weaviate.exceptions import UnexpectedStatusCodeError, WeaviateInvalidInputError, WeaviateQueryError
+    if isinstance(e, WeaviateInvalidInputError):
+        return True
+    if isinstance(e, UnexpectedStatusCodeError):
+        return 400 <= e.status_code < 500 and e.status_code not in (408, 429)
+    if isinstance(e, WeaviateQueryError):
+        msg = str(getattr(e, "message", e)).lower()
+        return not any(m in msg for m in _TRANSIENT_MARKERS)
+    return False
+
+def _policy() -> resilience.Policy:
+    return resilience.policy("weaviate", is_fatal=_client_error)
+
 def ensure_connected() -> WeaviateClient:
+    # через выключатель: пока Weaviate лежит, запросы получают BackendUnavailable сразу,
+    # а не переподключаются каждый со своим таймаутом
+    return _policy().call(_ensure_connected, retry=False)
+
+def _ensure_connected() -> WeaviateClient:
+    from weaviate.exceptions import WeaviateClosedClientError
     c = get_client()
     try:
         if not c.is_connected(): c.connect()
@@ -67,6 +127,9 @@ def ensure_connected() -> WeaviateClient:
         reset_client(); c = get_client(); c.connect(); return c
 
 def connect() -> None:
+    _policy().call(_connect, retry=False)
+
+def _connect() -> None:
     c = get_client()
     if not c.is_connected():
         c.connect()
@@ -87,10 +150,13 @@ def reset_client() -> None:
     _CLIENT = None
 
 def drop_collection(name: str) -> None:
+    from weaviate.exceptions import WeaviateClosedClientError
     c = ensure_connected()
     try:
         if c.collections.exists(name):
             c.collections.delete(name)
+            if name == REPORT:
+                _HOT_TENANTS.clear()
     except WeaviateClosedClientError:
         reset_client(); c = ensure_connected()
     ensure_connected()
@@ -105,75 +171,445 @@ def close_client() -> None:
 
 atexit.register(close_client)
 
+def _reset_after_fork() -> None:
+    """В дочернем процессе (pre-fork сервер) клиент родителя не используем: gRPC-канал не fork-safe."""
+    global _CLIENT, _FANOUT_POOL, _FANOUT_LOCK
+    _CLIENT = None
+    _HOT_TENANTS.clear()
+    _FANOUT_POOL = None   # потоки пула не переживают fork
+    _FANOUT_LOCK = threading.Lock()
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
 # -------------------------
-# Схема (ровно 11 полей)
+# Схема (11 полей + производные)
 # -------------------------
+def _report_properties() -> list[Property]:
+    from weaviate.classes.config import Property, DataType, Tokenization
+    return [
+        Property(name="type_document",  data_type=DataType.TEXT),
+        Property(name="view_document",  data_type=DataType.TEXT),
+        Property(name="post_main",      data_type=DataType.TEXT),
+        Property(name="post_main_fn",   data_type=DataType.TEXT),
+        Property(name="city_fix",       data_type=DataType.TEXT),
+        Property(name="date_doc",       data_type=DataType.TEXT),
+        Property(name="report_begin",   data_type=DataType.TEXT),
+        Property(name="report_next",    data_type=DataType.TEXT),
+        Property(name="report_end",     data_type=DataType.TEXT),
+        Property(name="post_new",       data_type=DataType.TEXT),
+        Property(name="post_new_fn",    data_type=DataType.TEXT),
+        # ключи
+        Property(name="case_number",    data_type=DataType.TEXT, tokenization=Tokenization.FIELD,
+                 index_filterable=True, index_searchable=False),
+        # производные
+        Property(name="date_doc_iso",   data_type=DataType.DATE),
+        Property(name="date_doc_month", data_type=DataType.TEXT, tokenization=Tokenization.FIELD),
+    ] + [Property(name=stem_field(f), data_type=DataType.TEXT) for f in STEM_FIELDS]
+
+def _ensure_properties(col) -> None:
+    """Досоздаёт свойства, появившиеся после создания коллекции."""
+    try:
+        existing = {p.name for p in col.config.get().properties}
+    except Exception as e:
+        logger.warning("cannot read %s schema: %s", REPORT, e)
+        return
+    added = []
+    for prop in _report_properties():
+        if prop.name not in existing:
+            logger.info("add property %s.%s", REPORT, prop.name)
+            col.config.add_property(prop)
+            added.append(prop.name)
+    if added and existing:
+        # у уже загруженных объектов новые свойства пусты, пока их не досчитать
+        logger.warning("%s: existing objects lack %s; run python -m app.services.backfill",
+                       REPORT, ", ".join(added))
+
+def _env_int(name: str) -> Optional[int]:
+    v = os.getenv(name, "").strip()
+    return int(v) if v else None
+
+def vector_index_config(
+    quantizer: Optional[str] = None,
+    ef: Optional[int] = None,
+    ef_construction: Optional[int] = None,
+    max_connections: Optional[int] = None,
+):
+    """
+    HNSW (cosine) с параметрами из аргументов или ENV:
+      HNSW_EF, HNSW_EF_CONSTRUCTION, HNSW_MAX_CONNECTIONS,
+      VECTOR_QUANTIZER=none|pq|bq|sq (+ PQ_SEGMENTS, PQ_CENTROIDS,
+      QUANTIZER_TRAINING_LIMIT, QUANTIZER_RESCORE_LIMIT).
+    Не заданные параметры остаются дефолтами Weaviate.
+    """
+    from weaviate.classes.config import Configure, VectorDistances
+    q = (quantizer if quantizer is not None else os.getenv("VECTOR_QUANTIZER", "none")).strip().lower()
+    Q = Configure.VectorIndex.Quantizer
+    if q in ("", "none"):
+        qc = None
+    elif q == "pq":
+        qc = Q.pq(
+            segments=_env_int("PQ_SEGMENTS"),
+            centroids=_env_int("PQ_CENTROIDS"),
+            training_limit=_env_int("QUANTIZER_TRAINING_LIMIT"),
+        )
+    elif q == "bq":
+        qc = Q.bq(rescore_limit=_env_int("QUANTIZER_RESCORE_LIMIT"))
+    elif q == "sq":
+        if not hasattr(Q, "sq"):
+            raise RuntimeError("SQ quantization requires weaviate-client >= 4.9 (and Weaviate >= 1.26)")
+        qc = Q.sq(
+            training_limit=_env_int("QUANTIZER_TRAINING_LIMIT"),
+            rescore_limit=_env_int("QUANTIZER_RESCORE_LIMIT"),
+        )
+    else:
+        raise ValueError(f"unknown VECTOR_QUANTIZER {q!r} (none|pq|bq|sq)")
+
+    return Configure.VectorIndex.hnsw(
+        distance_metric=VectorDistances.COSINE,
+        ef=ef if ef is not None else _env_int("HNSW_EF"),
+        ef_construction=ef_construction if ef_construction is not None else _env_int("HNSW_EF_CONSTRUCTION"),
+        max_connections=max_connections if max_connections is not None else _env_int("HNSW_MAX_CONNECTIONS"),
+        quantizer=qc,
+    )
+
 def ensure_schema() -> None:
+    from weaviate.classes.config import Configure
     client = ensure_connected()
     if client.collections.exists(REPORT):
+        col = client.collections.get(REPORT)
+        _ensure_properties(col)
+        if tenancy.is_enabled() and not _is_multi_tenant(col):
+            logger.warning("REPORT_TENANCY=%s, but %s was created without multi-tenancy; "
+                           "drop and re-create the collection to enable it",
+                           tenancy.tenancy_mode(), REPORT)
         return
     client.collections.create(
         name=REPORT,
-        properties=[
-            Property(name="type_document",  data_type=DataType.TEXT),
-            Property(name="view_document",  data_type=DataType.TEXT),
-            Property(name="post_main",      data_type=DataType.TEXT),
-            Property(name="post_main_fn",   data_type=DataType.TEXT),
-            Property(name="city_fix",       data_type=DataType.TEXT),
-            Property(name="date_doc",       data_type=DataType.TEXT),
-            Property(name="report_begin",   data_type=DataType.TEXT),
-            Property(name="report_next",    data_type=DataType.TEXT),
-            Property(name="report_end",     data_type=DataType.TEXT),
-            Property(name="post_new",       data_type=DataType.TEXT),
-            Property(name="post_new_fn",    data_type=DataType.TEXT),
-        ],
+        properties=_report_properties(),
         vectorizer_config=Configure.Vectorizer.none(),
-        vector_index_config=Configure.VectorIndex.hnsw(distance_metric=VectorDistances.COSINE),
+        vector_index_config=vector_index_config(),
+        multi_tenancy_config=Configure.multi_tenancy(enabled=True) if tenancy.is_enabled() else None,
     )
 
 # -------------------------
-# CRUD + BM25
+# Тенанты (REPORT_TENANCY=case|region, см. app.core.tenancy)
 # -------------------------
-def insert_reports(objs: list[Dict[str, Any]]) -> list[str | None]:
+# тенант → когда этот процесс последний раз убедился, что он HOT (time.monotonic()).
+# Запись живёт tenancy.HOT_CACHE_S: тенант мог выгрузить другой процесс (/tenants/deactivate)
+_HOT_TENANTS: Dict[str, float] = {}
+
+def _is_multi_tenant(col) -> bool:
+    try:
+        return bool(col.config.get().multi_tenancy_config.enabled)
+    except Exception:
+        return False
+
+def _ensure_tenants(col, names: set[str]) -> None:
+    """Создаёт отсутствующих тенантов и поднимает неактивных (COLD/FROZEN) в HOT."""
+    from weaviate.classes.tenants import Tenant, TenantActivityStatus
+    now = time.monotonic()
+    todo = {n for n in names if n not in _HOT_TENANTS or now - _HOT_TENANTS[n] >= tenancy.HOT_CACHE_S}
+    if not todo:
+        return
+    existing = col.tenants.get_by_names(list(todo))
+    missing = [Tenant(name=n) for n in todo if n not in existing]
+    if missing:
+        logger.info("create tenants: %s", [t.name for t in missing])
+        col.tenants.create(missing)
+    wake = [Tenant(name=n, activity_status=TenantActivityStatus.HOT)
+            for n in todo if n in existing and existing[n].activity_status != TenantActivityStatus.HOT]
+    if wake:
+        logger.info("activate tenants: %s", [t.name for t in wake])
+        col.tenants.update(wake)
+    _HOT_TENANTS.update(dict.fromkeys(todo, now))
+
+def get_report_collection(tenant: Optional[str] = None):
+    """
+    Коллекция REPORT для записи; при включённой мультиарендности — привязанная к тенанту
+    (тенант создаётся/активируется при первом обращении). Для чтения — read_report_collection.
+    """
+    col = get_client().collections.get(REPORT)
+    if not tenancy.is_enabled():
+        return col
+    name = tenancy.normalize_tenant(tenant or tenancy.DEFAULT_TENANT)
+    _ensure_tenants(col, {name})
+    tenancy.touch(name)
+    return col.with_tenant(name)
+
+def read_report_collection(tenant: Optional[str] = None):
+    """
+    Коллекция REPORT для чтения: существующий тенант поднимается в HOT, но не создаётся —
+    произвольный ?tenant= в GET не должен заводить пустые тенанты. None — такого тенанта нет.
+    """
+    col = get_client().collections.get(REPORT)
+    if not tenancy.is_enabled():
+        return col
+    name = tenancy.normalize_tenant(tenant or tenancy.DEFAULT_TENANT)
+    if name not in _HOT_TENANTS or time.monotonic() - _HOT_TENANTS[name] >= tenancy.HOT_CACHE_S:
+        if col.tenants.get_by_name(name) is None:
+            return None
+        _ensure_tenants(col, {name})
+    tenancy.touch(name)
+    return col.with_tenant(name)
+
+def list_tenants() -> list[Dict[str, Any]]:
+    connect()
+    if not tenancy.is_enabled():
+        return []
+    col = get_client().collections.get(REPORT)
+    existing = col.tenants.get()
+    idle = tenancy.idle_seconds_many(existing)
+    return [{"name": name, "status": t.activity_status.value, "idle_seconds": round(idle[name], 1)}
+            for name, t in sorted(existing.items())]
+
+def deactivate_idle_tenants(idle_seconds: float, offload: bool = False) -> list[str]:
+    """
+    Переводит тенантов, не использовавшихся idle_seconds, в COLD
+    (или FROZEN — выгрузка в облачное хранилище, offload=True).
+    Память Weaviate тогда растёт с числом активных дел, а не с архивом.
+    Простой — по общему для процессов хоста учёту (tenancy.idle_seconds_many),
+    не меньше tenancy.MIN_IDLE_S.
+    """
+    from weaviate.classes.tenants import Tenant, TenantActivityStatus
     connect()
+    if not tenancy.is_enabled():
+        return []
+    idle_seconds = max(idle_seconds, tenancy.MIN_IDLE_S)
     col = get_client().collections.get(REPORT)
-    ids: list[str | None] = []
-    for props in objs:
+    target = TenantActivityStatus.FROZEN if offload else TenantActivityStatus.COLD
+    hot = [name for name, t in col.tenants.get().items() if t.activity_status == TenantActivityStatus.HOT]
+    idle = [name for name, s in tenancy.idle_seconds_many(hot).items() if s >= idle_seconds]
+    if idle:
+        logger.info("deactivate tenants (%s): %s", target.value, idle)
+        col.tenants.update([Tenant(name=n, activity_status=target) for n in idle])
+        for n in idle:
+            _HOT_TENANTS.pop(n, None)
+            tenancy.forget(n)
+    return idle
+
+# -------------------------
+# Запросы по всем тенантам
+# -------------------------
+_FANOUT_POOL: Optional[ThreadPoolExecutor] = None
+_FANOUT_LOCK = threading.Lock()
+
+def fanout_concurrency() -> int:
+    return max(1, int(os.getenv("TENANT_FANOUT_CONCURRENCY", "8")))
+
+def _fanout_pool() -> ThreadPoolExecutor:
+    global _FANOUT_POOL
+    with _FANOUT_LOCK:
+        if _FANOUT_POOL is None:
+            _FANOUT_POOL = ThreadPoolExecutor(max_workers=fanout_concurrency(), thread_name_prefix="tenant-fanout")
+        return _FANOUT_POOL
+
+def _fanout_tenants(base) -> list[str]:
+    """
+    Тенанты для запроса «по всем»: HOT. Данные COLD/FROZEN тенантов не загружены
+    в Weaviate и без активации не читаются — они пропускаются, если не задано
+    TENANT_FANOUT_COLD=true (тогда поднимаются в HOT перед запросом: дорого, и
+    выгруженные дела снова занимают память до следующего /tenants/deactivate).
+    """
+    from weaviate.classes.tenants import TenantActivityStatus
+    existing = base.tenants.get()
+    hot = [n for n, t in existing.items() if t.activity_status == TenantActivityStatus.HOT]
+    inactive = [n for n, t in existing.items() if t.activity_status != TenantActivityStatus.HOT]
+    if inactive:
+        if os.getenv("TENANT_FANOUT_COLD", "false").strip().lower() in ("1", "true", "yes", "y"):
+            _ensure_tenants(base, set(inactive))
+            return hot + inactive
+        logger.debug("fan-out: %d inactive tenants skipped", len(inactive))
+    return hot
+
+def _fan_out(fn: Callable[[Any], Any], tenant: Optional[str] = None) -> list:
+    """
+    fn(коллекция) → [результат, ...]. Без мультиарендности или с tenant — один вызов
+    (несуществующий tenant — пустой список: чтение тенантов не создаёт); иначе fn выполняется по всем тенантам (_fanout_tenants) параллельно, не более
+    TENANT_FANOUT_CONCURRENCY одновременно. Без touch: общий запрос не должен
+    удерживать тенанты «горячими». Слияние результатов — на вызывающем.
+    """
+    if not tenancy.is_enabled() or tenant is not None:
+        col = read_report_collection(tenant)
+        return [] if col is None else [fn(col)]
+    base = get_client().collections.get(REPORT)
+    names = _fanout_tenants(base)
+    if len(names) <= 1:
+        return [fn(base.with_tenant(n)) for n in names]
+    return list(_fanout_pool().map(lambda n: fn(base.with_tenant(n)), names))
+
+# -------------------------
+# CRUD + BM25
+# -------------------------
+def with_derived_fields(props: Dict[str, Any]) -> Dict[str, Any]:
+    """Копия props с нормализованным case_number и заполненными производными полями (DERIVED_FIELDS)."""
+    out = dict(props)
+    for field, shadow in DATE_FIELDS.items():
+        dt = parse_date_doc(out.get(field))
+        if dt is not None:
+            out[shadow] = dt
+        else:
+            out.pop(shadow, None)
+    num = case_number.normalize(out.get("case_number")) or case_number.from_text(out.get("report_next"))
+    if num:
+        out["case_number"] = num
+    else:
+        out.pop("case_number", None)
+    if out.get("date_doc_iso") is not None:
+        out["date_doc_month"] = out["date_doc_iso"].strftime("%Y-%m")
+    else:
+        out.pop("date_doc_month", None)
+    out.update(stem_props(out))
+    return out
+
+def insert_reports(objs: list[Dict[str, Any]],
+                   tenants: list[Optional[str]] | None = None,
+                   ids: list[Optional[str]] | None = None) -> list[str | None]:
+    """
+    Вставка документов. При мультиарендности тенант берётся из tenants[i]
+    или вычисляется tenancy.tenant_key(props); тенанты создаются автоматически.
+    ids[i] — заданный UUID (детерминированный, напр. от пути файла): объект с таким
+    UUID перезаписывается (upsert), поэтому повторная загрузка того же файла не плодит дубли.
+    Отвергнутый объект (ошибка запроса: 4xx, неверные данные) → None на его месте;
+    недоступность Weaviate (соединение, таймаут, 5xx) поднимается исключением — пакет
+    целиком остаётся за вызывающим (повторять его безопасно: upsert по ids).
+    """
+    connect()
+    out: list[str | None] = []
+    for i, props in enumerate(objs):
         try:
-            uid = col.data.insert(properties=props)
-            ids.append(str(uid))
+            tenant = None
+            if tenancy.is_enabled():
+                tenant = (tenants[i] if tenants else None) or tenancy.tenant_key(props)
+            col = get_report_collection(tenant)
+            uid = ids[i] if ids else None
+            if uid and col.data.exists(uid):
+                col.data.replace(uuid=uid, properties=with_derived_fields(props))
+            else:
+                uid = col.data.insert(properties=with_derived_fields(props), uuid=uid)
+            out.append(str(uid))
         except Exception as e:
-            logger.error("insert report failed: %s", e)
-            ids.append(None)
-    return ids
-
-def build_filters(eqs: Dict[str, Any] | None = None):
-    if not eqs: return None
-    w = None
-    for k, v in eqs.items():
-        if v is None: continue
-        f = Filter.by_property(k).equal(v)
-        w = f if w is None else (w & f)
-    return w
+            if not (isinstance(e, ValueError) or _client_error(e)):
+                raise
+            logger.error("insert report rejected: %s", e)
+            out.append(None)
+    return out
 
-def bm25_search(query: str, query_props: list[str], limit: int = 10,
-                filters: Dict[str, Any] | None = None):
+def update_reports(updates: list[tuple[str, Dict[str, Any], Optional[str]]], batch: int = 100) -> int:
+    """
+    Пакетная перезапись свойств существующих объектов: (uuid, props, tenant).
+    insert_many с теми же UUID заменяет объекты целиком, поэтому векторы
+    сначала читаются одним fetch_objects на пачку и передаются обратно.
+    Возвращает число обновлённых объектов.
+    """
+    from weaviate.classes.data import DataObject
+    from weaviate.classes.query import Filter
     connect()
-    col = get_client().collections.get(REPORT)
+    by_tenant: Dict[Optional[str], list] = {}
+    for uid, props, tenant in updates:
+        by_tenant.setdefault(tenant if tenancy.is_enabled() else None, []).append((uid, props))
+
+    done = 0
+    for tenant, items in by_tenant.items():
+        col = get_report_collection(tenant)
+        for i in range(0, len(items), batch):
+            chunk = items[i:i + batch]
+            ids = [uid for uid, _ in chunk]
+            res = col.query.fetch_objects(
+                filters=Filter.by_id().contains_any(ids), include_vector=True, limit=len(ids),
+            )
+            vectors = {}
+            for o in res.objects:
+                vec = o.vector.get("default") if isinstance(o.vector, dict) else o.vector
+                vectors[str(o.uuid)] = vec or None
+            objs = [
+                DataObject(uuid=uid, properties=with_derived_fields(props), vector=vectors.get(uid))
+                for uid, props in chunk if uid in vectors  # удалённые из индекса не воскрешаем
+            ]
+            if not objs:
+                continue
+            out = col.data.insert_many(objs)
+            for idx, err in (out.errors or {}).items():
+                logger.error("update report %s failed: %s", objs[idx].uuid, err.message)
+            done += len(objs) - len(out.errors or {})
+    return done
+
+def iter_reports(batch: int = 200) -> Iterator[list[tuple[str, Dict[str, Any], Optional[str]]]]:
+    """
+    Все объекты REPORT пачками [(uuid, props, tenant), ...] — курсором (col.iterator),
+    по всем тенантам; неактивные тенанты поднимаются в HOT (обход для миграций,
+    напр. app.services.backfill; простаивающих потом выгрузит /tenants/deactivate).
+    """
+    connect()
+    base = get_client().collections.get(REPORT)
+    if tenancy.is_enabled():
+        names = sorted(base.tenants.get())
+        cols = []
+        for n in names:
+            _ensure_tenants(base, {n})
+            cols.append((base.with_tenant(n), n))
+    else:
+        cols = [(base, None)]
+    for col, tenant in cols:
+        buf: list = []
+        for o in col.iterator(include_vector=False):
+            buf.append((str(o.uuid), dict(o.properties), tenant))
+            if len(buf) >= batch:
+                yield buf
+                buf = []
+        if buf:
+            yield buf
+
+def build_filters(spec: Dict[str, Any] | None = None):
+    """
+    DSL фильтров (см. app.core.filters) → weaviate Filter.
+    Старая форма {"поле": значение} по-прежнему означает AND из equal.
+    Бросает FilterError на некорректной спецификации.
+    """
+    return compile_filters(spec, fields=FILTER_FIELDS)
+
+def bm25_search(query: str, query_props: list[str], limit: int = 10,
+                filters: Dict[str, Any] | None = None, tenant: Optional[str] = None,
+                fields: Optional[list[str]] = None):
+    """
+    BM25 по REPORT. При мультиарендности без tenant запрос расходится
+    параллельно по активным (HOT) тенантам (_fan_out), результаты сливаются по score.
+    score считается внутри тенанта (IDF и средняя длина — по его документам), поэтому
+    порядок после слияния тенантов приблизительный: тот же текст в маленьком тенанте
+    получает иной score, чем в большом. Точное ранжирование — запрос в один тенант.
+    fields — какие свойства вернуть (return_properties), по умолчанию все REPORT_FIELDS.
+    Чтение идёт через app.core.resilience: повторы, выключатель, дубль после p95 (HEDGE).
+    """
+    fields = project_fields(fields)
     w = build_filters(filters)
+    return _policy().call(_bm25_search, query, query_props, limit, w, tenant, fields, hedge=True)
+
+def _bm25_search(query: str, query_props: list[str], limit: int, w, tenant: Optional[str], fields: list[str]):
+    _connect()
+    if stemming_enabled():
+        # исходные слова ищем в исходных полях, стеммы — в теневых *_stem
+        query, query_props = stem_query(query), expand_query_props(query_props)
+    parts = _fan_out(lambda col: _bm25_one(col, query, query_props, limit, w, fields), tenant)
+    if len(parts) == 1:
+        return parts[0]
+    hits = [h for part in parts for h in part]
+    hits.sort(key=lambda h: h["score"], reverse=True)
+    return hits[:limit]
+
+def _bm25_one(col, query: str, query_props: list[str], limit: int, w, fields: list[str] = REPORT_FIELDS):
     res = col.query.bm25(
         query=query,
         query_properties=query_props,
         limit=limit,
         filters=w,
+        return_properties=fields,
         return_metadata=["score"],
         include_vector=False,
     )
     hits = []
     for o in res.objects:
         props = o.properties or {}
-        # упорядочиваем по REPORT_FIELDS
-        ordered = {field: props.get(field) for field in REPORT_FIELDS}
+        # упорядочиваем по REPORT_FIELDS (только запрошенные)
+        ordered = {field: props.get(field) for field in fields}
         hits.append({
             "id": str(o.uuid),
             "score": float(o.metadata.score or 0.0),
@@ -181,11 +617,103 @@ def bm25_search(query: str, query_props: list[str], limit: int = 10,
         })
     return hits
 
+# -------------------------
+# Документы дела (/cases/{number}/documents)
+# -------------------------
+def fetch_case(number: str, limit: int = 1000, fields: Optional[list[str]] = None,
+               tenant: Optional[str] = None) -> list[Dict[str, Any]]:
+    """
+    Документы дела по нормализованному номеру (case_number) одним фильтрованным запросом,
+    по возрастанию date_doc_iso. При REPORT_TENANCY=case — тенант дела case_<номер>
+    целиком (в нём только это дело, включая документы, вставленные до появления
+    case_number); иначе — фильтр по тенанту tenant или по всем активным (HOT) тенантам (_fan_out).
+    """
+    fields = project_fields(fields)
+    return _policy().call(_fetch_case, number, limit, fields, tenant)
+
+def _fetch_case(number: str, limit: int, fields: list[str], tenant: Optional[str]) -> list[Dict[str, Any]]:
+    from weaviate.classes.query import Filter, Sort
+    _connect()
+    w = Filter.by_property("case_number").equal(number)
+    if tenancy.is_enabled() and tenant is None and tenancy.tenancy_mode() == "case":
+        name = f"case_{number}"
+        if get_client().collections.get(REPORT).tenants.get_by_name(name) is None:
+            return []   # не создаём пустой тенант ради чтения
+        tenant, w = name, None
+
+    def one(col) -> list:
+        res = col.query.fetch_objects(
+            filters=w, limit=limit, sort=Sort.by_property("date_doc_iso", ascending=True),
+            return_properties=fields + ["date_doc_iso"],
+        )
+        out = []
+        for o in res.objects:
+            props = o.properties or {}
+            out.append((props.get("date_doc_iso"), {"uuid": str(o.uuid), "score": None,
+                                                    "properties": {k: props.get(k) for k in fields}}))
+        return out
+
+    rows = [r for part in _fan_out(one, tenant) for r in part]
+    # слияние тенантов; документы без распознанной даты — в конце
+    rows.sort(key=lambda r: (r[0] is None, r[0] or ""))
+    return [item for _, item in rows[:limit]]
+
+# -------------------------
+# Агрегаты (/reports/facets)
+# -------------------------
+_FACET_GROUPS_CAP = 10000   # значений на поле за один aggregate; top-N режется после сортировки
+
+def facet_counts(facets: list[str], filters: Dict[str, Any] | None = None,
+                 tenant: Optional[str] = None, limit: int = 20) -> Dict[str, Any]:
+    """
+    Счётчики значений полей FACET_FIELDS (aggregate group_by) с фильтрами DSL.
+    {"total": n, "facets": {поле: {"values": [{"value", "count"}], "missing": n}}} —
+    missing = документы без значения поля. Без тенанта при мультиарендности счётчики
+    суммируются по активным (HOT) тенантам, как в bm25_search (_fan_out).
+    """
+    unknown = [f for f in facets if f not in FACET_FIELDS]
+    if unknown:
+        raise ValueError(f"unknown facets: {', '.join(unknown)}")
+    w = build_filters(filters)
+    return _policy().call(_facet_counts, facets, w, tenant, limit)
+
+def _facet_counts(facets: list[str], w, tenant: Optional[str], limit: int) -> Dict[str, Any]:
+    from weaviate.classes.aggregate import GroupByAggregate
+    _connect()
+
+    def one(col) -> tuple[int, Dict[str, list]]:
+        n = int(col.aggregate.over_all(filters=w, total_count=True).total_count or 0)
+        groups = {f: col.aggregate.over_all(filters=w, total_count=True,
+                                            group_by=GroupByAggregate(prop=f, limit=_FACET_GROUPS_CAP)).groups
+                  for f in facets}
+        return n, groups
+
+    total = 0
+    counts: Dict[str, Dict[Any, int]] = {f: {} for f in facets}
+    for n, groups in _fan_out(one, tenant):
+        total += n
+        for f in facets:
+            acc = counts[f]
+            for g in groups[f]:
+                v = g.grouped_by.value
+                acc[v] = acc.get(v, 0) + int(g.total_count or 0)
+    return {"total": total, "facets": {f: facet_values(counts[f], total, limit) for f in facets}}
+
+def facet_values(counts: Dict[Any, int], total: int, limit: int) -> Dict[str, Any]:
+    """Значения по убыванию счётчика (при равенстве — по значению), первые limit."""
+    values = sorted(((v, c) for v, c in counts.items() if v not in (None, "")), key=lambda vc: (-vc[1], str(vc[0])))
+    return {"values": [{"value": v, "count": c} for v, c in values[:limit]],
+            "other": sum(c for _, c in values[limit:]),
+            "missing": max(0, total - sum(counts.values()))}
+
 # -------------------------
 # Exports
 # -------------------------
 __all__ = [
     "connect","is_connected","close_client","get_client",
-    "ensure_schema","insert_reports","bm25_search",
-    "REPORT","ensure_connected","reset_client","drop_collection"
+    "ensure_schema","insert_reports","update_reports","bm25_search","facet_counts","fetch_case",
+    "REPORT","ensure_connected","reset_client","drop_collection",
+    "REPORT_FIELDS","KEY_FIELDS","FILTER_FIELDS","FACET_FIELDS","project_fields","facet_values","build_filters","with_derived_fields","iter_reports",
+    "get_report_collection","read_report_collection","list_tenants","deactivate_idle_tenants",
+    "vector_index_config",
 ]
@@ -1,30 +1,82 @@
 # app/main.py
 from __future__ import annotations
+from contextlib import asynccontextmanager
 from typing import List, Optional
 from fastapi import FastAPI, UploadFile, File, HTTPException, Query
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from dotenv import load_dotenv
 from pathlib import Path
+import asyncio
+import os
 import tempfile
-from app.services.parser_dispatch import parse_document
+import json
+import time
+from app.services.parser_dispatch import parse_document_ex, parser_version, DETECTOR_VERSION, STUB_PARSER_VERSION
 
-from app.services.type_files._1_6_intro._1_rep_kui import read_any
 from app.core.weaviate_client import (
     connect, is_connected, ensure_schema,
-    insert_reports, bm25_search, drop_collection, reset_client,
-    ensure_connected, get_client, REPORT, REPORT_FIELDS, build_filters
+    drop_collection, reset_client,
+    ensure_connected, REPORT, FACET_FIELDS, project_fields, build_filters,
+    read_report_collection, list_tenants, deactivate_idle_tenants,
 )
+from app.core.backend import (
+    insert_reports, bm25_search, bm25_search_batch, bm25_backend, fetch_reports, facet_counts, fetch_case,
+)
+from app.core.filters import FilterError
+from app.core.resilience import BackendUnavailable
+from app.core import case_number, tenancy, raw_archive, warmup
+from app.core.serialization import fast_json, encode_items, plain_vector
 
 from app.schemas.schemas import (
     IndexReportsRequest, IndexReportsResponse,
-    BM25Request, HitsResponse, Hit,
+    BM25Request, HitsResponse,
+    BM25BatchRequest, BM25BatchResponse,
     UploadReportResponse, UploadReportsResponse
 )
 
 load_dotenv()
-app = FastAPI(title="Coder XX1 (DocX)", version="1.1.2")
+
+
+_INFLIGHT = {"uploads": 0}
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    # прогрев: подключение, схема, парсеры (app.core.warmup)
+    warmup.start_warmup()
+    yield
+    # остановка (SIGTERM от app.serve/uvicorn): новые соединения уже не принимаются,
+    # uvicorn дожидается открытых запросов; здесь — страховка для незавершённых загрузок
+    warmup.STATE["ready"] = False
+    deadline = time.monotonic() + float(os.getenv("SERVE_GRACEFUL_TIMEOUT", "30"))
+    while _INFLIGHT["uploads"] and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+
+
+app = FastAPI(title="Coder XX1 (DocX)", version="1.1.2", lifespan=lifespan)
+
+
+@app.exception_handler(BackendUnavailable)
+async def backend_unavailable(_request, exc: BackendUnavailable):
+    # выключатель открыт (app.core.resilience): отказ сразу, без ожидания таймаута клиента
+    return JSONResponse({"detail": str(exc), "backend": exc.backend}, status_code=503,
+                        headers={"Retry-After": str(max(1, int(exc.retry_after + 0.999)))})
 
 # -------- Health & Schema --------
+@app.get("/ready")
+def ready():
+    # готовность для балансировщика/автомасштабирования: 503 до окончания прогрева
+    return JSONResponse({**warmup.STATE, "pid": os.getpid(), "inflight": _INFLIGHT},
+                        status_code=200 if warmup.STATE["ready"] else 503)
+
+@app.get("/metrics")
+def metrics():
+    # текстовый формат Prometheus; лимитер эмбеддингов — свой у каждого воркера (app.core.limiter)
+    from app.core.limiter import get_embed_limiter
+    from app.core import facets, resilience
+    return PlainTextResponse(get_embed_limiter().prometheus() + resilience.prometheus() + facets.prometheus(),
+                             media_type="text/plain; version=0.0.4")
+
 @app.get("/health")
 def health():
     try:
@@ -52,19 +104,51 @@ def reports_index(req: IndexReportsRequest):
 
 @app.post("/search/bm25", response_model=HitsResponse)
 def search_bm25_route(req: BM25Request):
-    hits = bm25_search(
-        query=req.query,
-        query_props=req.query_props,
-        limit=req.limit,
-        filters=req.filters or None
-    )
-    return HitsResponse(hits=[Hit(**h) for h in hits])
+    # при REPORT_TENANCY запрос без тенанта идёт по всем активным тенантам
+    try:
+        hits = bm25_search(
+            query=req.query,
+            query_props=req.query_props,
+            limit=req.limit,
+            filters=req.filters or None,
+            fields=req.fields,
+            snippet_chars=req.snippet_chars,
+        )
+    except FilterError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid filters: {e}")
+    except ValueError as e:  # неизвестное поле в fields
+        raise HTTPException(status_code=400, detail=str(e))
+    # hits уже в форме Hit — без повторной сборки моделей и валидации response_model
+    return fast_json({"hits": hits})
+
+@app.post("/search/bm25/batch", response_model=BM25BatchResponse)
+def search_bm25_batch_route(req: BM25BatchRequest):
+    # запросы идут параллельно (SEARCH_BATCH_CONCURRENCY), дубли выполняются один раз
+    t0 = time.perf_counter()
+    results = bm25_search_batch([q.model_dump() for q in req.queries], concurrency=req.concurrency)
+    return fast_json({
+        "results": results,
+        "unique": sum(1 for r in results if r["duplicate_of"] is None),
+        "took_ms": round((time.perf_counter() - t0) * 1000, 3),
+    })
 
 # -------- Загрузка файла -> Парсинг -> Индексация (без второй схемы) --------
 @app.post("/upload/reports", response_model=UploadReportsResponse)
 async def upload_reports(files: List[UploadFile] = File(...)):
+    _INFLIGHT["uploads"] += 1
+    try:
+        return await _upload_reports(files)
+    finally:
+        _INFLIGHT["uploads"] -= 1
+
+
+async def _upload_reports(files: List[UploadFile]):
     all_fields = []
     temp_paths = []
+    tenants: List[Optional[str]] = []
+    shas: List[Optional[str]] = []
+    doc_types: List[str] = []   # тип по детектору — ключ версии парсера
+    partial: List[str] = []
 
     # === 1. сохранить все файлы временно ===
     for file in files:
@@ -76,14 +160,29 @@ async def upload_reports(files: List[UploadFile] = File(...)):
             temp_paths.append(tmp_path)
 
         # === 2. читать и парсить ===
+        from app.services.type_files._1_6_intro._1_rep_kui import read_any
         full, _ = read_any(tmp_path)
-        fields = parse_document(full, filename=file.filename)
+        fields, status, meta = parse_document_ex(full, filename=file.filename)
         all_fields.append(fields)
+        doc_types.append(meta["type_document"])
+        if status != "ok":   # не уложились в бюджет CPU — поля неполные, текст в карантине
+            partial.append(file.filename)
+        # сырой текст в архив — для reparse без повторного извлечения из PDF
+        shas.append(raw_archive.put_text(full) if raw_archive.is_enabled() else None)
+        # тенант (номер дела/регион) — номер дела может быть только в имени файла
+        tenants.append(tenancy.tenant_key(fields, file.filename) if tenancy.is_enabled() else None)
 
     # === 3. индексация всех документов в ReportKUI ===
-    ids = insert_reports(all_fields)
+    ids = insert_reports(all_fields, tenants=tenants)
     if not ids:
         raise HTTPException(status_code=500, detail="Failed to insert reports")
+    if raw_archive.is_enabled():
+        # частично разобранные пишутся с версией заглушки — reparse их подберёт (можно с бОльшим --budget-ms)
+        raw_archive.record_many([
+            (uid, sha, f.filename, t, flds, DETECTOR_VERSION,
+             STUB_PARSER_VERSION if f.filename in partial else parser_version(td), td)
+            for uid, sha, f, t, flds, td in zip(ids, shas, files, tenants, all_fields, doc_types)
+        ])
 
     # === 4. очистка временных файлов ===
     for p in temp_paths:
@@ -97,7 +196,8 @@ async def upload_reports(files: List[UploadFile] = File(...)):
         total=len(ids),
         success=sum(1 for i in ids if i),
         report_ids=[i for i in ids if i],
-        failed=[f.filename for i, f in zip(ids, files) if not i]
+        failed=[f.filename for i, f in zip(ids, files) if not i],
+        partial=partial,
     )
 
 @app.get("/reports/chunks")
@@ -105,6 +205,8 @@ def list_report_chunks(
     limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
     include_vector: bool = Query(False),
+    vector_format: str = Query("json", pattern="^(json|base64|binary)$"),
+    vector_dtype: str = Query("float32", pattern="^(float32|float16)$"),
 
     # фильтры по 11 полям схемы
     type_document: Optional[str] = None,
@@ -118,36 +220,114 @@ def list_report_chunks(
     report_end: Optional[str] = None,
     post_new: Optional[str] = None,
     post_new_fn: Optional[str] = None,
+
+    # DSL фильтров (JSON), объединяется с полями выше через AND
+    filters: Optional[str] = Query(None, description='JSON, напр. {"city_fix": ["Павлодар","Экибастуз"], "date_doc": {"gte": "2025-01-01"}}'),
+    tenant: Optional[str] = Query(None, description="тенант (обязателен при REPORT_TENANCY)"),
+    fields: Optional[str] = Query(None, description="проекция через запятую, напр. type_document,city_fix,date_doc"),
 ):
     """
     Возвращает объекты коллекции REPORT (чанки) с пагинацией.
     - include_vector=true — попытаться вернуть векторы (Weaviate v4: include_vector)
+    - vector_format=base64|binary, vector_dtype=float32|float16 — компактная передача векторов
+      (binary — application/octet-stream, формат кадра в app.core.serialization)
+    - filters — JSON-спецификация DSL фильтров (in / not / like / диапазоны date_doc / or)
+    - fields — вернуть только эти свойства (передаётся в return_properties)
     """
+    eqs = {
+        "type_document": type_document,
+        "view_document": view_document,
+        "post_main": post_main,
+        "post_main_fn": post_main_fn,
+        "city_fix": city_fix,
+        "date_doc": date_doc,
+        "report_begin": report_begin,
+        "report_next": report_next,
+        "report_end": report_end,
+        "post_new": post_new,
+        "post_new_fn": post_new_fn,
+    }
+    spec = _merge_filters_param({k: v for k, v in eqs.items() if v is not None}, filters)
+    return _fetch_chunks(limit, offset, include_vector, spec, tenant, vector_format, vector_dtype, fields)
+
+
+@app.get("/reports/facets")
+def report_facets(
+    facets: str = Query(",".join(FACET_FIELDS), description=f"поля через запятую: {', '.join(FACET_FIELDS)} "
+                                                             f"(date_doc — синоним date_doc_month)"),
+    limit: int = Query(20, ge=1, le=1000, description="значений на поле (остальные — в other)"),
+    filters: Optional[str] = Query(None, description="JSON DSL фильтров, как в /reports/chunks"),
+    tenant: Optional[str] = Query(None, description="тенант; без него при REPORT_TENANCY — сумма по активным"),
+):
+    """
+    Счётчики значений полей с фильтрами — вместо постраничной выгрузки /reports/chunks
+    и подсчёта на клиенте. Ответ кэшируется на FACETS_CACHE_TTL_S (app.core.facets),
+    вставка документов сбрасывает кэш.
+    """
+    names = list(dict.fromkeys("date_doc_month" if f.strip() == "date_doc" else f.strip()
+                               for f in facets.split(",") if f.strip()))
+    spec = _merge_filters_param({}, filters)
+    t0 = time.perf_counter()
+    try:
+        tenant = tenancy.normalize_tenant(tenant) if tenant else None
+        res, cached = facet_counts(names, filters=spec or None, tenant=tenant, limit=limit)
+    except ValueError as e:  # FilterError, неизвестный фасет или тенант
+        raise HTTPException(status_code=400, detail=str(e))
+    return fast_json({**res, "filters_applied": spec, "cached": cached,
+                      "took_ms": round((time.perf_counter() - t0) * 1000, 3)})
+
+
+def _merge_filters_param(spec: dict, filters: Optional[str]) -> dict:
+    """Объединяет поле-фильтры из query с JSON-DSL из ?filters= (через AND)."""
+    if not filters:
+        return spec
+    try:
+        dsl = json.loads(filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid filters JSON: {e}")
+    if not isinstance(dsl, dict):
+        raise HTTPException(status_code=400, detail="Invalid filters: expected JSON object")
+    return {"and": [spec, dsl]} if spec else dsl
+
+
+def _fetch_chunks(limit: int, offset: int, include_vector: bool,
+                  spec: dict, tenant: Optional[str] = None,
+                  vector_format: str = "json", vector_dtype: str = "float32",
+                  fields: Optional[str] = None):
+    if tenancy.is_enabled() and not tenant:
+        raise HTTPException(status_code=400, detail="tenant is required when REPORT_TENANCY is enabled")
+    try:
+        props = project_fields([f.strip() for f in fields.split(",") if f.strip()] if fields else None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if bm25_backend() != "weaviate":
+        # локальный бэкенд (FTS5 / NumPy-хранилище, офлайн/бенчмарки): векторов и тенантов нет
+        try:
+            items = fetch_reports(limit=limit, offset=offset, filters=spec or None, fields=props)
+        except FilterError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid filters: {e}")
+        return fast_json({"count": len(items), "limit": limit, "offset": offset,
+                          "filters_applied": spec, "items": items})
     try:
         ensure_connected()
-        col = get_client().collections.get(REPORT)
-
-        eqs = {
-            "type_document": type_document,
-            "view_document": view_document,
-            "post_main": post_main,
-            "post_main_fn": post_main_fn,
-            "city_fix": city_fix,
-            "date_doc": date_doc,
-            "report_begin": report_begin,
-            "report_next": report_next,
-            "report_end": report_end,
-            "post_new": post_new,
-            "post_new_fn": post_new_fn,
-        }
-        where = build_filters(eqs)
+        try:
+            col = read_report_collection(tenant)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if col is None:
+            raise HTTPException(status_code=404, detail=f"unknown tenant {tenant!r}")
+
+        try:
+            where = build_filters(spec)
+        except FilterError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid filters: {e}")
 
         try:
             res = col.query.fetch_objects(
                 limit=limit,
                 offset=offset,
                 filters=where,
-                return_properties=REPORT_FIELDS,
+                return_properties=props,
                 include_vector=include_vector,  # <-- правильно для v4
             )
         except TypeError:
@@ -156,7 +336,7 @@ def list_report_chunks(
                 limit=limit,
                 offset=offset,
                 filters=where,
-                return_properties=REPORT_FIELDS,
+                return_properties=props,
             )
 
         items = []
@@ -164,23 +344,100 @@ def list_report_chunks(
             item = {
                 "uuid": str(obj.uuid),
                 "score": None,  # fetch_objects без score
-                "properties": {k: (obj.properties or {}).get(k) for k in REPORT_FIELDS},
+                "properties": {k: (obj.properties or {}).get(k) for k in props},
             }
             # если SDK вернул вектор — добавим (может быть None, т.к. vectorizer=none)
-            vec = getattr(obj, "vector", None)
+            vec = plain_vector(getattr(obj, "vector", None))
             if include_vector and vec is not None:
                 item["vector"] = vec
             items.append(item)
 
-        return {
+        out = {
             "count": len(items),
             "limit": limit,
             "offset": offset,
-            "filters_applied": {k: v for k, v in eqs.items() if v is not None},
+            "filters_applied": spec,
             "items": items,
         }
+        if tenant:
+            out["tenant"] = tenant
+        return encode_items(out, vector_format if include_vector else "json", vector_dtype)
 
-    except HTTPException:
+    except (HTTPException, BackendUnavailable):
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# -------- Дела (номер КУИ/ЕРДР, app.core.case_number) --------
+@app.get("/cases/{number}/documents")
+def case_documents(
+    number: str,
+    limit: int = Query(1000, ge=1, le=10000),
+    fields: Optional[str] = Query(None, description="проекция через запятую, напр. type_document,date_doc"),
+    tenant: Optional[str] = Query(None, description="тенант; при REPORT_TENANCY=case не нужен — тенант и есть дело"),
+):
+    """
+    Все документы дела по номеру одним фильтрованным запросом (keyword-свойство case_number),
+    по возрастанию date_doc; документы без распознанной даты — в конце.
+    Номер нормализуется: «2555-0012-1000018» и «№ 255500121000018» — одно дело.
+    """
+    num = case_number.normalize(number)
+    if num is None:
+        raise HTTPException(status_code=400, detail=f"invalid case number {number!r}")
+    try:
+        props = project_fields([f.strip() for f in fields.split(",") if f.strip()] if fields else None)
+        items = fetch_case(num, limit=limit, fields=props,
+                           tenant=tenancy.normalize_tenant(tenant) if tenant else None)
+    except ValueError as e:  # неизвестное поле или тенант
+        raise HTTPException(status_code=400, detail=str(e))
+    return fast_json({"case_number": num, "count": len(items), "items": items})
+
+
+# -------- Тенанты (REPORT_TENANCY=case|region) --------
+@app.get("/tenants")
+def tenants_list():
+    return {"mode": tenancy.tenancy_mode(), "tenants": list_tenants()}
+
+@app.post("/tenants/deactivate")
+def tenants_deactivate(
+    idle_seconds: float = Query(3600, ge=tenancy.MIN_IDLE_S),
+    offload: bool = Query(False, description="FROZEN (выгрузка) вместо COLD"),
+):
+    if not tenancy.is_enabled():
+        raise HTTPException(status_code=400, detail="REPORT_TENANCY is not enabled")
+    return {"deactivated": deactivate_idle_tenants(idle_seconds, offload=offload)}
+
+@app.post("/tenants/{tenant}/search/bm25", response_model=HitsResponse)
+def tenant_search_bm25_route(tenant: str, req: BM25Request):
+    if not tenancy.is_enabled():
+        raise HTTPException(status_code=400, detail="REPORT_TENANCY is not enabled")
+    try:
+        hits = bm25_search(
+            query=req.query,
+            query_props=req.query_props,
+            limit=req.limit,
+            filters=req.filters or None,
+            tenant=tenancy.normalize_tenant(tenant),
+            fields=req.fields,
+            snippet_chars=req.snippet_chars,
+        )
+    except ValueError as e:  # FilterError тоже ValueError
+        raise HTTPException(status_code=400, detail=str(e))
+    return fast_json({"hits": hits})
+
+@app.get("/tenants/{tenant}/reports/chunks")
+def tenant_list_report_chunks(
+    tenant: str,
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    include_vector: bool = Query(False),
+    vector_format: str = Query("json", pattern="^(json|base64|binary)$"),
+    vector_dtype: str = Query("float32", pattern="^(float32|float16)$"),
+    filters: Optional[str] = Query(None, description="JSON DSL фильтров"),
+    fields: Optional[str] = Query(None, description="проекция через запятую"),
+):
+    if not tenancy.is_enabled():
+        raise HTTPException(status_code=400, detail="REPORT_TENANCY is not enabled")
+    return _fetch_chunks(limit, offset, include_vector, _merge_filters_param({}, filters), tenant,
+                         vector_format, vector_dtype, fields)
@@ -1,7 +1,9 @@
 # app/schemas/schemas.py
 from __future__ import annotations
 from typing import List, Optional
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
+
+from app.core.filters import parse_filters
 
 # ----- вставка/индексация -----
 class ReportItem(BaseModel):
@@ -21,6 +23,8 @@ class ReportItem(BaseModel):
     post_new: Optional[str] = None
     post_new_fn: Optional[str] = None
 
+    case_number: Optional[str] = Field(None, description="номер дела КУИ/ЕРДР; без него — из report_next")
+
     document_title: Optional[str] = None
     position_title: Optional[str] = None
     doc_kind: Optional[str] = None
@@ -35,7 +39,7 @@ class IndexReportsResponse(BaseModel):
 
 
 # ----- BM25 поиск -----
-class BM25Request(BaseModel):
+class BM25Query(BaseModel):
     query: str
     limit: int = 10
     # по умолчанию ищем по всем текстовым полям из схемы
@@ -48,9 +52,30 @@ class BM25Request(BaseModel):
             "document_title", "position_title", "doc_kind"
         ]
     )
-    # необязательные точные фильтры (например, по типу, городу, виду дока)
+    # необязательные фильтры (DSL из app.core.filters: equal, in, not, like, диапазоны date_doc, or)
     filters: dict = Field(default_factory=dict)
 
+    # проекция: какие свойства вернуть (None — все REPORT_FIELDS)
+    fields: Optional[List[str]] = None
+    # >0 — длинные поля (report_begin, report_end, ...) заменяются окном вокруг слов запроса
+    snippet_chars: int = Field(0, ge=0, le=2000)
+
+
+class BM25Request(BM25Query):
+    @field_validator("filters")
+    @classmethod
+    def _check_filters(cls, v: dict) -> dict:
+        parse_filters(v)  # структура/операторы; имена полей проверит build_filters
+        return v
+
+
+class BM25BatchRequest(BaseModel):
+    # фильтры элементов схемой не проверяются: ошибка одного запроса приходит в его error (bm25_search_batch),
+    # а не 422 на весь батч
+    queries: List[BM25Query] = Field(..., min_length=1, max_length=200)
+    # одновременно выполняемых запросов этого батча (None = SEARCH_BATCH_CONCURRENCY)
+    concurrency: Optional[int] = Field(None, ge=1, le=64)
+
 
 class Hit(BaseModel):
     id: str
@@ -61,6 +86,19 @@ class Hit(BaseModel):
 class HitsResponse(BaseModel):
     hits: List[Hit]
 
+
+class BM25BatchResult(BaseModel):
+    hits: List[Hit]
+    took_ms: float
+    error: Optional[str] = None
+    duplicate_of: Optional[int] = None  # индекс первого такого же запроса в батче
+
+
+class BM25BatchResponse(BaseModel):
+    results: List[BM25BatchResult]
+    unique: int
+    took_ms: float
+
 class UploadReportResponse(BaseModel):
     report_id: str
     chunk_ids: List[str]
@@ -80,4 +118,6 @@ class UploadReportsResponse(BaseModel):
     total: int
     success: int
     report_ids: List[str]
-    failed: List[str]
\ No newline at end of file
+    failed: List[str]
+    partial: List[str] = []   # разобраны частично: не уложились в PARSE_BUDGET_MS (app.services.regex_guard)
+
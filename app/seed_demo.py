@@ -1,10 +1,15 @@
 import os
+import sys
 import time
 import json
 import math
 import random
 import string
+import argparse
+import threading
 import requests
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 
 # --- Конфиги (ENV с дефолтами) ---
@@ -13,6 +18,16 @@ OLLAMA_MODEL = os.getenv("OLLAMA_EMB_MODEL", "nomic-embed-text")
 WEAVIATE_URL = os.getenv("WEAVIATE_URL", "http://localhost:8080")
 WEAVIATE_SCHEMA = f"{WEAVIATE_URL}/v1/schema"
 WEAVIATE_OBJS   = f"{WEAVIATE_URL}/v1/objects"
+WEAVIATE_BATCH  = f"{WEAVIATE_URL}/v1/batch/objects"
+# пакетный эндпоинт Ollama (/api/embed, input: [...]) рядом с /api/embeddings
+OLLAMA_BATCH_URL = os.getenv("OLLAMA_BATCH_URL", OLLAMA_URL.rsplit("/api/", 1)[0] + "/api/embed")
+
+# --- Производительность засева (ENV с дефолтами; переопределяются аргументами CLI) ---
+SEED_SCALE          = float(os.getenv("SEED_SCALE", "1"))       # множитель к COUNTS
+SEED_BATCH_SIZE     = int(os.getenv("SEED_BATCH_SIZE", "200"))  # объектов в /v1/batch/objects
+SEED_WORKERS        = int(os.getenv("SEED_WORKERS", "4"))       # параллельных батчей (эмбеддинг + запись)
+SEED_CACHE_EMBEDS   = os.getenv("SEED_CACHE_EMBEDS", "true").lower() in ("1", "true", "yes")
+SEED_CACHE_SIZE     = int(os.getenv("SEED_CACHE_SIZE", "10000"))  # LRU-кэш эмбеддингов, текстов
 
 # --- Имена коллекций ---
 CASE         = "Case"
@@ -25,6 +40,8 @@ COMM         = "CommunicationRecord"
 RULING       = "CourtRuling"
 
 ALL_CLASSES = [CASE, VICTIM, EXPERT, PROSECUTOR, DOC_CHUNK, FIN_TX, COMM, RULING]
+# тексты этих классов уникальны (номер дела, случайные кошелёк/IBAN) — кэшировать их бессмысленно
+UNIQUE_TEXT_CLASSES = {CASE, FIN_TX}
 
 # --- Распределение по классам (ровно 200) ---
 COUNTS = {
@@ -77,10 +94,146 @@ def create_class(name: str, props: list[dict]):
     print(f"✅ created {name}")
 
 def put_object(class_name: str, props: dict, embed_text_key: str):
-    vec = embed(props[embed_text_key])
-    body = {"class": class_name, "properties": props, "vector": vec}
-    r = http("POST", WEAVIATE_OBJS, json=body)
-    return r.json().get("id")
+    """Ставит объект в очередь пакетной загрузки (см. BatchLoader)."""
+    loader().add(class_name, props, props[embed_text_key])
+
+
+# ---------------------------
+# ПАКЕТНАЯ ЗАГРУЗКА
+# ---------------------------
+_BATCH_EMBED_SUPPORTED = True
+
+def embed_many(texts: list[str]) -> list[list[float]]:
+    """Эмбеддинги пачкой через /api/embed; если сервер его не знает — по одному."""
+    global _BATCH_EMBED_SUPPORTED
+    if _BATCH_EMBED_SUPPORTED:
+        r = requests.post(OLLAMA_BATCH_URL, json={"model": OLLAMA_MODEL, "input": texts}, timeout=120)
+        if r.status_code == 404:
+            _BATCH_EMBED_SUPPORTED = False
+            print("⚠️  /api/embed недоступен — эмбеддинги по одному")
+        else:
+            if not r.ok:
+                raise RuntimeError(f"POST {OLLAMA_BATCH_URL} -> {r.status_code}: {r.text[:300]}")
+            return r.json()["embeddings"]
+    return [embed(t) for t in texts]
+
+
+class BatchLoader:
+    """
+    Копит объекты в пачки по batch_size и отдаёт их пулу из workers потоков:
+    эмбеддинг пачкой (с кэшем повторяющихся шаблонных текстов) → /v1/batch/objects.
+    Кэш — LRU на cache_size текстов и только для шаблонных классов: уникальные тексты
+    (UNIQUE_TEXT_CLASSES) эмбеддятся мимо кэша и не вытесняют из него повторяющиеся.
+    Число пачек «в полёте» ограничено (backpressure), поэтому генерация
+    миллионов объектов не держит их все в памяти.
+    """
+    def __init__(self, batch_size: int, workers: int, cache_embeddings: bool, cache_size: int = 10000):
+        self.batch_size = batch_size
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.slots = threading.BoundedSemaphore(workers * 2)
+        self.cache: OrderedDict[str, list[float]] | None = (
+            OrderedDict() if cache_embeddings and cache_size > 0 else None)
+        self.cache_size = cache_size
+        self.lock = threading.Lock()
+        self.pending: list[tuple[str, dict, str]] = []
+        self.futures = []
+
+        self.started = time.perf_counter()
+        self.queued = 0
+        self.written = 0
+        self.failed = 0
+        self.embedded = 0
+        self.cache_hits = 0
+        self._last_report = 0.0
+
+    def add(self, class_name: str, props: dict, text: str):
+        self.pending.append((class_name, props, text))
+        self.queued += 1
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        batch, self.pending = self.pending, []
+        self.slots.acquire()
+        fut = self.pool.submit(self._run, batch)
+        fut.add_done_callback(lambda _f: self.slots.release())
+        self.futures.append(fut)
+        self.futures = [f for f in self.futures if not f.done()]
+
+    def _vectors(self, batch: list[tuple[str, dict, str]]) -> list[list[float]]:
+        texts = [t for _, _, t in batch]
+        if self.cache is None:
+            vecs = embed_many(texts)
+            with self.lock:
+                self.embedded += len(texts)
+            return vecs
+        cacheable = [c not in UNIQUE_TEXT_CLASSES for c, _, _ in batch]
+        out: list[list[float] | None] = [None] * len(texts)
+        with self.lock:
+            for i, t in enumerate(texts):
+                if cacheable[i] and t in self.cache:
+                    self.cache.move_to_end(t)
+                    out[i] = self.cache[t]
+            self.cache_hits += sum(v is not None for v in out)
+        missing = list(dict.fromkeys(t for t, v in zip(texts, out) if v is None))
+        if missing:
+            fresh = dict(zip(missing, embed_many(missing)))
+            with self.lock:
+                self.embedded += len(missing)
+                for i, t in enumerate(texts):
+                    if out[i] is None:
+                        out[i] = fresh[t]
+                        if cacheable[i]:
+                            self.cache[t] = fresh[t]
+                            self.cache.move_to_end(t)
+                while len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+        return out
+
+    def _run(self, batch: list[tuple[str, dict, str]]):
+        try:
+            vecs = self._vectors(batch)
+            body = {"objects": [
+                {"class": c, "properties": p, "vector": v}
+                for (c, p, _), v in zip(batch, vecs)
+            ]}
+            r = http("POST", WEAVIATE_BATCH, json=body)
+            errors = sum(1 for o in r.json() if (o.get("result") or {}).get("errors"))
+        except Exception as e:
+            print(f"❌ batch of {len(batch)} failed: {e}", file=sys.stderr)
+            errors = len(batch)
+        with self.lock:
+            self.written += len(batch) - errors
+            self.failed += errors
+        self.report()
+
+    def report(self, force: bool = False):
+        now = time.perf_counter()
+        if not force and now - self._last_report < 2.0:
+            return
+        self._last_report = now
+        dt = max(now - self.started, 1e-9)
+        print(f"   … written {self.written}/{self.queued} ({self.written / dt:.0f} obj/s), "
+              f"failed {self.failed}, embedded {self.embedded} ({self.embedded / dt:.0f}/s), "
+              f"cache hits {self.cache_hits}", flush=True)
+
+    def close(self):
+        self.flush()
+        for f in list(self.futures):
+            f.result()
+        self.pool.shutdown(wait=True)
+        self.report(force=True)
+
+
+_LOADER: BatchLoader | None = None
+
+def loader() -> BatchLoader:
+    global _LOADER
+    if _LOADER is None:
+        _LOADER = BatchLoader(SEED_BATCH_SIZE, SEED_WORKERS, SEED_CACHE_EMBEDS, SEED_CACHE_SIZE)
+    return _LOADER
 
 
 # ---------------------------
@@ -422,11 +575,30 @@ def seed_ruling(n):
 
 
 def main():
+    global SEED_BATCH_SIZE, SEED_WORKERS, SEED_CACHE_EMBEDS, SEED_CACHE_SIZE
+    ap = argparse.ArgumentParser(description="Засев демо-данных в Weaviate (8 классов)")
+    ap.add_argument("--scale", type=float, default=SEED_SCALE, help="множитель к COUNTS (1 → 200 объектов)")
+    ap.add_argument("--batch-size", type=int, default=SEED_BATCH_SIZE)
+    ap.add_argument("--workers", type=int, default=SEED_WORKERS)
+    ap.add_argument("--cache-embeddings", action=argparse.BooleanOptionalAction, default=SEED_CACHE_EMBEDS,
+                    help="переиспользовать эмбеддинги одинаковых шаблонных текстов "
+                         "(кроме классов с уникальными текстами: Case, FinancialTransaction)")
+    ap.add_argument("--cache-size", type=int, default=SEED_CACHE_SIZE, help="ёмкость LRU-кэша эмбеддингов")
+    ap.add_argument("--no-reset", action="store_true", help="не пересоздавать схему (дозасев)")
+    args = ap.parse_args()
+    SEED_BATCH_SIZE, SEED_WORKERS, SEED_CACHE_EMBEDS = args.batch_size, args.workers, args.cache_embeddings
+    SEED_CACHE_SIZE = args.cache_size
+
+    for cls in COUNTS:
+        COUNTS[cls] = max(1, int(round(COUNTS[cls] * args.scale)))
+
     print("== START ==")
     # 1) Сброс схемы
-    reset_schema()
+    if not args.no_reset:
+        reset_schema()
 
-    # 2) Засев по классам (в сумме 200 объектов)
+    # 2) Засев по классам (при scale=1 в сумме 200 объектов)
+    t0 = time.perf_counter()
     seed_cases(COUNTS[CASE])
     seed_victims(COUNTS[VICTIM])
     seed_experts(COUNTS[EXPERT])
@@ -435,10 +607,14 @@ def main():
     seed_fin_tx(COUNTS[FIN_TX])
     seed_comm(COUNTS[COMM])
     seed_ruling(COUNTS[RULING])
+    loader().close()
 
     # 3) Готово
     total = sum(COUNTS.values())
-    print(f"== DONE. Inserted ~{total} objects across 8 classes ==")
+    dt = time.perf_counter() - t0
+    ld = loader()
+    print(f"== DONE. Inserted {ld.written}/{total} objects across 8 classes "
+          f"in {dt:.1f}s ({ld.written / max(dt, 1e-9):.0f} obj/s), failed {ld.failed} ==")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,216 @@
+# app/serve.py
+"""
+Многопроцессный режим: pre-fork супервизор над uvicorn.
+
+Парсинг и pdfplumber упираются в GIL, поэтому один процесс uvicorn = одно ядро.
+Супервизор открывает сокет, (опционально) заранее импортирует app.main (--preload,
+страницы кода общие между воркерами), и форкает N воркеров на общий сокет.
+
+После fork каждый модуль сам сбрасывает свои синглтоны (os.register_at_fork):
+клиент Weaviate (gRPC не fork-safe), эмбеддер, соединения SQLite, пулы потоков.
+Подключение и прогрев (app.core.warmup) выполняются уже в воркере — в lifespan.
+
+Сигналы супервизору:
+  SIGTERM / SIGINT — плавная остановка: воркеры перестают принимать соединения
+                     и дожидаются текущих запросов (загрузок) до --graceful-timeout
+  SIGHUP           — поочерёдный перезапуск воркеров (новый готов → старый гасится)
+Упавший воркер перезапускается автоматически.
+
+SIGHUP перезагружает код только без --preload: тогда каждый новый воркер импортирует
+app.main заново. С --preload воркеры форкаются от уже импортированного родителя и
+получают тот же код, что был при старте супервизора: SIGHUP лишь пересоздаёт процессы
+(сбрасывает их состояние и соединения); для нового кода супервизор нужно перезапустить.
+
+Запуск:
+    python -m app.serve --workers 4 --port 8000 --preload
+"""
+from __future__ import annotations
+import argparse
+import logging
+import os
+import select
+import signal
+import socket
+import sys
+import threading
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger("app.serve")
+
+
+def _bind(host: str, port: int, backlog: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+# -------------------------
+# Воркер
+# -------------------------
+def _worker_main(sock: socket.socket, app_ref, ready_fd: int, args) -> None:
+    import uvicorn
+
+    for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP, signal.SIGCHLD):
+        signal.signal(sig, signal.SIG_DFL)
+
+    config = uvicorn.Config(
+        app_ref,
+        lifespan="on",
+        log_level=args.log_level,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        timeout_keep_alive=args.keep_alive,
+        limit_concurrency=args.limit_concurrency,
+        access_log=False,
+    )
+    server = uvicorn.Server(config)
+
+    def notify():
+        # супервизор ждёт этот байт, чтобы при SIGHUP гасить старый воркер только после старта нового
+        while not server.started and not server.should_exit:
+            time.sleep(0.01)
+        try:
+            os.write(ready_fd, b"1")
+        finally:
+            os.close(ready_fd)
+
+    threading.Thread(target=notify, daemon=True).start()
+    server.run(sockets=[sock])
+
+
+class Supervisor:
+    def __init__(self, sock: socket.socket, app_ref, args):
+        self.sock = sock
+        self.app_ref = app_ref
+        self.args = args
+        self.workers: Dict[int, float] = {}   # pid → время старта
+        self.stopping = False
+        self.reload = False
+
+    def spawn(self) -> Optional[int]:
+        r, w = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(r)
+            code = 0
+            try:
+                _worker_main(self.sock, self.app_ref, w, self.args)
+            except BaseException:
+                logger.exception("worker crashed")
+                code = 1
+            finally:
+                os._exit(code)
+        os.close(w)
+        self.workers[pid] = time.time()
+        ready = select.select([r], [], [], self.args.start_timeout)[0]
+        if ready:
+            os.read(r, 1)
+        else:
+            logger.warning("worker %d not ready after %.0fs", pid, self.args.start_timeout)
+        os.close(r)
+        logger.info("worker %d started", pid)
+        return pid
+
+    def stop(self, pid: int, sig=signal.SIGTERM) -> None:
+        try:
+            os.kill(pid, sig)
+        except ProcessLookupError:
+            self.workers.pop(pid, None)
+
+    def reap(self) -> list[int]:
+        dead = []
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            if self.workers.pop(pid, None) is not None:
+                dead.append(pid)
+                logger.info("worker %d exited (%s)", pid, os.waitstatus_to_exitcode(status))
+        return dead
+
+    def rolling_restart(self) -> None:
+        for old in list(self.workers):
+            self.spawn()
+            self.stop(old)
+            self._wait_exit({old}, self.args.graceful_timeout + 5)
+
+    def _wait_exit(self, pids: set, timeout: float) -> None:
+        deadline = time.time() + timeout
+        while pids & set(self.workers) and time.time() < deadline:
+            self.reap()
+            time.sleep(0.05)
+        for pid in pids & set(self.workers):
+            logger.warning("worker %d did not drain in time, killing", pid)
+            self.stop(pid, signal.SIGKILL)
+        self.reap()
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        signal.signal(signal.SIGHUP, self._on_hup)
+
+        for _ in range(self.args.workers):
+            self.spawn()
+        logger.info("serving on %s:%d with %d workers (pid %d)",
+                    self.args.host, self.args.port, self.args.workers, os.getpid())
+
+        while not self.stopping:
+            time.sleep(0.2)
+            if self.reload:
+                self.reload = False
+                logger.info("SIGHUP: rolling restart")
+                if self.args.preload:
+                    logger.warning("--preload: workers are forked from the running code; "
+                                   "restart the supervisor to load new code")
+                self.rolling_restart()
+            for _ in self.reap():
+                if not self.stopping and len(self.workers) < self.args.workers:
+                    time.sleep(self.args.restart_delay)
+                    self.spawn()
+
+        logger.info("stopping: draining %d workers", len(self.workers))
+        for pid in list(self.workers):
+            self.stop(pid)
+        self._wait_exit(set(self.workers), self.args.graceful_timeout + 5)
+        self.sock.close()
+
+    def _on_stop(self, *_):
+        self.stopping = True
+
+    def _on_hup(self, *_):
+        self.reload = True
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--host", default=os.getenv("SERVE_HOST", "0.0.0.0"))
+    ap.add_argument("--port", type=int, default=int(os.getenv("SERVE_PORT", "8000")))
+    ap.add_argument("--workers", type=int, default=int(os.getenv("SERVE_WORKERS", "0")) or (os.cpu_count() or 1))
+    ap.add_argument("--preload", action="store_true", help="импортировать app.main до fork (SIGHUP тогда не загружает новый код)")
+    ap.add_argument("--graceful-timeout", type=float, default=float(os.getenv("SERVE_GRACEFUL_TIMEOUT", "30")))
+    ap.add_argument("--start-timeout", type=float, default=60)
+    ap.add_argument("--restart-delay", type=float, default=1.0)
+    ap.add_argument("--keep-alive", type=int, default=5)
+    ap.add_argument("--limit-concurrency", type=int, default=None)
+    ap.add_argument("--backlog", type=int, default=2048)
+    ap.add_argument("--log-level", default="info")
+    args = ap.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="[%(asctime)s] %(levelname)s %(name)s: %(message)s")
+    if args.preload:
+        from app.main import app as app_ref
+    else:
+        app_ref = "app.main:app"
+    sock = _bind(args.host, args.port, args.backlog)
+    Supervisor(sock, app_ref, args).run()
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
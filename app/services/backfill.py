@@ -0,0 +1,86 @@
+# app/services/backfill.py
+"""
+Досчёт производных полей у уже загруженных документов (миграция).
+
+Производные поля (case_number — нормализованный номер, date_doc_iso, date_doc_month,
+теневые *_stem) пишутся при вставке (weaviate_client.with_derived_fields); объекты,
+вставленные до появления поля (ensure_schema досоздаёт только свойство) или до смены
+правил извлечения, остаются без него — фильтры по дате, фасет по месяцам и
+/cases/{number}/documents их не видят. Команда обходит все документы бэкенда
+(app.core.backend.iter_reports), пересчитывает производные поля и пачками
+перезаписывает только те объекты, у которых они изменились (update_reports).
+
+Номер дела здесь берётся из свойств (case_number или report_next); заново извлечь
+его из текста документа — задача app.services.reparse.
+
+Запуск (один раз после обновления схемы, повторный запуск ничего не меняет):
+    python -m app.services.backfill --dry-run
+    python -m app.services.backfill
+"""
+from __future__ import annotations
+import argparse
+import json
+import logging
+import time
+from datetime import date
+from typing import Any, Dict
+
+from app.core.weaviate_client import DERIVED_FIELDS, KEY_FIELDS, with_derived_fields
+
+logger = logging.getLogger(__name__)
+
+
+def _norm(v: Any) -> Any:
+    # DATE из Weaviate — datetime, из SQLite — "YYYY-MM-DD"
+    if isinstance(v, date):
+        return v.strftime("%Y-%m-%d")
+    return v or None
+
+
+def derived_changes(props: Dict[str, Any]) -> Dict[str, Any]:
+    """Производные поля, значения которых после пересчёта отличаются от сохранённых."""
+    new = with_derived_fields(props)
+    return {f: new.get(f) for f in KEY_FIELDS + DERIVED_FIELDS
+            if _norm(new.get(f)) != _norm(props.get(f))}
+
+
+def backfill(batch: int = 200, dry_run: bool = False) -> Dict[str, Any]:
+    from app.core.backend import iter_reports, update_reports
+
+    stats: Dict[str, Any] = {"scanned": 0, "changed": 0, "updated": 0, "dry_run": dry_run}
+    by_field: Dict[str, int] = {}
+    t0 = time.perf_counter()
+    for chunk in iter_reports(batch=batch):
+        pending = []
+        for uid, props, tenant in chunk:
+            stats["scanned"] += 1
+            diff = derived_changes(props)
+            if not diff:
+                continue
+            stats["changed"] += 1
+            for f in diff:
+                by_field[f] = by_field.get(f, 0) + 1
+            pending.append((uid, props, tenant))
+        if pending and not dry_run:
+            stats["updated"] += update_reports(pending)
+        logger.info("backfill: scanned %d, changed %d", stats["scanned"], stats["changed"])
+    stats["fields"] = by_field
+    stats["seconds"] = round(time.perf_counter() - t0, 2)
+    return stats
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--batch", type=int, default=200, help="объектов на пачку чтения/обновления")
+    ap.add_argument("--dry-run", action="store_true", help="только посчитать, что изменится")
+    args = ap.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    from dotenv import load_dotenv
+    load_dotenv()
+    res = backfill(args.batch, args.dry_run)
+    print(json.dumps(res, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,353 @@
+# app/services/doc_classifier.py
+"""
+Быстрый классификатор типа документа — запасная ступень после правил detect_*.
+
+Признаки: хэшированные символьные n-граммы (2..4) имени файла и начала текста
+(lower, ё→е, цифры → 0, пробелы схлопнуты) в пространстве 2^15 (--dim),
+log(1+tf) с L2-нормировкой. Модель — линейная (softmax-регрессия), только NumPy:
+пачка документов классифицируется одним умножением матриц X @ W + b.
+
+Как используется в parser_dispatch.detect_type_and_view:
+  1) обычная цепочка из 12 правил — первое совпадение по порядку решает (ответ
+     модели порядок не меняет, иначе тип зависел бы от классификатора, а не от правил);
+  2) модель вызывается только для документов, где правила дали «Неизвестно»
+     (OCR испортил ключевые слова); при уверенности ≥ DOC_CLASSIFIER_ACCEPT
+     принимается её тип. Узнанные правилами документы модель не считает.
+Без файла модели всё работает как раньше (только правила).
+
+Обучение (метки — из архива сырого текста или JSONL {text, filename, type_document, view_document}):
+    python -m app.services.doc_classifier --from-archive --ocr-noise 0.08 --out ./data/doc_classifier.npz
+    python -m app.services.doc_classifier --jsonl labeled.jsonl --epochs 40
+
+ENV: DOC_CLASSIFIER=auto|off, DOC_CLASSIFIER_PATH, DOC_CLASSIFIER_ACCEPT=0.7
+"""
+from __future__ import annotations
+import argparse
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DIM = 1 << 15
+NGRAMS = (2, 3, 4)
+HEAD_CHARS = 4000          # как head в detect_type_and_view
+CHUNK = 256                # строк плотной матрицы за одно умножение (256 × 32768 × 4 Б = 32 МБ)
+UNKNOWN = "Неизвестно"
+
+_PRIME = np.uint64(1099511628211)
+_MIX = np.uint64(29)
+_WS_RE = re.compile(r"\s+")
+_DIGIT_RE = re.compile(r"\d")
+_SEP_RE = re.compile(r"[_\-\./\\]+")
+
+_MODEL: Optional["Model"] = None
+_MODEL_LOADED = False
+_LOCK = threading.Lock()
+
+
+class Prediction(NamedTuple):
+    type_document: str
+    view_document: str
+    prob: float
+
+
+def mode() -> str:
+    return os.getenv("DOC_CLASSIFIER", "auto").strip().lower()
+
+
+def model_path() -> str:
+    return os.getenv("DOC_CLASSIFIER_PATH", "./data/doc_classifier.npz")
+
+
+def accept_threshold() -> float:
+    return float(os.getenv("DOC_CLASSIFIER_ACCEPT", "0.7"))
+
+
+# -------------------------
+# Признаки
+# -------------------------
+def _prep(s: str, limit: int) -> str:
+    s = (s or "")[:limit].lower().replace("ё", "е")
+    s = _DIGIT_RE.sub("0", s)
+    return " " + _WS_RE.sub(" ", s).strip() + " "
+
+
+def _hash_ngrams(s: str, salt: int, dim: int) -> np.ndarray:
+    c = np.frombuffer(s.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    parts = []
+    h = np.full(len(c), salt, dtype=np.uint64)
+    # n-граммы растут инкрементально: хэш (n+1)-граммы = хэш n-граммы * P + следующий символ
+    for n in range(1, max(NGRAMS) + 1):
+        m = len(c) - n + 1
+        if m <= 0:
+            break
+        h = h[:m] * _PRIME + c[n - 1:]          # переполнение uint64 — это и есть хэш
+        if n in NGRAMS:
+            parts.append((h ^ (h >> _MIX)) & np.uint64(dim - 1))
+    return np.concatenate(parts) if parts else np.empty(0, dtype=np.uint64)
+
+
+def featurize(filename: Optional[str], text: str, dim: int = DEFAULT_DIM) -> Tuple[np.ndarray, np.ndarray]:
+    """Разреженный вектор документа: (индексы int64, значения float32), L2 = 1."""
+    name = _SEP_RE.sub(" ", os.path.splitext(filename or "")[0])
+    idx = np.concatenate([_hash_ngrams(_prep(name, 300), 1, dim), _hash_ngrams(_prep(text, HEAD_CHARS), 2, dim)])
+    if not len(idx):
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    uniq, counts = np.unique(idx.astype(np.int64), return_counts=True)
+    val = np.log1p(counts).astype(np.float32)
+    val /= np.linalg.norm(val)
+    return uniq, val
+
+
+def _dense(rows: Sequence[Tuple[np.ndarray, np.ndarray]], dim: int) -> np.ndarray:
+    X = np.zeros((len(rows), dim), dtype=np.float32)
+    for i, (ix, v) in enumerate(rows):
+        X[i, ix] = v
+    return X
+
+
+def _softmax(z: np.ndarray) -> np.ndarray:
+    z = z - z.max(axis=1, keepdims=True)
+    np.exp(z, out=z)
+    z /= z.sum(axis=1, keepdims=True)
+    return z
+
+
+# -------------------------
+# Модель
+# -------------------------
+class Model:
+    def __init__(self, W: np.ndarray, b: np.ndarray, labels: List[Tuple[str, str]], meta: Dict[str, Any]):
+        self.W = W.astype(np.float32, copy=False)
+        self.b = b.astype(np.float32, copy=False)
+        self.labels = labels
+        self.meta = meta
+        self.dim = W.shape[0]
+
+    def predict_proba(self, items: Sequence[Tuple[Optional[str], str]]) -> np.ndarray:
+        """items: (filename, text). Возвращает (n, классы)."""
+        rows = [featurize(fn, text, self.dim) for fn, text in items]
+        out = np.empty((len(rows), len(self.labels)), dtype=np.float32)
+        for s in range(0, len(rows), CHUNK):
+            X = _dense(rows[s:s + CHUNK], self.dim)
+            out[s:s + CHUNK] = _softmax(X @ self.W + self.b)
+        return out
+
+    def predict(self, items: Sequence[Tuple[Optional[str], str]]) -> List[Prediction]:
+        if not items:
+            return []
+        P = self.predict_proba(items)
+        best = P.argmax(axis=1)
+        return [Prediction(*self.labels[k], float(P[i, k])) for i, k in enumerate(best)]
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        np.savez_compressed(
+            path, W=self.W, b=self.b,
+            types=np.array([t for t, _ in self.labels]), views=np.array([v for _, v in self.labels]),
+            meta=np.array(json.dumps(self.meta, ensure_ascii=False)),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "Model":
+        with np.load(path, allow_pickle=False) as z:
+            labels = list(zip(z["types"].tolist(), z["views"].tolist()))
+            return cls(z["W"], z["b"], labels, json.loads(str(z["meta"])))
+
+
+def get_model() -> Optional[Model]:
+    """Модель из DOC_CLASSIFIER_PATH (загружается один раз); None — классификатор не используется."""
+    global _MODEL, _MODEL_LOADED
+    if mode() == "off":
+        return None
+    if not _MODEL_LOADED:
+        with _LOCK:
+            if not _MODEL_LOADED:
+                path = model_path()
+                if os.path.exists(path):
+                    try:
+                        _MODEL = Model.load(path)
+                        logger.info("doc classifier loaded: %s (%d classes, dim %d)",
+                                    path, len(_MODEL.labels), _MODEL.dim)
+                    except Exception as e:
+                        logger.warning("doc classifier %s not loaded: %s", path, e)
+                _MODEL_LOADED = True
+    return _MODEL
+
+
+def set_model(model: Optional[Model]) -> None:
+    """Подменить модель процесса (бенчмарк, обучение на лету)."""
+    global _MODEL, _MODEL_LOADED
+    with _LOCK:
+        _MODEL, _MODEL_LOADED = model, True
+
+
+def predict(items: Sequence[Tuple[Optional[str], str]]) -> List[Optional[Prediction]]:
+    model = get_model()
+    if model is None:
+        return [None] * len(items)
+    return list(model.predict(items))
+
+
+# -------------------------
+# Обучение
+# -------------------------
+_OCR_SWAPS = {"о": "0", "е": "e", "а": "a", "с": "c", "р": "p", "и": "н", "л": "п", "ш": "щ", "в": "8", "з": "3"}
+
+
+def ocr_noise(s: str, rate: float, rnd: random.Random) -> str:
+    """Имитация ошибок OCR: латинские двойники, путаница букв, выпавшие и лишние пробелы."""
+    if rate <= 0:
+        return s
+    out = []
+    for ch in s:
+        r = rnd.random()
+        if r >= rate:
+            out.append(ch)
+            continue
+        low = ch.lower()
+        r = rnd.random()
+        if r < 0.6 and low in _OCR_SWAPS:
+            out.append(_OCR_SWAPS[low])
+        elif r < 0.75:
+            continue
+        elif r < 0.9:
+            out.append(ch + " ")
+        else:
+            out.append(ch)
+    return "".join(out)
+
+
+def train(samples: Sequence[Tuple[Optional[str], str, str, str]], dim: int = DEFAULT_DIM, epochs: int = 30,
+          lr: float = 0.05, l2: float = 1e-6, batch: int = 64, seed: int = 0) -> Model:
+    """samples: (filename, text, type_document, view_document). Softmax-регрессия, мини-батчи + Adam."""
+    labels = sorted({(t, v) for _, _, t, v in samples})
+    index = {lab: i for i, lab in enumerate(labels)}
+    rows = [featurize(fn, text, dim) for fn, text, _, _ in samples]
+    y = np.array([index[(t, v)] for _, _, t, v in samples])
+    C = len(labels)
+
+    rng = np.random.default_rng(seed)
+    W = np.zeros((dim, C), dtype=np.float32)
+    b = np.zeros(C, dtype=np.float32)
+    mW, vW, mb, vb = np.zeros_like(W), np.zeros_like(W), np.zeros_like(b), np.zeros_like(b)
+    beta1, beta2, eps, step = 0.9, 0.999, 1e-8, 0
+    for ep in range(epochs):
+        order = rng.permutation(len(rows))
+        loss = 0.0
+        for s in range(0, len(order), batch):
+            ids = order[s:s + batch]
+            X = _dense([rows[i] for i in ids], dim)
+            P = _softmax(X @ W + b)
+            loss -= float(np.log(P[np.arange(len(ids)), y[ids]] + 1e-12).sum())
+            P[np.arange(len(ids)), y[ids]] -= 1.0
+            P /= len(ids)
+            gW = X.T @ P + l2 * W
+            gb = P.sum(axis=0)
+            step += 1
+            for p, g, m, v in ((W, gW, mW, vW), (b, gb, mb, vb)):
+                m *= beta1
+                m += (1 - beta1) * g
+                v *= beta2
+                v += (1 - beta2) * g * g
+                p -= lr * (m / (1 - beta1 ** step)) / (np.sqrt(v / (1 - beta2 ** step)) + eps)
+        logger.info("epoch %d/%d: loss %.4f", ep + 1, epochs, loss / max(len(rows), 1))
+    return Model(W, b, labels, {"dim": dim, "ngrams": list(NGRAMS), "head_chars": HEAD_CHARS,
+                                "samples": len(rows), "epochs": epochs, "trained": time.time()})
+
+
+def samples_from_archive() -> List[Tuple[Optional[str], str, str, str]]:
+    """Метки — type_document из архива (то, что определили правила при загрузке)."""
+    from app.core import raw_archive
+    from app.services.parser_dispatch import view_of
+    out = []
+    for recs in raw_archive.iter_records():
+        for r in recs:
+            text = raw_archive.get_text(r["sha256"])
+            if text is not None and r["type_document"]:
+                out.append((r["filename"], text, r["type_document"], view_of(r["type_document"])))
+    return out
+
+
+def samples_from_jsonl(path: str) -> List[Tuple[Optional[str], str, str, str]]:
+    from app.services.parser_dispatch import view_of
+    out = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                d = json.loads(line)
+                td = d["type_document"]
+                out.append((d.get("filename"), d["text"], td, d.get("view_document") or view_of(td)))
+    return out
+
+
+def augment(samples: Iterable[Tuple[Optional[str], str, str, str]], rate: float, copies: int,
+            drop_filename: float, seed: int = 0) -> List[Tuple[Optional[str], str, str, str]]:
+    """Исходные образцы + copies зашумлённых копий (OCR-шум, с вероятностью drop_filename — без имени файла)."""
+    rnd = random.Random(seed)
+    out = list(samples)
+    for fn, text, td, vd in list(out):
+        for _ in range(copies):
+            name = None if rnd.random() < drop_filename else ocr_noise(fn or "", rate, rnd)
+            out.append((name, ocr_noise(text[:HEAD_CHARS], rate, rnd), td, vd))
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--from-archive", action="store_true", help="метки из app.core.raw_archive")
+    src.add_argument("--jsonl", help="JSONL: text, filename, type_document[, view_document]")
+    ap.add_argument("--dim", type=int, default=DEFAULT_DIM, help="степень двойки")
+    ap.add_argument("--epochs", type=int, default=30)
+    ap.add_argument("--lr", type=float, default=0.05)
+    ap.add_argument("--ocr-noise", type=float, default=0.0, help="доля испорченных символов в копиях")
+    ap.add_argument("--copies", type=int, default=2, help="зашумлённых копий на образец (при --ocr-noise)")
+    ap.add_argument("--drop-filename", type=float, default=0.5, help="доля копий без имени файла")
+    ap.add_argument("--holdout", type=float, default=0.1)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", default=model_path())
+    args = ap.parse_args()
+    if args.dim & (args.dim - 1):
+        ap.error("--dim must be a power of two")
+
+    logging.basicConfig(level=logging.INFO, format="[%(asctime)s] %(levelname)s %(name)s: %(message)s")
+    samples = samples_from_archive() if args.from_archive else samples_from_jsonl(args.jsonl)
+    if not samples:
+        raise SystemExit("no labeled samples")
+    random.Random(args.seed).shuffle(samples)
+    n_test = int(len(samples) * args.holdout)
+    test, fit = samples[:n_test], samples[n_test:]
+    if args.ocr_noise > 0:
+        fit = augment(fit, args.ocr_noise, args.copies, args.drop_filename, args.seed)
+
+    t = time.perf_counter()
+    model = train(fit, dim=args.dim, epochs=args.epochs, lr=args.lr, seed=args.seed)
+    res: Dict[str, Any] = {"samples": len(samples), "fit": len(fit), "holdout": len(test),
+                           "classes": len(model.labels), "train_s": round(time.perf_counter() - t, 2)}
+    if test:
+        pred = model.predict([(fn, text) for fn, text, _, _ in test])
+        ok = sum(p.type_document.lower() == td.lower() for p, (_, _, td, _) in zip(pred, test))
+        res["holdout_accuracy"] = round(ok / len(test), 4)
+    model.meta.update({k: res[k] for k in ("holdout_accuracy",) if k in res})
+    model.save(args.out)
+    res["model"] = args.out
+    print(json.dumps(res, ensure_ascii=False, indent=2))
+
+
+__all__ = [
+    "Prediction", "Model", "UNKNOWN", "featurize", "train", "predict", "get_model", "set_model",
+    "ocr_noise", "augment", "samples_from_archive", "samples_from_jsonl", "accept_threshold",
+]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,344 @@
+# app/services/ingest.py
+"""
+Массовая загрузка архива документов из каталога — без /upload/reports.
+
+Обходит дерево каталога (--ext, по умолчанию .pdf и .txt), в пуле процессов
+читает каждый файл (read_any) и разбирает его (parse_document_ex), а главный
+процесс пачками индексирует результаты (app.core.backend.insert_reports) и
+пишет сырой текст в архив (app.core.raw_archive) — так же, как загрузка через API.
+
+Чекпоинт — JSONL-файл (--checkpoint, по умолчанию ./data/ingest/<хэш каталога>.jsonl):
+строка на файл {path, size, mtime_ns, status, uuid, error}. Строка дописывается
+только после того, как пачка проиндексирована. Поэтому прерванный прогон (Ctrl+C, kill)
+при повторном запуске пропускает готовые файлы. Файлы с ошибкой при повторе
+разбираются снова; изменённый файл (другие size/mtime) — тоже. Оборванная последняя
+строка чекпоинта игнорируется.
+
+UUID объекта — uuid5 от абсолютного пути файла (file_uuid), вставка — upsert: файл,
+проиндексированный, но не попавший в чекпоинт (сбой между вставкой и записью строки),
+и изменённый файл перезаписывают свой объект, а не добавляют второй.
+
+Во время прогона в stderr раз в --progress секунд печатаются файлы/с, МБ/с, ошибки и ETA.
+В конце печатается сводка: счётчики, ошибки по причинам и первые ошибочные файлы.
+
+Запуск:
+    python -m app.services.ingest /mnt/archive/cases
+    python -m app.services.ingest /mnt/archive/cases --workers 8 --batch 200 --out ingest.json
+    python -m app.services.ingest /mnt/archive/cases --dry-run   # только разбор, без записи
+"""
+from __future__ import annotations
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+STATUS_DONE = "done"
+STATUS_PARTIAL = "partial"     # не уложился в бюджет CPU — поля неполные, reparse подберёт
+STATUS_ERROR = "error"
+ERR_NO_ID = "insert: no id returned"   # бэкенд ответил, но отдельный объект не вставлен
+
+_DEFAULT_EXT = (".pdf", ".txt")
+
+
+# -------------------------
+# Обход каталога и чекпоинт
+# -------------------------
+def iter_files(root: Path, exts: Tuple[str, ...]) -> Iterator[Path]:
+    """Файлы дерева с нужными расширениями, в стабильном порядке; скрытые — пропускаются."""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+        for name in sorted(filenames):
+            if not name.startswith(".") and name.lower().endswith(exts):
+                yield Path(dirpath) / name
+
+
+def default_checkpoint(root: Path) -> Path:
+    key = hashlib.sha1(str(root.resolve()).encode("utf-8")).hexdigest()[:12]
+    return Path("./data/ingest") / f"{root.resolve().name or 'root'}-{key}.jsonl"
+
+
+def file_uuid(path: str | Path) -> str:
+    """Детерминированный UUID документа по абсолютному пути файла (uuid5, пространство URL)."""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, Path(path).resolve().as_uri()))
+
+
+def _file_key(path: Path) -> Tuple[str, int, int]:
+    st = path.stat()
+    return str(path.resolve()), st.st_size, st.st_mtime_ns
+
+
+def load_checkpoint(path: Path) -> Dict[str, Dict[str, Any]]:
+    """path → последняя запись; оборванная при прерывании строка пропускается."""
+    done: Dict[str, Dict[str, Any]] = {}
+    if not path.exists():
+        return done
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue
+            done[rec["path"]] = rec
+    return done
+
+
+def is_finished(rec: Optional[Dict[str, Any]], key: Tuple[str, int, int]) -> bool:
+    return (rec is not None and rec.get("status") in (STATUS_DONE, STATUS_PARTIAL)
+            and rec.get("size") == key[1] and rec.get("mtime_ns") == key[2])
+
+
+def checkpoint_line(key: Tuple[str, int, int], status: str, uid: Optional[str] = None,
+                    error: Optional[str] = None) -> str:
+    path, size, mtime = key
+    return json.dumps({"path": path, "size": size, "mtime_ns": mtime, "status": status,
+                       "uuid": uid, "error": error, "ts": round(time.time(), 3)}, ensure_ascii=False) + "\n"
+
+
+# -------------------------
+# Воркер пула (отдельный процесс)
+# -------------------------
+def _init_worker() -> None:
+    import app.services.parser_dispatch   # noqa: F401 — модуль сам настраивает свой логгер при импорте
+    logging.getLogger("app.services.parser_dispatch").setLevel(logging.WARNING)
+    logging.getLogger("pdfminer").setLevel(logging.ERROR)
+
+
+def _read_parse(job: Tuple[str, str]) -> Tuple[str, Optional[str], Optional[Dict[str, Any]], str,
+                                                Optional[str], Optional[str]]:
+    """(path, filename) → (path, text, fields, status, doc_type, error); doc_type — тип по детектору."""
+    from app.services import parser_dispatch as pd
+    from app.services.type_files._1_6_intro._1_rep_kui import read_any
+    path, filename = job
+    try:
+        text, _ = read_any(Path(path))
+    except Exception as e:   # битый PDF, нет прав — файл помечается ошибкой, прогон идёт дальше
+        return path, None, None, STATUS_ERROR, None, f"read: {type(e).__name__}: {e}"
+    if not text.strip():
+        return path, None, None, STATUS_ERROR, None, "read: empty text (scan without text layer?)"
+    try:
+        fields, status, meta = pd.parse_document_ex(text, filename=filename)
+    except Exception as e:
+        return path, None, None, STATUS_ERROR, None, f"parse: {type(e).__name__}: {e}"
+    return path, text, fields, (STATUS_DONE if status == "ok" else STATUS_PARTIAL), meta["type_document"], None
+
+
+# -------------------------
+# Индексация пачки (главный процесс)
+# -------------------------
+def index_batch(rows: List[Tuple[str, str, Dict[str, Any], str, str]]) -> Tuple[List[Optional[str]], str]:
+    """
+    rows: (path, text, fields, status, doc_type) → (uuid | None по строкам, причина для None).
+    Вставка в индекс (upsert по file_uuid) + сырой текст в архив, как в /upload/reports;
+    исключение бэкенда (индекс недоступен) не поднимается — вся пачка возвращается без id
+    с причиной "insert: <тип>: ..." (повтор — на вызывающем); ERR_NO_ID — бэкенд ответил,
+    но отверг отдельные объекты.
+    """
+    from app.core import raw_archive, tenancy
+    from app.core.backend import insert_reports
+    from app.services.parser_dispatch import DETECTOR_VERSION, STUB_PARSER_VERSION, parser_version
+
+    names = [Path(p).name for p, _, _, _, _ in rows]
+    objs = [f for _, _, f, _, _ in rows]
+    tenants = [tenancy.tenant_key(f, n) if tenancy.is_enabled() else None for f, n in zip(objs, names)]
+    uids = [file_uuid(p) for p, _, _, _, _ in rows]
+    try:
+        ids = insert_reports(objs, tenants=tenants, ids=uids) or [None] * len(rows)
+    except Exception as e:   # индекс недоступен — пачка не отмечается готовой
+        logger.warning("insert_reports failed for %d files: %s", len(rows), e)
+        return [None] * len(rows), f"insert: {type(e).__name__}: {e}"
+    if raw_archive.is_enabled():
+        recs = []
+        for uid, (_, text, f, status, td), name, t in zip(ids, rows, names, tenants):
+            if uid:
+                pv = STUB_PARSER_VERSION if status == STATUS_PARTIAL else parser_version(td)
+                recs.append((uid, raw_archive.put_text(text), name, t, f, DETECTOR_VERSION, pv, td))
+        raw_archive.record_many(recs)
+    return ids, ERR_NO_ID
+
+
+# -------------------------
+# Прогресс
+# -------------------------
+class Progress:
+    """Счётчики прогона и строка прогресса в stderr не чаще раза в every секунд."""
+
+    def __init__(self, total: int, every: float):
+        self.total = total
+        self.every = every
+        self.t0 = self._last = time.perf_counter()
+        self.files = 0
+        self.bytes = 0
+        self.counts: Counter = Counter()
+        self.reasons: Counter = Counter()
+        self.failed: List[Dict[str, str]] = []
+
+    def add(self, size: int, status: str, error: Optional[str] = None, path: str = "") -> None:
+        self.files += 1
+        self.bytes += size
+        self.counts[status] += 1
+        if error:
+            self.reasons[": ".join(error.split(": ", 2)[:2])] += 1   # «этап: тип исключения»
+            if len(self.failed) < 50:
+                self.failed.append({"path": path, "error": error})
+        self.maybe_print()
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.t0
+
+    def line(self) -> str:
+        el = max(self.elapsed(), 1e-6)
+        rate = self.files / el
+        eta = (self.total - self.files) / rate if rate else 0.0
+        return (f"[ingest] {self.files}/{self.total} files  {rate:.1f} files/s  "
+                f"{self.bytes / el / 1e6:.2f} MB/s  partial={self.counts[STATUS_PARTIAL]}  "
+                f"errors={self.counts[STATUS_ERROR]}  elapsed={el:.0f}s  eta={eta:.0f}s")
+
+    def maybe_print(self, force: bool = False) -> None:
+        now = time.perf_counter()
+        if force or now - self._last >= self.every:
+            self._last = now
+            print(self.line(), file=sys.stderr, flush=True)
+
+
+# -------------------------
+# Прогон
+# -------------------------
+def ingest(root: Path, checkpoint: Optional[Path] = None, workers: Optional[int] = None,
+           batch: int = 100, exts: Tuple[str, ...] = _DEFAULT_EXT, dry_run: bool = False,
+           progress_every: float = 5.0, limit: Optional[int] = None) -> Dict[str, Any]:
+    checkpoint = checkpoint or default_checkpoint(root)
+    prev = load_checkpoint(checkpoint)
+    jobs: List[Tuple[str, str]] = []
+    keys: Dict[str, Tuple[str, int, int]] = {}
+    skipped = 0
+    for p in iter_files(root, exts):
+        try:
+            key = _file_key(p)
+        except OSError:
+            continue   # файл исчез между обходом и stat
+        if is_finished(prev.get(key[0]), key):
+            skipped += 1
+            continue
+        jobs.append((key[0], p.name))
+        keys[key[0]] = key
+        if limit and len(jobs) >= limit:
+            break
+
+    prog = Progress(len(jobs), progress_every)
+    print(f"[ingest] {root}: {len(jobs)} to ingest, {skipped} already done (checkpoint {checkpoint})",
+          file=sys.stderr, flush=True)
+    if not dry_run:
+        checkpoint.parent.mkdir(parents=True, exist_ok=True)
+    ck = None if dry_run else checkpoint.open("a", encoding="utf-8")
+    pending: List[Tuple[str, str, Dict[str, Any], str, str]] = []   # (path, text, fields, status, doc_type)
+
+    def write_ck(path: str, status: str, uid: Optional[str] = None, error: Optional[str] = None) -> None:
+        if ck is not None:
+            ck.write(checkpoint_line(keys[path], status, uid, error))
+
+    def flush() -> None:
+        if not pending:
+            return
+        batch_rows = list(pending)
+        pending.clear()
+        if dry_run:
+            for path, _, _, status, _ in batch_rows:
+                prog.add(keys[path][1], status)
+            return
+        ids, err = index_batch(batch_rows)
+        for uid, (path, _, _, status, _) in zip(ids, batch_rows):
+            if uid:
+                write_ck(path, status, uid)
+                prog.add(keys[path][1], status)
+            else:
+                write_ck(path, STATUS_ERROR, error=err)
+                prog.add(keys[path][1], STATUS_ERROR, err, path)
+        ck.flush()
+
+    workers = workers or max(1, (os.cpu_count() or 2) - 1)
+    inflight_max = workers * 4   # очередь заданий ограничена: тексты не копятся в памяти
+    it = iter(jobs)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            inflight = set()
+            while True:
+                while len(inflight) < inflight_max:
+                    job = next(it, None)
+                    if job is None:
+                        break
+                    inflight.add(pool.submit(_read_parse, job))
+                if not inflight:
+                    break
+                finished, inflight = wait(inflight, timeout=progress_every, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    path, text, fields, status, td, error = fut.result()
+                    if error:
+                        write_ck(path, STATUS_ERROR, error=error)
+                        prog.add(keys[path][1], STATUS_ERROR, error, path)
+                    else:
+                        pending.append((path, text, fields, status, td))
+                if len(pending) >= batch:
+                    flush()
+                prog.maybe_print()
+        flush()
+    finally:
+        if ck is not None:
+            ck.close()
+    prog.maybe_print(force=True)
+
+    return {
+        "root": str(root), "checkpoint": None if dry_run else str(checkpoint), "dry_run": dry_run,
+        "found": len(jobs) + skipped, "skipped": skipped, "processed": prog.files,
+        "done": prog.counts[STATUS_DONE], "partial": prog.counts[STATUS_PARTIAL],
+        "errors": prog.counts[STATUS_ERROR], "seconds": round(prog.elapsed(), 2),
+        "files_per_sec": round(prog.files / max(prog.elapsed(), 1e-6), 2),
+        "mb_per_sec": round(prog.bytes / max(prog.elapsed(), 1e-6) / 1e6, 3),
+        "error_reasons": dict(prog.reasons.most_common(20)), "failed_sample": prog.failed,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("root", help="каталог с документами (обходится рекурсивно)")
+    ap.add_argument("--checkpoint", help="файл чекпоинта (по умолчанию ./data/ingest/<каталог>-<хэш>.jsonl)")
+    ap.add_argument("--workers", type=int)
+    ap.add_argument("--batch", type=int, default=100, help="документов на пакетную вставку")
+    ap.add_argument("--ext", default=",".join(_DEFAULT_EXT), help="расширения через запятую")
+    ap.add_argument("--limit", type=int, help="не больше N файлов за прогон")
+    ap.add_argument("--progress", type=float, default=5.0, help="период строки прогресса, с")
+    ap.add_argument("--dry-run", action="store_true", help="только чтение и разбор, без индекса и чекпоинта")
+    ap.add_argument("--budget-ms", type=float, help="бюджет CPU на документ (PARSE_BUDGET_MS)")
+    ap.add_argument("--out")
+    args = ap.parse_args()
+    if args.budget_ms is not None:
+        os.environ["PARSE_BUDGET_MS"] = str(args.budget_ms)   # воркеры пула наследуют окружение
+
+    logging.basicConfig(level=logging.INFO)
+    from dotenv import load_dotenv
+    load_dotenv()
+    root = Path(args.root)
+    if not root.is_dir():
+        ap.error(f"not a directory: {root}")
+    exts = tuple(e.strip().lower() if e.strip().startswith(".") else "." + e.strip().lower()
+                 for e in args.ext.split(",") if e.strip())
+    res = ingest(root, Path(args.checkpoint) if args.checkpoint else None, args.workers, args.batch,
+                 exts, args.dry_run, args.progress, args.limit)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(res, f, ensure_ascii=False, indent=2)
+    print(json.dumps(res, ensure_ascii=False, indent=2))
+    sys.exit(1 if res["errors"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,14 @@
 # app/services/parser_dispatch.py
 from __future__ import annotations
-from typing import Optional, Dict
+from typing import Callable, Optional, Dict, Union
+from functools import lru_cache
+import importlib
 import re
 import logging
 
+from app.core import case_number
+from app.services import regex_guard, textnorm
+
 # ============================================================
 #                       Л О Г И Р О В А Н И Е
 # ============================================================
@@ -31,18 +36,82 @@ if not logger.handlers:
 # 11) Заявление об отказе от ознакомления               -> _7_13_dates/_6_ob_otkaze.parse_zayavlenie_otkaz
 # 12) Протокол допроса потерпевшего                     -> _7_13_dates/_5_prot_dopros.parse_prot_doprosa
 # ============================================================
-from .type_files._1_6_intro._1_rep_kui import parse_report_fields as parse_kui_fields
-from .type_files._1_6_intro._2_rep_erdr import parse_report_erdr_fields
-from .type_files._1_6_intro._3_uved_o_nazhale import parse_uved_start
-from .type_files._1_6_intro._4_postanov import parse_postanovlenie_accept
-from .type_files._1_6_intro._5_post_vedenie import parse_postanovlenie_vedenie
-from .type_files._1_6_intro._6_post_porushenie import parse_postanovlenie_porushenie
-from .type_files._7_13_dates._1_pos_prin_poter import parse_priznanie_poter
-from .type_files._7_13_dates._2_zayab_lang import parse_zayavlenie_yazyk
-from .type_files._7_13_dates._3_isk_zayab import parse_iskovoe_zayavlenie
-from .type_files._7_13_dates._4_pos_prin_graj import parse_priznanie_poter_graj
-from .type_files._7_13_dates._5_prot_dopros import parse_prot_doprosa
-from .type_files._7_13_dates._6_ob_otkaze import parse_zayavlenie_otkaz
+# Модули парсеров импортируются лениво — при первом документе своего типа
+# (или заранее в warm_up_parsers): холодный старт не платит за все 12 сразу.
+_PARSERS: Dict[str, tuple[str, str]] = {
+    "parse_kui_fields":                 (".type_files._1_6_intro._1_rep_kui", "parse_report_fields"),
+    "parse_report_erdr_fields":         (".type_files._1_6_intro._2_rep_erdr", "parse_report_erdr_fields"),
+    "parse_uved_start":                 (".type_files._1_6_intro._3_uved_o_nazhale", "parse_uved_start"),
+    "parse_postanovlenie_accept":       (".type_files._1_6_intro._4_postanov", "parse_postanovlenie_accept"),
+    "parse_postanovlenie_vedenie":      (".type_files._1_6_intro._5_post_vedenie", "parse_postanovlenie_vedenie"),
+    "parse_postanovlenie_porushenie":   (".type_files._1_6_intro._6_post_porushenie", "parse_postanovlenie_porushenie"),
+    "parse_priznanie_poter":            (".type_files._7_13_dates._1_pos_prin_poter", "parse_priznanie_poter"),
+    "parse_zayavlenie_yazyk":           (".type_files._7_13_dates._2_zayab_lang", "parse_zayavlenie_yazyk"),
+    "parse_iskovoe_zayavlenie":         (".type_files._7_13_dates._3_isk_zayab", "parse_iskovoe_zayavlenie"),
+    "parse_priznanie_poter_graj":       (".type_files._7_13_dates._4_pos_prin_graj", "parse_priznanie_poter_graj"),
+    "parse_prot_doprosa":               (".type_files._7_13_dates._5_prot_dopros", "parse_prot_doprosa"),
+    "parse_zayavlenie_otkaz":           (".type_files._7_13_dates._6_ob_otkaze", "parse_zayavlenie_otkaz"),
+}
+
+
+@lru_cache(maxsize=None)
+def _parser(name: str) -> Callable[..., Dict[str, Optional[str]]]:
+    module, attr = _PARSERS[name]
+    return getattr(importlib.import_module(module, package=__package__), attr)
+
+# ============================================================
+#                  В Е Р С И И   П А Р С Е Р О В
+# Поднимать номер при исправлении парсера/детектора: app.services.reparse
+# перепарсит из архива сырого текста (app.core.raw_archive) только записи,
+# созданные старой версией.
+# ============================================================
+DETECTOR_VERSION = 4
+
+PARSER_VERSIONS: Dict[str, int] = {
+    "Рапорт КУИ": 3,                                              # [1]
+    "Рапорт ЕРДР": 4,                                             # [2]
+    "Уведомление о начале ДР": 3,                                 # [3]
+    "Постановление о принятии материалов": 4,                     # [4]
+    "Постановление о ведении УП по ДР (электронно)": 4,           # [5]
+    "Постановление о поручении производства ДР следователю": 4,   # [6]
+    "Постановление о признании лица потерпевшим": 4,              # [7]
+    "Заявление потерпевшего о языке судопроизводства": 3,         # [8]
+    "Исковое заявление": 3,                                       # [9]
+    "Постановление о признании лица гражданским истцом": 4,       # [10]
+    "Заявление об отказе от ознакомления": 3,                     # [11]
+    "Протокол допроса потерпевшего": 3,                           # [12]
+}
+STUB_PARSER_VERSION = 0   # «Неизвестно» — парсера нет
+
+
+def parser_version(type_document: Optional[str]) -> int:
+    """Версия парсера для типа документа по детектору (meta["type_document"], без учёта регистра)."""
+    td = (type_document or "").strip().lower()
+    for name, ver in PARSER_VERSIONS.items():
+        if name.lower() == td:
+            return ver
+    return STUB_PARSER_VERSION
+
+
+def warm_up_parsers() -> int:
+    """
+    Импортирует все парсеры и прогоняет каждый на коротком образце, чтобы
+    регулярки попали в кэш re до первого настоящего документа. Возвращает число парсеров.
+    """
+    sample = "Рапорт\nг. Павлодар 17 апреля 2025 года\nНачальнику\nДокладываю, что\n"
+    prev = logger.level
+    logger.setLevel(logging.WARNING)
+    try:
+        for name in _PARSERS:
+            try:
+                _parser(name)(sample, filename="warmup.txt")
+            except Exception as e:  # образец не обязан разбираться
+                logger.debug("warm-up %s: %s", name, e)
+        detect_type_and_view("warmup.txt", sample)
+    finally:
+        logger.setLevel(prev)
+    return len(_PARSERS)
+
 
 # ============================================================
 #                           У Т И Л И Т Ы
@@ -64,9 +133,6 @@ def _normalize_name(s: str) -> str:
     logger.debug(f"_normalize_name: normalized={s!r}")
     return s
 
-def _prep_text(t: str) -> str:
-    """Подготовка текста к эвристикам детектора: lower + ё->е."""
-    return (t or "").lower().replace("ё", "е")
 
 
 # ============================================================
@@ -80,7 +146,7 @@ def _prep_text(t: str) -> str:
 # [6] ПОСТАНОВЛЕНИЕ О ВЕДЕНИИ ПРОИЗВОДСТВА ПО ДР СЛЕДОВАТЕЛЮ
 def detect_post_porushenie(norm: str, head: str) -> Optional[Dict[str, str]]:
     # norm уже нормализован _normalize_name (нижний регистр, разделители -> пробел)
-    # head уже в нижнем регистре (_prep_text)
+    # head уже в нижнем регистре (textnorm.NormText.head)
     hay = f"{norm} {head}"
     # подстрахуемся ещё раз против необычных разделителей
     hay = re.sub(r"[_\-\./\\]+", " ", hay)
@@ -332,147 +398,232 @@ def detect_protokol_dopros(norm: str, head: str) -> Optional[Dict[str, str]]:
 
 # ============================================================
 #                 Г Л А В Н Ы Й   Д Е Т Е К Т О Р
-# Вызывает частные детекторы по порядку.
+# Вызывает частные детекторы по порядку — первое совпадение в цепочке решает.
+# Классификатор app.services.doc_classifier (если обучен) порядок не меняет:
+# его ответ принимается только когда ни одно правило не сработало
+# (иначе «Неизвестно») и уверенность ≥ DOC_CLASSIFIER_ACCEPT.
 # ============================================================
-def detect_type_and_view(filename: Optional[str], text: str) -> Dict[str, str]:
-    logger.info(f"detect_type_and_view: filename={filename!r}")
-
-    norm = _normalize_name(filename or "")
-    head = _prep_text(text)[:4000]  # проверяем только начало текста
-
-    # Порядок важен: 12 → 11 → 10 → 9 → 8 → 7 → 6 → 5 → 4 → 3 → 2 → 1
-    detectors = (
-        detect_protokol_dopros,      # [12]
-        detect_zayavlenie_otkaz,     # [11]
-        detect_post_priznanie_graj,  # [10]
-        detect_iskovoe_zayavlenie,   # [9]
-        detect_zayavlenie_yazyk,     # [8]
-        detect_post_priznanie_poter, # [7]
-        detect_post_porushenie,      # [6]
-        detect_post_vedenie,         # [5]
-        detect_post_accept,          # [4]
-        detect_uved,                 # [3]
-        detect_raport_erdr,          # [2]
-        detect_raport_kui,           # [1]
-    )
-
-    for detector in detectors:
-        try:
-            # детекторы с двумя аргументами (norm, head)
-            res = detector(norm, head)  # type: ignore[misc]
-        except TypeError:
-            # детекторы с одним аргументом (norm)
-            res = detector(norm)        # type: ignore[misc]
+# Порядок важен: 12 → 11 → 10 → 9 → 8 → 7 → 6 → 5 → 4 → 3 → 2 → 1
+_DETECTORS = (
+    (detect_protokol_dopros,      "протокол допроса потерпевшего", "протокол"),                       # [12]
+    (detect_zayavlenie_otkaz,     "Заявление об отказе от ознакомления", "Заявление"),                # [11]
+    (detect_post_priznanie_graj,  "Постановление о признании лица гражданским истцом", "Постановление"),  # [10]
+    (detect_iskovoe_zayavlenie,   "Исковое заявление", "Заявление"),                                  # [9]
+    (detect_zayavlenie_yazyk,     "Заявление потерпевшего о языке судопроизводства", "Заявление"),    # [8]
+    (detect_post_priznanie_poter, "Постановление о признании лица потерпевшим", "Постановление"),     # [7]
+    (detect_post_porushenie,      "Постановление о поручении производства ДР следователю", "Постановление"),  # [6]
+    (detect_post_vedenie,         "Постановление о ведении УП по ДР (электронно)", "Постановление"),  # [5]
+    (detect_post_accept,          "Постановление о принятии материалов", "Постановление"),            # [4]
+    (detect_uved,                 "Уведомление о начале ДР", "Уведомление"),                          # [3]
+    (detect_raport_erdr,          "Рапорт ЕРДР", "Рапорт"),                                           # [2]
+    (detect_raport_kui,           "Рапорт КУИ", "Рапорт"),                                            # [1]
+)
+_VIEW_BY_TYPE = {td.lower(): vd for _, td, vd in _DETECTORS}
+UNKNOWN_META = {"type_document": "Неизвестно", "view_document": "Неизвестно"}
+
+
+def view_of(type_document: Optional[str]) -> str:
+    """Вид документа по типу (для меток классификатора)."""
+    return _VIEW_BY_TYPE.get((type_document or "").lower(), "Неизвестно")
+
+
+def _run_detector(detector, norm: str, head: str) -> Optional[Dict[str, str]]:
+    try:
+        # детекторы с двумя аргументами (norm, head)
+        return detector(norm, head)  # type: ignore[misc]
+    except TypeError:
+        # детекторы с одним аргументом (norm)
+        return detector(norm)        # type: ignore[misc]
+
+
+def _match_rules(norm: str, head: str) -> Optional[Dict[str, str]]:
+    for detector, _, _ in _DETECTORS:
+        res = _run_detector(detector, norm, head)
         if res:
             logger.debug(f"{detector.__name__} -> {res}")
             return res
+    return None
+
+
+def _accept_hint(hint) -> Dict[str, str]:
+    # ответ модели принимается, только если ни одно правило не сработало
+    if hint is not None and hint.type_document.lower() in _VIEW_BY_TYPE:
+        from app.services.doc_classifier import accept_threshold
+        if hint.prob >= accept_threshold():
+            logger.info(f"No detector matched → classifier {hint.type_document!r} ({hint.prob:.2f})")
+            return {"type_document": hint.type_document, "view_document": hint.view_document}
 
     logger.debug("No detector matched → Unknown")
-    return {"type_document": "Неизвестно", "view_document": "Неизвестно"}
+    return dict(UNKNOWN_META)
+
+
+def _classify(items) -> list:
+    from app.services import doc_classifier
+    try:
+        return doc_classifier.predict(items)
+    except Exception as e:  # классификатор — только подсказка
+        logger.warning(f"doc classifier failed: {e}")
+        return [None] * len(items)
+
+
+def detect_type_and_view(filename: Optional[str], text: Union[str, textnorm.NormText]) -> Dict[str, str]:
+    logger.info(f"detect_type_and_view: filename={filename!r}")
+    return detect_types_batch([(filename, text)])[0]
+
+
+def detect_types_batch(items) -> list:
+    """
+    items: [(filename, text), ...] → [meta, ...].
+    Сначала цепочка правил (проверяем только начало текста); классификатор считает
+    одним умножением матриц только документы, которые правила не узнали.
+    """
+    norms = [(fn, textnorm.normalize(text)) for fn, text in items]
+    metas = [_match_rules(_normalize_name(fn or ""), nt.head()) for fn, nt in norms]
+    unknown = [i for i, m in enumerate(metas) if m is None]
+    if unknown:
+        hints = _classify([(norms[i][0], norms[i][1].text) for i in unknown])
+        for i, hint in zip(unknown, hints):
+            metas[i] = _accept_hint(hint)
+    return metas
 
 
 # ============================================================
 #                    Д И С П Е Т Ч Е Р   П А Р С И Н Г А
-# Возвращает РОВНО 11 полей, как требуют парсеры.
+# Возвращает РОВНО 11 полей, как требуют парсеры, + case_number (номер дела).
 # ============================================================
-def parse_document(text: str, filename: Optional[str] = None) -> Dict[str, Optional[str]]:
+def _stub_fields(meta: Dict[str, str]) -> Dict[str, Optional[str]]:
+    return {
+        "type_document": meta.get("type_document") or "",
+        "view_document": meta.get("view_document") or "",
+        "post_main": None,
+        "post_main_fn": None,
+        "city_fix": None,
+        "date_doc": None,
+        "report_begin": None,
+        "report_next": None,
+        "report_end": None,
+        "post_new": None,
+        "post_new_fn": None,
+    }
+
+
+def parse_document(text: Union[str, textnorm.NormText], filename: Optional[str] = None,
+                   meta: Optional[Dict[str, str]] = None) -> Dict[str, Optional[str]]:
+    """
+    Выбрать нужный парсер по типу документа и вернуть ровно 11 полей + case_number.
+    meta — уже определённый тип (detect_types_batch), чтобы не детектировать повторно.
     """
-    Выбрать нужный парсер по типу документа и вернуть ровно 11 полей.
+    return parse_document_ex(text, filename, meta)[0]
+
+
+def parse_document_ex(text: Union[str, textnorm.NormText], filename: Optional[str] = None,
+                      meta: Optional[Dict[str, str]] = None
+                      ) -> tuple[Dict[str, Optional[str]], str, Dict[str, str]]:
+    """
+    То же, что parse_document, плюс статус разбора под бюджетом CPU (app.services.regex_guard):
+    ok | windowed (поля из начала/конца текста) | timeout (только тип/вид), и meta детектора.
+    Версия парсера (parser_version) берётся по meta["type_document"] — имени из _DETECTORS;
+    type_document в полях — то, что вернул парсер, и с ключами PARSER_VERSIONS может не совпадать.
+    Текст нормализуется один раз (app.services.textnorm): детектор и парсер получают
+    одно и то же представление, исходные фрагменты полей — NormText.find_original.
     """
     logger.info(f"parse_document: filename={filename!r}, text_len={len(text or '')}")
-    meta = detect_type_and_view(filename, text or "")
+    nt = textnorm.normalize(text)
+    if meta is None:
+        meta = detect_type_and_view(filename, nt)
+    fields, status = _parse_fields(nt, filename, meta)
+    # номер дела КУИ/ЕРДР — сверх 11 полей, для всех типов одинаково (app.core.case_number)
+    fields["case_number"] = case_number.extract(fields, filename, nt.head())
+    return fields, status, meta
+
+
+def _parse_fields(nt: textnorm.NormText, filename: Optional[str],
+                  meta: Dict[str, str]) -> tuple[Dict[str, Optional[str]], str]:
     td = (meta["type_document"] or "").lower()
     vd = (meta["view_document"] or "").lower()
     logger.debug(f"meta={meta}, td={td}, vd={vd}")
+    status = [regex_guard.STATUS_OK]
+
+    def run(name: str) -> Dict[str, Optional[str]]:
+        fields, status[0] = regex_guard.run(_parser(name), nt.text, filename, lambda: _stub_fields(meta), name=name)
+        return fields
 
     # ---------- [1] Рапорт КУИ ----------
     if td == "рапорт куи" and vd == "рапорт":
         logger.info("Dispatch → parse_kui_fields")
-        fields = parse_kui_fields(text, filename=filename)
+        fields = run("parse_kui_fields")
         fields["type_document"] = "Рапорт КУИ"
         fields["view_document"] = "Рапорт"
-        return fields
+        return fields, status[0]
 
     # ---------- [2] Рапорт ЕРДР ----------
     if td == "рапорт ердр" and vd == "рапорт":
         logger.info("Dispatch → parse_report_erdr_fields")
-        fields = parse_report_erdr_fields(text, filename=filename)
+        fields = run("parse_report_erdr_fields")
         fields["type_document"] = "Рапорт ЕРДР"
         fields["view_document"] = "Рапорт"
-        return fields
+        return fields, status[0]
 
     # ---------- [3] Уведомление о начале ДР ----------
     if td == "уведомление о начале др" and vd == "уведомление":
         logger.info("Dispatch → parse_uved_start")
-        fields = parse_uved_start(text, filename=filename)
-        return fields
+        fields = run("parse_uved_start")
+        return fields, status[0]
 
     # ---------- [4] Постановление о принятии материалов ----------
     if td == "постановление о принятии материалов" and vd == "постановление":
         logger.info("Dispatch → parse_postanovlenie_accept")
-        fields = parse_postanovlenie_accept(text, filename=filename)
-        return fields
+        fields = run("parse_postanovlenie_accept")
+        return fields, status[0]
 
     # ---------- [5] Постановление о ведении УП по ДР (электронно) ----------
     if td == "постановление о ведении уп по др (электронно)" and vd == "постановление":
         logger.info("Dispatch → parse_postanovlenie_vedenie")
-        fields = parse_postanovlenie_vedenie(text, filename=filename)
-        return fields
+        fields = run("parse_postanovlenie_vedenie")
+        return fields, status[0]
 
     # ---------- [6] Постановление о поручении производства ДР следователю ----------
     if td == "постановление о поручении производства др следователю" and vd == "постановление":
         logger.info("Dispatch → parse_postanovlenie_porushenie")
-        fields = parse_postanovlenie_porushenie(text, filename=filename)
-        return fields
+        fields = run("parse_postanovlenie_porushenie")
+        return fields, status[0]
 
     # ---------- [7] Постановление о признании лица потерпевшим ----------
     if td == "постановление о признании лица потерпевшим" and vd == "постановление":
         logger.info("Dispatch → parse_priznanie_poter")
-        fields = parse_priznanie_poter(text, filename=filename)
-        return fields
+        fields = run("parse_priznanie_poter")
+        return fields, status[0]
 
     # ---------- [8] Заявление потерпевшего о языке судопроизводства ----------
     if td == "заявление потерпевшего о языке судопроизводства" and vd == "заявление":
         logger.info("Dispatch → parse_zayavlenie_yazyk")
-        fields = parse_zayavlenie_yazyk(text, filename=filename)
-        return fields
+        fields = run("parse_zayavlenie_yazyk")
+        return fields, status[0]
 
     # ---------- [9] Исковое заявление ----------
     if td == "исковое заявление" and vd == "заявление":
         logger.info("Dispatch → parse_iskovoe_zayavlenie")
-        fields = parse_iskovoe_zayavlenie(text, filename=filename)
-        return fields
+        fields = run("parse_iskovoe_zayavlenie")
+        return fields, status[0]
 
     # ---------- [10] Постановление о признании лица гражданским истцом ----------
     if td == "постановление о признании лица гражданским истцом" and vd == "постановление":
         logger.info("Dispatch → parse_priznanie_poter_graj")
-        fields = parse_priznanie_poter_graj(text, filename=filename)
-        return fields
+        fields = run("parse_priznanie_poter_graj")
+        return fields, status[0]
 
     # ---------- [11] Заявление об отказе от ознакомления ----------
     if td == "заявление об отказе от ознакомления" and vd == "заявление":
         logger.info("Dispatch → parse_zayavlenie_otkaz")
-        fields = parse_zayavlenie_otkaz(text, filename=filename)
-        return fields
+        fields = run("parse_zayavlenie_otkaz")
+        return fields, status[0]
 
     # ---------- [12] Протокол допроса потерпевшего ----------
     if td == "протокол допроса потерпевшего" and vd == "протокол":
         logger.info("Dispatch → parse_prot_doprosa")
-        fields = parse_prot_doprosa(text, filename=filename)
-        return fields
+        fields = run("parse_prot_doprosa")
+        return fields, status[0]
 
     # ---------- Заглушка (ровно 11 полей) ----------
     logger.warning("Unknown document type → returning stub")
-    return {
-        "type_document": meta.get("type_document") or "",
-        "view_document": meta.get("view_document") or "",
-        "post_main": None,
-        "post_main_fn": None,
-        "city_fix": None,
-        "date_doc": None,
-        "report_begin": None,
-        "report_next": None,
-        "report_end": None,
-        "post_new": None,
-        "post_new_fn": None,
-    }
+    return _stub_fields(meta), status[0]
@@ -0,0 +1,167 @@
+# app/services/regex_guard.py
+"""
+Защита парсеров от катастрофического бэктрекинга регулярок на длинном/битом OCR-тексте.
+
+Каждый документ разбирается под бюджетом CPU (PARSE_BUDGET_MS) в три ступени:
+  ok        — полный текст уложился в бюджет;
+  windowed  — бюджет исчерпан → повтор на окне текста (PARSE_WINDOW_HEAD первых +
+              PARSE_WINDOW_TAIL последних символов: шапка и подпись) с тем же бюджетом;
+  timeout   — не уложилось и окно → заглушка: тип/вид документа, остальные поля None.
+Документ, не уложившийся в бюджет, сохраняется в карантин (PARSE_QUARANTINE_DIR:
+<sha>.txt + <sha>.json) для разбора и пополнения фазз-корпуса (app.bench.fuzz_parsers).
+
+Прерывание: re проверяет сигналы во время сопоставления, поэтому в главном потоке
+бюджет жёсткий — SIGPROF с исключением. Бюджет — CPU своего потока (time.thread_time):
+ITIMER_PROF считает CPU всего процесса и срабатывает раньше, когда рядом работают
+другие потоки (пул запросов сервера, клиенты бэкендов); обработчик тогда сверяет
+CPU потока и взводит таймер на остаток, а исключение поднимает только по исчерпании.
+Ограничения: CPU других потоков сокращает лишь интервал между проверками, не бюджет;
+вне главного потока сигналы недоступны — там защищают только окна поиска полей в самих
+парсерах (жёсткий бюджет — разбор в пуле процессов, как в ingest/watch/reparse).
+
+ENV: PARSE_BUDGET_MS=1000 (0 — без ограничения), PARSE_WINDOW_HEAD=6000, PARSE_WINDOW_TAIL=3000,
+     PARSE_QUARANTINE=true, PARSE_QUARANTINE_DIR=./data/quarantine
+"""
+from __future__ import annotations
+import hashlib
+import json
+import logging
+import os
+import signal
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+STATUS_OK = "ok"
+STATUS_WINDOWED = "windowed"
+STATUS_TIMEOUT = "timeout"
+
+
+class ParseBudgetExceeded(Exception):
+    """Бюджет CPU на документ исчерпан (поднимается из обработчика SIGPROF)."""
+
+
+def budget_ms() -> float:
+    return float(os.getenv("PARSE_BUDGET_MS", "1000"))
+
+
+def _window_sizes() -> Tuple[int, int]:
+    return int(os.getenv("PARSE_WINDOW_HEAD", "6000")), int(os.getenv("PARSE_WINDOW_TAIL", "3000"))
+
+
+def quarantine_enabled() -> bool:
+    return os.getenv("PARSE_QUARANTINE", "true").strip().lower() in ("1", "true", "yes", "y")
+
+
+def quarantine_dir() -> str:
+    return os.getenv("PARSE_QUARANTINE_DIR", "./data/quarantine")
+
+
+# -------------------------
+# Бюджет
+# -------------------------
+def hard_limit_available() -> bool:
+    return hasattr(signal, "setitimer") and threading.current_thread() is threading.main_thread()
+
+
+@contextmanager
+def cpu_budget(ms: float) -> Iterator[None]:
+    """Бюджет CPU потока на блок; ms <= 0 или не главный поток — без прерывания."""
+    if ms <= 0 or not hard_limit_available():
+        yield
+        return
+    deadline = time.thread_time() + ms / 1000.0
+
+    def on_sigprof(signum, frame):
+        left = deadline - time.thread_time()
+        if left <= 0:
+            raise ParseBudgetExceeded()
+        # таймер считал и CPU других потоков — ждём остаток бюджета этого потока
+        signal.setitimer(signal.ITIMER_PROF, max(left, 0.001))
+
+    prev = signal.signal(signal.SIGPROF, on_sigprof)
+    signal.setitimer(signal.ITIMER_PROF, ms / 1000.0)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        signal.signal(signal.SIGPROF, prev)
+
+
+def window(text: str, head: Optional[int] = None, tail: Optional[int] = None) -> str:
+    """Начало и конец текста (шапка и подпись); короткий текст — как есть."""
+    h, t = _window_sizes()
+    head = h if head is None else head
+    tail = t if tail is None else tail
+    if len(text) <= head + tail:
+        return text
+    return text[:head] + "\n" + text[-tail:]
+
+
+# -------------------------
+# Карантин
+# -------------------------
+def quarantine(text: str, info: Dict[str, Any]) -> Optional[str]:
+    """Сохраняет текст и обстоятельства (один раз на sha256); возвращает путь к .txt."""
+    if not quarantine_enabled():
+        return None
+    sha = hashlib.sha256(text.encode("utf-8", "surrogatepass")).hexdigest()
+    d = Path(quarantine_dir())
+    try:
+        d.mkdir(parents=True, exist_ok=True)
+        path = d / f"{sha}.txt"
+        if not path.exists():
+            path.write_text(text, encoding="utf-8", errors="surrogatepass")
+        (d / f"{sha}.json").write_text(
+            json.dumps({**info, "sha256": sha, "chars": len(text), "ts": time.time()}, ensure_ascii=False, indent=2),
+            encoding="utf-8",
+        )
+        return str(path)
+    except OSError as e:
+        logger.warning("quarantine write failed: %s", e)
+        return None
+
+
+# -------------------------
+# Разбор под бюджетом
+# -------------------------
+def run(parser: Callable[..., Dict[str, Optional[str]]], text: str, filename: Optional[str],
+        stub: Callable[[], Dict[str, Optional[str]]], name: str = "",
+        ms: Optional[float] = None) -> Tuple[Dict[str, Optional[str]], str]:
+    """
+    parser(text, filename=...) под бюджетом: (поля, статус ok|windowed|timeout).
+    stub() — 11 полей заглушки (тип/вид уже определены детектором).
+    """
+    ms = budget_ms() if ms is None else ms
+    t0 = time.thread_time()
+    try:
+        with cpu_budget(ms):
+            return parser(text, filename=filename), STATUS_OK
+    except ParseBudgetExceeded:
+        pass
+    spent = (time.thread_time() - t0) * 1000
+    win = window(text)
+
+    status, fields = STATUS_TIMEOUT, None
+    if len(win) < len(text):
+        try:
+            with cpu_budget(ms):
+                fields, status = parser(win, filename=filename), STATUS_WINDOWED
+        except ParseBudgetExceeded:
+            pass
+    total = (time.thread_time() - t0) * 1000
+    path = quarantine(text, {"filename": filename, "parser": name, "status": status,
+                             "budget_ms": ms, "full_ms": round(spent, 1), "total_ms": round(total, 1)})
+    logger.warning("parse budget exceeded: parser=%s file=%r chars=%d status=%s cpu=%.0fms quarantine=%s",
+                   name, filename, len(text), status, total, path)
+    return (fields if fields is not None else stub()), status
+
+
+__all__ = [
+    "ParseBudgetExceeded", "STATUS_OK", "STATUS_WINDOWED", "STATUS_TIMEOUT",
+    "budget_ms", "cpu_budget", "window", "quarantine", "run", "hard_limit_available",
+]
@@ -0,0 +1,139 @@
+# app/services/reparse.py
+"""
+Повторный разбор документов из архива сырого текста (app.core.raw_archive) —
+без повторной загрузки PDF и pdfplumber.
+
+Берутся записи, у которых версия детектора или парсера ниже текущей
+(DETECTOR_VERSION / PARSER_VERSIONS в parser_dispatch), текст разбирается
+заново в пуле процессов, изменившиеся объекты пачками перезаписываются
+в индексе (app.core.backend.update_reports), записи архива получают новые версии.
+
+Запуск:
+    python -m app.services.reparse                      # только устаревшие
+    python -m app.services.reparse --type "Рапорт КУИ"  # + все записи этого типа
+    python -m app.services.reparse --all --dry-run      # что изменится, без записи
+"""
+from __future__ import annotations
+import argparse
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from app.core import raw_archive
+
+logger = logging.getLogger(__name__)
+
+
+def is_outdated(rec: Dict[str, Any], detector_version: int, versions_of) -> bool:
+    """rec["type_document"] — тип по детектору (ключ PARSER_VERSIONS), см. raw_archive.record_many."""
+    if rec["detector_version"] < detector_version:
+        return True
+    return rec["parser_version"] < versions_of(rec["type_document"])
+
+
+# -------------------------
+# Воркер пула (отдельный процесс)
+# -------------------------
+def _init_worker() -> None:
+    logging.getLogger("app.services.parser_dispatch").setLevel(logging.WARNING)
+
+
+def _parse_one(job: tuple) -> tuple:
+    """(uuid, sha, filename) → (uuid, fields | None, doc_type, detector_version, parser_version, error).
+    Разбор, не уложившийся в бюджет CPU (regex_guard), считается ошибкой: частичный
+    результат не должен затирать полный."""
+    from app.services import parser_dispatch as pd
+    uid, sha, filename = job
+    text = raw_archive.get_text(sha)
+    if text is None:
+        return uid, None, None, 0, 0, f"text {sha} not in archive"
+    try:
+        fields, status, meta = pd.parse_document_ex(text, filename=filename)
+    except Exception as e:  # парсер упал — запись остаётся старой
+        return uid, None, None, 0, 0, f"{type(e).__name__}: {e}"
+    if status != "ok":
+        return uid, None, None, 0, 0, f"parse budget exceeded ({status})"
+    td = meta["type_document"]
+    return uid, fields, td, pd.DETECTOR_VERSION, pd.parser_version(td), None
+
+
+# -------------------------
+# Прогон
+# -------------------------
+def reparse(types: Optional[List[str]] = None, everything: bool = False, workers: Optional[int] = None,
+            batch: int = 200, dry_run: bool = False) -> Dict[str, Any]:
+    from app.core.backend import update_reports
+    from app.services.parser_dispatch import DETECTOR_VERSION, parser_version
+
+    wanted = {t.lower() for t in (types or [])}
+    jobs, prev = [], {}
+    for recs in raw_archive.iter_records():
+        for r in recs:
+            if everything or (r["type_document"] or "").lower() in wanted \
+                    or is_outdated(r, DETECTOR_VERSION, parser_version):
+                jobs.append((r["uuid"], r["sha256"], r["filename"]))
+                prev[r["uuid"]] = r
+
+    stats = {"candidates": len(jobs), "changed": 0, "unchanged": 0, "updated": 0, "errors": 0,
+             "type_changed": 0, "dry_run": dry_run}
+    t0 = time.perf_counter()
+    pending_upd: list = []
+    pending_rec: list = []
+
+    def flush():
+        if not dry_run and pending_upd:
+            stats["updated"] += update_reports(pending_upd)
+        if not dry_run and pending_rec:
+            raw_archive.record_many(pending_rec)
+        pending_upd.clear()
+        pending_rec.clear()
+
+    workers = workers or max(1, (os.cpu_count() or 2) - 1)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        for uid, fields, td, dv, pv, err in pool.map(_parse_one, jobs, chunksize=16):
+            if err:
+                stats["errors"] += 1
+                logger.warning("reparse %s: %s", uid, err)
+                continue
+            old = prev[uid]
+            if td.lower() != (old["type_document"] or "").lower():
+                stats["type_changed"] += 1
+            if raw_archive.fields_hash(fields) != old["fields_hash"]:
+                stats["changed"] += 1
+                pending_upd.append((uid, fields, old["tenant"]))
+            else:
+                stats["unchanged"] += 1
+            # версии обновляются и для неизменившихся — чтобы не разбирать их снова
+            pending_rec.append((uid, old["sha256"], old["filename"], old["tenant"], fields, dv, pv, td))
+            if len(pending_rec) >= batch:
+                flush()
+    flush()
+    stats["seconds"] = round(time.perf_counter() - t0, 2)
+    return stats
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--type", action="append", dest="types",
+                    help="перепарсить все записи типа по детектору, как в PARSER_VERSIONS (можно несколько)")
+    ap.add_argument("--all", action="store_true", help="перепарсить всё")
+    ap.add_argument("--workers", type=int)
+    ap.add_argument("--batch", type=int, default=200, help="объектов на пакетное обновление")
+    ap.add_argument("--dry-run", action="store_true")
+    ap.add_argument("--budget-ms", type=float, help="бюджет CPU на документ (PARSE_BUDGET_MS), напр. для карантина")
+    args = ap.parse_args()
+    if args.budget_ms is not None:
+        os.environ["PARSE_BUDGET_MS"] = str(args.budget_ms)   # воркеры пула наследуют окружение
+
+    logging.basicConfig(level=logging.INFO)
+    from dotenv import load_dotenv
+    load_dotenv()
+    res = reparse(args.types, args.all, args.workers, args.batch, args.dry_run)
+    print(json.dumps(res, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
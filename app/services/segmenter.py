@@ -0,0 +1,202 @@
+# app/services/segmenter.py
+"""
+Разметка документа на разделы за один проход — общая для всех парсеров полей.
+
+Раньше каждое поле искалось регуляркой с нулевого смещения по всему тексту:
+шапка (post_main), тело (report_begin/next), подпись (post_new) — 8–15 полных
+проходов на документ, а на длинных протоколах ленивые пролёты тянутся через
+весь текст. Теперь:
+
+  1. профиль типа документа (PROFILES) — упорядоченные якоря разделов
+     («УСТАНОВИЛ:», «ПОСТАНОВИЛ:», «дал(а) следующие показания» …) и якорь подписи;
+  2. якоря ищутся по порядку, каждый с места предыдущего — один проход до
+     последнего найденного якоря; подпись — последнее вхождение своего якоря
+     в хвосте текста (SEGMENT_SIGNATURE_WINDOW) и только после тела;
+  3. Segments отдаёт срезы: head — от начала до первого якоря, раздел — от своего
+     якоря до следующего найденного, signature — от якоря подписи до конца.
+
+Парсер ищет поле в своём разделе (seg.find); если ни одного из разделов поля в документе
+нет — по всему тексту, как раньше. Промах в шапке/подписи — поиск по остатку текста
+(каждый символ просматривается один раз); промах в разделе тела — None: повтор по всему
+тексту на битом OCR удваивал бы худшее время разбора.
+
+ENV: SEGMENTS=true (false — все срезы равны полному тексту, для A/B и отката),
+     SEGMENT_SIGNATURE_WINDOW=4000
+"""
+from __future__ import annotations
+import os
+import re
+from typing import Callable, Dict, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+HEAD = "head"
+SIGNATURE = "signature"
+
+# -------------------------
+# Профили: (якоря разделов по порядку, якорь подписи)
+# -------------------------
+_POSTANOVLENIE = (
+    (
+        ("ustanovil", r"УСТАНОВИЛ[:：]"),
+        ("postanovil", r"ПОСТАНОВИЛ[:：]"),
+    ),
+    r"^[ \t]*(?:Следователь|Руководител[ья]|Приложени[ея])",
+)
+
+PROFILES: Dict[str, Tuple[Tuple[Tuple[str, str], ...], Optional[str]]] = {
+    "postanovlenie": _POSTANOVLENIE,
+    "protokol": (
+        (
+            ("intro", r"в\s+помещении"),
+            ("anketa", r"^[ \t]*Фамилия[, ]*имя[, ]*отчество\s*:"),
+            ("testimony", r"дал\(а\)\s+следующие\s+показания"),
+        ),
+        r"Следователь\s+по\s+ОВД",
+    ),
+    "raport_erdr": (
+        (
+            ("body", r"^[ \t]*(?:Я,\s*старший\s+следователь|о\s+выявлении\s+сведений)"),
+            ("registration", r"^[ \t]*Учитывая\s+наличие"),
+            ("attachments", r"^[ \t]*К\s+рапорту\s+прилагаются"),
+        ),
+        None,
+    ),
+    "raport_kui": (
+        (
+            ("body", r"В\s+период\s+дежурства\s+поступило\s+сообщение"),
+            ("registration", r"^[ \t]*Для\s+принятия\s+решения"),
+            ("transfer", r"Зарегистрированное\s+сообщение\s+передано"),
+        ),
+        None,
+    ),
+}
+
+# тип документа → профиль (типы без профиля разбираются по полному тексту)
+PROFILE_BY_TYPE: Dict[str, str] = {
+    "Рапорт КУИ": "raport_kui",
+    "Рапорт ЕРДР": "raport_erdr",
+    "Постановление о принятии материалов": "postanovlenie",
+    "Постановление о ведении УП по ДР (электронно)": "postanovlenie",
+    "Постановление о поручении производства ДР следователю": "postanovlenie",
+    "Постановление о признании лица потерпевшим": "postanovlenie",
+    "Постановление о признании лица гражданским истцом": "postanovlenie",
+    "Протокол допроса потерпевшего": "protokol",
+}
+
+
+def enabled() -> bool:
+    return os.getenv("SEGMENTS", "true").strip().lower() in ("1", "true", "yes", "y")
+
+
+def signature_window() -> int:
+    return int(os.getenv("SEGMENT_SIGNATURE_WINDOW", "4000"))
+
+
+_compiled: Dict[str, Tuple[List[Tuple[str, re.Pattern]], Optional[re.Pattern]]] = {}
+
+
+def _compile(profile: str) -> Tuple[List[Tuple[str, re.Pattern]], Optional[re.Pattern]]:
+    # без re.I: у якорей фиксированный регистр, а регистронезависимый поиск в re
+    # теряет быстрый поиск по литералу (на 500k символов ~15× медленнее)
+    c = _compiled.get(profile)
+    if c is None:
+        anchors, sig = PROFILES[profile]
+        c = _compiled[profile] = (
+            [(name, re.compile(pat, re.M)) for name, pat in anchors],
+            re.compile(sig, re.M) if sig else None,
+        )
+    return c
+
+
+# -------------------------
+# Разметка
+# -------------------------
+class Segments:
+    """Срезы разделов одного документа; spans: имя → (начало, конец)."""
+
+    def __init__(self, text: str, spans: Dict[str, Tuple[int, int]]):
+        self.text = text
+        self.spans = spans
+
+    def has(self, name: str) -> bool:
+        return name in self.spans
+
+    def get(self, *names: str, default: Optional[str] = None) -> str:
+        """
+        Непрерывный срез от начала первого до конца последнего из найденных разделов.
+        Ни один не найден — default (по умолчанию весь текст).
+        """
+        span = self._span(names)
+        if span is None:
+            return self.text if default is None else default
+        return self.text[span[0]:span[1]]
+
+    def _span(self, names: Tuple[str, ...]) -> Optional[Tuple[int, int]]:
+        found = [self.spans[n] for n in names if n in self.spans]
+        if not found:
+            return None
+        return min(s for s, _ in found), max(e for _, e in found)
+
+    def find(self, fn: Callable[..., T], pattern: str, *names: str, **kw) -> T:
+        """
+        fn(pattern, срез, **kw) по разделам names (ни один не найден — по всему тексту).
+        Промах в срезе-начале (шапка) или срезе-конце (подпись) — повтор по остатку
+        текста: для «первого вхождения» в шапке и «последнего» в подписи это тот же
+        результат, что поиск по всему тексту, но без повторного прохода по срезу.
+        """
+        span = self._span(names)
+        if span is None:
+            return fn(pattern, self.text, **kw)
+        s, e = span
+        res = fn(pattern, self.text[s:e], **kw)
+        if not res:
+            if s == 0 and e < len(self.text):
+                res = fn(pattern, self.text[e:], **kw)
+            elif e == len(self.text) and s > 0:
+                res = fn(pattern, self.text[:s], **kw)
+        return res
+
+
+def segment(text: str, profile: Optional[str]) -> Segments:
+    """Разметка по профилю (без профиля или при SEGMENTS=false — пусто)."""
+    if not profile or not enabled():
+        return Segments(text, {})
+    anchors, sig_rx = _compile(profile)
+
+    # якоря по порядку: каждый ищется с места предыдущего — в сумме один проход до последнего
+    starts: List[Tuple[int, str]] = []
+    pos = 0
+    for name, rx in anchors:
+        m = rx.search(text, pos)
+        if m:
+            starts.append((m.start(), name))
+            pos = m.start()
+
+    # подпись — последнее вхождение якоря в хвосте текста и только после тела
+    sig = None
+    if sig_rx is not None:
+        lo = max(pos, len(text) - signature_window())
+        for m in sig_rx.finditer(text, lo):
+            if m.start() > pos or not starts:
+                sig = m.start()
+    end = len(text) if sig is None else sig
+
+    spans: Dict[str, Tuple[int, int]] = {}
+    bounds = [p for p, _ in starts] + [end]
+    spans[HEAD] = (0, bounds[0])
+    for i, (p, name) in enumerate(starts):
+        spans[name] = (p, bounds[i + 1])
+    if sig is not None:
+        spans[SIGNATURE] = (sig, len(text))
+    return Segments(text, spans)
+
+
+def segment_for(text: str, type_document: str) -> Segments:
+    return segment(text, PROFILE_BY_TYPE.get(type_document))
+
+
+__all__ = [
+    "PROFILES", "PROFILE_BY_TYPE", "HEAD", "SIGNATURE", "Segments",
+    "segment", "segment_for", "enabled", "signature_window",
+]
@@ -0,0 +1,113 @@
+# app/services/textnorm.py
+"""
+Единая нормализация текста документа — один раз в parse_document, а не в каждом парсере.
+
+Раньше каждый шаг делал свою полную копию текста: детектор — lower() + ё→е по всему
+тексту ради первых 4000 символов, парсеры — свой replace("ё", "е"). Теперь
+normalize(text) строит NormText:
+
+  text    — представление для парсеров полей (регистр сохранён) по таблице замен
+            _PARSE_TABLE: CRLF/\\r → \\n, ё→е, неразрывные/узкие пробелы → пробел,
+            невидимые символы (мягкий перенос, zero-width, BOM) удаляются;
+  head(n) — представление для детектора типа: начало text в нижнем регистре и с
+            латинскими двойниками кириллицы (OCR: «cлeдователь» → «следователь»);
+  карта смещений — индекс в text → индекс в исходном тексте (замены 1:1, удаления
+            учтены), чтобы показать исходный фрагмент поля: original_span / find_original.
+
+Замены — C-проходы str.replace только по символам, которые в тексте есть (обычно
+ни одного: текст не копируется); карта смещений хранит только позиции удалённых
+символов (в обычном тексте их нет — тождественная карта без памяти).
+"""
+from __future__ import annotations
+import bisect
+import re
+from typing import List, Optional, Tuple
+
+# -------------------------
+# Таблицы
+# -------------------------
+_DELETE = "\u00ad\u200b\u200c\u200d\u2060\ufeff"     # мягкий перенос, zero-width, BOM
+
+# таблица замен для парсеров; "" — удалить. Порядок важен: CRLF раньше одиночного \r
+_PARSE_TABLE = (
+    ("\r\n", "\n"), ("\r", "\n"),
+    ("ё", "е"), ("Ё", "Е"),
+    ("\u00a0", " "), ("\u2007", " "), ("\u2009", " "), ("\u202f", " "), ("\u3000", " "),
+    *((c, "") for c in _DELETE),
+)
+
+# только для детектора (нижний регистр): латиница, неотличимая от кириллицы на скане
+_DETECT_TABLE = str.maketrans("aceopxyk", "асеорхук")
+
+# \r перед \n удаляется (CRLF → LF), одиночный \r заменяется таблицей
+_DELETED_RE = re.compile("\r(?=\n)|[" + _DELETE + "]")
+
+HEAD_CHARS = 4000
+
+
+# -------------------------
+# Нормализованный текст
+# -------------------------
+class NormText:
+    """Нормализованное представление документа с картой смещений в исходный текст."""
+
+    __slots__ = ("original", "text", "_shifted")
+
+    def __init__(self, original: str, text: str, shifted: List[int]):
+        self.original = original
+        self.text = text
+        # j-я удалённая позиция исходника минус j: original = i + bisect_right(shifted, i)
+        self._shifted = shifted
+
+    def __len__(self) -> int:
+        return len(self.text)
+
+    def head(self, n: int = HEAD_CHARS) -> str:
+        """Начало текста для детектора: нижний регистр + латинские двойники → кириллица."""
+        return self.text[:n].lower().translate(_DETECT_TABLE)
+
+    def to_original(self, i: int) -> int:
+        """Индекс в text → индекс в исходном тексте."""
+        return i + bisect.bisect_right(self._shifted, i) if self._shifted else i
+
+    def original_span(self, start: int, end: int) -> Tuple[int, int]:
+        if end <= start:
+            s = self.to_original(start)
+            return s, s
+        # конец — сразу за последним символом среза (удалённые хвостовые символы не захватываем)
+        return self.to_original(start), self.to_original(end - 1) + 1
+
+    def original_text(self, start: int, end: int) -> str:
+        s, e = self.original_span(start, end)
+        return self.original[s:e]
+
+    def find_original(self, value: Optional[str]) -> Optional[Tuple[int, int]]:
+        """
+        Где в исходном тексте стоит значение поля. Парсеры схлопывают пробелы/переносы,
+        поэтому ищем по словам с любыми пробельными символами между ними.
+        """
+        words = (value or "").split()
+        if not words:
+            return None
+        m = re.search(r"\s+".join(map(re.escape, words)), self.text)
+        return self.original_span(m.start(), m.end()) if m else None
+
+
+def normalize(text: Optional[str]) -> NormText:
+    """Один проход нормализации; повторный вызов на NormText возвращает его же."""
+    if isinstance(text, NormText):
+        return text
+    original = text or ""
+    deleted: List[int] = []
+    if "\r" in original or any(c in original for c in _DELETE):
+        deleted = [m.start() for m in _DELETED_RE.finditer(original)]
+    # str.translate со словарём на не-ASCII тексте идёт посимвольно через Python-словарь
+    # (~50 мс на 500k символов); replace только присутствующих символов — memchr-проходы C
+    out = original
+    for src, dst in _PARSE_TABLE:
+        if src in out:
+            out = out.replace(src, dst)
+    return NormText(original, out, [d - j for j, d in enumerate(deleted)])
+
+
+__all__ = ["NormText", "normalize", "HEAD_CHARS"]
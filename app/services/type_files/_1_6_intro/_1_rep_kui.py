@@ -4,6 +4,8 @@ from typing import Dict, List, Tuple, Optional
 from pathlib import Path
 import re
 
+from app.services.segmenter import segment
+
 def _read_pdf(path: Path) -> tuple[str, list[str]]:
     import pdfplumber
     pages = []
@@ -24,9 +26,10 @@ def _clean_text(txt: str) -> str:
     # вырезаем «Единый реестр...» хвост (портит регексы)
     t = re.sub(r"Е\s*д\s*и\s*н\s*ы\s*й[\s\S]*?mailto:[^\s]+", " ", t, flags=re.I)
     # нормализация переносов/пробелов
-    t = re.sub(r"[ \t]*\n[ \t]*", "\n", t)
+    t = "\n".join(ln.strip(" \t") for ln in t.split("\n"))   # = re.sub(r"[ \t]*\n[ \t]*", "\n"), но линейно
     t = re.sub(r"[ \t]+", " ", t)
     t = re.sub(r"[ \t]+\n", "\n", t)
+    t = re.sub(r"\n{3,}", "\n\n", t)   # серии пустых строк: ^\s* и (?:^|\n)\s* на них квадратичны
     return t.strip()
 
 def _find(pattern: str, text: str, flags=re.I|re.S) -> Optional[str]:
@@ -73,6 +76,8 @@ def parse_report_fields(raw_text: str, filename: Optional[str] = None) -> Dict[s
       report_end, post_new, post_new_fn
     """
     text = _clean_text(raw_text)
+    # один проход: шапка / «В период дежурства» / «Для принятия решения» / передача сообщения
+    seg = segment(text, "raport_kui")
 
     # 1) type_document / 2) view_document
     is_kui_by_name, name_phrase, kui_num = _detect_kui_from_name(filename)
@@ -85,39 +90,42 @@ def parse_report_fields(raw_text: str, filename: Optional[str] = None) -> Dict[s
     type_document = "Рапорт КУИ" if is_kui_by_name else "Рапорт КУИ"  # для твоего кейса — фикс
     view_document = "Рапорт" if (is_kui_by_name or _has_raport_heading(text)) else ""
     # 3) post_main — ровно должность руководителя
-    m = re.search(
+    m = seg.find(lambda p, s: re.search(p, s, flags=re.I),
     r"(Руководитель\s+Департамента\s*(?:\n|\s)+"
     r"экономических\s+расследований\s*(?:\n|\s)+"
     r"по\s+Павлодарской\s+области)",
-    text, flags=re.I)
+    "head")
     post_main = m.group(1).strip() if m else None
     
     # 4) post_main_fn — ФИО
-    post_main_fn = _find(r"(Есенов\s*Е\.?\s*О\.?)", text)
+    post_main_fn = seg.find(_find, r"(Есенов\s*Е\.?\s*О\.?)", "head")
 
     # 5) city_fix — город «Павлодар» (без «…ской области»)
-    city_fix = _find(r"\bг\.\s*(Павлодар)\b", text) or "Павлодар"
+    city_fix = seg.find(_find, r"\bг\.\s*(Павлодар)\b", "head") or "Павлодар"
 
     # 6) date_doc — «17 апреля 2025 года» (текстом)
-    date_doc = _find(r"\b(\d{1,2}\s+[А-Яа-я]+?\s+\d{4}\s*(?:года|г\.)?)\b", text)
+    date_doc = seg.find(_find, r"\b(\d{1,2}\s+[А-Яа-я]+?\s+\d{4}\s*(?:года|г\.)?)\b", "head")
 
     # 7) report_begin — от якоря до «Для принятия решения»
-    report_begin = _find(
-      r"((?:^|\n)\s*В\s+период\s+дежурства\s+поступило\s+сообщение\s+следующего\s+содержания:[\s\S]*?)\n\s*Для\s+принятия\s+решения",text)
+    report_begin = seg.find(_find,
+      r"((?:^|\n)\s*В\s+период\s+дежурства\s+поступило\s+сообщение\s+следующего\s+содержания:[\s\S]*?)\n\s*Для\s+принятия\s+решения",
+      "body", "registration")
 
     # 8) report_next — строка с КУИ, датой и временем
-    report_next = _find(
-    r"((?:^|\n)\s*Для\s+принятия\s+решения[\s\S]*?КУИ\s*№\s*\d+\s*дата\s*регистрации\s*\d{2}\.\d{2}\.\d{4}\s*время\s*\d{2}:\d{2}\.?)",text)
+    report_next = seg.find(_find,
+    r"((?:^|\n)\s*Для\s+принятия\s+решения[\s\S]*?КУИ\s*№\s*\d+\s*дата\s*регистрации\s*\d{2}\.\d{2}\.\d{4}\s*время\s*\d{2}:\d{2}\.?)",
+    "registration", "transfer")
 
 
     # 9) report_end — про передачу Самарову
-    report_end = _find(
-    r"((?:^|\n)\s*Зарегистрированное\s+сообщение\s+передано\s+на\s+рассмотрение\s+сотруднику[\s\S]*?Самаров\s*Ж\.?\s*Г\.?\.?)",text)
+    report_end = seg.find(_find,
+    r"((?:^|\n)\s*Зарегистрированное\s+сообщение\s+передано\s+на\s+рассмотрение\s+сотруднику[\s\S]*?Самаров\s*Ж\.?\s*Г\.?\.?)",
+    "transfer")
 
 
     # 10) post_new — должность получателя
     post_new = _find(
-        r"(Старший\s+оперуполномоченный[\s\S]*?Павлодарской\s+области[\s\S]*?Агенств[ао]\s+по\s+финансовому\s+мониторингу)",text)
+        r"(Старший\s+оперуполномоченный[\s\S]{0,400}?Павлодарской\s+области[\s\S]{0,400}?Агенств[ао]\s+по\s+финансовому\s+мониторингу)",text)
 
     # 11) post_new_fn — ФИО получателя
     post_new_fn = _find(r"(Самаров\s*Ж\.?\s*Г\.?)", text)
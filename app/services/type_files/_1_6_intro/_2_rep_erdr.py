@@ -3,6 +3,10 @@ from __future__ import annotations
 from typing import Optional, Dict
 import re
 
+from app.services.segmenter import segment
+
+HEAD_WINDOW = 4000   # окно поиска полей шапки
+
 # --- утилиты ---
 
 def _find(pattern: str, text: str, flags=re.I|re.S) -> Optional[str]:
@@ -79,8 +83,11 @@ def parse_report_erdr_fields(text: str, filename: Optional[str] = None) -> Dict[
     type_document = "Рапорт ЕРДР"
     view_document = "Рапорт"
 
+    # один проход: шапка / «Я, старший следователь» / «Учитывая наличие» / «К рапорту прилагаются»
+    seg = segment(text, "raport_erdr")
+
     # 3–4) должность руководителя и ФИО в шапке (Е.О. Есенов / Есенов Е.О.)
-    post_main_fn = _fio_any_order(text)
+    post_main_fn = _fio_any_order(seg.get("head")) or _fio_any_order(text)
     pat_post_main = re.compile(
     r"(Руководител[ья]\s+Департамента[\s\S]{0,200}?"      # Руководитель Департамента ...
     r"экономическ[^\n]*?[\s\S]{0,200}?"                   # экономических (с переносами)
@@ -89,7 +96,8 @@ def parse_report_erdr_fields(text: str, filename: Optional[str] = None) -> Dict[
     re.IGNORECASE
 )
 
-    m = pat_post_main.search(text)
+    # три вложенных пролёта по {0,200} — ищем только в шапке, не по всему документу
+    m = pat_post_main.search(text[:HEAD_WINDOW])
     if m:
     # аккуратно нормализуем, сохраняя переносы строк
         post_main = "\n".join(ln.strip() for ln in m.group(1).splitlines() if ln.strip())
@@ -98,24 +106,25 @@ def parse_report_erdr_fields(text: str, filename: Optional[str] = None) -> Dict[
         post_main = _post_main_above_fio(text, post_main_fn)
 
     # 5–6) город и дата
-    city_fix = _find(r"(?m)^\s*г\.\s*([А-ЯЁ][а-яё\-]+)\s*$", text) or _find(r"\bг\.\s*([А-ЯЁ][а-яё\-]+)\b", text)
-    date_doc = _find(r"(?m)^\s*(\d{1,2}\s+[А-Яа-я]+?\s+\d{4}\s*(?:года|г\.)?)\s*$", text) \
-               or _find(r"\b(\d{1,2}\s+[А-Яа-я]+?\s+\d{4}\s*(?:года|г\.)?)\b", text)
+    city_fix = seg.find(_find, r"(?m)^\s*г\.\s*([А-ЯЁ][а-яё\-]+)\s*$", "head") \
+               or seg.find(_find, r"\bг\.\s*([А-ЯЁ][а-яё\-]+)\b", "head")
+    date_doc = seg.find(_find, r"(?m)^\s*(\d{1,2}\s+[А-Яа-я]+?\s+\d{4}\s*(?:года|г\.)?)\s*$", "head") \
+               or seg.find(_find, r"\b(\d{1,2}\s+[А-Яа-я]+?\s+\d{4}\s*(?:года|г\.)?)\b", "head")
 
     # 7) начало (описательная часть) — от "Я, старший следователь..." до "Учитывая наличие..."
-    report_begin = _find(
+    report_begin = seg.find(_find,
         r"((?:^|\n)\s*Я,\s*старший\s+следователь[\s\S]*?)\n\s*Учитывая\s+наличие",
-        text
+        "body", "registration"
     )
     if report_begin is None:
         # fallback: от "о выявлении сведений ..." до "Учитывая ..."
-        report_begin = _find(
+        report_begin = seg.find(_find,
             r"((?:^|\n)\s*о\s+выявлении\s+сведений[\s\S]*?)\n\s*Учитывая\s+наличие",
-            text
+            "body", "registration"
         )
 
     # 8) регистрация в ЕРДР — абзац с номером
-    report_next = _find(
+    report_next = seg.find(_find,
     r"""(
         (?:^|\n)\s*Учитывая\s+наличие      # начало абзаца
         [\s\S]{0,1000}?                    # весь текст с переносами
@@ -124,20 +133,20 @@ def parse_report_erdr_fields(text: str, filename: Optional[str] = None) -> Dict[
         под\W*№\W*\d+                      # сам номер
         \.                                 # точка в конце
     )""",
-    text,
+    "registration", "attachments",
     flags=re.I | re.X
 )
 
 
     # 9) подпись/передача — блок "Старший следователь ... Закиев Е.Б."
-    report_end = _find(
+    report_end = seg.find(_find,
         r"""(
             (?:^|\n)\s*К\s+рапорту\s+прилагаются   # начало абзаца
             [^\n\.]*                                # первая строка до точки
             (?:\n[^\n\.]*)*                         # возможные переносы строки, но без точек
             \.                                      # завершающая точка этого предложения
         )""",
-        text,
+        "attachments",
         flags=re.I | re.X
     )
 
@@ -162,7 +171,7 @@ def parse_report_erdr_fields(text: str, filename: Optional[str] = None) -> Dict[
 
     # если город/дата не вытащились: пробуем "г.Павлодар 17 апреля 2025 года" в одной строке
     if not city_fix:
-        city_fix = _find(r"г\.\s*([А-ЯЁ][а-яё\-]+)\s+\d{1,2}\s+[А-Яа-я]+?\s+\d{4}", text)
+        city_fix = seg.find(_find, r"г\.\s*([А-ЯЁ][а-яё\-]+)\s+\d{1,2}\s+[А-Яа-я]+?\s+\d{4}", "head")
 
     return {
         "type_document": type_document,
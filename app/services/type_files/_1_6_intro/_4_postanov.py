@@ -2,6 +2,8 @@
 import re
 from typing import Dict, Optional
 
+from app.services.segmenter import segment
+
 
 def _find(pattern: str, text: str, flags=re.I | re.S) -> Optional[str]:
     m = re.search(pattern, text, flags)
@@ -23,23 +25,24 @@ FIO = r"[А-ЯЁӘІҢҒҮҰҚӨҺ][а-яёәіңғүұқөһ\-]+(?:\s+[А-ЯЁ
 # ---------- парсер ПОСТАНОВЛЕНИЯ ----------
 def parse_postanovlenie_accept(text: str, filename: Optional[str] = None) -> Dict[str, Optional[str]]:
     t = text
+    seg = segment(t, "postanovlenie")   # один проход: шапка / УСТАНОВИЛ / ПОСТАНОВИЛ / подпись
 
     type_document = "Постановление о принятии материалов"
     view_document = "Постановление"
 
     # city / date
-    city_fix = _find(r"(?m)^\s*г\.\s*([А-ЯЁӘІҢҒҮҰҚӨҺ][А-ЯЁӘІҢҒҮҰҚӨҺа-яёәіңғүұқөһ\-]+)\s*$", t) \
-            or _find(r"\bг\.\s*([А-ЯЁӘІҢҒҮҰҚӨҺ][А-ЯЁӘІҢҒҮҰҚӨҺа-яёәіңғүұқөһ\-]+)\b", t)
-    date_doc = _find(r"(?m)^\s*(\d{1,2}\s+[А-Яа-я]+?\s+\d{4}\s*(?:года|г\.)?)\s*$", t) \
-            or _find(r"\b(\d{1,2}\s+[А-Яа-я]+?\s+\d{4}\s*(?:года|г\.)?)\b", t)
+    city_fix = seg.find(_find, r"(?m)^\s*г\.\s*([А-ЯЁӘІҢҒҮҰҚӨҺ][А-ЯЁӘІҢҒҮҰҚӨҺа-яёәіңғүұқөһ\-]+)\s*$", "head") \
+            or seg.find(_find, r"\bг\.\s*([А-ЯЁӘІҢҒҮҰҚӨҺ][А-ЯЁӘІҢҒҮҰҚӨҺа-яёәіңғүұқөһ\-]+)\b", "head")
+    date_doc = seg.find(_find, r"(?m)^\s*(\d{1,2}\s+[А-Яа-я]+?\s+\d{4}\s*(?:года|г\.)?)\s*$", "head") \
+            or seg.find(_find, r"\b(\d{1,2}\s+[А-Яа-я]+?\s+\d{4}\s*(?:года|г\.)?)\b", "head")
     if not city_fix:
-        city_fix = _find(r"г\.\s*([А-ЯЁӘІҢҒҮҰҚӨҺ][А-ЯЁӘІҢҒҮҰҚӨҺа-яёәіңғүұқөһ\-]+)\s+\d{1,2}\s+[А-Яа-я]+?\s+\d{4}", t)
+        city_fix = seg.find(_find, r"г\.\s*([А-ЯЁӘІҢҒҮҰҚӨҺ][А-ЯЁӘІҢҒҮҰҚӨҺа-яёәіңғүұқөһ\-]+)\s+\d{1,2}\s+[А-Яа-я]+?\s+\d{4}", "head")
 
     # № дела
-    number_work = _find(r"(№\s*\d{6,}\,?)", t)
+    number_work = seg.find(_find, r"(№\s*\d{6,}\,?)", "head")
 
     # верхний блок должности (post_main)
-    post_main = _find(
+    post_main = seg.find(_find,
     r"""(?isx)
     (Следователь
        (?:\s+по\s+особо\s+важным\s+делам)?   # иногда есть, иногда нет
@@ -48,32 +51,31 @@ def parse_postanovlenie_accept(text: str, filename: Optional[str] = None) -> Dic
        [\s\r\n]+по\s+[А-ЯЁӘІҢҒҮҰҚӨҺа-яёәіңғүұқөһ\-]+\s+области
         )
         """,
-        t
+        "head"
     )
 
 
     # ищем все ФИО; первое — вверху, последнее — подпись
-    fios = _find_all(rf"({FIO})", t)
-    post_main_fn = fios[0] if fios else None
+    post_main_fn = seg.find(_find, rf"({FIO})", "head")
 
     # УСТАНОВИЛ:
-    report_begin = _find(
+    report_begin = seg.find(_find,
         r"""УСТАНОВИЛ[:：]\s*
             ([\s\S]*?)
             (?=\n\s*ПОСТАНОВИЛ[:：]|\Z)
-        """, t, flags=re.I | re.S | re.X
+        """, "ustanovil", "postanovil", flags=re.I | re.S | re.X
     )
 
     # ПОСТАНОВИЛ:
-    report_end = _find(
+    report_end = seg.find(_find,
         r"""ПОСТАНОВИЛ[:：]\s*
             ([\s\S]*?)
             (?=\n\s*(?:Следователь|Приложени[ея]|$))
-        """, t, flags=re.I | re.S | re.X
+        """, "postanovil", "signature", flags=re.I | re.S | re.X
     )
 
     # нижняя подпись
-    post_new = _find(
+    post_new = seg.find(_find,
         r"""(?isx)
     (                                   # вернуть весь блок
       Следователь
@@ -86,9 +88,10 @@ def parse_postanovlenie_accept(text: str, filename: Optional[str] = None) -> Dic
       \s+по\s+[А-ЯЁӘІҢҒҮҰҚӨҺа-яёәіңғүұқөһ\-]+\s+области
     )
         """,
-        t
+        "signature"
     )
 
+    fios = seg.find(_find_all, rf"({FIO})", "signature")
     post_new_fn = fios[-1] if fios else None
 
     # чистим
@@ -2,6 +2,8 @@
 import re
 from typing import Dict, Optional
 
+from app.services.segmenter import segment
+
 # --- утилиты те же, что у тебя ---
 def _find(pattern: str, text: str, flags=re.I | re.S) -> Optional[str]:
     m = re.search(pattern, text, flags)
@@ -20,23 +22,24 @@ def _clean_spaces_keep_newlines(s: Optional[str]) -> Optional[str]:
 FIO = r"[А-ЯЁӘІҢҒҮҰҚӨҺ][а-яёәіңғүұқөһ\-]+(?:\s+[А-ЯЁӘІҢҒҮҰҚӨҺ]\.\s*[А-ЯЁӘІҢҒҮҰҚӨҺ]\.)"
 
 def parse_postanovlenie_vedenie(text: str, filename: Optional[str] = None) -> Dict[str, Optional[str]]:
-    t = text.replace("ё", "е")
+    t = text   # уже нормализован в parse_document (app.services.textnorm: ё→е, пробелы, CRLF)
+    seg = segment(t, "postanovlenie")   # один проход: шапка / УСТАНОВИЛ / ПОСТАНОВИЛ / подпись
 
     type_document = "Постановление о ведении УСП (электронно)"
     view_document = "Постановление"
 
     # город / дата (работает и когда на одной строке)
-    city_fix = _find(r"(?m)^\s*г\.\s*([А-ЯЁӘІҢҒҮҰҚӨҺ][А-ЯЁӘІҢҒҮҰҚӨҺа-яёәіңғүұқөһ\-]+)\s*(?=\d{1,2}\s+[А-Яа-я]+?\s+\d{4})", t) \
-            or _find(r"(?m)^\s*г\.\s*([А-ЯЁӘІҢҒҮҰҚӨҺ][А-ЯЁӘІҢҒҮҰҚӨҺа-яёәіңғүұқөһ\-]+)\s*$", t) \
-            or _find(r"\bг\.\s*([А-ЯЁӘІҢҒҮҰҚӨҺ][А-ЯЁӘІҢҒҮҰҚӨҺа-яёәіңғүұқөһ\-]+)\b", t)
+    city_fix = seg.find(_find, r"(?m)^\s*г\.\s*([А-ЯЁӘІҢҒҮҰҚӨҺ][А-ЯЁӘІҢҒҮҰҚӨҺа-яёәіңғүұқөһ\-]+)\s*(?=\d{1,2}\s+[А-Яа-я]+?\s+\d{4})", "head") \
+            or seg.find(_find, r"(?m)^\s*г\.\s*([А-ЯЁӘІҢҒҮҰҚӨҺ][А-ЯЁӘІҢҒҮҰҚӨҺа-яёәіңғүұқөһ\-]+)\s*$", "head") \
+            or seg.find(_find, r"\bг\.\s*([А-ЯЁӘІҢҒҮҰҚӨҺ][А-ЯЁӘІҢҒҮҰҚӨҺа-яёәіңғүұқөһ\-]+)\b", "head")
 
-    date_doc = _find(r"(?m)\b(\d{1,2}\s+[А-Яа-я]+?\s+\d{4}\s*(?:года|г\.)?)\b", t)
+    date_doc = seg.find(_find, r"(?m)\b(\d{1,2}\s+[А-Яа-я]+?\s+\d{4}\s*(?:года|г\.)?)\b", "head")
 
     # номер ЕРДР / дела (берём первый попавшийся длинный номер с №)
-    number_work = _find(r"(№\s*\d{6,})", t)
+    number_work = seg.find(_find, r"(№\s*\d{6,})", "head")
 
     # верхний блок должности
-    post_main = _find(
+    post_main = seg.find(_find,
         r"""(?isx)
         (
           Следователь
@@ -48,31 +51,30 @@ def parse_postanovlenie_vedenie(text: str, filename: Optional[str] = None) -> Di
           [\s\r\n]+по\s+[А-ЯЁӘІҢҒҮҰҚӨҺа-яёәіңғүұқөһ\-]+\s+области
         )
         """,
-        t
+        "head"
     )
 
     # ФИО (первое — наверху, последнее — подпись)
-    fios = _find_all(rf"({FIO})", t)
-    post_main_fn = fios[0] if fios else None
+    post_main_fn = seg.find(_find, rf"({FIO})", "head")
 
     # УСТАНОВИЛ:
-    report_begin = _find(
+    report_begin = seg.find(_find,
         r"""УСТАНОВИЛ[:：]\s*
             ([\s\S]*?)
             (?=\n\s*ПОСТАНОВИЛ[:：]|\Z)
-        """, t, flags=re.I | re.S | re.X
+        """, "ustanovil", "postanovil", flags=re.I | re.S | re.X
     )
 
     # ПОСТАНОВИЛ: (ограничим до подписи/приложений)
-    report_end = _find(
+    report_end = seg.find(_find,
         r"""ПОСТАНОВИЛ[:：]\s*
             ([\s\S]*?)
             (?=\n\s*(?:Следователь|Приложени[ея]|$))
-        """, t, flags=re.I | re.S | re.X
+        """, "postanovil", "signature", flags=re.I | re.S | re.X
     )
 
     # нижний блок должности (подпись)
-    post_new = _find(
+    post_new = seg.find(_find,
         r"""(?isx)
         (
           Следователь
@@ -84,8 +86,9 @@ def parse_postanovlenie_vedenie(text: str, filename: Optional[str] = None) -> Di
           [\s\r\n]+по\s+[А-ЯЁӘІҢҒҮҰҚӨҺа-яёәіңғүұқөһ\-]+\s+области
         )
         """,
-        t
+        "signature"
     )
+    fios = seg.find(_find_all, rf"({FIO})", "signature")
     post_new_fn = fios[-1] if fios else None
 
     # чистка
@@ -2,6 +2,8 @@
 import re
 from typing import Dict, Optional
 
+from app.services.segmenter import segment
+
 # ---------- утилиты ----------
 def _find(pattern: str, text: str, flags=re.I | re.S) -> Optional[str]:
     """
@@ -66,7 +68,8 @@ def parse_postanovlenie_porushenie(text: str, filename: Optional[str] = None) ->
       B) "ПОСТАНОВЛЕНИЕ о поручении производства досудебного расследования"
     Возвращает РОВНО 11 полей.
     """
-    t = (text or "").replace("ё", "е")
+    t = text or ""   # уже нормализован в parse_document (app.services.textnorm: ё→е, пробелы, CRLF)
+    seg = segment(t, "postanovlenie")   # один проход: шапка / УСТАНОВИЛ / ПОСТАНОВИЛ / подпись
 
     # --- определить точный тип по шапке ---
     heading = (t[:1200]).lower()
@@ -90,24 +93,24 @@ def parse_postanovlenie_porushenie(text: str, filename: Optional[str] = None) ->
     view_document = "Постановление"
 
     # --- город / дата ---
-    city_fix = _find(
+    city_fix = seg.find(_find,
         r"(?m)^\s*г\.\s*([А-ЯЁӘІҢҒҮҰҚӨҺ][А-ЯЁӘІҢҒҮҰҚӨҺа-яёәіңғүұқөһ\-]+)\s*(?=\d{1,2}\s+[А-Яа-я]+?\s+\d{4})",
-        t
-    ) or _find(
-        r"(?m)^\s*г\.\s*([А-ЯЁӘІҢҒҮҰҚӨҺ][А-ЯЁӘІҢҒҮҰҚӨҺа-яёәіңғүұқөһ\-]+)\s*$", t
-    ) or _find(
-        r"\bг\.\s*([А-ЯЁӘІҢҒҮҰҚӨҺ][А-ЯЁӘІҢҒҮҰҚӨҺа-яёәіңғүұқөһ\-]+)\b", t
+        "head"
+    ) or seg.find(_find,
+        r"(?m)^\s*г\.\s*([А-ЯЁӘІҢҒҮҰҚӨҺ][А-ЯЁӘІҢҒҮҰҚӨҺа-яёәіңғүұқөһ\-]+)\s*$", "head"
+    ) or seg.find(_find,
+        r"\bг\.\s*([А-ЯЁӘІҢҒҮҰҚӨҺ][А-ЯЁӘІҢҒҮҰҚӨҺа-яёәіңғүұқөһ\-]+)\b", "head"
     )
 
-    date_doc = _find(
-        r"(?m)\b(\d{1,2}\s+[А-Яа-я]+?\s+\d{4}\s*(?:года|г\.)?)\b", t
+    date_doc = seg.find(_find,
+        r"(?m)\b(\d{1,2}\s+[А-Яа-я]+?\s+\d{4}\s*(?:года|г\.)?)\b", "head"
     )
 
     # --- № ЕРДР / дела ---
-    number_work = _find(r"(№\s*\d{6,})", t)
+    number_work = seg.find(_find, r"(№\s*\d{6,})", "head")
 
     # --- блок должности наверху (2 формы: Следователь ИЛИ Руководитель СУ ДЭР) ---
-    post_main = _find(
+    post_main = seg.find(_find,
         r"""(?isx)
         (                                   # ВАРИАНТ 1: Следователь ...
           Следователь
@@ -127,31 +130,30 @@ def parse_postanovlenie_porushenie(text: str, filename: Optional[str] = None) ->
           [^\S\r\n]+области
         )
         """,
-        t
+        "head"
     )
 
     # --- ФИО (первое сверху, последнее в подписи) ---
-    fios = _find_all(rf"({FIO})", t)
-    post_main_fn = fios[0] if fios else None
+    post_main_fn = seg.find(_find, rf"({FIO})", "head")
 
     # --- УСТАНОВИЛ: ---
-    report_begin = _find(
+    report_begin = seg.find(_find,
         r"""УСТАНОВИЛ[:：]\s*
             ([\s\S]*?)
             (?=\n\s*ПОСТАНОВИЛ[:：]|\Z)
-        """, t, flags=re.I | re.S | re.X
+        """, "ustanovil", "postanovil", flags=re.I | re.S | re.X
     )
 
     # --- ПОСТАНОВИЛ: ---
-    report_end = _find(
+    report_end = seg.find(_find,
         r"""ПОСТАНОВИЛ[:：]\s*
             ([\s\S]*?)
             (?=\n\s*(?:Следователь|Руководител[ьяе]?|Приложени[ея]|$))
-        """, t, flags=re.I | re.S | re.X
+        """, "postanovil", "signature", flags=re.I | re.S | re.X
     )
 
     # --- нижняя подпись (те же 2 формы должности) ---
-    post_new = _find(
+    post_new = seg.find(_find,
         r"""(?isx)
         (
           (?:Следователь
@@ -166,8 +168,9 @@ def parse_postanovlenie_porushenie(text: str, filename: Optional[str] = None) ->
              [^\S\r\n]+области)
         )
         """,
-        t
+        "signature"
     )
+    fios = seg.find(_find_all, rf"({FIO})", "signature")
     post_new_fn = fios[-1] if fios else None
 
     # --- чистка ---
@@ -2,6 +2,8 @@
 import re
 from typing import Dict, Optional
 
+from app.services.segmenter import segment
+
 # ---------- утилиты ----------
 def _find(pattern: str, text: str, flags=re.I | re.S) -> Optional[str]:
     """
@@ -66,7 +68,8 @@ def parse_priznanie_poter(text: str, filename: Optional[str] = None) -> Dict[str
        «ПОСТАНОВЛЕНИЕ о признании лица потерпевшим»
     Возвращает РОВНО 11 полей (тот же контракт, что и у остальных).
     """
-    t = (text or "").replace("ё", "е")
+    t = text or ""   # уже нормализован в parse_document (app.services.textnorm: ё→е, пробелы, CRLF)
+    seg = segment(t, "postanovlenie")   # один проход: шапка / УСТАНОВИЛ / ПОСТАНОВИЛ / подпись
 
     # --- определить тип по шапке ---
     heading = (t[:1500]).lower()
@@ -79,22 +82,22 @@ def parse_priznanie_poter(text: str, filename: Optional[str] = None) -> Dict[str
     view_document = "Постановление"
 
     # --- город / дата ---
-    city_fix = _find(
+    city_fix = seg.find(_find,
         r"(?m)^\s*г\.\s*([А-ЯЁӘІҢҒҮҰҚӨҺ][А-ЯЁӘІҢҒҮҰҚӨҺа-яёәіңғүұқөһ\-]+)\s*(?=\d{1,2}\s+[А-Яа-я]+?\s+\d{4})",
-        t
-    ) or _find(
-        r"(?m)^\s*г\.\s*([А-ЯЁӘІҢҒҮҰҚӨҺ][А-ЯЁӘІҢҒҮҰҚӨҺа-яёәіңғүұқөһ\-]+)\s*$", t
-    ) or _find(
-        r"\bг\.\s*([А-ЯЁӘІҢҒҮҰҚӨҺ][А-ЯЁӘІҢҒҮҰҚӨҺа-яёәіңғүұқөһ\-]+)\b", t
+        "head"
+    ) or seg.find(_find,
+        r"(?m)^\s*г\.\s*([А-ЯЁӘІҢҒҮҰҚӨҺ][А-ЯЁӘІҢҒҮҰҚӨҺа-яёәіңғүұқөһ\-]+)\s*$", "head"
+    ) or seg.find(_find,
+        r"\bг\.\s*([А-ЯЁӘІҢҒҮҰҚӨҺ][А-ЯЁӘІҢҒҮҰҚӨҺа-яёәіңғүұқөһ\-]+)\b", "head"
     )
 
-    date_doc = _find(r"(?m)\b(\d{1,2}\s+[А-Яа-я]+?\s+\d{4}\s*(?:года|г\.)?)\b", t)
+    date_doc = seg.find(_find, r"(?m)\b(\d{1,2}\s+[А-Яа-я]+?\s+\d{4}\s*(?:года|г\.)?)\b", "head")
 
     # --- № ЕРДР / дела ---
-    number_work = _find(r"(№\s*\d{6,})", t)
+    number_work = seg.find(_find, r"(№\s*\d{6,})", "head")
 
     # --- верхний блок должности (Следователь … ДЭР … по <области>) ---
-    post_main = _find(
+    post_main = seg.find(_find,
         r"""(?isx)
         (
           Следователь
@@ -106,27 +109,26 @@ def parse_priznanie_poter(text: str, filename: Optional[str] = None) -> Dict[str
           [\s\r\n]+по\s+[А-ЯЁӘІҢҒҮҰҚӨҺа-яёәіңғүұқөһ\-]+\s+области
         )
         """,
-        t
+        "head"
     )
 
     # --- ФИО исполнителя (в шапке и подписи) ---
-    fios = _find_all(rf"({FIO_INITS})", t)
-    post_main_fn = fios[0] if fios else None
+    post_main_fn = seg.find(_find, rf"({FIO_INITS})", "head")
 
     # --- УСТАНОВИЛ: (до блока ПОСТАНОВИЛ) ---
-    report_begin = _find(
+    report_begin = seg.find(_find,
         r"""УСТАНОВИЛ[:：]\s*
             ([\s\S]*?)
             (?=\n\s*ПОСТАНОВИЛ[:：]|\Z)
-        """, t, flags=re.I | re.S | re.X
+        """, "ustanovil", "postanovil", flags=re.I | re.S | re.X
     )
 
     # --- ПОСТАНОВИЛ: ---
-    report_end = _find(
+    report_end = seg.find(_find,
         r"""ПОСТАНОВИЛ[:：]\s*
             ([\s\S]*?)
             (?=\n\s*(?:Следователь|Приложени[ея]|$))
-        """, t, flags=re.I | re.S | re.X
+        """, "postanovil", "signature", flags=re.I | re.S | re.X
     )
 
     # --- вытащим из ПОСТАНОВИЛ: ФИО потерпевшего и ДР (если есть) ---
@@ -135,7 +137,7 @@ def parse_priznanie_poter(text: str, filename: Optional[str] = None) -> Dict[str
     victim_dob = _find(r"(\d{2}\.\d{2}\.\d{4})\s*г\.?\s*р\.?", report_end or "", flags=re.I) or None
 
     # --- нижняя подпись (тот же блок должности) ---
-    post_new = _find(
+    post_new = seg.find(_find,
         r"""(?isx)
         (
           Следователь
@@ -147,8 +149,9 @@ def parse_priznanie_poter(text: str, filename: Optional[str] = None) -> Dict[str
           [\s\r\n]+по\s+[А-ЯЁӘІҢҒҮҰҚӨҺа-яёәіңғүұқөһ\-]+\s+области
         )
         """,
-        t
+        "signature"
     )
+    fios = seg.find(_find_all, rf"({FIO_INITS})", "signature")
     post_new_fn = fios[-1] if fios else None
 
     # --- чистка ---
@@ -34,13 +34,17 @@ LETTERS = f"{RU_UP}{RU_LOW}"
 FIO_INITS = rf"[{RU_UP}][{RU_LOW}\-]+(?:\s+[{RU_UP}]\.\s*[{RU_UP}]\.)"
 FIO_FULL  = rf"[{RU_UP}][{RU_LOW}\-]+(?:\s+[{RU_UP}][{RU_LOW}\-]+){{1,2}}"
 
+# окно поиска полей шапки: на длинном/битом тексте пролёты вида [\s\S]{0,400}? + \s*
+# иначе перебираются по всему документу (см. app.services.regex_guard)
+HEAD_WINDOW = 4000
+
 # ---------- ПАРСЕР: Заявление о языке уголовного судопроизводства ----------
 def parse_zayavlenie_yazyk(text: str, filename: Optional[str] = None) -> Dict[str, Optional[str]]:
     """
     Универсальный парсер под шаблон «ЗАЯВЛЕНИЕ о языке уголовного судопроизводства».
     Возвращает РОВНО 11 полей.
     """
-    t = (text or "").replace("ё", "е")
+    t = text or ""   # уже нормализован в parse_document (app.services.textnorm: ё→е, пробелы, CRLF)
 
     type_document = "Заявление о языке уголовного судопроизводства"
     view_document = "Заявление"
@@ -69,10 +73,10 @@ def parse_zayavlenie_yazyk(text: str, filename: Optional[str] = None) -> Dict[st
     # ФИО адресата (рядом с шапкой; любые звания между блоком и ФИО допустимы)
     post_main_fn = _find(
         rf"""Следовател[\s\S]{{0,400}}?
-             (?:майор|подполковник|полковник|капитан|лейтенант|старший\s+лейтенант)?\s*
-             (?:СЭР|полиции)?\s*
+             (?:майор|подполковник|полковник|капитан|лейтенант|старший\s+лейтенант)?\s*+
+             (?:СЭР|полиции)?\s*+
              ({FIO_INITS})
-        """, t, flags=re.I | re.S | re.X
+        """, t[:HEAD_WINDOW], flags=re.I | re.S | re.X
     )
     # fallback: первое встреченное ФИО-инициалы сверху документа
     if not post_main_fn:
@@ -33,7 +33,7 @@ FIO_FULL  = rf"[{RU_UP}][{RU_LOW}\-]+(?:\s+[{RU_UP}][{RU_LOW}\-]+){{1,2}}"
 
 # ---------- парсер: ИСКОВОЕ ЗАЯВЛЕНИЕ ----------
 def parse_iskovoe_zayavlenie(text: str, filename: Optional[str] = None) -> Dict[str, Optional[str]]:
-    t = (text or "").replace("ё", "е")
+    t = text or ""   # уже нормализован в parse_document (app.services.textnorm: ё→е, пробелы, CRLF)
 
     type_document = "Исковое заявление"
     view_document = "Заявление"
@@ -2,6 +2,8 @@
 import re
 from typing import Dict, Optional
 
+from app.services.segmenter import segment
+
 # ---------- утилиты ----------
 def _find(pattern: str, text: str, flags=re.I | re.S) -> Optional[str]:
     m = re.search(pattern, text, flags)
@@ -26,6 +28,11 @@ def _s(text: Optional[str]) -> Optional[str]:
     text = re.sub(r"\n{3,}", "\n\n", text).strip()   # лишние пустые строки
     return text
 
+# окна поиска: должность — до 400 символов, вводный абзац — до 4000, анкета — до 8000;
+# нижняя подпись ищется в последних TAIL_WINDOW символах (она привязана к концу текста).
+# Неограниченные [\s\S]+? на битом OCR-тексте с сотнями «Следователь» дают O(n²).
+TAIL_WINDOW = 3000
+
 # ФИО: поддержка "Фамилия И.О." и "И.О. Фамилия"
 NAME_PAT = r"(?:(?:[А-ЯЁ][а-яё\-]+(?:\s+[А-ЯЁ][а-яё\-]+){0,2}\s+[А-ЯЁ]\.\s*[А-ЯЁ]\.)|(?:[А-ЯЁ]\.\s*[А-ЯЁ]\.\s*[А-ЯЁ][а-яё\-]+))"
 
@@ -58,38 +65,42 @@ def _norm_date_rus(s: Optional[str]) -> Optional[str]:
 
 def parse_prot_doprosa(text: str, filename: Optional[str] = None) -> Dict[str, Optional[str]]:
     t = text
+    # один проход: шапка / вводный абзац / анкета / показания / подпись
+    seg = segment(t, "protokol")
 
     # ---------- верх: post_main + post_main_fn ----------
-    m_top = re.search(
-        rf"(?P<post_main>Следователь[\s\S]+?Павлодарской области)\s+(?P<post_main_fn>{NAME_PAT})\s+в\s+помещении",
-        t, re.I | re.S
+    m_top = seg.find(
+        lambda p, s: re.search(p, s, re.I | re.S),
+        rf"(?P<post_main>Следователь[\s\S]{{1,400}}?Павлодарской области)\s+(?P<post_main_fn>{NAME_PAT})\s+в\s+помещении",
+        "head", "intro"
     )
     if m_top:
         post_main   = _s(m_top.group("post_main"))
         post_main_fn= _s(m_top.group("post_main_fn"))
     else:
-        post_main   = _s(_find(r"(Следователь[\s\S]+?Павлодарской области)", t))
-        post_main_fn= _s(_find(rf"({NAME_PAT})\s+в\s+помещении", t))
+        post_main   = _s(seg.find(_find, r"(Следователь[\s\S]{1,400}?Павлодарской области)", "head"))
+        post_main_fn= _s(seg.find(_find, rf"({NAME_PAT})\s+в\s+помещении", "head", "intro"))
 
     # ---------- вводный абзац до "в качестве потерпевшего(ей)" ----------
-    report_begin = _s(_find(
-        r"(в\s+помещении[\s\S]+?в\s+качестве\s+потерпевшего\(ей\)\s*:?)",
-        t
+    report_begin = _s(seg.find(_find,
+        r"(в\s+помещении[\s\S]{1,4000}?в\s+качестве\s+потерпевшего\(ей\)\s*:?)",
+        "intro", "anketa"
     ))
 
     # ---------- блок анкетных данных (Фамилия... -> Не применялось) ----------
-    report_next = _block(_find(
+    report_next = _block(seg.find(_find,
         r"""(?mx)                                   # m: multiline, x: verbose
         (                                           # 1) — весь блок
-          ^\s*Фамилия[, ]*имя[, ]*отчество\s*:      # старт таблицы
-          [\s\S]+?                                  # содержимое таблицы
-          ^\s*Применение\W+технич[^\n]*             # строка "Применение технических средств ..."
+          ^[ \t]*Фамилия[, ]*имя[, ]*отчество\s*:   # старт таблицы (пустые строки срежет _block)
+          [\s\S]{1,8000}?                           # содержимое таблицы
+          ^[ \t]*Применение\W+технич[^\n]*          # строка "Применение технических средств ..."
           аудио\W*\/?\W*видео\W*фиксац[^\n]*\s*:\s* # аудио/видео фиксации:
-          .*(?:Не\s*применял[а-я]+|Применял[а-я]+)  # значение в той же или следующей строке
+          [^\n]*(?:\n[^\n]*)??                      # значение в той же или следующей строке
+          (?:Не\s*применял[а-я]+|Применял[а-я]+)    # (.* с re.S уходил бы до конца текста)
           [^\n]*                                    # до конца строки
         )
         """,
-        t
+        "anketa", "testimony"
     ))
 
     # ---------- город (лучше искать в блоке "Место жительства") ----------
@@ -98,7 +109,7 @@ def parse_prot_doprosa(text: str, filename: Optional[str] = None) -> Dict[str, O
         city_fix = _find(r"(?:Место\s+жительства[\s\S]{0,200}?(?:г\.|город)\s*([А-ЯЁ][а-яё\-]+))", report_next)
     if not city_fix:
         # глобальный фоллбэк по первому вхождению "г. <Слово>"
-        city_fix = _find(r"(?:^|\W)г\.\s*([А-ЯЁ][а-яё\-]+)", t)
+        city_fix = seg.find(_find, r"(?:^|\W)г\.\s*([А-ЯЁ][а-яё\-]+)", "head")
     city_fix = _s(city_fix)
 
     # ---------- дата из вводного абзаца "от 17 апреля 2025 ..." ----------
@@ -106,16 +117,18 @@ def parse_prot_doprosa(text: str, filename: Optional[str] = None) -> Dict[str, O
     date_doc = _norm_date_rus(date_raw)
 
     # ---------- рассказ/показания: от "дал(а) следующие показания:" до низовой подписи следователя ----------
-    report_end = _s(_find(
-        r"(дал\(а\)\s+следующие\s+показания:\s*[\s\S]+?)(?=Следователь\s+по\s+ОВД[\s\S]+?$)",
-        t
+    report_end = _s(seg.find(_find,
+        # (?=...[\s\S]) вместо (?=...[\s\S]+?$): то же условие, но без прохода до конца текста на каждом шаге
+        r"(дал\(а\)\s+следующие\s+показания:\s*[\s\S]+?)(?=Следователь\s+по\s+ОВД[\s\S])",
+        "testimony", "signature"
     ))
 
     # ---------- нижняя подпись (post_new + post_new_fn) ----------
     post_new = post_new_fn = None
+    tail = seg.get("signature")[-TAIL_WINDOW:]   # без подписи — конец текста, как раньше
     it = list(re.finditer(
-        rf"(?P<post>Следователь[\s\S]+?Павлодарской области)\s+(?P<fn>{NAME_PAT})\s*$",
-        t, re.I | re.S
+        rf"(?P<post>Следователь[\s\S]{{1,400}}?Павлодарской области)\s+(?P<fn>{NAME_PAT})\s*$",
+        tail, re.I | re.S
     ))
     if it:
         last = it[-1]
@@ -123,10 +136,10 @@ def parse_prot_doprosa(text: str, filename: Optional[str] = None) -> Dict[str, O
         post_new_fn = _s(last.group("fn"))
     else:
         # фоллбэки, если OCR разорвал строки:
-        post_new    = _s(_find(r"(Следователь[\s\S]+?Павлодарской области)\s*$", t))
+        post_new    = _s(_find(r"(Следователь[\s\S]{1,400}?Павлодарской области)\s*$", tail))
         if post_new:
             # ближайшее ФИО справа/ниже
-            post_new_fn = _s(_find(rf"({NAME_PAT})\s*$", t))
+            post_new_fn = _s(_find(rf"({NAME_PAT})\s*$", tail))
 
     # ---------- вернуть 11 полей ----------
     return {
@@ -31,6 +31,10 @@ LETTERS = f"{RU_UP}{RU_LOW}"
 FIO_INITS = rf"[{RU_UP}][{RU_LOW}\-]+(?:\s+[{RU_UP}]\.\s*[{RU_UP}]\.)"
 FIO_FULL  = rf"[{RU_UP}][{RU_LOW}\-]+(?:\s+[{RU_UP}][{RU_LOW}\-]+){{1,2}}"
 
+# окно поиска полей шапки: на длинном/битом тексте пролёты вида [\s\S]{0,400}? + \s*
+# иначе перебираются по всему документу (см. app.services.regex_guard)
+HEAD_WINDOW = 4000
+
 # ---------- ПАРСЕР: Заявление об отказе от ознакомления ----------
 def parse_zayavlenie_otkaz(text: str, filename: Optional[str] = None) -> Dict[str, Optional[str]]:
     """
@@ -39,7 +43,7 @@ def parse_zayavlenie_otkaz(text: str, filename: Optional[str] = None) -> Dict[st
       • без «От:», когда данные заявителя перечислены строками
     Возвращает РОВНО 11 полей.
     """
-    t = (text or "").replace("ё", "е")
+    t = text or ""   # уже нормализован в parse_document (app.services.textnorm: ё→е, пробелы, CRLF)
 
     type_document = "Заявление об отказе от ознакомления"
     view_document = "Заявление"
@@ -65,10 +69,10 @@ def parse_zayavlenie_otkaz(text: str, filename: Optional[str] = None) -> Dict[st
     # ФИО адресата рядом
     post_main_fn = _find(
         rf"""Следовател[\s\S]{{0,400}}?
-             (?:майор|подполковник|полковник|капитан|лейтенант|старший\s+лейтенант)?\s*
-             (?:СЭР|полиции)?\s*
+             (?:майор|подполковник|полковник|капитан|лейтенант|старший\s+лейтенант)?\s*+
+             (?:СЭР|полиции)?\s*+
              ({FIO_INITS})
-        """, t, flags=re.I | re.S | re.X
+        """, t[:HEAD_WINDOW], flags=re.I | re.S | re.X
     )
 
     # --- блок заявителя (оба варианта) ---
@@ -76,8 +80,10 @@ def parse_zayavlenie_otkaz(text: str, filename: Optional[str] = None) -> Dict[st
     applicant_block = _find(r"(От\s*:[\s\S]{0,500}?)(?=\n\s*ЗАЯВЛЕНИЕ\b)", t)
     # B) если нет «От:», возьмём 400 символов перед заголовком
     if not applicant_block:
-        pre = _find(r"([\s\S]{0,400})\n\s*ЗАЯВЛЕНИЕ\b", t)
-        applicant_block = pre or ""
+        # сначала заголовок, потом 400 символов перед ним (регулярка с [\s\S]{0,400} в начале
+        # перебирала бы 400 вариантов на каждой позиции текста)
+        head = re.search(r"\n\s*ЗАЯВЛЕНИЕ\b", t, re.I)
+        applicant_block = t[max(0, head.start() - 400):head.start()] if head else ""
 
     applicant_fio   = _find(rf"(?:От\s*:)?\s*({FIO_FULL})", applicant_block)
     applicant_dob   = _find(r"(\d{2}\.\d{2}\.\d{4})\s*г\.?\s*р\.?", applicant_block)
@@ -0,0 +1,576 @@
+# app/services/watch.py
+"""
+Демон папки-приёмника: новые сканы индексируются без ручной загрузки.
+
+Каталоги из WATCH_DIRS (или аргументов) отслеживаются через Linux inotify — ctypes
+к libc, без сторонних пакетов; подкаталоги добавляются по мере появления.
+Конвейер:
+
+  1. событие (IN_CLOSE_WRITE / IN_MOVED_TO / IN_MODIFY / IN_CREATE) ставит файл
+     в ожидание; файл готов, когда WATCH_DEBOUNCE_MS нет событий и size/mtime
+     не изменились между двумя stat — недописанный по сети скан не читается;
+  2. готовые файлы читаются и разбираются в пуле процессов (как app.services.ingest);
+  3. разобранные копятся в микропакет: WATCH_BATCH штук или WATCH_BATCH_WAIT_MS
+     с первого — и индексируются одной вставкой (ingest.index_batch → ReportKUI
+     + архив сырого текста).
+
+Противодавление: разбор не уходит вперёд индексации больше чем на WATCH_QUEUE_MAX
+файлов — медленная вставка останавливает приём; события ждут в очереди ядра, а при её
+переполнении (IN_Q_OVERFLOW) каталоги пересканируются. Ошибка вставки оставляет
+пакет в буфере и повторяется с экспоненциальной паузой (до WATCH_BACKOFF_MAX_S).
+Объекты, отвергнутые поштучно (insert_reports вернул None), повторяются той же паузой
+до WATCH_INSERT_ATTEMPTS раз и только потом отмечаются ошибкой; пакет, отвергнутый
+целиком, считается недоступностью индекса и попыток не тратит. Ошибка вставки в чекпоинте
+не мешает пересканированию взять файл снова. Повтор не плодит
+дубли: UUID документа — от пути файла, вставка — upsert (ingest.index_batch).
+
+Пересканирование раз в WATCH_RESCAN_S — страховка для сетевых шар (SMB/NFS не шлют
+inotify о записях с других машин); без inotify (не Linux) — только оно. Обработанные
+файлы отмечаются в чекпоинте (формат app.services.ingest), перезапуск их не повторяет.
+
+Метрики (WATCH_METRICS_PORT, 0 — выкл.): GET /metrics — текстовый формат Prometheus,
+GET /stats — JSON. Главная — watch_index_lag_seconds: от появления файла в папке
+(первое событие; для найденных сканированием — ctime) до возврата вставки, после
+которого документ находится поиском.
+
+Запуск:
+    python -m app.services.watch                       # каталоги из WATCH_DIRS
+    python -m app.services.watch /mnt/share/scans --workers 2
+
+ENV: WATCH_DIRS, WATCH_EXT=.pdf,.txt, WATCH_DEBOUNCE_MS=2000, WATCH_BATCH=20,
+     WATCH_BATCH_WAIT_MS=1000, WATCH_QUEUE_MAX=64, WATCH_BACKOFF_MAX_S=60, WATCH_INSERT_ATTEMPTS=5,
+     WATCH_RESCAN_S=300, WATCH_CHECKPOINT=./data/ingest/watch.jsonl,
+     WATCH_METRICS_HOST=127.0.0.1, WATCH_METRICS_PORT=9108
+"""
+from __future__ import annotations
+import argparse
+import ctypes
+import ctypes.util
+import json
+import logging
+import os
+import select
+import signal
+import struct
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from app.services import ingest
+
+logger = logging.getLogger(__name__)
+
+
+def _env_list(name: str, default: str) -> List[str]:
+    return [x.strip() for x in os.getenv(name, default).replace(os.pathsep, ",").split(",") if x.strip()]
+
+
+def watch_dirs() -> List[str]:
+    return _env_list("WATCH_DIRS", "")
+
+
+def watch_ext() -> Tuple[str, ...]:
+    return tuple(e.lower() if e.startswith(".") else "." + e.lower() for e in _env_list("WATCH_EXT", ".pdf,.txt"))
+
+
+def debounce_s() -> float:
+    return float(os.getenv("WATCH_DEBOUNCE_MS", "2000")) / 1000
+
+
+def batch_size() -> int:
+    return max(1, int(os.getenv("WATCH_BATCH", "20")))
+
+
+def batch_wait_s() -> float:
+    return float(os.getenv("WATCH_BATCH_WAIT_MS", "1000")) / 1000
+
+
+def queue_max() -> int:
+    return max(1, int(os.getenv("WATCH_QUEUE_MAX", "64")))
+
+
+def backoff_max_s() -> float:
+    return float(os.getenv("WATCH_BACKOFF_MAX_S", "60"))
+
+
+def insert_attempts() -> int:
+    return max(1, int(os.getenv("WATCH_INSERT_ATTEMPTS", "5")))
+
+
+def rescan_s() -> float:
+    return float(os.getenv("WATCH_RESCAN_S", "300"))
+
+
+def checkpoint_path() -> Path:
+    return Path(os.getenv("WATCH_CHECKPOINT", "./data/ingest/watch.jsonl"))
+
+
+def metrics_addr() -> Tuple[str, int]:
+    return os.getenv("WATCH_METRICS_HOST", "127.0.0.1"), int(os.getenv("WATCH_METRICS_PORT", "9108"))
+
+
+# временные имена копировщиков/сканеров: файл ещё пишется под другим именем
+_TEMP_SUFFIXES = (".part", ".partial", ".tmp", ".crdownload", ".download", ".filepart")
+
+
+def wanted(name: str, exts: Tuple[str, ...]) -> bool:
+    low = name.lower()
+    return (not low.startswith((".", "~$")) and low.endswith(exts)
+            and not low.endswith(_TEMP_SUFFIXES))
+
+
+# -------------------------
+# inotify (ctypes к libc)
+# -------------------------
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE_SELF
+_EVENT = struct.Struct("iIII")
+
+
+class Inotify:
+    """Рекурсивное наблюдение за деревьями каталогов; read() → [(путь, это_каталог)], overflow-флаг."""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("inotify is not available")
+        self._libc = libc
+        self.fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._dirs: Dict[int, str] = {}
+
+    def add_tree(self, root: str) -> List[str]:
+        """Наблюдение за root и всеми подкаталогами; возвращает добавленные каталоги."""
+        added = []
+        for dirpath, dirnames, _ in os.walk(root):
+            dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+            wd = self._libc.inotify_add_watch(self.fd, os.fsencode(dirpath), _MASK)
+            if wd < 0:
+                logger.warning("inotify_add_watch(%s) failed: errno %d (fs.inotify.max_user_watches?)",
+                               dirpath, ctypes.get_errno())
+                continue
+            self._dirs[wd] = dirpath
+            added.append(dirpath)
+        return added
+
+    def read(self, timeout: float) -> Tuple[List[Tuple[str, bool]], bool]:
+        r, _, _ = select.select([self.fd], [], [], max(0.0, timeout))
+        if not r:
+            return [], False
+        try:
+            buf = os.read(self.fd, 1 << 16)
+        except BlockingIOError:
+            return [], False
+        out, overflow, i = [], False, 0
+        while i + _EVENT.size <= len(buf):
+            wd, mask, _cookie, ln = _EVENT.unpack_from(buf, i)
+            name = os.fsdecode(buf[i + _EVENT.size:i + _EVENT.size + ln].rstrip(b"\0"))
+            i += _EVENT.size + ln
+            if mask & IN_Q_OVERFLOW:
+                overflow = True
+            elif mask & (IN_IGNORED | IN_DELETE_SELF):
+                self._dirs.pop(wd, None)
+            elif wd in self._dirs and name:
+                out.append((os.path.join(self._dirs[wd], name), bool(mask & IN_ISDIR)))
+        return out, overflow
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+# -------------------------
+# Метрики
+# -------------------------
+LAG_BUCKETS = (1, 2, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+
+
+class Metrics:
+    """Счётчики демона; читаются из потока HTTP-сервера, поэтому под замком."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters: Dict[str, int] = {
+            "files_seen": 0, "indexed_done": 0, "indexed_partial": 0, "failed_read": 0,
+            "failed_parse": 0, "failed_insert": 0, "insert_batches": 0, "insert_errors": 0,
+            "insert_retries": 0, "rescans": 0, "overflows": 0,
+        }
+        self.gauges: Dict[str, float] = {
+            "pending_files": 0, "queued_files": 0, "oldest_unindexed_age_seconds": 0,
+            "last_insert_seconds": 0, "last_lag_seconds": 0, "backoff_seconds": 0,
+        }
+        self.lag_buckets = [0] * (len(LAG_BUCKETS) + 1)
+        self.lag_sum = 0.0
+        self.lag_count = 0
+        self.started = time.time()
+
+    def inc(self, name: str, n: int = 1) -> None:
+        with self.lock:
+            self.counters[name] += n
+
+    def set(self, **gauges: float) -> None:
+        with self.lock:
+            self.gauges.update(gauges)
+
+    def observe_lag(self, seconds: float) -> None:
+        with self.lock:
+            i = next((k for k, b in enumerate(LAG_BUCKETS) if seconds <= b), len(LAG_BUCKETS))
+            self.lag_buckets[i] += 1
+            self.lag_sum += seconds
+            self.lag_count += 1
+            self.gauges["last_lag_seconds"] = round(seconds, 3)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            return {"uptime_s": round(time.time() - self.started, 1), **self.counters, **self.gauges,
+                    "lag_count": self.lag_count,
+                    "lag_avg_s": round(self.lag_sum / self.lag_count, 3) if self.lag_count else None}
+
+    def prometheus(self) -> str:
+        with self.lock:
+            lines = []
+            for k, v in self.counters.items():
+                lines += [f"# TYPE watch_{k}_total counter", f"watch_{k}_total {v}"]
+            for k, v in self.gauges.items():
+                lines += [f"# TYPE watch_{k} gauge", f"watch_{k} {v}"]
+            lines.append("# TYPE watch_index_lag_seconds histogram")
+            acc = 0
+            for b, n in zip(LAG_BUCKETS, self.lag_buckets):
+                acc += n
+                lines.append(f'watch_index_lag_seconds_bucket{{le="{b}"}} {acc}')
+            lines.append(f'watch_index_lag_seconds_bucket{{le="+Inf"}} {self.lag_count}')
+            lines.append(f"watch_index_lag_seconds_sum {round(self.lag_sum, 3)}")
+            lines.append(f"watch_index_lag_seconds_count {self.lag_count}")
+        return "\n".join(lines) + "\n"
+
+
+def serve_metrics(metrics: Metrics, host: str, port: int) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/metrics":
+                body, ctype = metrics.prometheus().encode(), "text/plain; version=0.0.4"
+            elif self.path == "/stats":
+                body, ctype = json.dumps(metrics.snapshot(), ensure_ascii=False).encode(), "application/json"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):   # без строки в лог на каждый опрос
+            pass
+
+    srv = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=srv.serve_forever, name="watch-metrics", daemon=True).start()
+    return srv
+
+
+# -------------------------
+# Демон
+# -------------------------
+class _Pending:
+    __slots__ = ("arrival", "last_event", "stat")
+
+    def __init__(self, arrival: float, now: float):
+        self.arrival = arrival        # wall clock: начало отсчёта задержки индексации
+        self.last_event = now         # monotonic
+        self.stat: Optional[Tuple[int, int]] = None
+
+
+class Watcher:
+    def __init__(self, dirs: List[str], workers: Optional[int] = None, metrics: Optional[Metrics] = None):
+        self.dirs = [str(Path(d).resolve()) for d in dirs]
+        self.exts = watch_ext()
+        self.workers = workers or max(1, min(4, (os.cpu_count() or 2) - 1))
+        self.metrics = metrics or Metrics()
+        self.stop = threading.Event()
+
+        self.pending: Dict[str, _Pending] = {}          # ждут успокоения файла
+        self.ready: List[Tuple[str, float]] = []         # (path, arrival) — к разбору
+        self.inflight: Dict[Any, Tuple[str, float, Tuple[str, int, int]]] = {}
+        self.buffer: List[Tuple[Tuple[str, str, Dict[str, Any], str, str], float, Tuple[str, int, int]]] = []
+        self.attempts: Dict[str, int] = {}               # path → неудачных поштучных вставок
+        self.queued: Set[str] = set()                    # ready + inflight + buffer: не ставить дважды
+        self.buffer_since = 0.0
+        self.backoff = 0.0
+        self.retry_at = 0.0
+
+        self.ck_path = checkpoint_path()
+        self.ck_path.parent.mkdir(parents=True, exist_ok=True)
+        self.done = ingest.load_checkpoint(self.ck_path)
+        self.ck = self.ck_path.open("a", encoding="utf-8")
+
+        try:
+            self.inotify: Optional[Inotify] = Inotify()
+        except OSError as e:
+            logger.warning("inotify unavailable (%s): polling every %ss", e, rescan_s())
+            self.inotify = None
+
+    # --- приём файлов
+    def _seen(self, path: str) -> bool:
+        """Уже обработан в этой версии (готов, частичен или ошибка чтения/разбора).
+        Ошибка вставки — не «обработан»: пересканирование возьмёт файл снова."""
+        rec = self.done.get(path)
+        if rec is None or (rec.get("error") or "").startswith("insert"):
+            return False
+        try:
+            st = os.stat(path)
+        except OSError:
+            return True
+        return rec.get("size") == st.st_size and rec.get("mtime_ns") == st.st_mtime_ns
+
+    def touch(self, path: str, arrival: Optional[float] = None) -> None:
+        if path in self.queued or not wanted(os.path.basename(path), self.exts):
+            return
+        now = time.monotonic()
+        p = self.pending.get(path)
+        if p is None:
+            self.pending[path] = _Pending(arrival if arrival is not None else time.time(), now)
+            self.metrics.inc("files_seen")
+        else:
+            p.last_event = now
+
+    def _scan_files(self, root: str) -> Iterator[str]:
+        for p in ingest.iter_files(Path(root), self.exts):
+            if wanted(p.name, self.exts):
+                yield str(p)
+
+    def rescan(self) -> None:
+        self.metrics.inc("rescans")
+        now = time.time()
+        for root in self.dirs:
+            for path in self._scan_files(root):
+                if path in self.pending or path in self.queued or self._seen(path):
+                    continue
+                try:
+                    ctime = os.stat(path).st_ctime   # ctime не сохраняется копированием с -p, в отличие от mtime
+                except OSError:
+                    continue
+                self.touch(path, min(ctime, now))
+
+    def _settle(self) -> None:
+        """Файлы без событий дольше debounce и с неизменным size/mtime → ready."""
+        now, quiet = time.monotonic(), debounce_s()
+        for path, p in list(self.pending.items()):
+            if now - p.last_event < quiet:
+                continue
+            try:
+                st = os.stat(path)
+            except OSError:   # удалён/переименован до готовности
+                del self.pending[path]
+                continue
+            cur = (st.st_size, st.st_mtime_ns)
+            if p.stat == cur and st.st_size > 0:
+                del self.pending[path]
+                self.ready.append((path, p.arrival))
+                self.queued.add(path)
+            else:
+                p.stat, p.last_event = cur, now
+
+    # --- разбор и индексация
+    def _submit(self, pool: ProcessPoolExecutor) -> None:
+        # противодавление: разбор не уходит вперёд индексации больше чем на queue_max файлов
+        limit = queue_max()
+        while self.ready and len(self.inflight) + len(self.buffer) < limit and not self.retry_at:
+            path, arrival = self.ready.pop(0)
+            try:
+                key = ingest._file_key(Path(path))
+            except OSError:
+                self.queued.discard(path)
+                continue
+            fut = pool.submit(ingest._read_parse, (path, os.path.basename(path)))
+            self.inflight[fut] = (path, arrival, key)
+
+    def _collect(self) -> None:
+        for fut in [f for f in self.inflight if f.done()]:
+            path, arrival, key = self.inflight.pop(fut)
+            try:
+                _, text, fields, status, td, error = fut.result()
+            except Exception as e:   # упал процесс пула
+                text, fields, status, td = None, None, ingest.STATUS_ERROR, None
+                error = f"parse: {type(e).__name__}: {e}"
+            if error:
+                logger.warning("watch %s: %s", path, error)
+                self.metrics.inc("failed_read" if error.startswith("read") else "failed_parse")
+                self._mark(key, ingest.STATUS_ERROR, error=error)
+                self.queued.discard(path)
+                continue
+            if not self.buffer:
+                self.buffer_since = time.monotonic()
+            self.buffer.append(((path, text, fields, status, td), arrival, key))
+
+    def _flush(self, force: bool = False) -> None:
+        if not self.buffer:
+            return
+        now = time.monotonic()
+        if self.retry_at and now < self.retry_at:
+            return
+        if not force and len(self.buffer) < batch_size() and now - self.buffer_since < batch_wait_s():
+            return
+        batch = self.buffer[:batch_size()]
+        t0 = time.perf_counter()
+        ids, err = ingest.index_batch([row for row, _, _ in batch])
+        took = time.perf_counter() - t0
+        self.metrics.inc("insert_batches")
+        self.metrics.set(last_insert_seconds=round(took, 3))
+        if not any(ids) and (err != ingest.ERR_NO_ID or len(batch) > 1):
+            # индекс недоступен (или отверг весь пакет — тоже сбой индекса, а не файлов):
+            # пакет остаётся в буфере, приём стоит (см. _submit), пауза растёт, попытки не тратятся
+            self.metrics.inc("insert_errors")
+            self._backoff(now)
+            logger.warning("watch: insert failed (%s), retry in %.0fs, %d files buffered", err, self.backoff,
+                           len(self.buffer))
+            return
+        del self.buffer[:len(batch)]
+        indexed_at = time.time()
+        retry = []
+        for uid, item in zip(ids, batch):
+            (path, _, _, status, _), arrival, key = item
+            if uid:
+                self.queued.discard(path)
+                self.attempts.pop(path, None)
+                self._mark(key, status, uid)
+                self.metrics.inc("indexed_partial" if status == ingest.STATUS_PARTIAL else "indexed_done")
+                self.metrics.observe_lag(max(0.0, indexed_at - arrival))
+                continue
+            n = self.attempts.get(path, 0) + 1
+            if n < insert_attempts():   # отдельный объект отвергнут — повтор после паузы
+                self.attempts[path] = n
+                retry.append(item)
+                continue
+            # попытки исчерпаны: ошибка до изменения файла
+            self.queued.discard(path)
+            self.attempts.pop(path, None)
+            self._mark(key, ingest.STATUS_ERROR, error=err)
+            self.metrics.inc("failed_insert")
+        if retry:
+            self.buffer[:0] = retry
+            self.metrics.inc("insert_retries", len(retry))
+            self._backoff(now)
+            logger.warning("watch: %d objects rejected (%s), retry in %.0fs", len(retry), err, self.backoff)
+        else:
+            self.backoff, self.retry_at = 0.0, 0.0
+            self.metrics.set(backoff_seconds=0)
+        self.buffer_since = time.monotonic()
+        self.ck.flush()
+
+    def _backoff(self, now: float) -> None:
+        self.backoff = min(backoff_max_s(), max(1.0, self.backoff * 2))
+        self.retry_at = now + self.backoff
+        self.metrics.set(backoff_seconds=self.backoff)
+
+    def _mark(self, key: Tuple[str, int, int], status: str, uid: Optional[str] = None,
+              error: Optional[str] = None) -> None:
+        self.ck.write(ingest.checkpoint_line(key, status, uid, error))
+        self.done[key[0]] = {"path": key[0], "size": key[1], "mtime_ns": key[2], "status": status, "error": error}
+
+    def _gauges(self) -> None:
+        now = time.time()
+        arrivals = ([p.arrival for p in self.pending.values()] + [a for _, a in self.ready]
+                    + [a for _, a, _ in self.inflight.values()] + [a for _, a, _ in self.buffer])
+        self.metrics.set(pending_files=len(self.pending), queued_files=len(self.queued),
+                         oldest_unindexed_age_seconds=round(now - min(arrivals), 3) if arrivals else 0)
+
+    # --- главный цикл
+    def run(self) -> None:
+        for d in self.dirs:
+            if self.inotify is not None:
+                self.inotify.add_tree(d)
+            logger.info("watching %s (%s)", d, "inotify" if self.inotify else "polling")
+        self.rescan()
+        next_rescan = time.monotonic() + rescan_s()
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=ingest._init_worker) as pool:
+            while not self.stop.is_set():
+                timeout = min(0.5, debounce_s() / 2, batch_wait_s() / 2) if (self.pending or self.inflight
+                                                                              or self.buffer) else 1.0
+                if self.inotify is not None:
+                    events, overflow = self.inotify.read(timeout)
+                    for path, is_dir in events:
+                        if is_dir:
+                            # файлы могли появиться до того, как на новый каталог встал watch
+                            for d in self.inotify.add_tree(path):
+                                for f in self._scan_files(d):
+                                    self.touch(f)
+                        else:
+                            self.touch(path)
+                    if overflow:
+                        self.metrics.inc("overflows")
+                        logger.warning("inotify queue overflow: rescanning")
+                        self.rescan()
+                else:
+                    self.stop.wait(timeout)
+                if time.monotonic() >= next_rescan:
+                    self.rescan()
+                    next_rescan = time.monotonic() + rescan_s()
+                self._settle()
+                self._submit(pool)
+                self._collect()
+                self._flush()
+                self._gauges()
+
+            # остановка: дождаться начатого разбора и попытаться проиндексировать буфер
+            for fut in list(self.inflight):
+                fut.result()
+            self._collect()
+            self.retry_at = 0.0
+            while self.buffer and not self.retry_at:
+                self._flush(force=True)
+        if self.buffer:
+            logger.warning("watch: %d parsed files not indexed on shutdown (will be picked up on restart)",
+                           len(self.buffer))
+        self.ck.close()
+        if self.inotify is not None:
+            self.inotify.close()
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("dirs", nargs="*", help="каталоги (по умолчанию WATCH_DIRS)")
+    ap.add_argument("--workers", type=int)
+    ap.add_argument("--budget-ms", type=float, help="бюджет CPU на документ (PARSE_BUDGET_MS)")
+    args = ap.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    from dotenv import load_dotenv
+    load_dotenv()
+    if args.budget_ms is not None:
+        os.environ["PARSE_BUDGET_MS"] = str(args.budget_ms)
+    dirs = args.dirs or watch_dirs()
+    if not dirs:
+        ap.error("no directories: pass them as arguments or set WATCH_DIRS")
+    for d in dirs:
+        if not os.path.isdir(d):
+            ap.error(f"not a directory: {d}")
+
+    w = Watcher(dirs, args.workers)
+    host, port = metrics_addr()
+    srv = serve_metrics(w.metrics, host, port) if port else None
+    if srv:
+        logger.info("metrics on http://%s:%d/metrics", host, srv.server_address[1])
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: w.stop.set())
+    try:
+        w.run()
+    finally:
+        if srv:
+            srv.shutdown()
+    print(json.dumps(w.metrics.snapshot(), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
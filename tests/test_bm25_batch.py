@@ -0,0 +1,33 @@
+# tests/test_bm25_batch.py
+"""/search/bm25/batch: ошибка фильтра одного запроса — в его error, а не 422 на весь батч."""
+from __future__ import annotations
+
+import pytest
+from pydantic import ValidationError
+
+from app.core import backend, fts_store
+from app.schemas.schemas import BM25BatchRequest, BM25Request
+
+BAD = {"date_doc": {"bogus": "2025-01-01"}}
+
+
+@pytest.fixture
+def sqlite_backend(tmp_path, monkeypatch):
+    monkeypatch.setenv("BM25_BACKEND", "sqlite")
+    monkeypatch.setenv("FTS_DB_PATH", str(tmp_path / "fts.sqlite3"))
+    monkeypatch.setattr(fts_store, "_CONN", None)
+    fts_store.insert_reports([{"report_begin": "кража велосипеда", "city_fix": "Алматы"}])
+    yield
+    fts_store._CONN.close()
+
+
+def test_single_request_still_rejects_bad_filter():
+    with pytest.raises(ValidationError):
+        BM25Request(query="кража", filters=BAD)
+
+
+def test_bad_filter_fails_only_its_query(sqlite_backend):
+    req = BM25BatchRequest(queries=[{"query": "кража"}, {"query": "кража", "filters": BAD}])
+    res = backend.bm25_search_batch([q.model_dump() for q in req.queries])
+    assert len(res[0]["hits"]) == 1 and res[0]["error"] is None
+    assert res[1]["hits"] == [] and "bogus" in res[1]["error"]
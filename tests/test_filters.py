@@ -0,0 +1,38 @@
+# tests/test_filters.py
+"""Отрицание диапазона даты в DSL фильтров (app.core.filters): документы без даты не попадают."""
+from __future__ import annotations
+
+import pytest
+
+from app.core import fts_store
+from app.core.filters import parse_filters
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setenv("FTS_DB_PATH", str(tmp_path / "fts.sqlite3"))
+    monkeypatch.setattr(fts_store, "_CONN", None)
+    fts_store.insert_reports([
+        {"report_begin": "кража", "date_doc": "01.03.2025", "city_fix": "Алматы"},
+        {"report_begin": "кража", "date_doc": "01.07.2025", "city_fix": "Павлодар"},
+        {"report_begin": "кража", "city_fix": "Экибастуз"},
+    ])
+    yield
+    fts_store._CONN.close()
+
+
+def _cities(filters):
+    hits = fts_store.bm25_search("кража", ["report_begin"], limit=10, filters=filters)
+    return sorted(h["properties"]["city_fix"] for h in hits)
+
+
+def test_not_range_is_complement_range():
+    assert parse_filters({"not": {"date_doc": {"gt": "2025-05-01"}}}) == \
+        ("cmp", "date_doc", "lte", parse_filters({"date_doc": {"lte": "2025-05-01"}})[3])
+
+
+def test_not_range_excludes_missing_date(db):
+    assert _cities({"date_doc": {"gt": "2025-05-01"}}) == ["Павлодар"]
+    assert _cities({"not": {"date_doc": {"gt": "2025-05-01"}}}) == ["Алматы"]
+    # ne, в отличие от диапазона, пустые поля включает
+    assert _cities({"not": {"date_doc": "01.07.2025"}}) == ["Алматы", "Экибастуз"]
@@ -0,0 +1,207 @@
+# tests/test_local_store.py
+"""app.core.local_store как бэкенд BM25_BACKEND=local (app.core.backend)."""
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from app.core import backend, local_store
+
+
+class _Embedder:
+    """Детерминированные векторы вместо Ollama: хэш слов → 16 координат."""
+
+    def embed_passages(self, texts, project=True):
+        out = []
+        for t in texts:
+            v = np.zeros(16, dtype=np.float32)
+            for w in t.lower().split():
+                v[hash(w) % 16] += 1.0
+            out.append((v + 1e-3).tolist())
+        return out
+
+    def embed_query(self, text):
+        return self.embed_passages([text])[0]
+
+
+DOCS = [
+    {"type_document": "Рапорт КУИ", "city_fix": "г. Павлодар", "post_main": "Руководитель отдела",
+     "date_doc": "17 апреля 2025 года", "report_begin": "перевод USDT на кошелёк",
+     "report_next": "КУИ № 255500120000201 дата регистрации"},
+    {"type_document": "Рапорт ЕРДР", "city_fix": "Экибастуз", "post_main": "старший следователь",
+     "date_doc": "01.02.2024", "report_begin": "реклама TAKORP в Telegram"},
+    {"type_document": "Постановление", "city_fix": "Павлодар", "date_doc": "2025-03-05",
+     "report_begin": "перевод на карту", "report_next": "КУИ № 255500120000201"},
+]
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setenv("BM25_BACKEND", "local")
+    monkeypatch.setenv("LOCAL_STORE_DIR", str(tmp_path / "store"))
+    monkeypatch.setenv("BM25_STEMMING", "false")
+    monkeypatch.setattr("app.core.embeddings.get_embedder", lambda: _Embedder())
+    local_store.drop_collection()
+    yield local_store
+    local_store.drop_collection()
+
+
+def _types(hits):
+    return sorted(h["properties"]["type_document"] for h in hits)
+
+
+def test_backend_switch_selects_local_store(store):
+    assert backend.bm25_backend() == "local"
+    assert backend._impl() is local_store
+
+
+def test_bm25_search_ranks_and_filters(store):
+    backend.insert_reports(DOCS)
+    hits = backend.bm25_search("перевод кошелёк", ["report_begin"], limit=5)
+    assert [h["properties"]["type_document"] for h in hits] == ["Рапорт КУИ", "Постановление"]
+    assert hits[0]["score"] > hits[1]["score"] > 0
+    hits = backend.bm25_search("перевод", ["report_begin"], filters={"city_fix": "Экибастуз"})
+    assert hits == []
+
+
+def test_eq_matches_words_like_weaviate(store):
+    backend.insert_reports(DOCS)
+    assert _types(backend.fetch_reports(filters={"city_fix": "Павлодар"})) == ["Постановление", "Рапорт КУИ"]
+    assert _types(backend.fetch_reports(filters={"type_document": "куи рапорт"})) == ["Рапорт КУИ"]
+    assert _types(backend.fetch_reports(filters={"type_document": ["КУИ", "ЕРДР"]})) == ["Рапорт ЕРДР", "Рапорт КУИ"]
+    assert _types(backend.fetch_reports(filters={"not": {"city_fix": "Павлодар"}})) == ["Рапорт ЕРДР"]
+
+
+def test_like_matches_each_word(store):
+    backend.insert_reports(DOCS)
+    assert _types(backend.fetch_reports(filters={"post_main": {"like": "руковод"}})) == ["Рапорт КУИ"]
+    assert _types(backend.fetch_reports(filters={"post_main": {"like": "*ледоват*"}})) == ["Рапорт ЕРДР"]
+    assert backend.fetch_reports(filters={"post_main": {"like": "Руководитель отдела"}}) == []
+
+
+def test_date_range_and_month_key(store):
+    backend.insert_reports(DOCS)
+    assert _types(backend.fetch_reports(filters={"date_doc": {"gte": "2025-01-01"}})) == ["Постановление", "Рапорт КУИ"]
+    assert _types(backend.fetch_reports(filters={"date_doc_month": "2024-02"})) == ["Рапорт ЕРДР"]
+
+
+def test_fetch_case_by_number_in_date_order(store):
+    backend.insert_reports(DOCS)
+    items = backend.fetch_case("255500120000201")
+    assert [i["properties"]["type_document"] for i in items] == ["Постановление", "Рапорт КУИ"]
+
+
+def test_facet_counts(store):
+    backend.insert_reports(DOCS)
+    res, cached = backend.facet_counts(["city_fix", "date_doc_month"], filters={"city_fix": "Павлодар"})
+    assert res["total"] == 2
+    assert {v["value"] for v in res["facets"]["city_fix"]["values"]} == {"г. Павлодар", "Павлодар"}
+    assert res["facets"]["date_doc_month"]["values"][0]["count"] == 1
+
+
+def test_insert_with_ids_upserts(store):
+    ids = ["00000000-0000-0000-0000-000000000001", "00000000-0000-0000-0000-000000000002"]
+    backend.insert_reports(DOCS[:2], ids=ids)
+    backend.insert_reports([{**DOCS[0], "city_fix": "Астана"}], ids=ids[:1])
+    items = backend.fetch_reports()
+    assert sorted(i["uuid"] for i in items) == ids
+    assert _types(backend.fetch_reports(filters={"city_fix": "Астана"})) == ["Рапорт КУИ"]
+    assert backend.fetch_reports(filters={"city_fix": "Павлодар"}) == []
+
+
+def test_update_keeps_vector_and_skips_deleted(store):
+    ids = backend.insert_reports(DOCS)
+    st = store.get_store()
+    before = np.array(st._mat[st.live_row(ids[1])])
+    store.get_store().delete([ids[2]])
+    n = backend.update_reports([(ids[1], {**DOCS[1], "city_fix": "Астана"}, None),
+                                (ids[2], DOCS[2], None)])
+    assert n == 1
+    # city_fix входит в report_text — текст изменился, вектор пересчитан
+    assert not np.allclose(st._mat[st.live_row(ids[1])], before)
+    assert st.live_row(ids[2]) is None
+    assert _types(backend.fetch_reports(filters={"city_fix": "Астана"})) == ["Рапорт ЕРДР"]
+
+
+def test_state_survives_reopen(store):
+    ids = backend.insert_reports(DOCS)
+    backend.update_reports([(ids[0], {**DOCS[0], "city_fix": "Астана"}, None)])
+    store._STORE = None
+    assert _types(backend.fetch_reports(filters={"city_fix": "Астана"})) == ["Рапорт КУИ"]
+    assert len(backend.fetch_reports()) == 3
+    assert [r for chunk in backend.iter_reports() for r in chunk][0][0] in ids
+
+
+def test_crash_after_meta_append_loses_no_later_rows(store, tmp_path):
+    ids = local_store.insert_reports(DOCS[:1], vectors=[[1.0, 0.0, 0.0, 0.0]])
+    st = store.get_store()
+    # сбой между дозаписью meta.jsonl и _save_state: строка есть, count — прежний
+    with (st.path / "meta.jsonl").open("a", encoding="utf-8") as f:
+        f.write('{"id": "ghost", "properties": {"type_document": "Призрак"}}\n')
+    store._STORE = None
+    new = local_store.insert_reports(DOCS[1:2], vectors=[[0.0, 1.0, 0.0, 0.0]])
+    store._STORE = None
+    st = store.get_store()
+    assert st.ids == ids + new
+    assert "ghost" not in st.id_to_row
+    assert local_store.vector_search([0.0, 1.0, 0.0, 0.0], limit=1)[0]["id"] == new[0]
+    assert not list(st.path.glob("*.tmp"))
+
+
+def test_two_handles_on_one_dir_do_not_overwrite_rows(store):
+    # два экземпляра — как два процесса (flock — на открытый файл, не на процесс)
+    path = store.get_store().path
+    a, b = local_store.LocalVectorIndex(path), local_store.LocalVectorIndex(path)
+    a.add(np.eye(4)[[0]], [{"n": 0}], ["id-0"])
+    b.add(np.eye(4)[[1]], [{"n": 1}], ["id-1"])
+    a.add(np.eye(4)[[2]], [{"n": 2}], ["id-2"])
+    b.delete(["id-0"])
+    a.refresh()
+    assert a.ids == b.ids == ["id-0", "id-1", "id-2"]
+    assert a.live_row("id-0") is None
+    c = local_store.LocalVectorIndex(path)
+    for row, oid in enumerate(c.ids):
+        assert c.props[row]["n"] == int(oid[-1])
+        assert int(np.argmax(c._mat[row])) == int(oid[-1])
+
+
+def test_concurrent_writer_processes(store):
+    import multiprocessing as mp
+    path = store.get_store().path
+
+    def writer(k):
+        st = local_store.LocalVectorIndex(path)
+        for i in range(20):
+            v = np.zeros((1, 4), dtype=np.float32)
+            v[0, k] = 1.0
+            st.add(v, [{"k": k}], [f"{k}-{i}"])
+
+    procs = [mp.get_context("fork").Process(target=writer, args=(k,)) for k in range(3)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(30)
+    st = local_store.LocalVectorIndex(path)
+    assert st.count == 60 and len(set(st.ids)) == 60
+    for row, oid in enumerate(st.ids):
+        k = int(oid.split("-")[0])
+        assert st.props[row]["k"] == k and int(np.argmax(st._mat[row])) == k
+
+
+def test_update_reembeds_only_changed_text(store, monkeypatch):
+    ids = local_store.insert_reports(DOCS[:2], vectors=[[1.0, 0.0, 0.0, 0.0], [0.0, 1.0, 0.0, 0.0]])
+    st = store.get_store()
+    seen = []
+
+    class _Emb:
+        def embed_passages(self, texts, project=True):
+            seen.extend(texts)
+            return [[0.0, 0.0, 1.0, 0.0] for _ in texts]
+
+    monkeypatch.setattr("app.core.embeddings.get_embedder", lambda: _Emb())
+    monkeypatch.setattr(local_store, "_check_embedding", lambda: None)
+    changed = {**DOCS[0], "report_begin": "новый текст после reparse"}
+    assert backend.update_reports([(ids[0], changed, None), (ids[1], dict(DOCS[1]), None)]) == 2
+    assert seen == [local_store.report_text(changed)]
+    assert local_store.vector_search([0.0, 0.0, 1.0, 0.0], limit=1)[0]["id"] == ids[0]
+    assert np.allclose(st._mat[st.live_row(ids[1])], [0.0, 1.0, 0.0, 0.0])
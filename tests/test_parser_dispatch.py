@@ -0,0 +1,36 @@
+# tests/test_parser_dispatch.py
+"""Классификатор типа — только для документов, которые не узнали правила."""
+from __future__ import annotations
+
+from app.services import doc_classifier
+from app.services import parser_dispatch as pd
+
+
+def test_classifier_sees_only_rule_misses(monkeypatch):
+    seen = []
+
+    def predict(items):
+        seen.extend(items)
+        return [doc_classifier.Prediction("Рапорт ЕРДР", "Рапорт", 0.99)] * len(items)
+
+    monkeypatch.setattr(doc_classifier, "predict", predict)
+    metas = pd.detect_types_batch([
+        ("Рапорт КУИ.pdf", "текст"),
+        ("scan_0001.pdf", "неразборчиво"),
+    ])
+    assert [m["type_document"] for m in metas] == ["Рапорт КУИ", "Рапорт ЕРДР"]
+    assert [fn for fn, _ in seen] == ["scan_0001.pdf"]
+
+
+def test_rule_match_skips_classifier(monkeypatch):
+    def predict(items):
+        raise AssertionError("classifier called for a rule match")
+
+    monkeypatch.setattr(doc_classifier, "predict", predict)
+    assert pd.detect_type_and_view("Рапорт КУИ.pdf", "текст")["type_document"] == "Рапорт КУИ"
+
+
+def test_low_confidence_hint_stays_unknown(monkeypatch):
+    monkeypatch.setattr(doc_classifier, "predict",
+                        lambda items: [doc_classifier.Prediction("Рапорт ЕРДР", "Рапорт", 0.1)] * len(items))
+    assert pd.detect_type_and_view("scan.pdf", "неразборчиво") == pd.UNKNOWN_META
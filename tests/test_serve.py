@@ -0,0 +1,174 @@
+# tests/test_serve.py
+"""app.serve: супервизор (перезапуск, SIGHUP, SIGTERM) и сброс синглтонов после fork."""
+from __future__ import annotations
+
+import json
+import os
+import re
+import signal
+import subprocess
+import sys
+import textwrap
+import threading
+import time
+import urllib.request
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# супервизор над минимальным ASGI-приложением: /pid — pid воркера, /slow — ответ через 1 с
+SUPERVISOR = textwrap.dedent("""
+    import argparse, asyncio, logging, os, sys
+    from app.serve import Supervisor, _bind
+
+    async def app(scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                msg = await receive()
+                await send({"type": msg["type"] + ".complete"})
+                if msg["type"] == "lifespan.shutdown":
+                    return
+        if scope["path"] == "/slow":
+            await asyncio.sleep(1.0)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": str(os.getpid()).encode()})
+
+    logging.basicConfig(filename=sys.argv[1], level=logging.INFO, format="%(message)s")
+    args = argparse.Namespace(host="127.0.0.1", port=0, workers=2, preload=True, graceful_timeout=5.0,
+                              start_timeout=10, restart_delay=0.1, keep_alive=5, limit_concurrency=None,
+                              log_level="warning")
+    sock = _bind(args.host, 0, 64)
+    args.port = sock.getsockname()[1]
+    print(args.port, flush=True)
+    Supervisor(sock, app, args).run()
+""")
+
+
+def _wait(cond, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        v = cond()
+        if v:
+            return v
+        time.sleep(0.05)
+    raise AssertionError("timed out")
+
+
+class _Served:
+    def __init__(self, tmp_path: Path):
+        script = tmp_path / "supervisor.py"
+        script.write_text(SUPERVISOR, encoding="utf-8")
+        self.log = tmp_path / "serve.log"
+        self.proc = subprocess.Popen([sys.executable, str(script), str(self.log)], cwd=ROOT,
+                                     env={**os.environ, "PYTHONPATH": str(ROOT)},
+                                     stdout=subprocess.PIPE, text=True)
+        self.port = int(self.proc.stdout.readline())
+
+    def started(self) -> list[int]:
+        text = self.log.read_text() if self.log.exists() else ""
+        return [int(p) for p in re.findall(r"worker (\d+) started", text)]
+
+    def exited(self) -> list[int]:
+        text = self.log.read_text() if self.log.exists() else ""
+        return [int(p) for p in re.findall(r"worker (\d+) exited", text)]
+
+    def get(self, path: str = "/pid", timeout: float = 5.0) -> str:
+        with urllib.request.urlopen(f"http://127.0.0.1:{self.port}{path}", timeout=timeout) as r:
+            return r.read().decode()
+
+
+@pytest.fixture
+def served(tmp_path):
+    s = _Served(tmp_path)
+    _wait(lambda: len(s.started()) >= 2)
+    yield s
+    if s.proc.poll() is None:
+        s.proc.kill()
+        s.proc.wait()
+
+
+def test_workers_serve_on_shared_socket(served):
+    pid = int(served.get())
+    assert pid in served.started()
+    assert pid != served.proc.pid
+
+
+def test_crashed_worker_is_replaced(served):
+    first = served.started()
+    os.kill(first[0], signal.SIGKILL)
+    _wait(lambda: len(served.started()) == 3)
+    assert first[0] in served.exited()
+    assert int(served.get()) in served.started()[1:]
+
+
+def test_sighup_rolls_every_worker(served):
+    old = served.started()
+    served.proc.send_signal(signal.SIGHUP)
+    _wait(lambda: set(old) <= set(served.exited()))
+    new = [p for p in served.started() if p not in old]
+    assert len(new) == 2
+    assert int(served.get()) in new
+    assert "restart the supervisor to load new code" in served.log.read_text()
+
+
+def test_sigterm_drains_inflight_requests(served):
+    result = {}
+
+    def slow():
+        result["body"] = served.get("/slow")
+
+    t = threading.Thread(target=slow)
+    t.start()
+    time.sleep(0.3)   # запрос уже в воркере
+    served.proc.send_signal(signal.SIGTERM)
+    t.join(10)
+    assert result.get("body", "").isdigit()
+    assert served.proc.wait(10) == 0
+    assert set(served.started()) <= set(served.exited())
+
+
+# -------------------------
+# Сброс синглтонов после fork (os.register_at_fork)
+# -------------------------
+CHILD_CHECK = textwrap.dedent("""
+    import json, os, sys
+    from app.core import backend, facets, fts_store, local_store, raw_archive, tenancy
+
+    fts_store.get_conn(); raw_archive.get_conn(); backend._pool(); facets.get_cache()
+    local_store.get_store(); tenancy.touch("t1")
+    parent = {"fts": fts_store._CONN, "raw": raw_archive._CONN, "lock": fts_store._LOCK}
+
+    r, w = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        state = {
+            "fts_conn_reset": fts_store._CONN is None,
+            "fts_lock_new": fts_store._LOCK is not parent["lock"],
+            "raw_conn_reset": raw_archive._CONN is None,
+            "pool_reset": backend._POOL is None,
+            "facets_reset": facets._CACHE is None,
+            "store_reset": local_store._STORE is None,
+            "tenancy_reset": tenancy._CONN is None,
+            "fts_reopens": fts_store.count() == 0 and fts_store._CONN is not parent["fts"],
+        }
+        os.write(w, json.dumps(state).encode())
+        os._exit(0)
+    os.close(w)
+    data = os.read(r, 4096)
+    os.waitpid(pid, 0)
+    print(data.decode())
+""")
+
+
+def test_singletons_reset_after_fork(tmp_path):
+    env = {**os.environ, "PYTHONPATH": str(ROOT), "BM25_BACKEND": "sqlite",
+           "FTS_DB_PATH": str(tmp_path / "fts.sqlite3"), "RAW_ARCHIVE_PATH": str(tmp_path / "raw.sqlite3"),
+           "LOCAL_STORE_DIR": str(tmp_path / "store"), "REPORT_TENANCY": "case",
+           "TENANT_ACTIVITY_PATH": str(tmp_path / "activity.sqlite3")}
+    out = subprocess.run([sys.executable, "-c", CHILD_CHECK], cwd=ROOT, env=env,
+                         capture_output=True, text=True, timeout=60)
+    assert out.returncode == 0, out.stderr
+    state = json.loads(out.stdout.strip().splitlines()[-1])
+    assert all(state.values()), state
@@ -0,0 +1,70 @@
+# tests/test_tenant_reads.py
+"""Чтение с ?tenant= не создаёт тенантов (app.core.weaviate_client.read_report_collection)."""
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import pytest
+
+from app.core import weaviate_client as wc
+
+
+class _Tenants:
+    def __init__(self, names):
+        from weaviate.classes.tenants import TenantActivityStatus
+        self.items = {n: SimpleNamespace(name=n, activity_status=TenantActivityStatus.HOT) for n in names}
+        self.created = []
+
+    def get_by_name(self, name):
+        return self.items.get(name)
+
+    def get_by_names(self, names):
+        return {n: self.items[n] for n in names if n in self.items}
+
+    def create(self, tenants):
+        from weaviate.classes.tenants import TenantActivityStatus
+        for t in tenants:
+            self.created.append(t.name)
+            self.items[t.name] = SimpleNamespace(name=t.name, activity_status=TenantActivityStatus.HOT)
+
+    def update(self, tenants):
+        pass
+
+
+class _Col:
+    def __init__(self, names):
+        self.tenants = _Tenants(names)
+        self.tenant = None
+
+    def with_tenant(self, name):
+        c = _Col([])
+        c.tenants, c.tenant = self.tenants, name
+        return c
+
+
+@pytest.fixture
+def col(tmp_path, monkeypatch):
+    monkeypatch.setenv("REPORT_TENANCY", "case")
+    monkeypatch.setenv("TENANT_ACTIVITY_PATH", str(tmp_path / "activity.sqlite3"))
+    c = _Col(["case_255500120000201"])
+    client = SimpleNamespace(collections=SimpleNamespace(get=lambda name: c))
+    monkeypatch.setattr(wc, "get_client", lambda: client)
+    wc._HOT_TENANTS.clear()
+    yield c
+    wc._HOT_TENANTS.clear()
+
+
+def test_read_of_unknown_tenant_creates_nothing(col):
+    assert wc.read_report_collection("case_typo") is None
+    assert wc._fan_out(lambda c: c.tenant, "case_typo") == []
+    assert col.tenants.created == [] and "case_typo" not in wc._HOT_TENANTS
+
+
+def test_read_of_existing_tenant(col):
+    assert wc._fan_out(lambda c: c.tenant, "case_255500120000201") == ["case_255500120000201"]
+    assert col.tenants.created == []
+
+
+def test_write_accessor_still_creates(col):
+    assert wc.get_report_collection("case_999").tenant == "case_999"
+    assert col.tenants.created == ["case_999"]
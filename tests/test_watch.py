@@ -0,0 +1,124 @@
+# tests/test_watch.py
+"""app.services.watch: недоступность индекса не превращает буфер в ошибки чекпоинта."""
+from __future__ import annotations
+
+import os
+
+import pytest
+
+from app.core import weaviate_client
+from app.services import ingest, watch
+
+
+@pytest.fixture
+def watcher(tmp_path, monkeypatch):
+    monkeypatch.setenv("WATCH_CHECKPOINT", str(tmp_path / "watch.jsonl"))
+    monkeypatch.setenv("WATCH_INSERT_ATTEMPTS", "2")
+    monkeypatch.setenv("WATCH_BATCH", "20")
+    monkeypatch.setenv("RAW_ARCHIVE", "false")
+    monkeypatch.delenv("REPORT_TENANCY", raising=False)
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    w = watch.Watcher([str(inbox)])
+    yield w, inbox
+    w.ck.close()
+    if w.inotify is not None:
+        w.inotify.close()
+
+
+def _buffer(w, inbox, n):
+    for i in range(n):
+        p = inbox / f"scan{i}.txt"
+        p.write_text(f"Рапорт {i}", encoding="utf-8")
+        key = ingest._file_key(p)
+        w.queued.add(key[0])
+        w.buffer.append(((key[0], p.read_text(encoding="utf-8"), {"report_begin": f"текст {i}"},
+                          ingest.STATUS_DONE, "Рапорт"), 0.0, key))
+
+
+def _flush_now(w):
+    w.retry_at = 0.0
+    w._flush(force=True)
+
+
+def test_outage_keeps_buffer_and_spends_no_attempts(watcher, monkeypatch):
+    w, inbox = watcher
+    _buffer(w, inbox, 3)
+    calls = {"n": 0}
+
+    def down(objs, tenants=None, ids=None):
+        calls["n"] += 1
+        raise ConnectionError("weaviate: connection refused")
+
+    monkeypatch.setattr("app.core.backend.insert_reports", down)
+    for _ in range(5):   # больше, чем WATCH_INSERT_ATTEMPTS
+        _flush_now(w)
+    assert calls["n"] == 5
+    assert len(w.buffer) == 3 and not w.attempts
+    assert w.retry_at > 0 and not w.done
+
+    monkeypatch.setattr("app.core.backend.insert_reports", lambda objs, tenants=None, ids=None: list(ids))
+    _flush_now(w)
+    assert not w.buffer
+    assert {r["status"] for r in w.done.values()} == {ingest.STATUS_DONE}
+
+
+def test_whole_batch_rejected_is_a_batch_failure(watcher, monkeypatch):
+    w, inbox = watcher
+    _buffer(w, inbox, 2)
+    monkeypatch.setattr("app.core.backend.insert_reports", lambda objs, tenants=None, ids=None: [None] * len(objs))
+    for _ in range(4):
+        _flush_now(w)
+    assert len(w.buffer) == 2 and not w.done
+
+
+def test_insert_error_is_not_seen_by_rescan(watcher, monkeypatch):
+    w, inbox = watcher
+    _buffer(w, inbox, 2)
+    # второй объект отвергается поштучно, пока попытки не кончатся
+    monkeypatch.setattr("app.core.backend.insert_reports",
+                        lambda objs, tenants=None, ids=None: [None if o["report_begin"] == "текст 1" else uid
+                                                              for o, uid in zip(objs, ids)])
+    _flush_now(w)
+    _flush_now(w)
+    bad = str(inbox / "scan1.txt")
+    assert w.done[bad]["status"] == ingest.STATUS_ERROR
+    assert not w._seen(bad)
+    assert w._seen(str(inbox / "scan0.txt"))
+    w.rescan()
+    assert bad in w.pending
+
+
+class _Data:
+    def __init__(self, exc):
+        self.exc = exc
+
+    def exists(self, uid):
+        return False
+
+    def insert(self, properties, uuid=None):
+        raise self.exc
+
+
+class _Col:
+    def __init__(self, exc):
+        self.data = _Data(exc)
+
+
+def test_weaviate_insert_raises_when_unavailable(monkeypatch):
+    from weaviate.exceptions import UnexpectedStatusCodeError
+    monkeypatch.setattr(weaviate_client, "connect", lambda: None)
+    monkeypatch.setattr(weaviate_client, "get_report_collection", lambda tenant=None: _Col(ConnectionError("refused")))
+    with pytest.raises(ConnectionError):
+        weaviate_client.insert_reports([{"report_begin": "x"}])
+
+    class _Resp:
+        status_code = 422
+        text = "invalid property"
+
+        def json(self):
+            return {"error": [{"message": "invalid property"}]}
+
+    rejected = UnexpectedStatusCodeError("insert", _Resp())
+    monkeypatch.setattr(weaviate_client, "get_report_collection", lambda tenant=None: _Col(rejected))
+    assert weaviate_client.insert_reports([{"report_begin": "x"}]) == [None]